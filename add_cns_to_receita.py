@@ -6,8 +6,7 @@ Usa matching inteligente baseado em:
 3. Fallback: Fuzzy Matching apenas no nome da serventia
 """
 
-import gspread
-import toml
+import gsheets_client_utils
 import pandas as pd
 from rapidfuzz import fuzz, process
 from cns_utils import normalize_cns
@@ -15,7 +14,7 @@ from cns_utils import normalize_cns
 print("=== Adicionando CNS à Receita TJRJ ===\n")
 
 # Conecta
-gc = gspread.service_account_from_dict(toml.load('.streamlit/secrets.toml')['gcp_service_account'])
+gc = gsheets_client_utils.obter_cliente()
 
 # Planilha Receita TJRJ
 sh_receita = gc.open_by_key('1_BXjFfmKM_K0ZHpcU8qiEWYQm4weZeekg8E2CbOiQfE')
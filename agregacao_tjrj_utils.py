@@ -0,0 +1,135 @@
+"""
+Agregação das abas derivadas do TJRJ ('Análise 12 Meses', 'Distritos' e 'Cidades').
+
+Uma única passada agrupada sobre os dados brutos, com chaves categóricas
+(cod, cidade, designacao), calcula as médias mensais por serviço junto com o
+faturamento acumulado e o nº de registros de cada serviço; a tabela de cidades sai
+desse resultado (poucas centenas de linhas), sem novos agrupamentos sobre os dados
+brutos nem merges. A marca de distrito é calculada uma vez por designação distinta.
+
+Usado por extrai_transp_tjrj (cloud_main) e master_processo (processar_pdfs).
+"""
+import numpy as np
+import pandas as pd
+
+CHAVES_SERVICO = ['cod', 'cidade', 'designacao']
+COLUNAS_VALOR = ['RCPJ', 'RCPN', 'IT', 'RI', 'RTD', 'Notas', 'Protesto',
+                 'Emolumentos', 'Funarpem', 'Gratuitos', 'Total']
+
+# Layout da aba 'Cidades' do cloud_main (A..E)
+COLUNAS_CIDADES = ['cidade', 'Media Mensal Total (R$)', 'Faturamento Acumulado Bruto (R$)',
+                   'Qtd Cartorios', 'Média por cartório']
+
+RE_DISTRITO = r'(\d+).*?DISTR'
+
+
+def _categorica(serie):
+    return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+
+
+def marcar_distritos(designacoes):
+    """
+    Marca as designações de RCPN de Distrito a partir do 2º (mesma regra de
+    eh_distrito_valido), avaliando cada designação distinta uma só vez.
+
+    Args:
+        designacoes: Series (texto ou categórica) ou lista
+
+    Returns:
+        numpy.ndarray bool alinhado à entrada (não-textos são False)
+    """
+    categorias = pd.Categorical(designacoes)
+    textos = pd.Series(np.asarray(categorias.categories, dtype=object), dtype=object)
+    textos = textos.where(textos.map(type).eq(str))
+    numeros = textos.str.upper().str.extract(RE_DISTRITO, expand=False)
+    por_categoria = pd.to_numeric(numeros, errors='coerce').ge(2).to_numpy(dtype=bool)
+    codigos = categorias.codes
+    if not len(por_categoria):
+        return np.zeros(len(codigos), dtype=bool)
+    # código -1 (ausente) é descartado pela máscara
+    return (codigos >= 0) & por_categoria[codigos]
+
+
+def _ultimos_validos(serie, ids, n_grupos):
+    """Último valor não ausente de cada grupo (como groupby.last), pela posição da linha."""
+    posicoes = np.where(serie.notna().to_numpy() & (ids >= 0), np.arange(len(serie)), -1)
+    ultima = np.full(n_grupos, -1)
+    np.maximum.at(ultima, np.maximum(ids, 0), posicoes)
+    return pd.api.extensions.take(serie.array, ultima, allow_fill=True)
+
+
+def agregar(df_brutos):
+    """
+    Agrega os dados brutos numa única passada agrupada.
+
+    Linhas sem cod/cidade/designacao ficam de fora (o extrator sempre preenche as três).
+
+    Args:
+        df_brutos: DataFrame no formato de 'Dados Brutos'
+
+    Returns:
+        tuple: (df_analise, eh_distrito, df_cidades)
+            df_analise: médias mensais por (cod, cidade, designacao) + último gestor/cargo
+            eh_distrito: numpy.ndarray bool alinhado a df_analise
+            df_cidades: cidade, 'Media Mensal Total (R$)' (soma das médias dos serviços),
+                        'Faturamento Acumulado Bruto (R$)', 'Qtd Cartorios' e
+                        'Total de Registros Mensais', em ordem alfabética de cidade
+    """
+    # Grupo de cada linha a partir dos códigos das categorias (já em ordem alfabética)
+    chaves = [_categorica(df_brutos[col]).array for col in CHAVES_SERVICO]
+    codigos = np.stack([c.codes.astype(np.int64) for c in chaves])
+    valida = (codigos >= 0).all(axis=0)
+    tamanhos = [max(len(c.categories), 1) for c in chaves]
+    combinados, ids = np.unique(np.ravel_multi_index(codigos[:, valida], tamanhos), return_inverse=True)
+    n_grupos = len(combinados)
+
+    # Valores num único bloco float64: uma operação agrupada para todas as colunas
+    valores = pd.DataFrame(df_brutos[COLUNAS_VALOR].to_numpy(dtype='float64', na_value=np.nan)[valida],
+                           columns=COLUNAS_VALOR).groupby(ids)
+    medias = valores.mean().to_numpy()
+    acumulado = valores['Total'].sum().to_numpy()
+    registros = np.bincount(ids, minlength=n_grupos)
+
+    ids_linhas = np.full(len(df_brutos), -1)
+    ids_linhas[valida] = ids
+    por_servico = pd.DataFrame({
+        **{col: pd.Categorical.from_codes(cod, dtype=c.dtype) for col, c, cod in
+           zip(CHAVES_SERVICO, chaves, np.unravel_index(combinados, tamanhos))},
+        **{col: medias[:, k] for k, col in enumerate(COLUNAS_VALOR)},
+        **{col: _ultimos_validos(df_brutos[col], ids_linhas, n_grupos) for col in ('gestor', 'cargo')},
+    })
+
+    # Tabela de cidades a partir das linhas de serviço (já agregadas)
+    df_cidades = pd.DataFrame({
+        'cidade': por_servico['cidade'],
+        'Media Mensal Total (R$)': por_servico['Total'],
+        'Faturamento Acumulado Bruto (R$)': acumulado,
+        'Qtd Cartorios': 1,
+        'Total de Registros Mensais': registros,
+    }).groupby('cidade', observed=True, sort=True).sum().reset_index()
+
+    eh_distrito = marcar_distritos(por_servico['designacao'])
+    # Chaves voltam ao dtype de entrada (a exportação preenche ausentes com 0.0)
+    for col in CHAVES_SERVICO:
+        por_servico[col] = por_servico[col].astype(df_brutos[col].dtype)
+    df_cidades['cidade'] = df_cidades['cidade'].astype(df_brutos['cidade'].dtype)
+    return por_servico, eh_distrito, df_cidades
+
+
+def gerar_analises(df_brutos):
+    """
+    Abas derivadas no layout do cloud_main.
+
+    Returns:
+        tuple: (df_analise_compat, df_distritos, df_cidades)
+    """
+    df_analise, eh_distrito, df_cidades = agregar(df_brutos)
+
+    df_analise_compat = df_analise.rename(columns={'Total': 'Media Mensal Total (R$)'})
+    df_distritos = df_analise[eh_distrito].copy()
+
+    # E: Média por cartório = Media Mensal Total (B) / Qtd Cartorios (D)
+    df_cidades['Média por cartório'] = (df_cidades['Media Mensal Total (R$)'] / df_cidades['Qtd Cartorios']).round(2)
+    df_cidades = df_cidades[COLUNAS_CIDADES]
+    df_cidades = df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False)
+    return df_analise_compat, df_distritos, df_cidades
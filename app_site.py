@@ -9,9 +9,12 @@ Sistema de análise e visualização de receitas dos cartórios do Rio de Janeir
 import streamlit as st
 import pandas as pd
 import gspread
+import gsheets_client_utils
 import plotly.express as px
 import plotly.graph_objects as go
 import extrai_transp_tjrj
+import moeda_utils
+import esquema_utils
 import traceback
 import base64
 import sys
@@ -137,18 +140,6 @@ def format_br_currency(val):
     """Formata valor para padrão brasileiro (R$ 1.234,56)"""
     return f"R$ {val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def clean_currency(x):
-    """Converte string brasileira para float (1.234,56 -> 1234.56)"""
-    if not isinstance(x, str): 
-        return x
-    if not x.strip(): 
-        return 0.0
-    clean = x.replace('.', '').replace(',', '.')
-    try:
-        return float(clean)
-    except ValueError:
-        return 0.0
-
 # ============================================================================
 # AUTENTICAÇÃO
 # ============================================================================
@@ -177,12 +168,39 @@ def check_password():
 # ============================================================================
 # CARREGAMENTO DE DADOS
 # ============================================================================
+def _preparar_analise(df):
+    """Limpeza da 'Análise 12 Meses' (vinda da aba ou do dataset local)."""
+    df = df.drop_duplicates()
+    
+    # Remove linhas de totalização
+    if 'cidade' in df.columns:
+        df = df[~df['cidade'].astype(str).str.contains('Total', case=False, na=False)]
+    if 'designacao' in df.columns:
+        df = df[~df['designacao'].astype(str).str.contains('Total', case=False, na=False)]
+    
+    # Converte colunas numéricas (1.234,56 -> 1234.56; vazios viram 0.0)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = moeda_utils.converter_brl(df[col])
+    
+    # Substitui "Responsavel pelo Expediente" por "R.E." na coluna cargo
+    if 'cargo' in df.columns:
+        df['cargo'] = df['cargo'].astype(str).str.replace('Responsavel pelo Expediente', 'R.E.', case=False, regex=False)
+        df['cargo'] = df['cargo'].str.replace('Responsável pelo Expediente', 'R.E.', case=False, regex=False)
+    
+    # Tipos compactos: cada sessão do Streamlit guarda a sua cópia do quadro
+    return esquema_utils.compactar(df, esquema_utils.ESQUEMA_TJRJ, rotulo="Análise 12 Meses")
+
 @st.cache_data(ttl=60)  # Cache de 1 minuto para facilitar testes
 def load_data():
-    """Carrega dados da planilha Google Sheets com cache de 10 minutos"""
+    """Carrega a 'Análise 12 Meses' (dataset local ou planilha Google Sheets)"""
     try:
-        gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-        sh = gc.open_by_key(st.secrets["SHEET_ID"])
+        # Dataset canônico local (mesma máquina do cloud_main): lido do disco, sem o Sheets
+        df = extrai_transp_tjrj.carregar_analise_local()
+        if df is not None:
+            return _preparar_analise(df)
+        
+        sh = gsheets_client_utils.abrir_planilha(st.secrets["SHEET_ID"])
         
         try:
             worksheet = sh.worksheet("Análise 12 Meses")
@@ -194,28 +212,7 @@ def load_data():
             # Processa headers e dados
             header = [h.strip() for h in rows[0]]
             data = rows[1:]
-            df = pd.DataFrame(data, columns=header)
-            
-            # Limpeza de dados
-            df = df.drop_duplicates()
-            
-            # Remove linhas de totalização
-            if 'cidade' in df.columns:
-                df = df[~df['cidade'].astype(str).str.contains('Total', case=False, na=False)]
-            if 'designacao' in df.columns:
-                df = df[~df['designacao'].astype(str).str.contains('Total', case=False, na=False)]
-            
-            # Converte colunas numéricas
-            for col in NUMERIC_COLUMNS:
-                if col in df.columns:
-                    df[col] = df[col].apply(clean_currency)
-            
-            # Substitui "Responsavel pelo Expediente" por "R.E." na coluna cargo
-            if 'cargo' in df.columns:
-                df['cargo'] = df['cargo'].astype(str).str.replace('Responsavel pelo Expediente', 'R.E.', case=False, regex=False)
-                df['cargo'] = df['cargo'].str.replace('Responsável pelo Expediente', 'R.E.', case=False, regex=False)
-            
-            return df
+            return _preparar_analise(pd.DataFrame(data, columns=header))
             
         except gspread.exceptions.WorksheetNotFound:
             st.warning("A conexão foi feita, mas as abas de dados ainda não existem. Por favor, faça a atualização inicial.")
@@ -516,7 +513,7 @@ if not df.empty:
             
             if 'cargo' in df_filtered.columns:
                 # Agrupa por cargo
-                df_cargo = df_filtered.groupby('cargo')[col_total].sum().reset_index()
+                df_cargo = df_filtered.groupby('cargo', observed=True)[col_total].sum().reset_index()
                 df_cargo = df_cargo[df_cargo[col_total] > 0]
                 
                 if not df_cargo.empty:
@@ -0,0 +1,145 @@
+"""
+Carga histórica completa da Receita Cartorária do TJRJ.
+
+Descobre todas as páginas anuais do site de transparência, baixa e processa todos os
+relatórios mensais (downloads simultâneos sob limite de requisições por segundo) e
+grava o resultado no dataset local particionado por ano/mês (dataset_tjrj_utils).
+
+- Retomável: cada lote de meses é gravado assim que termina; uma execução interrompida
+  continua de onde parou.
+- Idempotente: meses já presentes no dataset são pulados (use --forcar para refazer;
+  o resultado gravado é o mesmo).
+
+Uso:
+    python backfill_tjrj.py                      (todos os anos disponíveis)
+    python backfill_tjrj.py --desde 2018 --ate 2022 --rps 1
+    python backfill_tjrj.py --forcar --backend pdfium
+"""
+import re
+import sys
+import time
+import argparse
+from datetime import date
+from urllib.parse import urlparse
+
+import extrai_transp_tjrj as tjrj
+import dataset_tjrj_utils
+from limitador_utils import LimitadorTaxa
+
+# Páginas anuais: BASE_PAGE/AAAA
+RE_PAGINA_ANO = re.compile(re.escape(urlparse(tjrj.BASE_PAGE).path) + r'/(\d{4})\b')
+ANO_MINIMO = 2000
+# Anos seguidos sem relatórios antes de parar a busca por páginas mais antigas
+MAX_ANOS_VAZIOS = 2
+TAMANHO_LOTE = 12
+RPS_PADRAO = 2.0
+
+
+def descobrir_links(desde=None, ate=None, limitador=None):
+    """
+    Descobre os links dos relatórios mensais em todas as páginas anuais.
+
+    Os anos vêm dos links da página principal; a busca continua para anos anteriores
+    até encontrar MAX_ANOS_VAZIOS anos seguidos sem relatórios.
+
+    Returns:
+        list: URLs dos PDFs (sem duplicatas), do mês mais recente para o mais antigo
+    """
+    ano_atual = date.today().year
+    ate = ate or ano_atual
+    desde = desde or ANO_MINIMO
+
+    if limitador: limitador()
+    html_main = tjrj.safe_get(tjrj.BASE_PAGE)
+    links = tjrj.extract_pdf_links(html_main)
+    anos_listados = {int(a) for a in RE_PAGINA_ANO.findall(html_main or "")}
+    print(f"[BACKFILL] Anos listados na página principal: {sorted(anos_listados) or 'nenhum'}")
+
+    vazios = 0
+    for ano in range(ate, desde - 1, -1):
+        if limitador: limitador()
+        links_ano = tjrj.extract_pdf_links(tjrj.safe_get(f"{tjrj.BASE_PAGE}/{ano}"))
+        links.extend(links_ano)
+        if links_ano:
+            vazios = 0
+        elif ano < min(anos_listados | {ano_atual}):
+            vazios += 1
+            if vazios >= MAX_ANOS_VAZIOS:
+                break
+
+    # Um relatório por mês (o mesmo PDF pode aparecer na página principal e na do ano)
+    por_mes = {}
+    for url in links:
+        mes, ano = tjrj.extrair_mes_ano(url)
+        if mes and desde <= ano <= ate:
+            por_mes.setdefault((ano, mes), url)
+    return [por_mes[chave] for chave in sorted(por_mes, reverse=True)]
+
+
+def executar_backfill(desde=None, ate=None, rps=RPS_PADRAO, forcar=False, backend=None,
+                      tamanho_lote=TAMANHO_LOTE, links=None):
+    """
+    Executa a carga histórica.
+
+    Args:
+        desde, ate: Intervalo de anos (padrão: todos os disponíveis)
+        rps: Máximo de requisições por segundo ao site do TJRJ (0 = sem limite)
+        forcar: Reprocessa também os meses que já estão no dataset
+        links: Lista de URLs já conhecida (pula a descoberta)
+
+    Returns:
+        dict: Contagens {'descobertos', 'pulados', 'gravados', 'falhas'}
+    """
+    if not dataset_tjrj_utils.disponivel():
+        raise RuntimeError("pyarrow não instalado: o dataset local é necessário para o backfill")
+
+    limitador = LimitadorTaxa(rps)
+    if links is None:
+        links = descobrir_links(desde, ate, limitador)
+
+    materializados = set() if forcar else dataset_tjrj_utils.meses_materializados()
+    pendentes = []
+    for url in links:
+        mes, ano = tjrj.extrair_mes_ano(url)
+        if (ano, mes) not in materializados:
+            pendentes.append(url)
+
+    stats = {'descobertos': len(links), 'pulados': len(links) - len(pendentes), 'gravados': 0, 'falhas': 0}
+    print(f"[BACKFILL] {len(links)} relatórios encontrados; {stats['pulados']} já no dataset; "
+          f"{len(pendentes)} a processar (limite {rps} req/s).")
+
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+        resultados = tjrj.baixar_e_processar_pdfs(lote, backend=backend, limitador=limitador)
+        for url, (nome_arquivo, dados) in zip(lote, resultados):
+            mes, ano = tjrj.extrair_mes_ano(url)
+            if dados and dataset_tjrj_utils.gravar_mes(ano, mes, dados):
+                stats['gravados'] += 1
+                print(f"[OK] {nome_arquivo} ({len(dados)} linhas)")
+            else:
+                stats['falhas'] += 1
+                print(f"[FALHA] {nome_arquivo} ({'sem dados' if dados is not None else 'download'})")
+        print(f"[BACKFILL] Progresso: {min(inicio + tamanho_lote, len(pendentes))}/{len(pendentes)}")
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga histórica da Receita Cartorária do TJRJ")
+    parser.add_argument('--desde', type=int, help="Primeiro ano (padrão: o mais antigo disponível)")
+    parser.add_argument('--ate', type=int, help="Último ano (padrão: ano atual)")
+    parser.add_argument('--rps', type=float, default=RPS_PADRAO, help="Requisições por segundo ao TJRJ")
+    parser.add_argument('--forcar', action='store_true', help="Reprocessa meses já presentes no dataset")
+    parser.add_argument('--backend', help="Backend de texto do PDF (pdfplumber, pdfium)")
+    args = parser.parse_args(argv)
+
+    inicio = time.time()
+    stats = executar_backfill(args.desde, args.ate, args.rps, args.forcar, args.backend)
+    print(f"\n[BACKFILL] Concluído em {time.time() - inicio:.1f}s: {stats['gravados']} mês(es) gravado(s), "
+          f"{stats['pulados']} já existentes, {stats['falhas']} falha(s).")
+    print(f"[BACKFILL] Dataset: {dataset_tjrj_utils.DATASET_DIR}")
+    return 1 if stats['falhas'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,13 @@
 import os
 import re
 import time
-import requests
+import http_utils
 from urllib.parse import urljoin, urlparse
 from datetime import date
 
+import pdf_cache_utils
+import pdf_stream_utils
+
 BASE_PAGE = "https://www.tjrj.jus.br/transparencia/relatorio-de-receita-cartoraria-extrajudicial"
 ROOT = "https://www.tjrj.jus.br"
 
@@ -36,7 +39,7 @@ def log_error(msg: str):
 def safe_get(url):
     """Baixa HTML sem exibir erros no console."""
     try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+        r = http_utils.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
         r.raise_for_status()
         return r.text
     except Exception as e:
@@ -91,35 +94,46 @@ def extrair_mes_ano(url):
     return (mes, ano) if mes and ano else (None, None)
 
 def download_stream(url, dest):
-    """Download robusto com retries — erros só no log."""
+    """Download robusto com retries — erros só no log.
+
+    O PDF é guardado no cache compartilhado (pdf_cache_utils) e exportado para `dest`;
+    se o servidor responder 304, a cópia do cache é reaproveitada sem novo download.
+    """
+    tmp = dest + ".part"
     for attempt in range(1, RETRIES + 1):
         try:
-            with requests.Session() as s:
-                r = s.get(
-                    url,
-                    headers={"User-Agent": "Mozilla/5.0"},
-                    stream=True,
-                    timeout=(TIMEOUT_CONNECT, TIMEOUT_READ)
-                )
+            headers = {"User-Agent": "Mozilla/5.0"}
+            headers.update(pdf_cache_utils.cabecalhos_condicionais(url))
+
+            # Conexão reaproveitada do pool do host (http_utils); o `with` a devolve ao pool
+            with http_utils.get(
+                url,
+                headers=headers,
+                stream=True,
+                timeout=(TIMEOUT_CONNECT, TIMEOUT_READ)
+            ) as r:
+                if r.status_code == 304 and pdf_cache_utils.exportar_pdf(url, dest):
+                    print(f"[CACHE] {os.path.basename(dest)}")
+                    return True
+                if r.status_code == 304:
+                    pdf_cache_utils.remover(url)
+                    raise Exception("304 sem cópia no cache")
                 r.raise_for_status()
 
-                with open(dest, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-
-            if os.path.getsize(dest) < MIN_PDF_BYTES:
-                raise Exception("Arquivo muito pequeno")
+                # Assinatura %PDF conferida no primeiro bloco: páginas de erro são abortadas na hora
+                pdf_stream_utils.gravar_resposta_pdf(r, tmp, MIN_PDF_BYTES)
 
-            with open(dest, "rb") as f:
-                if b"%PDF" not in f.read(10):
-                    raise Exception("Assinatura PDF inválida")
+            pdf_cache_utils.guardar_pdf_arquivo(url, tmp, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            if not pdf_cache_utils.exportar_pdf(url, dest):
+                raise Exception("Falha ao exportar do cache")
 
             print(f"[OK] {os.path.basename(dest)}")
             return True
 
         except Exception as e:
             log_error(f"[DOWNLOAD ERRO {attempt}/{RETRIES}] {url} — {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
             time.sleep(1 + attempt * 2)
 
     log_error(f"[FALHA] {url}")
@@ -0,0 +1,252 @@
+"""
+Benchmark dos extratores de PDF do TJRJ com relatórios sintéticos (gerador_relatorio_tjrj).
+
+Mede páginas/s, serviços/s e pico de memória de cada caminho de extração:
+    - extrai_transp_tjrj.processar_pdf_content  (pipeline do cloud_main)
+    - extrator.processar_pdfs                   (script local V71, gera o Excel)
+    - master_processo.processar_pdfs            (orquestrador local, gera o Excel)
+
+Cada caso roda num processo separado, para que o pico de memória (RSS) de um não
+contamine o outro. "Serviços" é o nº de linhas extraídas contra o nº de serviços do
+relatório: os scripts locais reiniciam o serviço a cada página, então perdem os
+serviços que atravessam páginas.
+
+Com --comparar, os resultados são confrontados com uma execução anterior (JSON
+gravado por --saida) e o script termina com código 1 se algum caso ficar mais
+lento ou usar mais memória que a tolerância.
+
+Uso:
+    python benchmark_parsers_tjrj.py
+    python benchmark_parsers_tjrj.py --arquivos 3 --paginas 200 --casos processar_pdf_content
+    python benchmark_parsers_tjrj.py --saida bench.json --comparar bench_anterior.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import builtins
+import resource
+import tempfile
+import contextlib
+import subprocess
+
+import gerador_relatorio_tjrj as gerador
+
+CASOS = ["processar_pdf_content", "extrator", "master_processo"]
+TOLERANCIA_PADRAO = 0.25
+
+
+def _pico_rss_mb():
+    # ru_maxrss vem em KB no Linux (e em bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def gerar_pdfs(pasta, n_arquivos, n_paginas, linhas_por_pagina=50):
+    """
+    Grava `n_arquivos` relatórios de `n_paginas` páginas em `pasta` como 'AAAA MM.pdf'.
+
+    Returns:
+        dict: {nome_arquivo: nº de serviços do relatório}
+    """
+    os.makedirs(pasta, exist_ok=True)
+    esperados = {}
+    for i in range(n_arquivos):
+        mes = 12 - i % 12
+        ano = 2025 - i // 12
+        pdf_bytes, servicos = gerador.gerar_relatorio(mes=mes, ano=ano, linhas_por_pagina=linhas_por_pagina,
+                                                       seed=ano * 100 + mes, n_paginas=n_paginas)
+        nome = f"{ano} {mes:02d}.pdf"
+        with open(os.path.join(pasta, nome), "wb") as f:
+            f.write(pdf_bytes)
+        esperados[nome] = len(servicos)
+    return esperados
+
+
+@contextlib.contextmanager
+def _script_local(modulo, pasta, pasta_saida):
+    """Aponta o script local para a pasta de PDFs sintéticos e silencia o 'Pressione ENTER'."""
+    arquivo_saida = os.path.join(pasta_saida, f"{modulo.__name__}.xlsx")
+    originais = (modulo.PASTA_PDFS, modulo.ARQUIVO_SAIDA, builtins.input, sys.stdout)
+    modulo.PASTA_PDFS, modulo.ARQUIVO_SAIDA = pasta, arquivo_saida
+    builtins.input = lambda *args: ""
+    sys.stdout = open(os.devnull, "w")
+    try:
+        yield arquivo_saida
+    finally:
+        sys.stdout.close()
+        modulo.PASTA_PDFS, modulo.ARQUIVO_SAIDA, builtins.input, sys.stdout = originais
+
+
+def _linhas_excel(arquivo_saida):
+    import pandas as pd
+    if not os.path.exists(arquivo_saida):
+        return 0
+    return len(pd.read_excel(arquivo_saida, sheet_name='Dados Brutos'))
+
+
+def executar_caso(caso, pasta, backend=None):
+    """
+    Executa um caso neste processo.
+
+    Returns:
+        dict: segundos, servicos extraídos, pico de memória (MB) e acréscimo sobre o
+              processo já com os módulos importados
+    """
+    arquivos = sorted(f for f in os.listdir(pasta) if f.endswith(".pdf"))
+    if caso == "processar_pdf_content":
+        import extrai_transp_tjrj as tjrj
+        rss_base = _pico_rss_mb()
+        inicio = time.perf_counter()
+        servicos = 0
+        for nome in arquivos:
+            ano, mes = nome[:-4].split()
+            dados = tjrj.processar_pdf_content(os.path.join(pasta, nome), f"{ano}_{mes}.pdf",
+                                               usar_cache=False, workers_paginas=1, backend=backend)
+            servicos += len(dados)
+        segundos = time.perf_counter() - inicio
+    elif caso in ("extrator", "master_processo"):
+        modulo = __import__(caso)
+        with tempfile.TemporaryDirectory() as pasta_saida:
+            rss_base = _pico_rss_mb()
+            with _script_local(modulo, pasta, pasta_saida) as arquivo_saida:
+                inicio = time.perf_counter()
+                if caso == "extrator":
+                    modulo.processar_pdfs(backend=backend)
+                else:
+                    modulo.processar_pdfs()
+                segundos = time.perf_counter() - inicio
+            servicos = _linhas_excel(arquivo_saida)
+    else:
+        raise ValueError(f"Caso desconhecido: {caso}")
+    pico = _pico_rss_mb()
+    return {'segundos': segundos, 'servicos': servicos, 'pico_mb': pico, 'acrescimo_mb': pico - rss_base}
+
+
+def medir(caso, pasta, backend=None):
+    """Executa um caso num processo novo e devolve as medidas (ou {'erro': ...})."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--executar", caso, "--pasta", pasta]
+    if backend:
+        cmd += ["--backend", backend]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    ultima = proc.stdout.strip().splitlines()[-1:] if proc.stdout.strip() else []
+    if proc.returncode != 0 or not ultima:
+        return {'erro': (proc.stderr.strip().splitlines() or ["sem saída"])[-1]}
+    return json.loads(ultima[0])
+
+
+def executar_benchmark(n_arquivos=2, n_paginas=100, casos=None, backend=None, linhas_por_pagina=50):
+    """
+    Gera os PDFs sintéticos e mede cada caso.
+
+    Returns:
+        dict: {'parametros': {...}, 'casos': {caso: medidas}}
+    """
+    casos = casos or CASOS
+    pasta = tempfile.mkdtemp(prefix="bench_tjrj_")
+    try:
+        esperados = gerar_pdfs(pasta, n_arquivos, n_paginas, linhas_por_pagina)
+        total_paginas = n_arquivos * n_paginas
+        resultados = {}
+        for caso in casos:
+            medidas = medir(caso, pasta, backend)
+            if 'erro' not in medidas:
+                medidas['paginas_s'] = total_paginas / medidas['segundos']
+                medidas['servicos_s'] = medidas['servicos'] / medidas['segundos']
+                medidas['servicos_esperados'] = sum(esperados.values())
+            resultados[caso] = medidas
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    parametros = {'arquivos': n_arquivos, 'paginas': n_paginas, 'linhas_por_pagina': linhas_por_pagina,
+                  'backend': backend or os.environ.get('TJRJ_PDF_BACKEND', 'pdfplumber')}
+    return {'parametros': parametros, 'casos': resultados}
+
+
+def imprimir_resultados(resultado):
+    p = resultado['parametros']
+    print(f"\n=== Benchmark extratores TJRJ: {p['arquivos']} PDF(s) x {p['paginas']} páginas "
+          f"(backend {p['backend']}) ===")
+    print(f"{'caso':<24}{'tempo':>9}{'pág/s':>10}{'serv/s':>10}{'serviços':>15}{'pico MB':>10}{'+MB':>8}")
+    for caso, m in resultado['casos'].items():
+        if 'erro' in m:
+            print(f"{caso:<24}  [ERRO] {m['erro']}")
+            continue
+        servicos = f"{m['servicos']}/{m['servicos_esperados']}"
+        print(f"{caso:<24}{m['segundos']:>8.2f}s{m['paginas_s']:>10.1f}{m['servicos_s']:>10.1f}"
+              f"{servicos:>15}{m['pico_mb']:>10.1f}{m['acrescimo_mb']:>8.1f}")
+
+
+def comparar_com_base(resultado, base, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Compara com uma execução anterior de mesmos parâmetros.
+
+    Returns:
+        list[str]: Regressões encontradas (vazia se nenhuma)
+    """
+    if base.get('parametros') != resultado['parametros']:
+        print("[AVISO] Parâmetros diferentes da execução base: comparação ignorada.")
+        return []
+    regressoes = []
+    for caso, m in resultado['casos'].items():
+        anterior = base['casos'].get(caso)
+        if not anterior or 'erro' in anterior:
+            continue
+        if 'erro' in m:
+            regressoes.append(f"{caso}: falhou ({m['erro']})")
+            continue
+        if m['servicos'] < anterior['servicos']:
+            regressoes.append(f"{caso}: serviços extraídos {anterior['servicos']} -> {m['servicos']}")
+        if m['paginas_s'] < anterior['paginas_s'] * (1 - tolerancia):
+            regressoes.append(f"{caso}: pág/s {anterior['paginas_s']:.1f} -> {m['paginas_s']:.1f}")
+        if m['acrescimo_mb'] > max(anterior['acrescimo_mb'] * (1 + tolerancia), anterior['acrescimo_mb'] + 20):
+            regressoes.append(f"{caso}: memória +{anterior['acrescimo_mb']:.1f} MB -> +{m['acrescimo_mb']:.1f} MB")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos extratores de PDF do TJRJ")
+    parser.add_argument('--arquivos', type=int, default=2, help="Nº de PDFs sintéticos")
+    parser.add_argument('--paginas', type=int, default=100, help="Páginas por PDF")
+    parser.add_argument('--linhas-por-pagina', type=int, default=50)
+    parser.add_argument('--casos', nargs='+', choices=CASOS, help="Casos a medir (padrão: todos)")
+    parser.add_argument('--backend', help="Backend de texto (pdf_texto_utils)")
+    parser.add_argument('--saida', help="Grava os resultados em JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    # Uso interno: executa um caso no processo atual
+    parser.add_argument('--executar', choices=CASOS, help=argparse.SUPPRESS)
+    parser.add_argument('--pasta', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.executar:
+        print(json.dumps(executar_caso(args.executar, args.pasta, args.backend)))
+        return 0
+
+    # Lê a base antes de gravar: --saida e --comparar podem ser o mesmo arquivo
+    base = None
+    if args.comparar and os.path.exists(args.comparar):
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    resultado = executar_benchmark(args.arquivos, args.paginas, args.casos, args.backend, args.linhas_por_pagina)
+    imprimir_resultados(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+        print(f"[OK] Resultados gravados em {args.saida}")
+
+    if base:
+        regressoes = comparar_com_base(resultado, base, args.tolerancia)
+        for r in regressoes:
+            print(f"[REGRESSAO] {r}")
+        if regressoes:
+            return 1
+        print(f"[OK] Sem regressões em relação a {args.comparar} (tolerância {args.tolerancia:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
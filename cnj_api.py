@@ -29,11 +29,10 @@ class CNJClient:
         """Inicializa o cliente SOAP com timeout"""
         try:
             from zeep.transports import Transport
-            from requests import Session
+            import http_utils
             
-            session = Session()
-            session.timeout = self.timeout
-            transport = Transport(session=session)
+            # Sessão do pool compartilhado (conexão reaproveitada entre as consultas por UF)
+            transport = Transport(session=http_utils.sessao(self.wsdl_url))
             
             self.client = Client(self.wsdl_url, transport=transport)
             logger.info(f"Cliente CNJ inicializado com timeout de {self.timeout}s")
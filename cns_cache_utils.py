@@ -0,0 +1,235 @@
+"""
+Cache local dos vínculos COD TJRJ -> CNS (SQLite).
+
+O banco local é a fonte principal do cache: a busca dos vínculos conhecidos é uma
+consulta local, sem chamadas à API do Google Sheets. A aba "Cache Matches CNS" vira
+um espelho, atualizado em segundo plano ao fim do enriquecimento:
+- vínculos marcados como MANUAL na planilha são importados (a edição manual continua
+  sendo feita na planilha e prevalece sobre o casamento automático), assim como
+  códigos que só existam na aba;
+- em seguida a aba é regravada com o conteúdo do banco, se algo mudou.
+
+Na primeira execução num ambiente novo (banco vazio) a aba é importada inteira.
+Edições manuais feitas na planilha valem a partir da execução seguinte ao espelhamento
+(ou imediatamente com `python cns_cache_utils.py --importar`).
+"""
+import os
+import sys
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from cns_utils import normalize_cns
+import gsheets_client_utils
+
+CNS_CACHE_DB = os.environ.get('TJRJ_CNS_CACHE_DB', os.path.join(os.getcwd(), 'cache_cns', 'vinculos.sqlite'))
+ABA_ESPELHO = "Cache Matches CNS"
+COLUNAS_PLANILHA = ['COD_TJRJ', 'CNS', 'NOME_TJRJ', 'NOME_CNJ', 'CIDADE', 'METODO_MATCH', 'DATA_CRIACAO', 'MANUAL']
+# Coluna da planilha -> coluna do banco
+_COLUNAS_BANCO = dict(zip(COLUNAS_PLANILHA, ['cod_tjrj', 'cns', 'nome_tjrj', 'nome_cnj', 'cidade',
+                                             'metodo', 'data_criacao', 'manual']))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vinculos (
+    cod_tjrj TEXT PRIMARY KEY,
+    cns TEXT NOT NULL,
+    nome_tjrj TEXT,
+    nome_cnj TEXT,
+    cidade TEXT,
+    metodo TEXT,
+    data_criacao TEXT,
+    manual INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS vinculos_cns ON vinculos (cns);
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+"""
+
+_lock = threading.Lock()
+_espelhos = []
+
+
+@contextmanager
+def _banco():
+    """Conexão com o banco (uma por operação, serializadas entre threads; commit ao sair)."""
+    with _lock:
+        os.makedirs(os.path.dirname(os.path.abspath(CNS_CACHE_DB)), exist_ok=True)
+        conexao = sqlite3.connect(CNS_CACHE_DB, timeout=30)
+        try:
+            conexao.executescript(_ESQUEMA)
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+
+def _versao(conexao, chave):
+    linha = conexao.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+    return linha[0] if linha else 0
+
+
+def _marcar_versao(conexao, chave, valor):
+    conexao.execute("INSERT INTO meta (chave, valor) VALUES (?, ?) "
+                    "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor", (chave, valor))
+
+
+def _eh_manual(valor):
+    return str(valor).strip().upper() in ('TRUE', '1', 'SIM', 'VERDADEIRO')
+
+
+def total_vinculos():
+    """Nº de vínculos no banco local."""
+    with _banco() as conexao:
+        return conexao.execute("SELECT COUNT(*) FROM vinculos").fetchone()[0]
+
+
+def carregar_vinculos():
+    """
+    Returns:
+        dict {COD_TJRJ: CNS} com todos os vínculos conhecidos
+    """
+    with _banco() as conexao:
+        return dict(conexao.execute("SELECT cod_tjrj, cns FROM vinculos"))
+
+
+def carregar_dataframe():
+    """Todos os vínculos no formato da aba (MANUAL como 'TRUE'/'FALSE'), ordenados por código."""
+    with _banco() as conexao:
+        df = pd.read_sql_query(f"SELECT {', '.join(_COLUNAS_BANCO.values())} FROM vinculos ORDER BY cod_tjrj", conexao)
+    df.columns = COLUNAS_PLANILHA
+    df['MANUAL'] = df['MANUAL'].map({1: 'TRUE', 0: 'FALSE'})
+    return df.fillna('')
+
+
+def gravar_vinculos(registros, substituir=False):
+    """
+    Grava vínculos no banco local.
+
+    Args:
+        registros: Lista de dicts com as chaves de COLUNAS_PLANILHA (faltantes ficam vazias)
+        substituir: False = só códigos novos (casamento automático nunca altera o que
+                    já existe); True = atualiza códigos existentes (edições manuais)
+
+    Returns:
+        int: Nº de vínculos inseridos/alterados
+    """
+    agora = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+    linhas = []
+    for registro in registros:
+        cod, cns = str(registro.get('COD_TJRJ', '')).strip(), str(registro.get('CNS', '')).strip()
+        if not cod or not cns:
+            continue
+        linhas.append((cod, normalize_cns(cns), str(registro.get('NOME_TJRJ', '')), str(registro.get('NOME_CNJ', '')),
+                       str(registro.get('CIDADE', '')), str(registro.get('METODO_MATCH', '') or 'auto'),
+                       str(registro.get('DATA_CRIACAO', '') or agora), int(_eh_manual(registro.get('MANUAL', False)))))
+    if not linhas:
+        return 0
+
+    colunas = ', '.join(_COLUNAS_BANCO.values())
+    if substituir:
+        # Só regrava o que mudou (evita marcar o espelho como desatualizado à toa)
+        sql = (f"INSERT INTO vinculos ({colunas}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+               "ON CONFLICT(cod_tjrj) DO UPDATE SET cns = excluded.cns, nome_tjrj = excluded.nome_tjrj, "
+               "nome_cnj = excluded.nome_cnj, cidade = excluded.cidade, metodo = excluded.metodo, "
+               "data_criacao = excluded.data_criacao, manual = excluded.manual "
+               "WHERE vinculos.cns != excluded.cns OR vinculos.manual != excluded.manual")
+    else:
+        sql = f"INSERT OR IGNORE INTO vinculos ({colunas}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    with _banco() as conexao:
+        antes = conexao.total_changes
+        conexao.executemany(sql, linhas)
+        alterados = conexao.total_changes - antes
+        if alterados:
+            _marcar_versao(conexao, 'versao', _versao(conexao, 'versao') + 1)
+    return alterados
+
+
+def _abrir_aba(sheet_id):
+    return gsheets_client_utils.obter_aba(sheet_id, ABA_ESPELHO, criar=True, rows=1000, cols=len(COLUNAS_PLANILHA))
+
+
+def _registros_planilha(ws):
+    valores = ws.get_all_values()
+    if not valores or valores[0][:len(COLUNAS_PLANILHA)] != COLUNAS_PLANILHA:
+        return []
+    return [dict(zip(COLUNAS_PLANILHA, linha + [''] * (len(COLUNAS_PLANILHA) - len(linha)))) for linha in valores[1:]]
+
+
+def importar_planilha(sheet_id, ws=None):
+    """
+    Importa a aba "Cache Matches CNS" para o banco local.
+
+    Vínculos MANUAL=TRUE substituem o que houver no banco; os demais só entram se o
+    código ainda não existir.
+
+    Returns:
+        tuple: (nº de vínculos importados, nº de linhas da aba)
+    """
+    ws = ws or _abrir_aba(sheet_id)
+    registros = _registros_planilha(ws)
+    manuais = [r for r in registros if _eh_manual(r['MANUAL'])]
+    importados = gravar_vinculos(manuais, substituir=True)
+    importados += gravar_vinculos([r for r in registros if not _eh_manual(r['MANUAL'])])
+    return importados, len(registros)
+
+
+def espelhar_planilha(sheet_id):
+    """
+    Sincroniza a aba com o banco: importa as edições manuais (e códigos que só existam
+    na aba, para nunca perder linhas) e regrava a aba se o banco mudou desde o último
+    espelhamento (2 chamadas de leitura, 2 de escrita só se necessário).
+
+    Returns:
+        int: Nº de linhas gravadas na aba (0 se já estava atualizada)
+    """
+    ws = _abrir_aba(sheet_id)
+    importados, linhas_aba = importar_planilha(sheet_id, ws=ws)
+    if importados:
+        print(f"  [CACHE] {importados} vínculos importados da planilha")
+
+    with _banco() as conexao:
+        versao = _versao(conexao, 'versao')
+        espelhada = _versao(conexao, 'versao_espelhada')
+        total = conexao.execute("SELECT COUNT(*) FROM vinculos").fetchone()[0]
+    if versao == espelhada and linhas_aba == total:
+        return 0
+
+    df = carregar_dataframe()
+    ws.clear()
+    ws.update(values=[COLUNAS_PLANILHA] + df.astype(str).values.tolist(), range_name='A1')
+    with _banco() as conexao:
+        _marcar_versao(conexao, 'versao_espelhada', versao)
+    print(f"  [CACHE] Espelho atualizado: {len(df)} vínculos na aba '{ABA_ESPELHO}'")
+    return len(df)
+
+
+def espelhar_em_segundo_plano(sheet_id):
+    """Inicia o espelhamento numa thread (o processo aguarda o término ao sair)."""
+    def executar():
+        try:
+            espelhar_planilha(sheet_id)
+        except Exception as e:
+            print(f"  [CACHE] Erro ao espelhar na planilha: {e}")
+
+    thread = threading.Thread(target=executar, name="espelho-cache-cns")
+    thread.start()
+    _espelhos.append(thread)
+    return thread
+
+
+def aguardar_espelho(timeout=None):
+    """Aguarda os espelhamentos pendentes."""
+    while _espelhos:
+        _espelhos.pop().join(timeout)
+
+
+if __name__ == "__main__":
+    # Uso: python cns_cache_utils.py --importar   (aplica agora as edições feitas na planilha)
+    if '--importar' in sys.argv[1:]:
+        from extrai_transp_tjrj import GOOGLE_SHEET_ID
+        importados, linhas = importar_planilha(GOOGLE_SHEET_ID)
+        print(f"[CACHE] {importados} vínculos importados ({linhas} linhas na aba)")
+    else:
+        print(f"[CACHE] {total_vinculos()} vínculos em {CNS_CACHE_DB}")
@@ -0,0 +1,412 @@
+"""
+Motor de casamento dos serviços do TJRJ com o CNS (Lista de Serventias do CNJ).
+
+A base do CNJ é indexada uma única vez (blocos por município, índices por nome e por
+gestor). Os serviços do TJRJ são casados por código (todos os meses juntos) passando
+pelos critérios abaixo, do mais para o menos confiável. Em cada critério todos os
+pares candidatos são resolvidos de uma vez, do maior para o menor escore, sem repetir
+serviço nem CNS (atribuição um-para-um global).
+
+    Método              Confiança   Regra
+    cache               1.00        vínculo já conhecido (manual ou execução anterior)
+    exato               1.00        mesmo município e mesmo nome normalizado
+    gestor              0.70-0.95   mesmo gestor; vários candidatos -> atribuições + nome
+    gestor_parcial      0.80        três primeiros nomes do gestor, candidato único
+                                    no município
+    atribuicao_unica    0.70        único cartório livre do município com as atribuições
+    similaridade        0.60-0.90   nome/gestor/atribuições parecidos (matriz por município)
+"""
+import re
+from collections import defaultdict
+from unicodedata import normalize
+
+import numpy as np
+import pandas as pd
+
+from cns_utils import normalize_cns
+
+NAO_ENCONTRADO = 'NAO_ENCONTRADO'
+GESTOR_NAO_IDENTIFICADO = 'NAO IDENTIFICADO'
+
+# Colunas de receita do TJRJ -> termos na coluna de atribuições do CNJ
+TERMOS_ATRIBUICAO = {
+    'RCPJ': ('RCPJ', 'PESSOAS JURIDICAS'),
+    'RCPN': ('RCPN', 'PESSOAS NATURAIS'),
+    'RI': ('IMOVEIS',),
+    'RTD': ('RTD', 'TITULOS E DOCUMENTOS'),
+    'Notas': ('TABELIE', 'NOTAS'),
+    'Protesto': ('PROTESTO',),
+}
+COLUNAS_RECEITA = list(TERMOS_ATRIBUICAO)
+
+CONFIANCA = {
+    'cache': 1.0, 'exato': 1.0,
+    'gestor': 0.95, 'gestor_varios': 0.85, 'gestor_outra_cidade': 0.70,
+    'gestor_parcial': 0.80,
+    'atribuicao_unica': 0.70,
+}
+# Similaridade: escore mínimo e vantagem mínima sobre o 2º melhor candidato do serviço
+LIMIAR_SIMILARIDADE = 0.62
+MARGEM_SIMILARIDADE = 0.08
+PESOS_SIMILARIDADE = {'nome': 0.55, 'gestor': 0.30, 'atribuicoes': 0.15}
+
+# Forma canônica dos nomes para a similaridade
+_ABREVIACOES = {
+    'RCPN': 'REGISTRO CIVIL PESSOAS NATURAIS', 'RCPJ': 'REGISTRO CIVIL PESSOAS JURIDICAS',
+    'RTD': 'REGISTRO TITULOS DOCUMENTOS', 'RI': 'REGISTRO IMOVEIS', 'OF': 'OFICIO',
+    'CIRC': 'CIRCUNSCRICAO', 'DISTR': 'DISTRITO', 'SUBDIST': 'SUBDISTRITO', 'TAB': 'TABELIONATO',
+}
+_PALAVRAS_VAZIAS = {'CARTORIO', 'DO', 'DA', 'DE', 'DOS', 'DAS', 'E', 'O', 'A', 'SERVICO', 'SERVENTIA'}
+_RE_NUMERO = re.compile(r'\b0*(\d+)(?:O|A|OS|AS)?\b')
+_RE_PALAVRA = re.compile(r'[A-Z0-9]+')
+
+
+def normalizar_nome(nome):
+    """Remove acentos e apóstrofos e passa para maiúsculas (D'ARAUJO -> D ARAUJO)."""
+    if not isinstance(nome, str):
+        return ""
+    nome = normalize('NFKD', nome).encode('ASCII', 'ignore').decode('ASCII')
+    return nome.replace("'", " ").upper().strip()
+
+
+def mascara_atribuicoes(texto):
+    """Bits das atribuições (ordem de COLUNAS_RECEITA) citadas num texto já normalizado."""
+    mascara = 0
+    for bit, coluna in enumerate(COLUNAS_RECEITA):
+        if any(termo in texto for termo in TERMOS_ATRIBUICAO[coluna]):
+            mascara |= 1 << bit
+    return mascara
+
+
+def detectar_colunas(df_serventias):
+    """Identifica as colunas da Lista de Serventias (os nomes variam entre exportações)."""
+    colunas = list(df_serventias.columns)
+
+    def achar(condicao, padrao):
+        return next((c for c in colunas if condicao(c.lower())), padrao)
+
+    return {
+        'nome': achar(lambda c: 'nome' in c or 'denominacao' in c or 'denominação' in c, 'Denominação'),
+        'municipio': achar(lambda c: 'municipio' in c or 'município' in c or 'cidade' in c, 'Município'),
+        'cns': achar(lambda c: 'cns' in c, 'CNS'),
+        'gestor': achar(lambda c: ('titular' in c or 'responsavel' in c or 'responsável' in c)
+                        and 'data' not in c and 'dat.' not in c, 'Titular'),
+        'atribuicao': achar(lambda c: 'atribuicao' in c or 'atribuição' in c, 'Atribuições'),
+    }
+
+
+def _nome_canonico(nome, municipio):
+    """(texto sem números/palavras vazias, conjunto de números) para comparar designações."""
+    if municipio:
+        nome = nome.replace(municipio, ' ')
+    numeros = frozenset(_RE_NUMERO.findall(nome))
+    palavras = []
+    for palavra in _RE_PALAVRA.findall(_RE_NUMERO.sub(' ', nome)):
+        palavra = _ABREVIACOES.get(palavra, palavra)
+        palavras.extend(p for p in palavra.split() if p not in _PALAVRAS_VAZIAS)
+    return " ".join(palavras), numeros
+
+
+def _primeiros_nomes(gestor, n=3):
+    partes = gestor.split()
+    return " ".join(partes[:n]) if len(partes) >= n else None
+
+
+def _matriz_trigramas(textos_a, textos_b):
+    """Similaridade de cosseno entre trigramas de caracteres (matriz len(a) x len(b))."""
+    vocab = {}
+    linhas = []
+    for texto in list(textos_a) + list(textos_b):
+        texto = f" {texto} "
+        contagem = defaultdict(int)
+        for i in range(len(texto) - 2):
+            contagem[vocab.setdefault(texto[i:i + 3], len(vocab))] += 1
+        linhas.append(contagem)
+    matriz = np.zeros((len(linhas), max(1, len(vocab))), dtype=np.float32)
+    for i, contagem in enumerate(linhas):
+        if contagem:
+            matriz[i, list(contagem)] = list(contagem.values())
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    matriz /= np.where(normas == 0, 1, normas)
+    return matriz[:len(textos_a)] @ matriz[len(textos_a):].T
+
+
+def _jaccard_mascaras(mascaras_a, mascaras_b):
+    """Jaccard entre as atribuições (bits) de cada par; 0.5 quando um lado não tem nenhuma."""
+    a = np.asarray(mascaras_a, dtype=np.int64)[:, None]
+    b = np.asarray(mascaras_b, dtype=np.int64)[None, :]
+    bits = np.arange(len(COLUNAS_RECEITA))
+    inter = ((a & b)[..., None] >> bits & 1).sum(-1)
+    uniao = ((a | b)[..., None] >> bits & 1).sum(-1)
+    return np.where(uniao == 0, 0.5, inter / np.maximum(uniao, 1)).astype(np.float32)
+
+
+def _conflito_numeros(numeros_a, numeros_b):
+    """1 onde os dois nomes têm números e nenhum coincide (1º x 2º ofício), por par."""
+    return np.array([[bool(na) and bool(nb) and not (na & nb) for nb in numeros_b] for na in numeros_a],
+                    dtype=bool).reshape(len(numeros_a), len(numeros_b))
+
+
+class BaseCNJ:
+    """Lista de Serventias indexada para o casamento (montada uma vez por execução)."""
+
+    def __init__(self, df_serventias):
+        self.colunas = col = detectar_colunas(df_serventias)
+        df = df_serventias.reindex(columns=list(dict.fromkeys(col.values())))
+        self.cns, self.nome, self.municipio, self.gestor, self.mascara = [], [], [], [], []
+        self.nome_original = []
+        for cns, nome, municipio, gestor, atribuicoes in zip(
+                df[col['cns']], df[col['nome']], df[col['municipio']], df[col['gestor']], df[col['atribuicao']]):
+            cns = normalize_cns(str(cns).strip()) if pd.notna(cns) and str(cns).strip() else ''
+            if not cns:
+                continue
+            self.cns.append(cns)
+            self.nome_original.append(nome)
+            self.nome.append(normalizar_nome(nome))
+            self.municipio.append(normalizar_nome(municipio))
+            self.gestor.append(normalizar_nome(gestor))
+            self.mascara.append(mascara_atribuicoes(normalizar_nome(str(atribuicoes))))
+
+        self.blocos = defaultdict(list)
+        self.por_nome = {}
+        self.por_gestor = defaultdict(list)
+        self.por_gestor_parcial = defaultdict(list)
+        for i, (municipio, nome, gestor) in enumerate(zip(self.municipio, self.nome, self.gestor)):
+            self.blocos[municipio].append(i)
+            self.por_nome[(municipio, nome)] = i
+            if gestor:
+                self.por_gestor[gestor].append(i)
+                # Como antes: os três primeiros nomes também indexam o gestor completo
+                parcial = _primeiros_nomes(gestor)
+                if parcial and parcial != gestor:
+                    self.por_gestor[parcial].append(i)
+                self.por_gestor_parcial[parcial or gestor].append(i)
+        self.canonico = [_nome_canonico(n, m) for n, m in zip(self.nome, self.municipio)]
+
+    def __len__(self):
+        return len(self.cns)
+
+
+def _montar_servicos(df_brutos):
+    """
+    Um serviço por código do TJRJ (ou cidade+designação, sem código), com os dados mais
+    recentes, todos os gestores vistos e a união das atribuições com receita > 0.
+
+    Returns:
+        tuple: (codigos por linha, DataFrame de serviços)
+    """
+    if 'cod' in df_brutos.columns:
+        chave = df_brutos['cod'].astype(str)
+    else:
+        chave = df_brutos['cidade'].astype(str) + '|' + df_brutos['designacao'].astype(str)
+    codigos, chaves = pd.factorize(chave)
+
+    flags = pd.DataFrame({c: pd.to_numeric(df_brutos[c], errors='coerce').to_numpy() > 0
+                          for c in COLUNAS_RECEITA if c in df_brutos.columns})
+    mascara = np.zeros(len(df_brutos), dtype=np.int64)
+    for bit, coluna in enumerate(COLUNAS_RECEITA):
+        if coluna in flags.columns:
+            mascara |= flags[coluna].to_numpy().astype(np.int64) << bit
+
+    linhas = pd.DataFrame({
+        'servico': codigos,
+        'municipio': [normalizar_nome(v) for v in df_brutos['cidade']],
+        'nome': [normalizar_nome(v) for v in df_brutos['designacao']],
+        'gestor': [normalizar_nome(v) for v in df_brutos['gestor']] if 'gestor' in df_brutos.columns else "",
+        'mascara': mascara,
+    })
+    grupos = linhas.groupby('servico', sort=True)
+    servicos = pd.DataFrame({
+        'chave': np.asarray(chaves, dtype=object),
+        'municipio': grupos['municipio'].last().to_numpy(),
+        'nome': grupos['nome'].last().to_numpy(),
+        'mascara': grupos['mascara'].agg(np.bitwise_or.reduce).to_numpy(),
+    })
+    # Gestores do mais recente para o mais antigo (sem 'NAO IDENTIFICADO')
+    gestores = [[] for _ in range(len(servicos))]
+    vistos = linhas[['servico', 'gestor']].iloc[::-1].drop_duplicates()
+    for servico, gestor in zip(vistos['servico'], vistos['gestor']):
+        if gestor and gestor != GESTOR_NAO_IDENTIFICADO:
+            gestores[servico].append(gestor)
+    servicos['gestores'] = gestores
+    return codigos, servicos
+
+
+class _Casamento:
+    """Estado da atribuição um-para-um: CNS, método e confiança de cada serviço."""
+
+    def __init__(self, n_servicos):
+        self.cns = np.full(n_servicos, NAO_ENCONTRADO, dtype=object)
+        self.metodo = np.full(n_servicos, "", dtype=object)
+        self.confianca = np.zeros(n_servicos, dtype=np.float64)
+        self.usados = set()
+
+    def livre(self, servico):
+        return self.cns[servico] == NAO_ENCONTRADO
+
+    def resolver(self, pares):
+        """
+        Aplica pares (escore, servico, cns, metodo, confianca) do maior para o menor
+        escore, pulando serviços e CNS já atribuídos.
+
+        Returns:
+            int: Nº de serviços atribuídos
+        """
+        atribuidos = 0
+        for _, servico, cns, metodo, confianca in sorted(pares, key=lambda p: (-p[0], p[1])):
+            if not self.livre(servico) or cns in self.usados:
+                continue
+            self.cns[servico], self.metodo[servico], self.confianca[servico] = cns, metodo, round(confianca, 3)
+            self.usados.add(cns)
+            atribuidos += 1
+        return atribuidos
+
+    def fixar(self, pares):
+        """
+        Aplica pares (servico, cns, metodo, confianca) já decididos (cache/manual) sem a
+        restrição um-para-um: o mesmo CNS pode valer para mais de um serviço (ex.: vínculo
+        manual 4450 -> 091041). Os CNS ficam reservados para as etapas automáticas.
+
+        Returns:
+            int: Nº de serviços atribuídos
+        """
+        for servico, cns, metodo, confianca in pares:
+            self.cns[servico], self.metodo[servico], self.confianca[servico] = cns, metodo, round(confianca, 3)
+            self.usados.add(cns)
+        return len(pares)
+
+
+def _pares_exatos(base, servicos, casamento):
+    for s, (municipio, nome) in enumerate(zip(servicos['municipio'], servicos['nome'])):
+        i = base.por_nome.get((municipio, nome)) if casamento.livre(s) else None
+        if i is not None:
+            yield (1.0, s, base.cns[i], 'exato', CONFIANCA['exato'])
+
+
+def _pares_gestor(base, servicos, casamento, parcial=False):
+    indice = base.por_gestor_parcial if parcial else base.por_gestor
+    metodo = 'gestor_parcial' if parcial else 'gestor'
+    for s in range(len(servicos)):
+        if not casamento.livre(s):
+            continue
+        municipio = servicos.at[s, 'municipio']
+        for ordem, gestor in enumerate(servicos.at[s, 'gestores']):
+            chave = _primeiros_nomes(gestor) if parcial else gestor
+            candidatos = [i for i in indice.get(chave, []) if base.cns[i] not in casamento.usados]
+            if not candidatos:
+                continue
+            no_municipio = [i for i in candidatos if base.municipio[i] == municipio]
+            # Outra cidade só quando o município não existe na base do CNJ (grafia
+            # diferente); se existe, o mesmo nome em outra cidade é homônimo
+            outra_cidade = not no_municipio
+            if outra_cidade and (parcial or municipio in base.blocos):
+                continue
+            candidatos = no_municipio or candidatos
+            if parcial and len(candidatos) > 1:
+                continue  # Nome parcial só vale com candidato único
+            if len(candidatos) == 1:
+                confianca = CONFIANCA['gestor_outra_cidade' if outra_cidade else metodo]
+                yield (confianca - 0.01 * ordem, s, base.cns[candidatos[0]], metodo, confianca)
+                continue
+            # Vários cartórios do mesmo gestor: atribuições em comum + nome parecido
+            canon_s, numeros_s = _nome_canonico(servicos.at[s, 'nome'], municipio)
+            sim = _matriz_trigramas([canon_s], [base.canonico[i][0] for i in candidatos])[0]
+            conflito = _conflito_numeros([numeros_s], [base.canonico[i][1] for i in candidatos])[0]
+            comuns = [bin(servicos.at[s, 'mascara'] & base.mascara[i]).count("1") for i in candidatos]
+            confianca = CONFIANCA['gestor_outra_cidade' if outra_cidade else 'gestor_varios']
+            for i, c, x, conf in zip(candidatos, comuns, sim, conflito):
+                escore = c + float(x) - (1.0 if conf else 0.0)
+                yield (confianca - 0.01 * ordem + escore / 100, s, base.cns[i], metodo, confianca)
+
+
+def _pares_atribuicao_unica(base, servicos, casamento):
+    livres_por_bloco = defaultdict(list)
+    for s in range(len(servicos)):
+        if casamento.livre(s) and servicos.at[s, 'mascara']:
+            livres_por_bloco[servicos.at[s, 'municipio']].append(s)
+    for municipio, lista in livres_por_bloco.items():
+        candidatos = [i for i in base.blocos.get(municipio, []) if base.cns[i] not in casamento.usados]
+        escolhas = {}
+        for s in lista:
+            mascara = servicos.at[s, 'mascara']
+            cobre = [i for i in candidatos if base.mascara[i] & mascara == mascara]
+            if len(cobre) == 1:
+                escolhas[s] = cobre[0]
+        # Um CNS disputado por dois serviços não é "único" para nenhum deles
+        disputados = pd.Series(escolhas, dtype=object).value_counts()
+        for s, i in escolhas.items():
+            if disputados[i] == 1:
+                yield (CONFIANCA['atribuicao_unica'], s, base.cns[i], 'atribuicao_unica', CONFIANCA['atribuicao_unica'])
+
+
+def _pares_similaridade(base, servicos, casamento):
+    livres_por_bloco = defaultdict(list)
+    for s in range(len(servicos)):
+        if casamento.livre(s):
+            livres_por_bloco[servicos.at[s, 'municipio']].append(s)
+    for municipio, lista in livres_por_bloco.items():
+        candidatos = [i for i in base.blocos.get(municipio, []) if base.cns[i] not in casamento.usados]
+        if not candidatos:
+            continue
+        canon_s = [_nome_canonico(servicos.at[s, 'nome'], municipio) for s in lista]
+        nome = _matriz_trigramas([c[0] for c in canon_s], [base.canonico[i][0] for i in candidatos])
+        conflito = _conflito_numeros([c[1] for c in canon_s], [base.canonico[i][1] for i in candidatos])
+        gestores_s = [(servicos.at[s, 'gestores'] or [""])[0] for s in lista]
+        gestor = _matriz_trigramas(gestores_s, [base.gestor[i] for i in candidatos])
+        atribuicoes = _jaccard_mascaras([servicos.at[s, 'mascara'] for s in lista],
+                                        [base.mascara[i] for i in candidatos])
+        escore = (PESOS_SIMILARIDADE['nome'] * nome + PESOS_SIMILARIDADE['gestor'] * gestor
+                  + PESOS_SIMILARIDADE['atribuicoes'] * atribuicoes)
+        escore[conflito] = 0.0
+
+        ordem = np.argsort(-escore, axis=1)
+        for linha, s in enumerate(lista):
+            melhor = escore[linha, ordem[linha, 0]]
+            segundo = escore[linha, ordem[linha, 1]] if len(candidatos) > 1 else 0.0
+            if melhor < LIMIAR_SIMILARIDADE or melhor - segundo < MARGEM_SIMILARIDADE:
+                continue
+            i = candidatos[ordem[linha, 0]]
+            yield (float(melhor), s, base.cns[i], 'similaridade', min(0.9, float(melhor)))
+
+
+def casar_cns(df_brutos, df_serventias, fixos=None, base=None):
+    """
+    Casa cada linha do TJRJ com um CNS.
+
+    Args:
+        df_brutos: Dados brutos do TJRJ (cod, cidade, designacao, gestor e receitas)
+        df_serventias: Lista de Serventias do CNJ (ignorado se `base` for informada)
+        fixos: {cod: CNS} já conhecidos (cache/manual); têm prioridade sobre o motor e
+               são aplicados como estão, mesmo com CNS repetido
+        base: BaseCNJ já montada (para reaproveitar entre chamadas)
+
+    Returns:
+        tuple: (DataFrame com CNS, CNS_METODO e CNS_CONFIANCA no índice de df_brutos,
+                dict {metodo: nº de serviços})
+    """
+    base = base if base is not None else BaseCNJ(df_serventias)
+    codigos, servicos = _montar_servicos(df_brutos)
+    casamento = _Casamento(len(servicos))
+    contagem = {}
+
+    if fixos:
+        pares = [(s, normalize_cns(fixos[chave]), 'cache', CONFIANCA['cache'])
+                 for s, chave in enumerate(servicos['chave']) if chave in fixos and str(fixos[chave]).strip()]
+        contagem['cache'] = casamento.fixar(pares)
+
+    etapas = [
+        ('exato', lambda: _pares_exatos(base, servicos, casamento)),
+        ('gestor', lambda: _pares_gestor(base, servicos, casamento)),
+        ('gestor_parcial', lambda: _pares_gestor(base, servicos, casamento, parcial=True)),
+        ('atribuicao_unica', lambda: _pares_atribuicao_unica(base, servicos, casamento)),
+        ('similaridade', lambda: _pares_similaridade(base, servicos, casamento)),
+    ]
+    for metodo, gerar_pares in etapas:
+        contagem[metodo] = casamento.resolver(list(gerar_pares()))
+
+    resultado = pd.DataFrame({
+        'CNS': casamento.cns[codigos],
+        'CNS_METODO': casamento.metodo[codigos],
+        'CNS_CONFIANCA': casamento.confianca[codigos],
+    }, index=df_brutos.index)
+    return resultado, contagem
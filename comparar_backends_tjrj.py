@@ -0,0 +1,126 @@
+"""
+Compara os backends de extração de texto (pdf_texto_utils) sobre relatórios do TJRJ.
+
+Roda processar_pdf_content com cada backend e compara as linhas extraídas, campo a
+campo. Por padrão usa relatórios sintéticos gerados localmente (gerador_relatorio_tjrj);
+PDFs reais já baixados podem ser passados como argumento (arquivos ou pastas).
+
+Uso:
+    python comparar_backends_tjrj.py                      (relatórios sintéticos)
+    python comparar_backends_tjrj.py pdfs/ cache_pdfs/    (+ PDFs locais)
+
+Sai com código 1 se algum backend divergir do pdfplumber.
+"""
+import os
+import sys
+import time
+
+import extrai_transp_tjrj as tjrj
+import gerador_relatorio_tjrj as gerador
+import pdf_texto_utils
+
+BACKEND_REFERENCIA = 'pdfplumber'
+
+# (nome, parâmetros de gerador_relatorio_tjrj.gerar_relatorio)
+AMOSTRAS_SINTETICAS = [
+    ("2025_10.pdf", dict(n_servicos=150, mes=10, ano=2025, seed=1)),
+    ("2024_03.pdf", dict(n_servicos=80, mes=3, ano=2024, linhas_por_pagina=17, seed=2)),
+    ("2019_12.pdf", dict(n_servicos=40, mes=12, ano=2019, linhas_por_pagina=60, seed=3)),
+]
+
+
+def amostras_sinteticas():
+    """Gera (nome, bytes) dos relatórios sintéticos de referência."""
+    for nome, parametros in AMOSTRAS_SINTETICAS:
+        pdf_bytes, _ = gerador.gerar_relatorio(**parametros)
+        yield nome, pdf_bytes
+
+
+def amostras_locais(caminhos):
+    """Gera (nome, caminho) dos PDFs encontrados nos arquivos/pastas informados."""
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for raiz, _, arquivos in os.walk(caminho):
+                for arquivo in sorted(arquivos):
+                    if arquivo.lower().endswith('.pdf'):
+                        yield arquivo, os.path.join(raiz, arquivo)
+        elif os.path.isfile(caminho):
+            yield os.path.basename(caminho), caminho
+
+
+def diferencas(linhas_ref, linhas_outro, limite=5):
+    """
+    Compara duas listas de linhas extraídas.
+
+    Returns:
+        list[str]: Descrição das diferenças (no máximo `limite` linhas divergentes)
+    """
+    saida = []
+    if len(linhas_ref) != len(linhas_outro):
+        saida.append(f"nº de linhas: {len(linhas_ref)} x {len(linhas_outro)}")
+
+    divergentes = 0
+    for i, (ref, outro) in enumerate(zip(linhas_ref, linhas_outro)):
+        campos = [c for c in ref.keys() | outro.keys() if ref.get(c) != outro.get(c)]
+        if not campos:
+            continue
+        divergentes += 1
+        if divergentes <= limite:
+            detalhe = ", ".join(f"{c}: {ref.get(c)!r} x {outro.get(c)!r}" for c in sorted(campos))
+            saida.append(f"linha {i} (cod {ref.get('cod')}): {detalhe}")
+    if divergentes > limite:
+        saida.append(f"... mais {divergentes - limite} linha(s) divergente(s)")
+    return saida
+
+
+def comparar(amostras, backends=None):
+    """
+    Extrai cada amostra com todos os backends e compara com o de referência.
+
+    Args:
+        amostras: Iterável de (nome_arquivo, bytes ou caminho)
+        backends: Backends a comparar (padrão: todos os disponíveis)
+
+    Returns:
+        dict: {nome_arquivo: {backend: {'linhas', 'segundos', 'diferencas'}}}
+    """
+    backends = backends or pdf_texto_utils.backends_disponiveis()
+    resultado = {}
+    for nome, pdf in amostras:
+        por_backend = {}
+        for backend in backends:
+            inicio = time.perf_counter()
+            linhas = tjrj.processar_pdf_content(pdf, nome, usar_cache=False, workers_paginas=1, backend=backend)
+            por_backend[backend] = {'linhas': linhas, 'segundos': time.perf_counter() - inicio}
+
+        referencia = por_backend[BACKEND_REFERENCIA]['linhas']
+        for backend, info in por_backend.items():
+            info['diferencas'] = diferencas(referencia, info['linhas'])
+        resultado[nome] = por_backend
+    return resultado
+
+
+def imprimir_relatorio(resultado):
+    """Imprime o resumo da comparação e retorna True se todos os backends coincidirem."""
+    tudo_igual = True
+    for nome, por_backend in resultado.items():
+        print(f"\n{nome}")
+        ref = por_backend[BACKEND_REFERENCIA]
+        for backend, info in por_backend.items():
+            status = "IGUAL" if not info['diferencas'] else "DIVERGE"
+            ganho = ref['segundos'] / info['segundos'] if info['segundos'] else 0
+            print(f"  [{status}] {backend:<11} {len(info['linhas']):>5} linhas  "
+                  f"{info['segundos']:6.2f}s  ({ganho:.1f}x)")
+            for linha in info['diferencas']:
+                print(f"      {linha}")
+            tudo_igual = tudo_igual and not info['diferencas']
+    return tudo_igual
+
+
+if __name__ == "__main__":
+    amostras = list(amostras_sinteticas()) + list(amostras_locais(sys.argv[1:]))
+    print(f"Backends: {', '.join(pdf_texto_utils.backends_disponiveis())} | Amostras: {len(amostras)}")
+    if not imprimir_relatorio(comparar(amostras)):
+        print("\n[AVISO] Há divergências: mantenha o backend padrão (pdfplumber).")
+        sys.exit(1)
+    print("\n[OK] Todos os backends extraíram as mesmas linhas.")
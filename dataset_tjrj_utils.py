@@ -0,0 +1,346 @@
+"""
+Dataset local dos dados brutos do TJRJ, particionado por ano/mês.
+
+Cada mês processado fica em dados_tjrj/ano=YYYY/mes=MM/dados.parquet com as linhas
+exatamente como saíram do extrator (valores ausentes continuam None). Assim uma
+execução incremental descobre quais meses já existem só listando as pastas e
+processa apenas os que faltam. dados_tjrj/exportacao.json registra a versão de cada
+mês enviada ao Google Sheets na última exportação bem-sucedida: sem mês novo, a
+execução incremental só termina sem exportar se o dataset ainda for aquele.
+
+Na mesma partição, brutos.parquet guarda a aba 'Dados Brutos' daquele mês já montada
+e tipada (textos, ano/mês inteiros, valores float64, zstd), com as colunas de CNS
+gravadas pelo popula_cns.py. É o sistema de registro: as abas do Google Sheets são
+renderizadas a partir dele e os painéis o leem direto do disco. Os dois arquivos
+vivem e são removidos juntos (remover_mes); regravar brutos.parquet sem as colunas
+de CNS mantém as do arquivo anterior.
+"""
+import os
+import re
+import json
+import hashlib
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # Sem pyarrow o dataset fica desativado (execuções sempre completas)
+
+DATASET_DIR = os.environ.get('TJRJ_DATASET_DIR', os.path.join(os.getcwd(), 'dados_tjrj'))
+
+_RE_ANO = re.compile(r'^ano=(\d{4})$')
+_RE_MES = re.compile(r'^mes=(\d{2})$')
+
+
+def disponivel():
+    """True se o dataset pode ser usado neste ambiente (pyarrow instalado)."""
+    return pa is not None
+
+
+def _dir_particao(ano, mes, dataset_dir=None):
+    return os.path.join(dataset_dir or DATASET_DIR, f"ano={int(ano):04d}", f"mes={int(mes):02d}")
+
+
+def meses_materializados(dataset_dir=None):
+    """
+    Lista os meses já gravados no dataset.
+
+    Returns:
+        set: {(ano, mes)} como inteiros
+    """
+    return _meses_em(dataset_dir or DATASET_DIR, 'dados.parquet')
+
+
+def _meses_em(base, arquivo):
+    meses = set()
+    if pa is None or not os.path.isdir(base):
+        return meses
+    for nome_ano in os.listdir(base):
+        m_ano = _RE_ANO.match(nome_ano)
+        if not m_ano:
+            continue
+        for nome_mes in os.listdir(os.path.join(base, nome_ano)):
+            m_mes = _RE_MES.match(nome_mes)
+            if m_mes and os.path.exists(os.path.join(base, nome_ano, nome_mes, arquivo)):
+                meses.add((int(m_ano.group(1)), int(m_mes.group(1))))
+    return meses
+
+
+def _gravar_atomico(tabela, caminho):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(tabela, tmp, compression='zstd')
+        os.replace(tmp, caminho)
+        return True
+    except Exception as e:
+        print(f"[DATASET] Falha ao gravar {caminho}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def gravar_mes(ano, mes, linhas, dataset_dir=None):
+    """
+    Grava (ou substitui) as linhas de um mês. Meses sem linhas não são gravados.
+
+    Args:
+        ano, mes: Partição de destino
+        linhas: list[dict] no formato do extrator (COLUNAS_BRUTAS)
+
+    Returns:
+        bool: True se o mês foi gravado
+    """
+    if pa is None or not linhas:
+        return False
+    caminho = os.path.join(_dir_particao(ano, mes, dataset_dir), 'dados.parquet')
+    return _gravar_atomico(pa.Table.from_pylist(linhas), caminho)
+
+
+def carregar_mes(ano, mes, dataset_dir=None):
+    """
+    Lê as linhas de um mês.
+
+    Returns:
+        list[dict] ou None se o mês não estiver no dataset
+    """
+    if pa is None:
+        return None
+    caminho = os.path.join(_dir_particao(ano, mes, dataset_dir), 'dados.parquet')
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return pq.read_table(caminho).to_pylist()
+    except Exception as e:
+        print(f"[DATASET] Arquivo inválido {caminho}: {e}")
+        return None
+
+
+def remover_mes(ano, mes, dataset_dir=None):
+    """Remove um mês do dataset (ex.: para forçar novo processamento)."""
+    shutil.rmtree(_dir_particao(ano, mes, dataset_dir), ignore_errors=True)
+
+
+def carregar_dataframe(anos=None, dataset_dir=None):
+    """
+    Lê o dataset inteiro (ou só alguns anos) num DataFrame, para análises de vários anos.
+
+    Args:
+        anos: Anos a carregar (padrão: todos)
+
+    Returns:
+        pandas.DataFrame (vazio se não houver dados)
+    """
+    if pa is None:
+        return pd.DataFrame()
+    tabelas = []
+    for ano, mes in sorted(meses_materializados(dataset_dir)):
+        if anos is not None and ano not in anos:
+            continue
+        tabelas.append(pq.read_table(os.path.join(_dir_particao(ano, mes, dataset_dir), 'dados.parquet')))
+    if not tabelas:
+        return pd.DataFrame()
+    # Colunas sempre vazias num mês têm tipo nulo: unifica os esquemas antes de concatenar
+    return pa.concat_tables(tabelas, promote_options='default').to_pandas()
+
+
+def _versao_mes(ano, mes, dataset_dir=None):
+    """Versão do mês no dataset (sha1 de dados.parquet) ou None se ausente."""
+    try:
+        with open(os.path.join(_dir_particao(ano, mes, dataset_dir), 'dados.parquet'), 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _arquivo_exportacao(dataset_dir=None):
+    return os.path.join(dataset_dir or DATASET_DIR, 'exportacao.json')
+
+
+def registrar_exportacao(meses, dataset_dir=None):
+    """
+    Registra a versão atual de `meses` como exportada para o Google Sheets (chamar só
+    depois de uma exportação bem-sucedida).
+
+    Args:
+        meses: [(ano, mes)] presentes nas abas enviadas
+    """
+    if pa is None:
+        return
+    versoes = {f"{int(a):04d}_{int(m):02d}": _versao_mes(a, m, dataset_dir) for a, m in meses}
+    caminho = _arquivo_exportacao(dataset_dir)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(versoes, f, indent=1)
+        os.replace(tmp, caminho)
+    except OSError as e:
+        print(f"[DATASET] Falha ao gravar {caminho}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def exportacao_em_dia(meses, dataset_dir=None):
+    """
+    True se a última exportação bem-sucedida enviou exatamente `meses` com o conteúdo que
+    está no dataset (nenhum mês alterado ou exportação falha desde então).
+    """
+    try:
+        with open(_arquivo_exportacao(dataset_dir), encoding='utf-8') as f:
+            exportadas = json.load(f)
+    except (OSError, ValueError):
+        return False
+    atuais = {f"{int(a):04d}_{int(m):02d}": _versao_mes(a, m, dataset_dir) for a, m in meses}
+    return bool(atuais) and None not in atuais.values() and atuais == exportadas
+
+
+# ####################################################################
+# DATASET CANÔNICO ('Dados Brutos' tipado)
+# ####################################################################
+
+COLUNAS_TEXTO = ['cod', 'cidade', 'designacao', 'arquivo_origem', 'gestor', 'cargo', 'CNS', 'CNS_METODO']
+COLUNAS_VALOR = ['RCPJ', 'RCPN', 'IT', 'RI', 'RTD', 'Notas', 'Protesto',
+                 'Emolumentos', 'Funarpem', 'Gratuitos', 'Total', 'CNS_CONFIANCA']
+# Enriquecimento (popula_cns.py): por código, preservado quando o mês é regravado sem ele
+COLUNAS_CNS = ['CNS', 'CNS_METODO', 'CNS_CONFIANCA', 'FROM_CACHE']
+
+_ARQUIVO_BRUTOS = 'brutos.parquet'
+
+
+def dir_canonico(dataset_dir=None):
+    """Pasta raiz do dataset canônico (as mesmas partições de gravar_mes)."""
+    return dataset_dir or DATASET_DIR
+
+
+def _caminho_brutos(ano, mes, dataset_dir=None):
+    return os.path.join(_dir_particao(ano, mes, dataset_dir), _ARQUIVO_BRUTOS)
+
+
+def _migrar_arvore_antiga(dataset_dir=None):
+    """Move os meses da antiga árvore paralela (canonico/ano=/mes=) para as partições."""
+    antiga = os.path.join(dir_canonico(dataset_dir), 'canonico')
+    if not os.path.isdir(antiga):
+        return
+    for ano, mes in _meses_em(antiga, _ARQUIVO_BRUTOS):
+        destino = _caminho_brutos(ano, mes, dataset_dir)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(os.path.join(_dir_particao(ano, mes, antiga), _ARQUIVO_BRUTOS), destino)
+    shutil.rmtree(antiga, ignore_errors=True)
+    print(f"[DATASET] Dataset canônico movido para as partições de {dir_canonico(dataset_dir)}")
+
+
+def _tipar(df):
+    """Tipos fixos das colunas conhecidas (as demais ficam com o tipo inferido)."""
+    df = df.copy()
+    for col in df.columns:
+        if col in COLUNAS_TEXTO:
+            # cod lido do Sheets vem como int: a chave é sempre texto
+            df[col] = df[col].astype('string')
+        elif col in COLUNAS_VALOR:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif col in ('ano', 'mes'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('int16')
+        elif col == 'FROM_CACHE':
+            df[col] = df[col].astype(str).str.upper().eq('TRUE')
+    return df
+
+
+def _manter_enriquecimento(df_mes, caminho):
+    """
+    Copia, por código, as colunas de CNS do arquivo atual que faltam em `df_mes`
+    (ex.: o cloud_main regravando um mês já enriquecido pelo popula_cns.py).
+    """
+    if not os.path.exists(caminho):
+        return df_mes
+    try:
+        existentes = pq.read_schema(caminho).names
+    except Exception:
+        return df_mes
+    faltantes = [c for c in COLUNAS_CNS if c in existentes and c not in df_mes.columns]
+    if not faltantes or 'cod' not in existentes:
+        return df_mes
+    anterior = _tipar(pq.read_table(caminho, columns=['cod'] + faltantes).to_pandas(ignore_metadata=True))
+    anterior = anterior.dropna(subset=['cod']).drop_duplicates('cod', keep='last')
+    mesclado = df_mes.merge(anterior, on='cod', how='left')
+    if 'FROM_CACHE' in faltantes:
+        mesclado['FROM_CACHE'] = mesclado['FROM_CACHE'].fillna(False).astype(bool)
+    return mesclado
+
+
+def meses_canonicos(dataset_dir=None):
+    """{(ano, mes)} presentes no dataset canônico."""
+    if pa is None:
+        return set()
+    _migrar_arvore_antiga(dataset_dir)
+    return _meses_em(dir_canonico(dataset_dir), _ARQUIVO_BRUTOS)
+
+
+def ultimos_meses(n=12, dataset_dir=None):
+    """Os `n` meses mais recentes do dataset canônico, em ordem cronológica."""
+    return sorted(meses_canonicos(dataset_dir))[-n:]
+
+
+def gravar_brutos(df_brutos, dataset_dir=None):
+    """
+    Grava a aba 'Dados Brutos' no dataset canônico, substituindo cada mês presente
+    em `df_brutos` (os demais meses do dataset são mantidos). As colunas de CNS
+    ausentes em `df_brutos` são mantidas do arquivo anterior do mês, por código.
+
+    Args:
+        df_brutos: DataFrame com ao menos 'ano' e 'mes' (linhas sem ano/mês são ignoradas)
+
+    Returns:
+        list: [(ano, mes)] gravados
+    """
+    if pa is None or df_brutos is None or df_brutos.empty:
+        return []
+    _migrar_arvore_antiga(dataset_dir)
+    df = df_brutos.copy()
+    for col in ('ano', 'mes'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = _tipar(df.dropna(subset=['ano', 'mes']))
+    gravados = []
+    for (ano, mes), df_mes in df.groupby(['ano', 'mes'], sort=True):
+        caminho = _caminho_brutos(ano, mes, dataset_dir)
+        df_mes = _manter_enriquecimento(df_mes, caminho)
+        tabela = pa.Table.from_pandas(df_mes, preserve_index=False)
+        if _gravar_atomico(tabela, caminho):
+            gravados.append((int(ano), int(mes)))
+    return gravados
+
+
+def carregar_brutos(meses=None, colunas=None, dataset_dir=None):
+    """
+    Lê o dataset canônico.
+
+    Args:
+        meses: [(ano, mes)] a carregar (padrão: todos)
+        colunas: Subconjunto de colunas (padrão: todas)
+
+    Returns:
+        pandas.DataFrame (vazio se não houver dados)
+    """
+    if pa is None:
+        return pd.DataFrame()
+    disponiveis = meses_canonicos(dataset_dir)
+    selecionados = sorted(disponiveis if meses is None else disponiveis & {(int(a), int(m)) for a, m in meses})
+    tabelas = []
+    for ano, mes in selecionados:
+        caminho = _caminho_brutos(ano, mes, dataset_dir)
+        try:
+            tabela = pq.read_table(caminho)
+        except Exception as e:
+            print(f"[DATASET] Arquivo inválido {caminho}: {e}")
+            continue
+        if colunas is not None:
+            tabela = tabela.select([c for c in colunas if c in tabela.column_names])
+        tabelas.append(tabela)
+    if not tabelas:
+        return pd.DataFrame()
+    # Sem os metadados do pandas: textos voltam com o dtype de texto padrão
+    return pa.concat_tables(tabelas, promote_options='default').to_pandas(ignore_metadata=True)
@@ -0,0 +1,107 @@
+"""
+Tipos compactos para os DataFrames do TJRJ e do CNJ.
+
+Textos repetidos (cidade, designação, gestor, Estado, Município, Semestre...) viram
+categóricas, inteiros vão para o menor tipo que os comporta e floats passam a
+float32 só quando a conversão não altera nenhum valor. Valores nunca são
+reinterpretados: colunas de texto com números continuam como estão.
+
+Aplicado na entrada do cloud_main, do extrair_cnj_analytics.upload_to_gsheets e dos
+loaders dos painéis (a memória do Streamlit Cloud é o teto de escala e cada sessão
+guarda sua cópia dos quadros).
+"""
+import numpy as np
+import pandas as pd
+
+VALORES_TJRJ = ['RCPJ', 'RCPN', 'IT', 'RI', 'RTD', 'Notas', 'Protesto',
+                'Emolumentos', 'Funarpem', 'Gratuitos', 'Total',
+                'Media Mensal Total (R$)']
+
+# Coluna -> 'categoria' | 'inteiro' | 'decimal'
+ESQUEMA_TJRJ = {
+    'cod': 'categoria', 'cidade': 'categoria', 'designacao': 'categoria',
+    'arquivo_origem': 'categoria', 'gestor': 'categoria', 'cargo': 'categoria',
+    'mes': 'inteiro', 'ano': 'inteiro',
+    **{col: 'decimal' for col in VALORES_TJRJ},
+}
+
+ESQUEMA_CNJ = {
+    'CNS': 'categoria', 'Estado': 'categoria', 'UF': 'categoria', 'Município': 'categoria',
+    'Atribuição': 'categoria', 'Semestre': 'categoria',
+    'Ano': 'inteiro', 'Semestre_Num': 'inteiro', 'Quantidade de atos praticados': 'inteiro',
+    'Valor arrecadação': 'decimal', 'Valor custeio': 'decimal', 'Valor repasse': 'decimal',
+    'Delegatário': 'decimal', 'Líquido': 'decimal', 'Indice_Eficiencia': 'decimal',
+    'Indice_Repasses': 'decimal',
+}
+
+# Acima desta fração de valores distintos a categórica gasta mais do que economiza
+LIMITE_DISTINTOS = 0.5
+
+
+def memoria_mb(df):
+    """Memória do DataFrame em MB (memory_usage deep=True)."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _float32_sem_perda(serie):
+    valores = serie.to_numpy(dtype='float64')
+    convertidos = valores.astype('float32')
+    return np.array_equal(convertidos.astype('float64'), valores, equal_nan=True)
+
+
+def _compactar_numero(serie, tipo):
+    if not pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype):
+        return serie
+    if tipo == 'inteiro' and serie.notna().all():
+        valores = serie.to_numpy()
+        if pd.api.types.is_integer_dtype(serie.dtype) or (np.isfinite(valores).all() and (valores == np.round(valores)).all()):
+            return pd.to_numeric(serie.astype('int64'), downcast='integer')
+    if pd.api.types.is_float_dtype(serie.dtype) and serie.dtype != 'float32' and _float32_sem_perda(serie):
+        return serie.astype('float32')
+    return serie
+
+
+def _compactar_texto(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(serie.dtype):
+        return serie
+    if serie.nunique(dropna=True) > LIMITE_DISTINTOS * max(len(serie), 1):
+        return serie
+    return serie.astype('category')
+
+
+def compactar(df, esquema, rotulo=None):
+    """
+    Aplica o esquema às colunas presentes em `df` (as demais ficam como estão).
+
+    Args:
+        df: DataFrame de entrada (não é alterado)
+        esquema: dict coluna -> 'categoria' | 'inteiro' | 'decimal'
+                 (ESQUEMA_TJRJ, ESQUEMA_CNJ)
+        rotulo: Se informado, imprime a memória antes/depois com esse nome
+
+    Returns:
+        pandas.DataFrame com os tipos compactos
+    """
+    antes = memoria_mb(df) if rotulo else 0.0
+    convertidas = {}
+    for col, tipo in esquema.items():
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        nova = _compactar_texto(serie) if tipo == 'categoria' else _compactar_numero(serie, tipo)
+        if nova is not serie:
+            convertidas[col] = nova
+    saida = df.assign(**convertidas) if convertidas else df.copy()
+    if rotulo:
+        depois = memoria_mb(saida)
+        economia = (1 - depois / antes) * 100 if antes else 0.0
+        print(f"[MEMORIA] {rotulo}: {antes:.1f} MB -> {depois:.1f} MB (-{economia:.0f}%, {len(convertidas)} colunas)")
+    return saida
+
+
+def descompactar_categorias(df):
+    """Categóricas de volta para texto (ex.: antes de fillna com um valor fora das categorias)."""
+    categoricas = df.select_dtypes('category').columns
+    if not len(categoricas):
+        return df
+    return df.astype({col: object for col in categoricas})
@@ -0,0 +1,190 @@
+"""
+Checkpoints das execuções do cloud_main (TJRJ), para retomar uma execução interrompida.
+
+Cada execução tem um id (data/hora de início) e uma pasta em execucoes_tjrj/<id>/ com
+estado.json (etapas concluídas e status) e o resultado de cada etapa:
+
+- links.json: links dos PDFs descobertos
+- mes_AAAA_MM.json: linhas extraídas de cada mês (gravadas assim que o PDF termina)
+- analises.pkl: 'Dados Brutos' montada e as abas derivadas
+- exportacao.json: abas já enviadas ao Google Sheets
+
+Com --resume, o cloud_main reabre a última execução não concluída e pula as etapas já
+feitas. Só o status 'SUCESSO' encerra uma execução; as mais antigas que
+EXECUCOES_MANTER são apagadas ao abrir uma nova.
+"""
+import os
+import json
+import time
+import shutil
+import datetime
+
+import pandas as pd
+
+EXECUCOES_DIR = os.environ.get('TJRJ_EXECUCOES_DIR', os.path.join(os.getcwd(), 'execucoes_tjrj'))
+EXECUCOES_MANTER = int(os.environ.get('TJRJ_EXECUCOES_MANTER', '5'))
+# Execuções mais antigas que isto não são retomadas (links e meses já desatualizados)
+RETOMAR_MAX_HORAS = float(os.environ.get('TJRJ_RETOMAR_MAX_HORAS', '48'))
+
+STATUS_ANDAMENTO = 'EM ANDAMENTO'
+STATUS_SUCESSO = 'SUCESSO'
+
+
+def etapa_mes(ano, mes):
+    """Nome da etapa com as linhas extraídas de um mês."""
+    return f"mes_{int(ano):04d}_{int(mes):02d}"
+
+
+def _gravar_atomico(caminho, gravar):
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        gravar(tmp)
+        os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _gravar_json(caminho, dados):
+    def gravar(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+    _gravar_atomico(caminho, gravar)
+
+
+class Execucao:
+    """
+    Pasta de checkpoints de uma execução.
+
+    Dados simples (listas/dicts) são gravados em JSON; o resto (DataFrames, tuplas de
+    DataFrames) em pickle, que preserva os tipos (categóricas etc.) — a pasta é local
+    e só é lida pelo próprio pipeline.
+    """
+
+    def __init__(self, run_id, base_dir=None):
+        self.run_id = run_id
+        self.diretorio = os.path.join(base_dir or EXECUCOES_DIR, run_id)
+        self.estado = self._ler_estado() or {
+            'run_id': run_id,
+            'iniciada_em': datetime.datetime.now().isoformat(timespec='seconds'),
+            'status': STATUS_ANDAMENTO,
+            'etapas': {},
+        }
+
+    def _ler_estado(self):
+        caminho = os.path.join(self.diretorio, 'estado.json')
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[CHECKPOINT] estado.json inválido em {self.diretorio}: {e}")
+            return None
+
+    def _gravar_estado(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        _gravar_json(os.path.join(self.diretorio, 'estado.json'), self.estado)
+
+    def _caminho(self, etapa, extensao):
+        return os.path.join(self.diretorio, f"{etapa}.{extensao}")
+
+    def concluida(self, etapa):
+        """True se a etapa já foi concluída nesta execução."""
+        return etapa in self.estado['etapas']
+
+    def salvar(self, etapa, dados, concluida=True):
+        """
+        Grava o resultado de uma etapa (gravação atômica).
+
+        Args:
+            etapa: Nome da etapa ('links', etapa_mes(ano, mes), 'analises', 'exportacao')
+            dados: Resultado da etapa
+            concluida: False para registrar um progresso parcial (ex.: abas já exportadas)
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        if isinstance(dados, (list, dict)):
+            _gravar_json(self._caminho(etapa, 'json'), dados)
+        else:
+            _gravar_atomico(self._caminho(etapa, 'pkl'), lambda tmp: pd.to_pickle(dados, tmp))
+        if concluida:
+            self.estado['etapas'][etapa] = datetime.datetime.now().isoformat(timespec='seconds')
+            self._gravar_estado()
+
+    def carregar(self, etapa):
+        """Resultado gravado da etapa (concluída ou parcial) ou None."""
+        caminho = self._caminho(etapa, 'json')
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as f:
+                return json.load(f)
+        caminho = self._caminho(etapa, 'pkl')
+        if os.path.exists(caminho):
+            return pd.read_pickle(caminho)
+        return None
+
+    def finalizar(self, status):
+        """Registra o status final; só STATUS_SUCESSO impede a execução de ser retomada."""
+        self.estado['status'] = status
+        self.estado['finalizada_em'] = datetime.datetime.now().isoformat(timespec='seconds')
+        self._gravar_estado()
+
+
+def listar_execucoes(base_dir=None):
+    """
+    Execuções gravadas, da mais recente para a mais antiga.
+
+    Returns:
+        list[Execucao]
+    """
+    base = base_dir or EXECUCOES_DIR
+    if not os.path.isdir(base):
+        return []
+    nomes = [n for n in os.listdir(base) if os.path.exists(os.path.join(base, n, 'estado.json'))]
+    nomes.sort(key=lambda n: os.path.getmtime(os.path.join(base, n, 'estado.json')), reverse=True)
+    return [Execucao(n, base) for n in nomes]
+
+
+def _remover_antigas(base_dir=None):
+    for execucao in listar_execucoes(base_dir)[EXECUCOES_MANTER:]:
+        shutil.rmtree(execucao.diretorio, ignore_errors=True)
+
+
+def abrir_execucao(retomar=False, base_dir=None):
+    """
+    Abre a execução do cloud_main.
+
+    Args:
+        retomar: False = nova execução; True = última execução não concluída (se houver,
+                 com até RETOMAR_MAX_HORAS); str = id de uma execução específica
+
+    Returns:
+        Execucao
+    """
+    if retomar:
+        if isinstance(retomar, str):
+            candidatas = [e for e in listar_execucoes(base_dir) if e.run_id == retomar]
+            if not candidatas:
+                print(f"[CHECKPOINT] Execução {retomar} não encontrada: iniciando uma nova.")
+        else:
+            limite = time.time() - RETOMAR_MAX_HORAS * 3600
+            candidatas = [e for e in listar_execucoes(base_dir)
+                          if e.estado['status'] != STATUS_SUCESSO
+                          and os.path.getmtime(os.path.join(e.diretorio, 'estado.json')) >= limite]
+            if not candidatas:
+                print("[CHECKPOINT] Nenhuma execução interrompida para retomar: iniciando uma nova.")
+        if candidatas:
+            execucao = candidatas[0]
+            print(f"[CHECKPOINT] Retomando a execução {execucao.run_id} "
+                  f"({len(execucao.estado['etapas'])} etapa(s) concluída(s)).")
+            return execucao
+
+    run_id = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    base = base_dir or EXECUCOES_DIR
+    sufixo = 1
+    while os.path.exists(os.path.join(base, run_id)):
+        sufixo += 1
+        run_id = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{sufixo}"
+    execucao = Execucao(run_id, base)
+    execucao._gravar_estado()
+    _remover_antigas(base_dir)
+    return execucao
@@ -1,5 +1,6 @@
 import os
 import time
+import contextlib
 import datetime
 import re
 from urllib.parse import urljoin, urlparse
@@ -9,18 +10,33 @@ from unicodedata import normalize
 # --- NOVAS DEPENDÊNCIAS DE REDE (Recomendadas para Google Cloud Functions) ---
 import urllib.request
 import urllib.error
-import requests # O requests é estável no GCF, mas vamos manter o urllib para o core
-import json
+import http_utils # Sessões requests com pool de conexões por host
 import io
+import hashlib
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # --- BIBLIOTECAS DE ANALISE E GOOGLE SHEETS ---
 import pdfplumber
+import numpy as np
 import pandas as pd
-# Biblioteca para Google Sheets: requer 'pip install gspread'
-import gspread 
+
+from municipios_utils import normalizar_para_match, separar_cidade_designacao
+from moeda_utils import extrair_valores_brl
+import pdf_stream_utils
+import pdf_texto_utils
+import dataset_tjrj_utils
+import execucao_tjrj_utils
+import instrumentacao_utils
+import agregacao_tjrj_utils
+import esquema_utils
+import cns_match_utils
+import cns_cache_utils
+import gsheets_client_utils
+import gsheets_escrita_utils
 try:
     import streamlit as st
 except ImportError:
@@ -38,6 +54,18 @@ except ImportError:
         cns_clean = ''.join(filter(str.isdigit, cns_str))
         return cns_clean.zfill(6)
 
+# Cache local de PDFs (opcional: sem ele os PDFs são sempre baixados novamente)
+try:
+    import pdf_cache_utils
+except ImportError:
+    pdf_cache_utils = None
+
+# Cache dos resultados da extração por PDF (opcional: requer pyarrow)
+try:
+    import parse_cache_utils
+except ImportError:
+    parse_cache_utils = None
+
 # ####################################################################
 # CONFIGURAÇÕES GERAIS (Cloud)
 # ####################################################################
@@ -65,6 +93,19 @@ TIMEOUT_CONNECT = 20
 TIMEOUT_READ = 120
 MIN_PDF_BYTES = 1500
 
+# --- CONFIGURAÇÕES DE PARALELISMO ---
+# Downloads são limitados pela rede (threads); a extração com pdfplumber é
+# limitada por CPU (processos). TJRJ_PARSE_WORKERS=1 desliga o pool de processos.
+DOWNLOAD_WORKERS = int(os.environ.get('TJRJ_DOWNLOAD_WORKERS', '4'))
+PARSE_WORKERS = int(os.environ.get('TJRJ_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Extração das páginas de UM mesmo PDF em paralelo (1 = desligado). Vale para PDFs
+# grandes processados isoladamente; no pipeline de vários meses o paralelismo é por arquivo.
+PAGE_WORKERS = int(os.environ.get('TJRJ_PAGE_WORKERS', '1'))
+MIN_PAGINAS_PARALELO = 8
+
+# Modo incremental: só os meses ausentes do dataset local (dataset_tjrj_utils) são processados
+INCREMENTAL_PADRAO = os.environ.get('TJRJ_INCREMENTAL', 'false').lower() in ('1', 'true', 'sim')
+
 MESES = {
     "janeiro": 1, "fevereiro": 2, "marco": 3, "março": 3,
     "abril": 4, "maio": 5, "junho": 6, "julho": 7,
@@ -73,6 +114,10 @@ MESES = {
 }
 
 # --- CONFIGURAÇÕES DO EXTRATOR ---
+# Versão da lógica de extração: INCREMENTE ao alterar processar_pdf_content,
+# para invalidar os resultados guardados em cache (parse_cache_utils).
+PARSER_VERSION = 2
+
 # Colunas que serão exportadas para o Google Sheets
 COLUNAS_BRUTAS = [
     'cod', 'cidade', 'designacao', 'arquivo_origem', 'mes', 'ano',
@@ -80,6 +125,8 @@ COLUNAS_BRUTAS = [
     'Emolumentos', 'Funarpem', 'Gratuitos', 'Total',
     'gestor', 'cargo'
 ]
+# Chave primária de uma linha de 'Dados Brutos' (sincronização por linha da aba)
+CHAVE_DADOS_BRUTOS = ['cod', 'ano', 'mes']
 
 # ####################################################################
 # FUNÇÕES DE UTILIDADE E REDE (Adaptadas para Cloud)
@@ -87,35 +134,78 @@ COLUNAS_BRUTAS = [
 
 # Funções otimizadas com requests
 def safe_get(url):
-    """Baixa HTML usando requests (mais robusto)."""
+    """Baixa HTML usando requests (pool de conexões compartilhado, ver http_utils)."""
     headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(url, headers=headers, timeout=TIMEOUT_CONNECT, verify=False)
+        response = http_utils.get(url, headers=headers, timeout=TIMEOUT_CONNECT, verify=False)
         response.encoding = 'utf-8' # Força UTF-8
         return response.text
     except Exception as e:
         print(f"[ERRO REDE] Falha ao carregar {url}: {e}")
         return ""
 
-def download_file(url: str):
-    """Baixa arquivo usando requests."""
-    headers = {"User-Agent": "Mozilla/5.0"}
+def baixar_pdf_arquivo(url: str):
+    """
+    Baixa o PDF em stream direto para o disco, revalidando a cópia do cache local (ETag/Last-Modified).
+
+    A assinatura %PDF é conferida no primeiro bloco: páginas HTML de erro são abortadas
+    sem baixar o restante, e o arquivo nunca fica inteiro na memória.
+
+    Returns:
+        tuple: (caminho, temporario) — temporario=True quando o arquivo está fora do cache
+               local e deve ser apagado pelo chamador; (None, False) em caso de falha.
+    """
+    dir_temp = pdf_cache_utils.PDF_CACHE_DIR if pdf_cache_utils else None
     for attempt in range(1, RETRIES + 1):
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if pdf_cache_utils:
+            headers.update(pdf_cache_utils.cabecalhos_condicionais(url))
         try:
-            r = requests.get(url, headers=headers, timeout=TIMEOUT_READ, verify=False)
-            if r.status_code == 200:
-                content = r.content
-                if len(content) < MIN_PDF_BYTES:
-                     print(f"[AVISO] Arquivo pequeno em {url}.")
-                     return None
-                return content
-            else:
-                 print(f"[ERRO HTTP] {r.status_code} em {url}")
+            with http_utils.get(url, headers=headers, timeout=(TIMEOUT_CONNECT, TIMEOUT_READ), verify=False, stream=True) as r:
+                if r.status_code == 304 and pdf_cache_utils:
+                    caminho = pdf_cache_utils.caminho_pdf(url)
+                    if caminho:
+                        return caminho, False
+                    # Cópia local sumiu entre a revalidação e a leitura: próxima tentativa sem condicional
+                    pdf_cache_utils.remover(url)
+                    continue
+                if r.status_code != 200:
+                    print(f"[ERRO HTTP] {r.status_code} em {url}")
+                    continue
+                tmp = pdf_stream_utils.criar_temporario(dir_temp)
+                pdf_stream_utils.gravar_resposta_pdf(r, tmp, MIN_PDF_BYTES)
+                etag, last_modified = r.headers.get('ETag'), r.headers.get('Last-Modified')
+        except pdf_stream_utils.PDFInvalidoError as e:
+            print(f"[AVISO] {e} em {url}.")
+            return None, False
         except Exception as e:
             print(f"[DOWNLOAD ERRO {attempt}/{RETRIES}] {url} - {e}")
             time.sleep(1 + attempt * 2)
+            continue
+
+        if pdf_cache_utils:
+            try:
+                sha256 = pdf_cache_utils.guardar_pdf_arquivo(url, tmp, etag, last_modified)
+                return pdf_cache_utils.caminho_blob(sha256), False
+            except OSError as e:
+                print(f"[AVISO] Falha ao gravar {url} no cache local: {e}")
+        if os.path.exists(tmp):
+            return tmp, True
+        return None, False
 
-    return None
+    return None, False
+
+def download_file(url: str):
+    """Baixa o PDF e retorna os bytes (o pipeline usa baixar_pdf_arquivo, sem carregar na memória)."""
+    caminho, temporario = baixar_pdf_arquivo(url)
+    if not caminho:
+        return None
+    try:
+        with open(caminho, 'rb') as f:
+            return f.read()
+    finally:
+        if temporario:
+            os.remove(caminho)
 
 def extrair_mes_ano(url: str):
     """Tenta extrair o mês e ano do nome do arquivo na URL."""
@@ -169,292 +259,494 @@ def extract_pdf_links(html, base=ROOT):
     print(f"[DEBUG] extrair_pdf_links encontrou {len(found)} links.")
     return found
 
-# Lista de Municipios (100% ASCII - SEM ACENTOS) - Mantida do extrator.py
-MUNICIPIOS_RJ = [
-    "ANGRA DOS REIS", "APERIBE", "ARARUAMA", "AREAL", "ARMACAO DOS BUZIOS",
-    "ARRAIAL DO CABO", "BARRA DO PIRAI", "BARRA MANSA", "BELFORD ROXO", "BOM JARDIM",
-    "BOM JESUS DO ITABAPOANA", "CABO FRIO", "CACHOEIRAS DE MACACU", "CAMBUCI", "CAMPOS DOS GOYTACAZES",
-    "CANTAGALO", "CARAPEBUS", "CARDOSO MOREIRA", "CARMO", "CASIMIRO DE ABREU", "COMENDADOR LEVY GASPARIAN",
-    "CONCEICAO DE MACABU", "CORDEIRO", "DUAS BARRAS", "DUQUE DE CAXIAS",
-    "ENGENHEIRO PAULO DE FRONTIN", "GUAPIMIRIM", "IGUABA GRANDE", "ITABORAI", "ITAGUAI",
-    "ITALVA", "ITAOCARA", "ITAPERUNA", "ITATIAIA", "JAPERI", "LAJE DO MURIAE", "MACAE",
-    "MACUCO", "MAGE", "MANGARATIBA", "MARICA", "MENDES", "MESQUITA", "MIGUEL PEREIRA",
-    "MIRACEMA", "NATIVIDADE", "NILOPOLIS", "NITEROI", "NOVA FRIBURGO", "NOVA IGUACU",
-    "PARACAMBI", "PARAIBA DO SUL", "PARATY", "PATY DO ALFERES", "PETROPOLIS",
-    "PINHEIRAL", "PIRAI", "PORCIUNCULA", "PORTO REAL", "QUATIS", "QUEIMADOS", "QUISSAMA",
-    "RESENDE", "RIO BONITO", "RIO CLARO", "RIO DAS FLORES", "RIO DAS OSTRAS", "RIO DE JANEIRO",
-    "SANTA MARIA MADALENA", "SANTO ANTONIO DE PADUA", "SAO FIDELIS",
-    "SAO FRANCISCO DE ITABAPOANA", "SAO GONCALO",
-    "SAO JOAO DA BARRA", "SAO JOAO DE MERITI",
-    "SAO JOSE DE UBA", "SAO JOSE DO VALE DO RIO PRETO",
-    "SAO PEDRO DA ALDEIA", "SAO SEBASTIAO DO ALTO",
-    "SAPUCAIA", "SAQUAREMA", "SEROPEDICA", "SILVA JARDIM", "SUMIDOURO", "TANGUA",
-    "TERESOPOLIS", "TRAJANO DE MORAES", "TRES RIOS", "VALENCA",
-    "VARRE-SAI", "VASSOURAS", "VOLTA REDONDA", "CAPITAL"
-]
+# Municípios e separação cidade/designação: municipios_utils (compartilhado com extrator.py e master_processo.py)
+extrator_normalizar_para_match = normalizar_para_match
+extrator_separar_cidade_designacao = separar_cidade_designacao
 
-def extrator_normalizar_para_match(texto):
-    if not texto: return ""
-    return normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
+# Valores BRL das linhas do relatório: moeda_utils (compartilhado com extrator.py, master_processo.py e os dashboards)
+extrator_extrair_valores = extrair_valores_brl
+
+def processar_pdf_content(pdf, nome_arquivo: str, usar_cache=True, workers_paginas=None, backend=None):
+    """
+    Processa um PDF usando a lógica do extrator.py.
+
+    Se o mesmo PDF (mesmo SHA-256) já foi processado com a versão atual do parser,
+    as linhas são lidas do cache (parse_cache_utils) sem abrir o PDF.
+
+    Args:
+        pdf: Bytes do PDF ou caminho do arquivo (aberto via mmap, sem carregar na memória)
+        workers_paginas: Nº de processos extraindo faixas de páginas do PDF
+                         (padrão: PAGE_WORKERS; 1 = em série)
+        backend: Motor de extração de texto (pdf_texto_utils; padrão: TJRJ_PDF_BACKEND)
+    """
+    backend = pdf_texto_utils.resolver_backend(backend)
+    sha256 = None
+    if usar_cache and parse_cache_utils:
+        if isinstance(pdf, (bytes, bytearray)):
+            sha256 = hashlib.sha256(pdf).hexdigest()
+        else:
+            sha256 = pdf_stream_utils.sha256_arquivo(pdf)
+        dados_cache = parse_cache_utils.carregar_resultado(sha256, nome_arquivo, PARSER_VERSION, backend)
+        if dados_cache is not None:
+            return dados_cache
 
-def extrator_extrair_valores(linha):
-    """Extrai valores numéricos formatados em BRL (ponto como milhar, vírgula como decimal)."""
-    valores_str = re.findall(r'[\d\.]+\,\d{2}', linha)
-    valores_float = []
-    for v in valores_str:
-        v_limpo = v.replace('.', '').replace(',', '.')
-        try:
-            valores_float.append(float(v_limpo))
-        except ValueError:
-            pass
-    return valores_float
-
-def extrator_separar_cidade_designacao(texto_completo):
-    """Separa o nome do município da designação do cartório."""
-    if not texto_completo: return "", ""
-    texto_norm = extrator_normalizar_para_match(texto_completo)
-    municipios_ordenados = sorted(MUNICIPIOS_RJ, key=len, reverse=True)
-    
-    for municipio in municipios_ordenados:
-        if texto_norm.startswith(municipio):
-            designacao = texto_norm[len(municipio):].strip()
-            if designacao.startswith("-"): designacao = designacao[1:].strip()
-            return municipio, designacao
-    return "OUTRA/VERIFICAR", texto_completo
-
-def processar_pdf_content(pdf_bytes: bytes, nome_arquivo: str):
-    """Processa o conteúdo binário de um PDF usando a lógica do extrator.py."""
     dados_servicos = []
-    
+    try:
+        _extrair_servicos_pdf(pdf, nome_arquivo, dados_servicos, workers_paginas or PAGE_WORKERS, backend)
+    except Exception as e:
+        print(f"[ERRO PDF] Falha ao processar {nome_arquivo}: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return dados_servicos  # Resultado parcial não vai para o cache
+
+    if sha256:
+        parse_cache_utils.salvar_resultado(sha256, nome_arquivo, PARSER_VERSION, dados_servicos, backend)
+    return dados_servicos
+
+def _extrair_servicos_pdf(pdf, nome_arquivo, dados_servicos, workers_paginas=1, backend=None):
+    """Extrai as linhas de serviço do PDF, acrescentando-as em `dados_servicos`."""
+    with pdf_texto_utils.abrir_documento(pdf, backend) as documento:
+        n_paginas = len(documento)
+        if workers_paginas <= 1 or n_paginas < MIN_PAGINAS_PARALELO:
+            extrair_servicos_textos(documento.textos(), nome_arquivo, dados_servicos)
+            return
+
+    # A extração do texto (parte cara) roda em faixas de páginas; a máquina de estados
+    # continua única e em ordem, então serviços que cruzam faixas são costurados nela.
+    textos = _extrair_textos_paralelo(pdf, n_paginas, workers_paginas, backend)
+    extrair_servicos_textos(textos, nome_arquivo, dados_servicos)
+
+def dividir_paginas(n_paginas, partes):
+    """
+    Divide as páginas em faixas contíguas de tamanho equilibrado.
+
+    Returns:
+        list: [(inicio, fim)] com fim exclusivo, cobrindo 0..n_paginas em ordem
+    """
+    partes = max(1, min(partes, n_paginas))
+    base, resto = divmod(n_paginas, partes)
+    faixas, inicio = [], 0
+    for i in range(partes):
+        fim = inicio + base + (1 if i < resto else 0)
+        faixas.append((inicio, fim))
+        inicio = fim
+    return faixas
+
+def _extrair_textos_intervalo(pdf, inicio, fim, backend=None):
+    """Texto das páginas [inicio, fim) do PDF (executado nos processos do pool)."""
+    with pdf_texto_utils.abrir_documento(pdf, backend) as documento:
+        return list(documento.textos(inicio, fim))
+
+def _extrair_textos_paralelo(pdf, n_paginas, workers_paginas, backend=None):
+    """Gera o texto de cada página, em ordem, extraindo as faixas em processos separados."""
+    faixas = dividir_paginas(n_paginas, workers_paginas)
+    pool = _criar_pool_processos(len(faixas))
+    if pool is None:
+        yield from _extrair_textos_intervalo(pdf, 0, n_paginas, backend)
+        return
+
+    try:
+        # Com caminho, cada processo abre o próprio mmap (os bytes não são copiados para o worker)
+        futuros = [pool.submit(_extrair_textos_intervalo, pdf, inicio, fim, backend) for inicio, fim in faixas]
+        for futuro in futuros:
+            yield from futuro.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# --- Tokenizador de linhas (regex pré-compiladas) ---
+# Regex para mapear colunas (RCPJ, RCPN, etc.). A ordem define a prioridade
+# quando uma linha contém mais de uma atribuição.
+MAPA_ATRIBUICOES = {
+    r'Civil das Pessoas Jur.dicas': "RCPJ",
+    r'Civil das Pessoas Naturais': "RCPN",
+    r'Interdi..es e Tutelas': "IT",
+    r'Of.cios e Atos do Registro de Im.veis': "RI",
+    r'T.tulos e Documentos': "RTD",
+    r'Of.cios e Atos de Notas': "Notas",
+    r'Tabelionatos de Protesto de T.tulos': "Protesto"
+}
+
+RE_ESPACOS = re.compile(r'[^\S\n]+')
+# Mesmas chaves de MAPA_ATRIBUICOES, fatoradas como trie (prefixos comuns compartilhados):
+# a cada posição o motor de regex testa no máximo uma ramificação por letra inicial.
+_TRIE_ATRIBUICOES = (
+    r'c(?:ivil das pessoas (?:jur.dicas|naturais))'
+    r'|t(?:.tulos e documentos|abelionatos de protesto de t.tulos)'
+    r'|interdi..es e tutelas'
+    r'|of.cios e atos d(?:o registro de im.veis|e notas)'
+)
+# Quebra de linha antes de cada marcador "colado" ao texto anterior (numa única passada)
+RE_QUEBRA_MARCADORES = re.compile(
+    r'(?<=\S)(?=Servi.o:|Total Geral|Gestor do Servi.o:|(?i:' + _TRIE_ATRIBUICOES + r'))'
+)
+# Classificador de linhas: uma única alternação (trie) aplicada à linha em minúsculas.
+# Os grupos nomeados identificam o marcador; os de atribuição têm o nome da coluna.
+_PADRAO_CLASSIFICADOR = (
+    r's(?P<servico>ervi.o:)'
+    r'|g(?P<gestor>estor do servi.o:)'
+    r'|c(?:ivil das pessoas (?:(?P<RCPJ>jur.dicas)|(?P<RCPN>naturais))|(?P<condicao>ondi..o do gestor:))'
+    r'|t(?:(?P<total>otal geral)|(?P<RTD>.tulos e documentos)|(?P<Protesto>abelionatos de protesto de t.tulos))'
+    r'|i(?P<IT>nterdi..es e tutelas)'
+    r'|o(?:f.cios e atos d(?:(?P<RI>o registro de im.veis)|(?P<Notas>e notas)))'
+)
+RE_CLASSIFICADOR = re.compile(_PADRAO_CLASSIFICADOR)
+# Fallback para linhas cujo lower() altera o comprimento (caracteres Unicode especiais)
+RE_CLASSIFICADOR_I = re.compile(_PADRAO_CLASSIFICADOR, re.IGNORECASE)
+# Marcadores que diferenciam maiúsculas: conferidos na linha original após o casamento
+_MARCADORES_CASE = {
+    'servico': re.compile(r'Servi.o:'),
+    'gestor': re.compile(r'Gestor do Servi.o:'),
+    'condicao': re.compile(r'Condi..o do Gestor:'),
+    'total': re.compile(r'Total Geral'),
+}
+_PRIORIDADE_ATRIBUICAO = {coluna: i for i, coluna in enumerate(MAPA_ATRIBUICOES.values())}
+
+RE_DATA_CABECALHO = re.compile(r'(\d{1,2})\s*/\s*(\d{4})')
+RE_COD_SERVICO = re.compile(r'^(\d+)\s*-\s*(.*)')
+RE_CONDICAO_GESTOR = re.compile(r'Condi..o do Gestor:?')
+
+def reparar_texto_pagina(texto):
+    """Normaliza espaços e separa em linhas os marcadores colados pelo pdfplumber."""
+    return RE_QUEBRA_MARCADORES.sub('\n', RE_ESPACOS.sub(' ', texto))
+
+def classificar_linha(linha_limpa):
+    """
+    Classifica uma linha do relatório numa única varredura.
+
+    Returns:
+        tuple: (servico, gestor, condicao, coluna_atribuicao, total) — os flags indicam
+        cabeçalho de serviço, gestor, condição do gestor e "Total Geral"; coluna_atribuicao
+        é a coluna (RCPJ, RCPN...) da atribuição encontrada ou None.
+    """
+    alvo = linha_limpa.lower()
+    regex = RE_CLASSIFICADOR
+    if len(alvo) != len(linha_limpa):
+        alvo, regex = linha_limpa, RE_CLASSIFICADOR_I
+
+    servico = gestor = condicao = total = False
+    coluna = None
+    pos = 0
+    while True:
+        m = regex.search(alvo, pos)
+        if m is None:
+            break
+        inicio = m.start()
+        tipo = m.lastgroup
+        pos = inicio + 1  # Continua do caractere seguinte: ocorrências sobrepostas também contam
+
+        if tipo in _MARCADORES_CASE:
+            if not _MARCADORES_CASE[tipo].match(linha_limpa, inicio):
+                continue
+            if tipo == 'servico':
+                servico = servico or inicio == 0
+            elif tipo == 'gestor':
+                gestor = True
+            elif tipo == 'condicao':
+                condicao = condicao or inicio == 0
+            else:
+                total = True
+        elif coluna is None or _PRIORIDADE_ATRIBUICAO[tipo] < _PRIORIDADE_ATRIBUICAO[coluna]:
+            coluna = tipo
+    return servico, gestor, condicao, coluna, total
+
+def extrair_servicos_textos(textos_paginas, nome_arquivo, dados_servicos):
+    """
+    Máquina de estados do extrator aplicada ao texto de cada página.
+
+    Args:
+        textos_paginas: Iterável com o texto de cada página (None/'' são ignorados)
+        nome_arquivo: Nome no formato 'YYYY_MM.pdf' (mês/ano de fallback)
+        dados_servicos: Lista onde as linhas extraídas são acrescentadas
+    """
     # Tenta extrair mês/ano do nome do arquivo fornecido
     match_data_arquivo = re.search(r'(\d{4})_(\d{2})', nome_arquivo)
     if match_data_arquivo:
         ano_arquivo = int(match_data_arquivo.group(1))
         mes_arquivo = int(match_data_arquivo.group(2))
     else:
-        ano_final, mes_final = 0, 0
-    
-    try:
-        # Usa pdfplumber para abrir o arquivo a partir dos bytes (encapsulados em BytesIO)
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            mes_atual = mes_arquivo
-            ano_atual = ano_arquivo
-            
-            # Regex para mapear colunas (RCPJ, RCPN, etc.)
-            mapa_regex = {
-                r'Civil das Pessoas Jur.dicas': "RCPJ",
-                r'Civil das Pessoas Naturais': "RCPN",
-                r'Interdi..es e Tutelas': "IT",
-                r'Of.cios e Atos do Registro de Im.veis': "RI",
-                r'T.tulos e Documentos': "RTD",
-                r'Of.cios e Atos de Notas': "Notas",
-                r'Tabelionatos de Protesto de T.tulos': "Protesto"
-            }
-
-            for pagina in pdf.pages:
-                texto = pagina.extract_text()
-                if not texto: continue
-                
-                # Limpeza de texto para facilitar a extração (Lógica do extrator.py)
-                texto_reparado = re.sub(r'[^\S\n]+', ' ', texto) 
-                texto_reparado = re.sub(r'(\S)(Servi.o:)', r'\1\n\2', texto_reparado)
-                texto_reparado = re.sub(r'(\S)(Total Geral)', r'\1\n\2', texto_reparado)
-                texto_reparado = re.sub(r'(\S)(Gestor do Servi.o:)', r'\1\n\2', texto_reparado)
-                
-                for key_regex in mapa_regex.keys():
-                    texto_reparado = re.sub(rf'(\S)({key_regex})', r'\1\n\2', texto_reparado, flags=re.IGNORECASE)
-
-                linhas = texto_reparado.split('\n')
-                dados_servico_atual = {}
-                lendo_servico = False
-                
-                for linha in linhas:
-                    linha_limpa = linha.strip()
-
-                    # Tentativa de extrair data do cabeçalho da página
-                    if "Per" in linha and "/" in linha and len(linha) < 50:
-                        match_data = re.search(r'(\d{1,2})\s*/\s*(\d{4})', linha)
-                        if match_data:
-                            mes_atual = int(match_data.group(1))
-                            ano_atual = int(match_data.group(2))
-
-                    # Início de um novo serviço
-                    if re.match(r'^Servi.o:', linha_limpa):
-                        if lendo_servico: pass 
-                        partes = linha_limpa.split(":", 1)
-                        texto_completo = partes[1].strip() if len(partes) > 1 else ""
-                        match_cod = re.search(r'^(\d+)\s*-\s*(.*)', texto_completo)
-                        
-                        if match_cod:
-                            cod_servico = match_cod.group(1).strip()
-                            nome_full = match_cod.group(2).strip()
-                        else:
-                            cod_servico = texto_completo.split(' ')[0] if texto_completo else "N/A"
-                            nome_full = texto_completo
-                            
-                        cidade, designacao = extrator_separar_cidade_designacao(nome_full)
-
-                        # Inicializa os dados do serviço
-                        dados_servico_atual = {col: None for col in COLUNAS_BRUTAS}
-                        dados_servico_atual['cod'] = cod_servico 
-                        dados_servico_atual['cidade'] = cidade
-                        dados_servico_atual['designacao'] = designacao
-                        dados_servico_atual['mes'] = mes_atual
-                        dados_servico_atual['ano'] = ano_atual
-                        dados_servico_atual['arquivo_origem'] = nome_arquivo
-                        dados_servico_atual['gestor'] = "NAO IDENTIFICADO"
-                        dados_servico_atual['cargo'] = "NAO IDENTIFICADO"
-                        lendo_servico = True
-                    
-                    # Extração do Gestor
-                    if lendo_servico and re.search(r'Gestor do Servi.o:', linha_limpa):
-                        try:
-                            partes = linha_limpa.split(":", 1)
-                            conteudo = partes[1].strip() if len(partes) > 1 else ""
-                            if re.search(r'Condi..o do Gestor', conteudo):
-                                split_cond = re.split(r'Condi..o do Gestor:?', conteudo)
-                                dados_servico_atual['gestor'] = split_cond[0].strip()
-                                if len(split_cond) > 1:
-                                    cargo_temp = split_cond[1].strip()
-                                    if "Delegat" in cargo_temp: cargo_temp = "Titular"
-                                    dados_servico_atual['cargo'] = cargo_temp
-                            else:
-                                dados_servico_atual['gestor'] = conteudo
-                        except: pass
-
-                    # Extração da Condição (Cargo)
-                    if lendo_servico and re.search(r'^Condi..o do Gestor:', linha_limpa):
-                        try:
-                            partes = linha_limpa.split(":", 1)
-                            cargo_temp = partes[1].strip()
-                            if "Delegat" in cargo_temp: cargo_temp = "Titular"
-                            dados_servico_atual['cargo'] = cargo_temp
-                        except: pass
-
-                    # Extração dos valores por atribuição
-                    if lendo_servico:
-                        for key_regex, nome_coluna in mapa_regex.items():
-                            if re.search(key_regex, linha_limpa, re.IGNORECASE):
-                                valores = extrator_extrair_valores(linha_limpa)
-                                if valores:
-                                    # O valor total do emolumento fica no final da linha
-                                    dados_servico_atual[nome_coluna] = valores[-1]
-                                break
-                    
-                    # Fim de um serviço (Total Geral)
-                    if lendo_servico and "Total Geral" in linha_limpa:
-                        valores = extrator_extrair_valores(linha_limpa)
-                        if len(valores) >= 1:
-                            # O último valor é o Total Final
-                            dados_servico_atual['Total'] = valores[-1]
-                            
-                            # Tentativa de capturar Emolumentos Totais, Funarpem e Gratuitos
-                            if len(valores) >= 4:
-                                dados_servico_atual['Emolumentos'] = valores[-4] # Emolumentos
-                                dados_servico_atual['Funarpem'] = valores[-3]
-                                dados_servico_atual['Gratuitos'] = valores[-2]
-                                
-                            dados_servicos.append(dados_servico_atual.copy())
-                            lendo_servico = False
-                            dados_servico_atual = {}
+        ano_arquivo, mes_arquivo = 0, 0
+
+    mes_atual = mes_arquivo
+    ano_atual = ano_arquivo
+
+    # O estado do serviço atravessa as páginas: um serviço pode começar numa página
+    # e ter as atribuições/"Total Geral" na seguinte.
+    dados_servico_atual = {}
+    lendo_servico = False
+
+    for texto in textos_paginas:
+        if not texto: continue
+
+        # Limpeza de texto para facilitar a extração (Lógica do extrator.py)
+        linhas = reparar_texto_pagina(texto).split('\n')
+
+        for linha in linhas:
+            linha_limpa = linha.strip()
+
+            # Tentativa de extrair data do cabeçalho da página
+            if "Per" in linha and "/" in linha and len(linha) < 50:
+                match_data = RE_DATA_CABECALHO.search(linha)
+                if match_data:
+                    mes_atual = int(match_data.group(1))
+                    ano_atual = int(match_data.group(2))
+
+            eh_servico, eh_gestor, eh_condicao, coluna, eh_total = classificar_linha(linha_limpa)
+
+            # Início de um novo serviço
+            if eh_servico:
+                partes = linha_limpa.split(":", 1)
+                texto_completo = partes[1].strip() if len(partes) > 1 else ""
+                match_cod = RE_COD_SERVICO.search(texto_completo)
+
+                if match_cod:
+                    cod_servico = match_cod.group(1).strip()
+                    nome_full = match_cod.group(2).strip()
+                else:
+                    cod_servico = texto_completo.split(' ')[0] if texto_completo else "N/A"
+                    nome_full = texto_completo
+
+                cidade, designacao = extrator_separar_cidade_designacao(nome_full)
+
+                # Inicializa os dados do serviço
+                dados_servico_atual = {col: None for col in COLUNAS_BRUTAS}
+                dados_servico_atual['cod'] = cod_servico
+                dados_servico_atual['cidade'] = cidade
+                dados_servico_atual['designacao'] = designacao
+                dados_servico_atual['mes'] = mes_atual
+                dados_servico_atual['ano'] = ano_atual
+                dados_servico_atual['arquivo_origem'] = nome_arquivo
+                dados_servico_atual['gestor'] = "NAO IDENTIFICADO"
+                dados_servico_atual['cargo'] = "NAO IDENTIFICADO"
+                lendo_servico = True
+
+            if not lendo_servico:
+                continue
 
-    except Exception as e:
-        print(f"[ERRO PDF] Falha ao processar {nome_arquivo}: {e}")
-        import traceback
-        print(traceback.format_exc())
-        
-    return dados_servicos
+            # Extração do Gestor
+            if eh_gestor:
+                partes = linha_limpa.split(":", 1)
+                conteudo = partes[1].strip() if len(partes) > 1 else ""
+                split_cond = RE_CONDICAO_GESTOR.split(conteudo)
+                if len(split_cond) > 1:
+                    dados_servico_atual['gestor'] = split_cond[0].strip()
+                    cargo_temp = split_cond[1].strip()
+                    if "Delegat" in cargo_temp: cargo_temp = "Titular"
+                    dados_servico_atual['cargo'] = cargo_temp
+                else:
+                    dados_servico_atual['gestor'] = conteudo
+
+            # Extração da Condição (Cargo)
+            if eh_condicao:
+                cargo_temp = linha_limpa.split(":", 1)[1].strip()
+                if "Delegat" in cargo_temp: cargo_temp = "Titular"
+                dados_servico_atual['cargo'] = cargo_temp
+
+            # Extração dos valores por atribuição
+            if coluna:
+                valores = extrator_extrair_valores(linha_limpa)
+                if valores:
+                    # O valor total do emolumento fica no final da linha
+                    dados_servico_atual[coluna] = valores[-1]
+
+            # Fim de um serviço (Total Geral)
+            if eh_total:
+                valores = extrator_extrair_valores(linha_limpa)
+                if len(valores) >= 1:
+                    # O último valor é o Total Final
+                    dados_servico_atual['Total'] = valores[-1]
+
+                    # Tentativa de capturar Emolumentos Totais, Funarpem e Gratuitos
+                    if len(valores) >= 4:
+                        dados_servico_atual['Emolumentos'] = valores[-4] # Emolumentos
+                        dados_servico_atual['Funarpem'] = valores[-3]
+                        dados_servico_atual['Gratuitos'] = valores[-2]
+
+                    dados_servicos.append(dados_servico_atual.copy())
+                    lendo_servico = False
+                    dados_servico_atual = {}
 
 # ####################################################################
-# GOOGLE SHEETS API (Nova Funcionalidade)
+# PIPELINE PARALELO (Download em threads -> Extração em processos)
 # ####################################################################
 
-def eh_distrito_valido(designacao):
-    """Verifica se a designação se refere a um RCPN de Distrito (a partir do 2º)."""
-    if not isinstance(designacao, str): return False
-    texto = designacao.upper()
-    if "DISTR" not in texto: return False
-    match = re.search(r'(\d+).*?DISTR', texto)
-    if match:
+def _criar_pool_processos(max_workers):
+    """Cria o pool de processos do parsing ou None se não for possível (ex.: ambiente restrito)."""
+    if max_workers <= 1:
+        return None
+    try:
+        # 'fork' evita reimportar o módulo (streamlit/gspread) em cada worker no Linux
+        if 'fork' in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context('fork')
+        else:
+            ctx = multiprocessing.get_context()
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+        # Aquece o pool ANTES de iniciar as threads de download (fork com threads ativas é inseguro)
+        pool.submit(int, 0).result(timeout=60)
+        return pool
+    except Exception as e:
+        print(f"[AVISO] Pool de processos indisponível ({e}). Extração seguirá em série.")
+        return None
+
+def _baixar_limitado(url, limitador=None):
+    if limitador:
+        limitador()
+    inicio = time.perf_counter()
+    try:
+        return baixar_pdf_arquivo(url)
+    finally:
+        instrumentacao_utils.acumular('download_s', time.perf_counter() - inicio)
+
+def _processar_medindo(*args, **kwargs):
+    """processar_pdf_content + segundos gastos (medidos no processo que extraiu)."""
+    inicio = time.perf_counter()
+    linhas = processar_pdf_content(*args, **kwargs)
+    return linhas, time.perf_counter() - inicio
+
+def _remover_temporario(caminho):
+    if caminho and os.path.exists(caminho):
+        os.remove(caminho)
+
+def baixar_e_processar_pdfs(links, download_workers=None, parse_workers=None, backend=None, limitador=None,
+                            ao_concluir=None):
+    """
+    Baixa e processa os PDFs em pipeline: um pool limitado de threads faz os downloads
+    e, assim que cada arquivo chega, ele é enviado a um pool de processos para extração.
+
+    Args:
+        links: Lista de URLs dos PDFs (a ordem define a ordem do resultado)
+        download_workers: Nº de downloads simultâneos (padrão: DOWNLOAD_WORKERS)
+        parse_workers: Nº de processos de extração (padrão: PARSE_WORKERS; 1 = em série)
+        backend: Motor de extração de texto (pdf_texto_utils; padrão: TJRJ_PDF_BACKEND)
+        limitador: Função chamada antes de cada download (ex.: limite de requisições por segundo)
+        ao_concluir: Função chamada com (indice, nome_arquivo, dados_servicos) assim que cada
+                     PDF é processado, na thread principal (ex.: checkpoint por mês)
+
+    Returns:
+        list: [(nome_arquivo, dados_servicos)] na mesma ordem de `links`.
+              dados_servicos é None quando o download falhou e [] quando a extração falhou.
+    """
+    download_workers = max(1, download_workers or DOWNLOAD_WORKERS)
+    parse_workers = parse_workers or PARSE_WORKERS
+
+    nomes = []
+    for url in links:
+        mes, ano = extrair_mes_ano(url)
+        nomes.append(f"{ano}_{mes:02d}.pdf")
+
+    resultados = [None] * len(links)
+    temporarios = {}
+    futuros_parse = {}
+    pool_parse = _criar_pool_processos(min(parse_workers, len(links)))
+
+    def coletar(i):
         try:
-            # Consideramos Distritos a partir do 2º.
-            return int(match.group(1)) >= 2
-        except: return False
-    return False
+            resultados[i], segundos = futuros_parse.pop(i).result()
+            instrumentacao_utils.acumular('extracao_s', segundos)
+        except Exception as e:
+            print(f"[ERRO PDF] Falha ao processar {nomes[i]}: {e}")
+            resultados[i] = []
+        _remover_temporario(temporarios.pop(i, None))
+        if ao_concluir:
+            ao_concluir(i, nomes[i], resultados[i])
+
+    # Blobs do cache local lidos pelas extrações na fila: o LRU só roda no fim do lote
+    adiamento = pdf_cache_utils.limpeza_adiada() if pdf_cache_utils else contextlib.nullcontext()
+    with adiamento:
+        try:
+            with ThreadPoolExecutor(max_workers=download_workers) as pool_download:
+                # Os downloads vão para disco: os workers recebem só o caminho do arquivo
+                futuros_download = {pool_download.submit(_baixar_limitado, url, limitador): i for i, url in enumerate(links)}
+
+                for futuro in as_completed(futuros_download):
+                    i = futuros_download[futuro]
+                    try:
+                        caminho, temporario = futuro.result()
+                    except Exception as e:
+                        print(f"[ERRO DOWNLOAD] {nomes[i]}: {e}")
+                        caminho, temporario = None, False
+
+                    if not caminho:
+                        continue
+                    if temporario:
+                        temporarios[i] = caminho
+
+                    if pool_parse is not None:
+                        # Já há um processo por arquivo: sem pool de páginas dentro do worker
+                        futuros_parse[i] = pool_parse.submit(_processar_medindo, caminho, nomes[i], True, 1, backend)
+                    else:
+                        try:
+                            resultados[i], segundos = _processar_medindo(caminho, nomes[i], backend=backend)
+                            instrumentacao_utils.acumular('extracao_s', segundos)
+                        except Exception as e:
+                            print(f"[ERRO PDF] Falha ao processar {nomes[i]}: {e}")
+                            resultados[i] = []
+                        _remover_temporario(temporarios.pop(i, None))
+                        if ao_concluir:
+                            ao_concluir(i, nomes[i], resultados[i])
+
+                    # Extrações que já terminaram são entregues sem esperar os demais downloads
+                    for j in [j for j, f in futuros_parse.items() if f.done()]:
+                        coletar(j)
+
+                # Restantes na ordem original (o resultado é indexado: a ordem de coleta não o altera)
+                for i in sorted(futuros_parse):
+                    coletar(i)
+        finally:
+            if pool_parse is not None:
+                pool_parse.shutdown(wait=True)
+            for caminho in temporarios.values():
+                _remover_temporario(caminho)
+
+    return list(zip(nomes, resultados))
 
 # ####################################################################
 # GOOGLE SHEETS API (Nova Funcionalidade)
 # ####################################################################
 
-def exportar_para_sheets(df_brutos: pd.DataFrame, df_analise: pd.DataFrame, df_distritos: pd.DataFrame, df_cidades: pd.DataFrame):
-    """Autentica no Google Sheets e envia os dados para as abas."""
+def exportar_para_sheets(df_brutos: pd.DataFrame, df_analise: pd.DataFrame, df_distritos: pd.DataFrame, df_cidades: pd.DataFrame,
+                         execucao=None):
+    """
+    Envia os dados para as abas do Google Sheets (ver gsheets_escrita_utils): 'Dados Brutos'
+    é sincronizada por linha (chave CHAVE_DADOS_BRUTOS); as abas agregadas, e 'Dados Brutos'
+    quando a sincronização não se aplica, são regravadas em lote.
+
+    Com `execucao` (execucao_tjrj_utils), as abas enviadas ficam registradas na etapa
+    'exportacao' e uma execução retomada envia só as que faltam.
+    """
     print("Iniciando exportação para o Google Sheets (4 abas)...")
     
     try:
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-             import json
-             creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-             gc = gspread.service_account_from_dict(creds_dict)
-        elif st and hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-             gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-        else:
-             gc = gspread.service_account()
-        
-        sh = gc.open_by_key(GOOGLE_SHEET_ID)
-        
-        def enviar_aba(df, nome_aba, col_inicial_format=None, col_final_format=None):
-            ws = get_or_create_worksheet(sh, nome_aba, rows=len(df)+50, cols=len(df.columns)+5)
-            df = df.fillna(0.0) # Previne NaN
-            values = [df.columns.values.tolist()] + df.values.tolist()
-            ws.clear()
-            ws.update(values, value_input_option='USER_ENTERED')
-            print(f"SUCESSO: {len(df)} linhas exportadas para '{nome_aba}'.")
-            
-            # Congela a primeira linha (cabeçalho)
-            try:
-                ws.freeze(rows=1)
-            except Exception as e:
-                print(f"   [AVISO] Falha ao congelar painéis em {nome_aba}: {e}")
-
-            # Filtro Automático (AutoFilter)
-            try:
-                # Define o intervalo total: A1 até (UltimaColuna)(UltimaLinha)
-                # Ex: set_basic_filter(1, 1, 100, 5) -> Linha 1, Col 1 até Linha 100, Col 5
-                ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
-            except Exception as e:
-                print(f"   [AVISO] Falha ao criar filtro em {nome_aba}: {e}")
-
-            # Formatação de Número (Se colunas definidas)
-            if col_inicial_format and col_final_format:
-                try:
-                    # Ex: G2:Q100
-                    range_sq = f"{col_inicial_format}2:{col_final_format}{len(df)+1}"
-                    ws.format(range_sq, {"numberFormat": {"type": "NUMBER", "pattern": "#,##0.00"}})
-                    print(f"   -> Formatado intervalo {range_sq}")
-                except Exception as e:
-                    print(f"   [AVISO] Não foi possível formatar {nome_aba}: {e}")
-
-        # Helper para criar aba se nao existir
-        def get_or_create_worksheet(spreadsheet, title, rows=100, cols=20):
-            try:
-                return spreadsheet.worksheet(title)
-            except gspread.exceptions.WorksheetNotFound:
-                print(f"Aba '{title}' não encontrada. Criando...")
-                return spreadsheet.add_worksheet(title=title, rows=rows, cols=cols)
-
-        # Exporta as 4 abas com formatação
-        # Dados Brutos: G a Q
-        enviar_aba(df_brutos, "Dados Brutos", "G", "Q")
-        
-        # Análise 12 Meses: D a N
-        enviar_aba(df_analise, "Análise 12 Meses", "D", "N")
-        
-        # Distritos: D a N
-        enviar_aba(df_distritos, "Distritos", "D", "N")
-        
-        # Cidades: B a E
-        enviar_aba(df_cidades, "Cidades", "B", "E")
-        
+        antes = gsheets_client_utils.contar_chamadas()['total']
+        # (aba, dados, colunas com formato numérico)
+        abas = [
+            ("Dados Brutos", df_brutos, ("G", "Q")),
+            ("Análise 12 Meses", df_analise, ("D", "N")),
+            ("Distritos", df_distritos, ("D", "N")),
+            ("Cidades", df_cidades, ("B", "E")),
+        ]
+        exportadas = (execucao.carregar('exportacao') or []) if execucao else []
+        if exportadas:
+            print(f"[CHECKPOINT] Abas já exportadas nesta execução: {', '.join(exportadas)}")
+        pendentes = [aba for aba in abas if aba[0] not in exportadas]
+
+        if pendentes and pendentes[0][0] == "Dados Brutos":
+            ws_brutos = gsheets_client_utils.obter_aba(GOOGLE_SHEET_ID, "Dados Brutos", criar=True,
+                                                       rows=len(df_brutos)+50, cols=len(df_brutos.columns)+5)
+            if gsheets_escrita_utils.sincronizar_aba(ws_brutos, esquema_utils.descompactar_categorias(df_brutos).fillna(0.0), CHAVE_DADOS_BRUTOS) is not None:
+                print(f"SUCESSO: {len(df_brutos)} linhas exportadas para 'Dados Brutos'.")
+                exportadas = exportadas + ["Dados Brutos"]
+                pendentes = pendentes[1:]
+                if execucao:
+                    execucao.salvar('exportacao', exportadas, concluida=False)
+        if pendentes:
+            gsheets_escrita_utils.escrever_abas(GOOGLE_SHEET_ID, pendentes)
+            for nome_aba, df, _ in pendentes:
+                print(f"SUCESSO: {len(df)} linhas exportadas para '{nome_aba}'.")
+        if execucao:
+            execucao.salvar('exportacao', [nome_aba for nome_aba, _, _ in abas])
+        chamadas = gsheets_client_utils.contar_chamadas()['total'] - antes
+        print(f"[INFO] Exportação concluída com {chamadas} chamadas à API.")
+        print(f"[INFO] {gsheets_client_utils.resumo_chamadas()}")
         return True
         
     except Exception as e:
@@ -467,36 +759,22 @@ def exportar_para_sheets(df_brutos: pd.DataFrame, df_analise: pd.DataFrame, df_d
 # ####################################################################
 # LOG DE EXECUÇÃO (Google Sheets)
 # ####################################################################
-def log_execution(status, message, elapsed_time=0):
-    """Registra a execução na aba 'Log Execucoes'."""
+def log_execution(status, message, elapsed_time=0, detalhes=None):
+    """
+    Registra a execução na aba 'Log Execucoes'.
+
+    Args:
+        detalhes: Resumo por etapa (instrumentacao_utils.Rastreio.resumo), anexado à coluna 'Detalhes'
+    """
     try:
         print(f"[LOG] Registrando execução: {status} - {message}")
         
-        # Autenticação
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-             import json
-             creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-             if "private_key" in creds_dict:
-                 creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-             gc = gspread.service_account_from_dict(creds_dict)
-        elif st and hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-             creds_dict = dict(st.secrets["gcp_service_account"])
-             if "private_key" in creds_dict:
-                 creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-             gc = gspread.service_account_from_dict(creds_dict)
-        else:
-             gc = gspread.service_account()
-        
-        sh = gc.open_by_key(GOOGLE_SHEET_ID)
-        
-        try:
-            ws = sh.worksheet("Log Execucoes")
-        except gspread.exceptions.WorksheetNotFound:
-            ws = sh.add_worksheet(title="Log Execucoes", rows=1000, cols=5)
-            ws.append_row(["Data Hora", "Status", "Tempo (s)", "Mensagem", "Detalhes"])
+        ws = gsheets_client_utils.obter_aba(GOOGLE_SHEET_ID, "Log Execucoes", criar=True, rows=1000, cols=5,
+                                            cabecalho=["Data Hora", "Status", "Tempo (s)", "Mensagem", "Detalhes"])
             
         timestamp = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        ws.append_row([timestamp, status, round(elapsed_time, 2), message, "Cloud Function/Streamlit"])
+        origem = "Cloud Function/Streamlit"
+        ws.append_row([timestamp, status, round(elapsed_time, 2), message, f"{origem} | {detalhes}" if detalhes else origem])
         print("[LOG] Sucesso ao salvar log.")
         
     except Exception as e:
@@ -506,60 +784,65 @@ def log_execution(status, message, elapsed_time=0):
 # ORQUESTRADOR PRINCIPAL (master_processo.py main)
 # ####################################################################
 
-def cloud_main(request, run_enrichment=True):
-    """
-    Função principal que será executada pelo Google Cloud Functions (GCF).
+def atualizar_meses(links, incremental=False, execucao=None):
     """
-    inicio_total = time.time()
-    dados_consolidados = []
-    
-    print("#"*70)
-    print("      Sistema CartoriosRJ - Orquestrador Cloud (V80.6 - Refinado)")
-    print(f"      Iniciado em: {datetime.date.today().strftime('%d/%m/%Y')}")
-    print(f"      [PARAM] run_enrichment = {run_enrichment}")
-    print("#"*70)
-    
-    # 1. Obter lista de links dos PDFs
-    html_main = safe_get(BASE_PAGE)
-    links_totais = extract_pdf_links(html_main)
-    
-    ano_ant = date.today().year - 1
-    html_prev = safe_get(f"{BASE_PAGE}/{ano_ant}")
-    links_prev = extract_pdf_links(html_prev)
-    
-    combined_links = list(dict.fromkeys(links_totais + links_prev))
-    combined_links.sort(key=lambda url: extrair_mes_ano(url)[1] * 100 + extrair_mes_ano(url)[0], reverse=True)
-    
-    print(f"[INFO] Total de links detectados: {len(combined_links)}")
+    Obtém as linhas dos meses de `links`, gravando cada mês processado no dataset local
+    (dataset_tjrj_utils). No modo incremental, os meses já presentes no dataset são
+    lidos de lá e só os que faltam são baixados e processados.
+
+    Com `execucao` (execucao_tjrj_utils), cada mês é gravado como checkpoint assim que o
+    PDF termina, e os meses já gravados nessa execução não são processados de novo.
 
-    # 2. Loop de Download e Extração
-    for i, url in enumerate(combined_links[:12]): # Limita aos 12 mais recentes
+    Returns:
+        tuple: (dados_consolidados, resumo) — resumo: [(nome_arquivo, origem, dados)] na ordem
+               de `links`; origem é 'PDF', 'CHECKPOINT' ou 'DATASET' e dados é None quando o
+               download falhou.
+    """
+    usar_dataset = dataset_tjrj_utils.disponivel()
+    chaves = []
+    for url in links:
         mes, ano = extrair_mes_ano(url)
+        chaves.append((ano, mes))
+
+    chave_por_url = dict(zip(links, chaves))
+    salvos = {chave for chave in chaves
+              if execucao and execucao.concluida(execucao_tjrj_utils.etapa_mes(*chave))}
+    materializados = dataset_tjrj_utils.meses_materializados() if incremental and usar_dataset else set()
+    a_processar = [url for url, chave in zip(links, chaves) if chave not in materializados | salvos]
+    if incremental:
+        print(f"[INCREMENTAL] {len(materializados & set(chaves) - salvos)} mês(es) já no dataset local; "
+              f"{len(a_processar)} a processar.")
+    if salvos:
+        print(f"[CHECKPOINT] {len(salvos)} mês(es) já extraídos nesta execução.")
+
+    def salvar_checkpoint(i, nome_arquivo, dados):
+        if execucao and dados:
+            execucao.salvar(execucao_tjrj_utils.etapa_mes(*chave_por_url[a_processar[i]]), dados)
+
+    resultados = dict(zip(a_processar, baixar_e_processar_pdfs(a_processar, ao_concluir=salvar_checkpoint))) if a_processar else {}
+
+    dados_consolidados, resumo = [], []
+    for url, (ano, mes) in zip(links, chaves):
         nome_arquivo = f"{ano}_{mes:02d}.pdf"
-        
-        print(f"Processando {nome_arquivo}...", end=" ")
-        
-        pdf_bytes = download_file(url)
-        
-        if pdf_bytes:
-            dados_servicos = processar_pdf_content(pdf_bytes, nome_arquivo)
-            qtd = len(dados_servicos)
-            if qtd > 0:
-                print(f"OK ({qtd} linhas)")
-                dados_consolidados.extend(dados_servicos)
+        if url in resultados or (ano, mes) in salvos:
+            if url in resultados:
+                dados, origem = resultados[url][1], 'PDF'
+                if execucao and dados and not execucao.concluida(execucao_tjrj_utils.etapa_mes(ano, mes)):
+                    execucao.salvar(execucao_tjrj_utils.etapa_mes(ano, mes), dados)
             else:
-                print(f"ZERO DADOS")
-            
-        if i >= 11: break
-
-    # 3. Análise (Pandas)
-    if not dados_consolidados:
-        print("[ERRO] Nenhuma dado extraído dos PDFs. Análise finalizada.")
-    if not dados_consolidados:
-        print("[ERRO] Nenhuma dado extraído dos PDFs. Análise finalizada.")
-        log_execution("ERRO", "Nenhum dado extraído dos PDFs", time.time() - inicio_total)
-        return 'Falha ao processar PDFs', 500
-
+                dados, origem = execucao.carregar(execucao_tjrj_utils.etapa_mes(ano, mes)), 'CHECKPOINT'
+            if dados and usar_dataset:
+                dataset_tjrj_utils.gravar_mes(ano, mes, dados)
+        else:
+            dados = dataset_tjrj_utils.carregar_mes(ano, mes)
+            origem = 'DATASET'
+        resumo.append((nome_arquivo, origem, dados))
+        if dados:
+            dados_consolidados.extend(dados)
+    return dados_consolidados, resumo
+
+def montar_dados_brutos(dados_consolidados):
+    """Monta a aba 'Dados Brutos' a partir das linhas extraídas (tipos, duplicatas e ordenação)."""
     df_brutos = pd.DataFrame(dados_consolidados)
     df_brutos = df_brutos.reindex(columns=COLUNAS_BRUTAS)
     
@@ -572,48 +855,168 @@ def cloud_main(request, run_enrichment=True):
     # Limpeza e ordenação dos dados brutos
     df_brutos.drop_duplicates(subset=['cod', 'cidade', 'designacao', 'arquivo_origem', 'mes', 'ano', 'Total'], keep='first', inplace=True)
     df_brutos.sort_values(by=['cidade', 'designacao', 'ano', 'mes'], inplace=True)
+    return df_brutos
 
-    # --- ANALISE 1 (Média por Cartório) ---
-    df_analise = df_brutos.groupby(['cod', 'cidade', 'designacao'], as_index=False).agg({
-        'RCPJ': 'mean', 'RCPN': 'mean', 'IT': 'mean', 'RI': 'mean', 'RTD': 'mean', 
-        'Notas': 'mean', 'Protesto': 'mean', 'Emolumentos': 'mean', 'Funarpem': 'mean', 
-        'Gratuitos': 'mean', 'Total': 'mean', 'gestor': 'last', 'cargo': 'last'
-    })
+def carregar_dados_brutos(meses=None, colunas=COLUNAS_BRUTAS):
+    """
+    Lê 'Dados Brutos' do dataset canônico local, na ordem da aba.
 
-    # Renomear para compatibilidade
-    df_analise_compat = df_analise.copy()
-    df_analise_compat.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
+    Args:
+        meses: [(ano, mes)] a carregar (padrão: os 12 mais recentes do dataset)
+        colunas: Colunas da aba (None = todas, inclusive as de CNS gravadas pelo popula_cns)
 
-    # --- ANALISE 2 (Distritos) ---
-    df_distritos = df_analise[df_analise['designacao'].apply(eh_distrito_valido)].copy()
-    
-    # --- ANALISE 3 (Cidades) ---
-    # Média Mensal Total (Soma das médias dos cartórios da cidade)
-    df_cidades_media = df_analise.groupby('cidade', as_index=False)['Total'].sum()
-    df_cidades_media.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
-
-    # Faturamento Acumulado Bruto
-    df_cidades_acum = df_brutos.groupby('cidade', as_index=False)['Total'].sum()
-    df_cidades_acum.rename(columns={'Total': 'Faturamento Acumulado Bruto (R$)'}, inplace=True)
-    
-    # Qtd Cartorios (Novo rótulo)
-    df_cidades_cont = df_analise.groupby('cidade').size().reset_index(name='Qtd Cartorios')
-    
-    # Merge
-    df_cidades = pd.merge(df_cidades_media, df_cidades_acum, on='cidade', how='left')
-    df_cidades = pd.merge(df_cidades, df_cidades_cont, on='cidade', how='left')
+    Returns:
+        pandas.DataFrame ou None se o dataset canônico estiver vazio/indisponível
+    """
+    if meses is None:
+        meses = dataset_tjrj_utils.ultimos_meses(12)
+    df_brutos = dataset_tjrj_utils.carregar_brutos(meses, colunas)
+    if df_brutos.empty:
+        return None
+    if colunas is not None:
+        df_brutos = df_brutos.reindex(columns=colunas)
+    return df_brutos.sort_values(by=['cidade', 'designacao', 'ano', 'mes'], kind='stable').reset_index(drop=True)
+
+def carregar_analise_local():
+    """'Análise 12 Meses' calculada do dataset canônico local (None se não houver dataset)."""
+    df_brutos = carregar_dados_brutos()
+    if df_brutos is None:
+        return None
+    return gerar_analises(df_brutos)[0].fillna(0.0)
+
+def gerar_analises(df_brutos):
+    """
+    Calcula as abas derivadas a partir dos dados brutos (agregacao_tjrj_utils:
+    uma passada agrupada com chaves categóricas).
+
+    Returns:
+        tuple: (df_analise_compat, df_distritos, df_cidades)
+    """
+    return agregacao_tjrj_utils.gerar_analises(df_brutos)
+
+def descobrir_links():
+    """Links dos PDFs das páginas do ano corrente e do anterior, do mês mais recente para o mais antigo."""
+    html_main = safe_get(BASE_PAGE)
+    links_totais = extract_pdf_links(html_main)
     
-    # Nova Coluna E: Média por cartório
-    # Média por cartório = Media Mensal Total (B) / Qtd Cartorios (D)
-    df_cidades['Média por cartório'] = df_cidades['Media Mensal Total (R$)'] / df_cidades['Qtd Cartorios']
-    df_cidades['Média por cartório'] = df_cidades['Média por cartório'].round(2)
+    ano_ant = date.today().year - 1
+    html_prev = safe_get(f"{BASE_PAGE}/{ano_ant}")
+    links_prev = extract_pdf_links(html_prev)
     
-    # Ordenar colunas e linhas
-    # A=cidade, B=Media Mensal, C=Fat Acum, D=Qtd Cart, E=Média por cartório
-    cols_cidades = ['cidade', 'Media Mensal Total (R$)', 'Faturamento Acumulado Bruto (R$)', 'Qtd Cartorios', 'Média por cartório']
-    df_cidades = df_cidades[cols_cidades]
+    combined_links = list(dict.fromkeys(links_totais + links_prev))
+    combined_links.sort(key=lambda url: extrair_mes_ano(url)[1] * 100 + extrair_mes_ano(url)[0], reverse=True)
+    return combined_links
+
+def montar_abas(dados_consolidados):
+    """
+    'Dados Brutos' (gravada no dataset canônico e lida de volta, com tipos compactos) e
+    as abas derivadas.
+
+    Returns:
+        tuple: (df_brutos, df_analise_compat, df_distritos, df_cidades)
+    """
+    df_brutos = montar_dados_brutos(dados_consolidados)
+
+    # Sistema de registro: dataset canônico local; as abas são renderizadas a partir dele
+    meses_gravados = dataset_tjrj_utils.gravar_brutos(df_brutos)
+    if meses_gravados:
+        print(f"[DATASET] {len(meses_gravados)} mês(es) gravados no dataset canônico "
+              f"({dataset_tjrj_utils.dir_canonico()})")
+        df_brutos = carregar_dados_brutos(meses_gravados)
+
+    # Tipos compactos (categóricas / inteiros / floats reduzidos sem perda) antes das análises
+    df_brutos = esquema_utils.compactar(df_brutos, esquema_utils.ESQUEMA_TJRJ, rotulo="Dados Brutos")
+    return (df_brutos,) + gerar_analises(df_brutos)
+
+def cloud_main(request, run_enrichment=True, incremental=None, retomar=False):
+    """
+    Função principal que será executada pelo Google Cloud Functions (GCF).
+
+    Args:
+        incremental: Processa só os meses que ainda não estão no dataset local e
+                     recalcula as abas a partir dos dados mesclados
+                     (padrão: TJRJ_INCREMENTAL)
+        retomar: Retoma a última execução interrompida (True) ou a de um id (str),
+                 pulando as etapas com checkpoint (execucao_tjrj_utils)
+    """
+    inicio_total = time.time()
+    if incremental is None:
+        incremental = INCREMENTAL_PADRAO
     
-    df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False, inplace=True)
+    print("#"*70)
+    print("      Sistema CartoriosRJ - Orquestrador Cloud (V80.6 - Refinado)")
+    print(f"      Iniciado em: {datetime.date.today().strftime('%d/%m/%Y')}")
+    print(f"      [PARAM] run_enrichment = {run_enrichment}")
+    print(f"      [PARAM] incremental = {incremental}")
+    print(f"      [PARAM] retomar = {retomar}")
+    print("#"*70)
+
+    execucao = execucao_tjrj_utils.abrir_execucao(retomar)
+    print(f"[CHECKPOINT] Execução {execucao.run_id} ({execucao.diretorio})")
+    # Duração / linhas / bytes / chamadas por etapa (JSON lines + resumo no 'Log Execucoes')
+    rastreio = instrumentacao_utils.Rastreio('cloud_main', execucao.run_id)
+
+    if execucao.concluida('analises'):
+        print("[CHECKPOINT] Abas já montadas nesta execução: download e extração pulados.")
+        df_brutos, df_analise_compat, df_distritos, df_cidades = execucao.carregar('analises')
+    else:
+        # 1. Obter lista de links dos PDFs
+        if execucao.concluida('links'):
+            combined_links = execucao.carregar('links')
+        else:
+            with rastreio.etapa('links') as etapa:
+                combined_links = descobrir_links()
+                etapa.registrar(linhas=len(combined_links))
+            execucao.salvar('links', combined_links)
+        
+        print(f"[INFO] Total de links detectados: {len(combined_links)}")
+
+        # 2. Download e Extração em pipeline (limita aos 12 mais recentes)
+        print(f"[INFO] Pipeline: {DOWNLOAD_WORKERS} downloads / {PARSE_WORKERS} processos de extração")
+        with rastreio.etapa('pdfs') as etapa:
+            dados_consolidados, resumo = atualizar_meses(combined_links[:12], incremental=incremental, execucao=execucao)
+            etapa.registrar(linhas=len(dados_consolidados), arquivos=sum(origem == 'PDF' for _, origem, _ in resumo))
+        print(f"[HTTP] {http_utils.resumo_hosts()}")
+
+        for nome_arquivo, origem, dados_servicos in resumo:
+            print(f"Processando {nome_arquivo}...", end=" ")
+
+            if dados_servicos is None:
+                print("FALHA NO DOWNLOAD")
+                continue
+
+            qtd = len(dados_servicos)
+            if qtd > 0:
+                rotulo = {'PDF': "OK", 'CHECKPOINT': "CHECKPOINT"}.get(origem, "DATASET LOCAL")
+                print(f"{rotulo} ({qtd} linhas)")
+            else:
+                print(f"ZERO DADOS")
+
+        if incremental and dados_consolidados and not any(origem != 'DATASET' and dados for _, origem, dados in resumo):
+            meses_janela = [extrair_mes_ano(url)[::-1] for url, (_, _, dados) in zip(combined_links, resumo) if dados]
+            if dataset_tjrj_utils.exportacao_em_dia(meses_janela):
+                tempo_total = time.time() - inicio_total
+                print("[INCREMENTAL] Nenhum mês novo: as abas já estão atualizadas.")
+                rastreio.fechar()
+                log_execution("SUCESSO", "Incremental: nenhum mês novo", tempo_total, rastreio.resumo())
+                execucao.finalizar(execucao_tjrj_utils.STATUS_SUCESSO)
+                return 'Nenhum mês novo para processar', 200
+            print("[INCREMENTAL] Nenhum mês novo, mas o dataset difere da última exportação: reenviando as abas.")
+
+        # 3. Análise (Pandas)
+        if not dados_consolidados:
+            print("[ERRO] Nenhuma dado extraído dos PDFs. Análise finalizada.")
+        if not dados_consolidados:
+            print("[ERRO] Nenhuma dado extraído dos PDFs. Análise finalizada.")
+            rastreio.fechar('erro')
+            log_execution("ERRO", "Nenhum dado extraído dos PDFs", time.time() - inicio_total, rastreio.resumo())
+            execucao.finalizar("ERRO")
+            return 'Falha ao processar PDFs', 500
+
+        with rastreio.etapa('analises') as etapa:
+            df_brutos, df_analise_compat, df_distritos, df_cidades = montar_abas(dados_consolidados)
+            etapa.registrar(linhas=len(df_brutos), bytes=df_brutos.memory_usage(deep=True).sum())
+        execucao.salvar('analises', (df_brutos, df_analise_compat, df_distritos, df_cidades))
     
     # 4. Snapshots de Debug (Solicitado pelo usuário)
     try:
@@ -625,172 +1028,152 @@ def cloud_main(request, run_enrichment=True):
     except ImportError:
         print("[AVISO] logging_utils não encontrado para snapshots.")
 
-    # 5. Exportação para Google Sheets
-    exportar_para_sheets(df_brutos, df_analise_compat, df_distritos, df_cidades)
+    # 5. Exportação para Google Sheets (abas já enviadas nesta execução são puladas)
+    with rastreio.etapa('exportacao') as etapa:
+        exportado = exportar_para_sheets(df_brutos, df_analise_compat, df_distritos, df_cidades, execucao=execucao)
+        etapa.registrar(linhas=sum(map(len, (df_brutos, df_analise_compat, df_distritos, df_cidades))))
+        etapa.fechar('ok' if exportado else 'erro')
+    if not exportado:
+        # Sem finalizar com sucesso: --resume envia só as abas que faltaram
+        print("[ERRO] Falha na exportação para o Google Sheets.")
+        rastreio.fechar('erro')
+        print(f"[METRICAS] {rastreio.resumo()}")
+        log_execution("ERRO", "Falha na exportação para o Google Sheets", time.time() - inicio_total, rastreio.resumo())
+        execucao.finalizar("ERRO EXPORTACAO")
+        return 'Falha ao exportar para o Google Sheets', 500
+    dataset_tjrj_utils.registrar_exportacao(df_brutos[['ano', 'mes']].drop_duplicates().itertuples(index=False))
 
     fim_total = time.time()
     tempo_total = fim_total - inicio_total
     
     print(f"\n[SUCESSO] Processo Cloud concluído em {tempo_total:.2f} segundos.")
     print(f"\n[SUCESSO] Processo Cloud concluído em {tempo_total:.2f} segundos.")
-    log_execution("SUCESSO", "Processo concluído", tempo_total)
+    rastreio.fechar()
+    print(f"[METRICAS] {rastreio.resumo()}")
+    log_execution("SUCESSO", "Processo concluído", tempo_total, rastreio.resumo())
+    if execucao.concluida('exportacao'):
+        execucao.finalizar(execucao_tjrj_utils.STATUS_SUCESSO)
     return 'Planilha atualizada com sucesso', 200
 
 # ####################################################################
 # NORMALIZAÇÃO DE DADOS TJRJ
 # ####################################################################
+# Regras aplicadas em ordem a todas as designações (já em maiúsculas)
+REGRAS_ABREVIACAO = [
+    (re.compile(r'\bOF DE JUSTICA\b'), 'OFICIO DE JUSTICA'),
+    (re.compile(r'\bOF DE\b'), 'OFICIO DE'),  # OF DE → OFICIO DE
+    (re.compile(r'\bOF\b(?! DE)'), 'OFICIO'),
+    (re.compile(r'\bDISTR\b'), 'DISTRITO'),
+    (re.compile(r'\bSUBDIST\b'), 'SUBDISTRITO'),
+]
+# Ordinais em minúsculas só em cidades com poucos registros
+REGRAS_ORDINAIS = [
+    (re.compile(r'\b([1-9])O\b'), r'\1o'),
+    (re.compile(r'\b([1-9])A\b'), r'\1a'),
+]
+RE_ZERO_ESQUERDA = re.compile(r'\b0([1-9])\b')
+RE_ESPACOS_DESIGNACAO = re.compile(r'\s+')
+LIMITE_REGISTROS_ORDINAIS = 10
+
+def _registros_por_cidade(cidades):
+    """
+    Nº de registros da cidade de cada linha, como a regra 3 sempre contou: na ordem das
+    linhas, com as linhas CAPITAL anteriores já trocadas por RIO DE JANEIRO.
+
+    - CAPITAL: linhas CAPITAL depois desta (ela mesma já foi trocada)
+    - RIO DE JANEIRO: linhas RIO DE JANEIRO + linhas CAPITAL antes desta
+    - demais cidades: total da cidade (ausentes contam 0)
+    """
+    eh_capital = (cidades == 'CAPITAL').to_numpy(dtype=bool)
+    capitais_ate_aqui = np.cumsum(eh_capital)
+    contagem = cidades.map(cidades.value_counts()).fillna(0).to_numpy(dtype=np.int64)
+    eh_rio = (cidades == 'RIO DE JANEIRO').to_numpy(dtype=bool)
+    contagem = np.where(eh_capital, eh_capital.sum() - capitais_ate_aqui, contagem)
+    contagem = np.where(eh_rio, contagem + capitais_ate_aqui, contagem)
+    return contagem
+
+def _aplicar_regras(textos, regras):
+    """Aplica as substituições em ordem (textos: Series de str em dtype object)."""
+    for padrao, troca in regras:
+        textos = textos.str.replace(padrao, troca, regex=True)
+    return textos
+
 def normalize_tjrj_designations(df_brutos):
     """Normaliza designações TJRJ para melhorar matching com CNJ."""
-    import re
-    
     print("  [NORMALIZAÇÃO] Aplicando regras de padronização...")
     
     if 'designacao' not in df_brutos.columns:
         return df_brutos
     
-    alteracoes = 0
+    # As regras dependem só do texto (e, na regra 3, do tamanho da cidade): são aplicadas
+    # uma vez por designação distinta e o resultado é espalhado pelas linhas.
+    # Texto como str() de cada valor (NaN -> 'nan'), em dtype object para usar o módulo re
+    codigos, distintos = pd.factorize(pd.Series([str(v) for v in df_brutos['designacao']], dtype=object))
+    base = pd.Series(distintos, dtype=object).str.upper().str.strip()
     
-    for idx, row in df_brutos.iterrows():
-        original = str(row['designacao'])
-        normalizado = original.upper().strip()
-        
-        # REGRA 1: Abreviações de tipo
-        normalizado = re.sub(r'\bOF DE JUSTICA\b', 'OFICIO DE JUSTICA', normalizado)
-        normalizado = re.sub(r'\bOF DE\b', 'OFICIO DE', normalizado)  # OF DE → OFICIO DE
-        normalizado = re.sub(r'\bOF\b(?! DE)', 'OFICIO', normalizado)
-        normalizado = re.sub(r'\bDISTR\b', 'DISTRITO', normalizado)
-        normalizado = re.sub(r'\bSUBDIST\b', 'SUBDISTRITO', normalizado)
-        
-        # REGRA 2: Cidade CAPITAL → RIO DE JANEIRO
-        if 'cidade' in df_brutos.columns and row['cidade'] == 'CAPITAL':
-            df_brutos.at[idx, 'cidade'] = 'RIO DE JANEIRO'
+    # REGRA 1: Abreviações de tipo
+    normalizado = _aplicar_regras(base, REGRAS_ABREVIACAO)
+    
+    if 'cidade' in df_brutos.columns:
+        cidades = df_brutos['cidade']
         
         # REGRA 3: Números ordinais (com cautela)
-        if 'cidade' in df_brutos.columns:
-            cidade = row['cidade']
-            total_cidade = len(df_brutos[df_brutos['cidade'] == cidade])
-            
-            if total_cidade < 10:
-                normalizado = re.sub(r'\b([1-9])O\b', r'\1o', normalizado)
-                normalizado = re.sub(r'\b([1-9])A\b', r'\1a', normalizado)
-            
-            normalizado = re.sub(r'\b0([1-9])\b', r'\1', normalizado)
+        poucos = _registros_por_cidade(cidades) < LIMITE_REGISTROS_ORDINAIS
+        com_ordinais = _aplicar_regras(normalizado, REGRAS_ORDINAIS)
+        # Zeros à esquerda e REGRA 4 (espaços), com e sem os ordinais em minúsculas
+        finais = [_aplicar_regras(v, [(RE_ZERO_ESQUERDA, r'\1'), (RE_ESPACOS_DESIGNACAO, ' ')]).str.strip()
+                  for v in (normalizado, com_ordinais)]
+        resultado = np.where(poucos, finais[1].to_numpy()[codigos], finais[0].to_numpy()[codigos])
         
+        # REGRA 2: Cidade CAPITAL → RIO DE JANEIRO
+        df_brutos['cidade'] = cidades.mask(cidades == 'CAPITAL', 'RIO DE JANEIRO')
+    else:
         # REGRA 4: Espaços
-        normalizado = re.sub(r'\s+', ' ', normalizado).strip()
-        
-        if normalizado != original.upper().strip():
-            df_brutos.at[idx, 'designacao'] = normalizado
-            alteracoes += 1
+        resultado = _aplicar_regras(normalizado, [(RE_ESPACOS_DESIGNACAO, ' ')]).str.strip().to_numpy()[codigos]
+    
+    alterados = resultado != base.to_numpy()[codigos]
+    if alterados.any():
+        df_brutos.loc[alterados, 'designacao'] = resultado[alterados]
+    alteracoes = int(alterados.sum())
     
     print(f"  [NORMALIZAÇÃO] {alteracoes} designações normalizadas")
     return df_brutos
 
 # ####################################################################
-# CACHE DE MATCHES CNS
+# CACHE DE MATCHES CNS (banco local; a aba "Cache Matches CNS" é espelho)
 # ####################################################################
-def load_cns_cache(gc, sheet_id):
-    """Carrega cache de matches COD TJRJ → CNS"""
-    try:
-        sh = gc.open_by_key(sheet_id)
-        ws = sh.worksheet("Cache Matches CNS")
-        data = ws.get_all_records()
-        df_cache = pd.DataFrame(data)
-        print(f"  [CACHE] Carregados {len(df_cache)} matches do cache")
-        return df_cache
-    except Exception as e:
-        print(f"  [CACHE] Aba não encontrada, criando...")
-        return pd.DataFrame(columns=['COD_TJRJ', 'CNS', 'NOME_TJRJ', 'NOME_CNJ', 'CIDADE', 'METODO_MATCH', 'DATA_CRIACAO', 'MANUAL'])
-
-def create_cache_sheet(gc, sheet_id):
-    """Cria aba de cache se não existir"""
-    try:
-        sh = gc.open_by_key(sheet_id)
-        created_new = False
-        try:
-            ws = sh.worksheet("Cache Matches CNS")
-        except:
-            ws = sh.add_worksheet("Cache Matches CNS", rows=1000, cols=8)
-            created_new = True
-            print("  [CACHE] Aba criada com sucesso")
-        
-        # Garante que os cabeçalhos estejam sempre na primeira linha
-        first_row = ws.row_values(1)
-        expected_headers = ['COD_TJRJ', 'CNS', 'NOME_TJRJ', 'NOME_CNJ', 'CIDADE', 'METODO_MATCH', 'DATA_CRIACAO', 'MANUAL']
-        
-        if not first_row or first_row != expected_headers:
-            ws.update('A1:H1', [expected_headers])
-            print("  [CACHE] Cabeçalhos inseridos/atualizados")
-        
-        return ws
-    except Exception as e:
-        print(f"  [CACHE] Erro ao criar aba: {e}")
-        return None
-
-def save_to_cache(gc, sheet_id, df_brutos, df_serventias, col_cns, col_nome):
-    """Salva novos matches no cache"""
+def save_to_cache(df_brutos, df_serventias, col_cns, col_nome):
+    """Salva no cache local os novos matches (códigos ainda sem vínculo)"""
     try:
         # Filtra apenas matches bem-sucedidos que não vieram do cache
         new_matches = df_brutos[
             (df_brutos['CNS'] != 'NAO_ENCONTRADO') &
-            (~df_brutos.get('FROM_CACHE', pd.Series([False]*len(df_brutos))))
+            (~df_brutos.get('FROM_CACHE', pd.Series(False, index=df_brutos.index)))
         ]
-        
         if len(new_matches) == 0:
             return
         
         # Agrupa por código único
         new_matches_unique = new_matches.groupby('cod').first().reset_index()
         
-        ws = create_cache_sheet(gc, sheet_id)
-        if ws is None:
-            return
-        
-        # Carrega cache existente
-        existing_cache = ws.get_all_records()
-        existing_codes = set(str(row.get('COD_TJRJ', '')) for row in existing_cache)
+        # Nome CNJ por CNS (6 dígitos), montado uma vez
+        nomes_cnj = dict(zip(df_serventias[col_cns].astype(str).map(normalize_cns), df_serventias[col_nome].astype(str)))
+        registros = [{
+            'COD_TJRJ': str(row['cod']),
+            'CNS': str(row['CNS']),
+            'NOME_TJRJ': str(row['designacao']),
+            'NOME_CNJ': nomes_cnj.get(str(row['CNS']), ''),
+            'CIDADE': str(row['cidade']),
+            'METODO_MATCH': str(row.get('CNS_METODO') or 'auto'),
+            'MANUAL': 'FALSE',
+        } for _, row in new_matches_unique.iterrows()]
         
-        print(f"  [CACHE] Códigos já no cache: {len(existing_codes)}")
-        
-        # Prepara dados - APENAS códigos novos
-
-        rows = []
-        skipped = 0
-        for idx, row in new_matches_unique.iterrows():
-            cod_str = str(row['cod'])
-            
-            # VERIFICAÇÃO CRÍTICA: Pula se código já existe no cache
-            if cod_str in existing_codes:
-                skipped += 1
-                continue
-            
-            # Busca nome CNJ
-            nome_cnj = ''
-            try:
-                cnj_row = df_serventias[df_serventias[col_cns] == row['CNS']]
-                if len(cnj_row) > 0:
-                    nome_cnj = str(cnj_row.iloc[0][col_nome])
-            except:
-                pass
-            
-            rows.append([
-                cod_str,
-                str(row['CNS']),
-                str(row['designacao']),
-                nome_cnj,
-                str(row['cidade']),
-                'auto',
-                datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
-                'FALSE'
-            ])
-        
-        # Append apenas códigos novos
-        if rows:
-            ws.append_rows(rows)
-            print(f"  [CACHE] {len(rows)} novos matches salvos")
-        
-        if skipped > 0:
-            print(f"  [CACHE] {skipped} códigos ignorados (já existem no cache)")
+        # Só códigos novos: vínculos existentes (inclusive manuais) não são alterados
+        novos = cns_cache_utils.gravar_vinculos(registros)
+        if novos:
+            print(f"  [CACHE] {novos} novos matches salvos")
+        if len(registros) > novos:
+            print(f"  [CACHE] {len(registros) - novos} códigos ignorados (já existem no cache)")
     
     except Exception as e:
         print(f"  [CACHE] Erro ao salvar: {e}")
@@ -802,77 +1185,61 @@ def save_to_cache(gc, sheet_id, df_brutos, df_serventias, col_cns, col_nome):
 def enrich_tjrj_with_cns(df_brutos):
     """
     Serviço Independente de População de CNS.
-    Recebe o DataFrame Bruto do TJRJ e adiciona a coluna CNS usando fuzzy matching
-    com a base oficial do CNJ (Lista de Serventias).
+    Recebe o DataFrame Bruto do TJRJ e adiciona as colunas CNS, CNS_METODO e
+    CNS_CONFIANCA casando cada código com a base oficial do CNJ (Lista de Serventias)
+    pelo motor de cns_match_utils. Vínculos do cache têm prioridade.
+
+    Cada etapa (normalização, cache, base CNJ, casamento, validação) é medida por
+    instrumentacao_utils.
     """
+    rastreio = instrumentacao_utils.Rastreio('enrich_tjrj_with_cns')
+    try:
+        return _enriquecer_cns(df_brutos, rastreio)
+    finally:
+        rastreio.fechar()
+        print(f"[METRICAS] {rastreio.resumo()}")
+
+def _enriquecer_cns(df_brutos, rastreio):
     print("\n[INFO] Iniciando Serviço de Enriquecimento de CNS...")
     
     # 0. Normalizar dados TJRJ antes do matching
+    rastreio.proxima('normalizacao').registrar(linhas=len(df_brutos))
     df_brutos = normalize_tjrj_designations(df_brutos)
     
-    # 0.5 Carregar e aplicar cache
+    # 0.5 Carregar cache local (COD -> CNS já conhecidos; têm prioridade no casamento)
+    etapa = rastreio.proxima('cache')
+    cache_map = {}
     try:
-        if hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            if "private_key" in creds_dict:
-                creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-            gc_cache = gspread.service_account_from_dict(creds_dict)
-        elif "GCP_SERVICE_ACCOUNT" in os.environ:
-            import json
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            gc_cache = gspread.service_account_from_dict(creds_dict)
-        else:
-            gc_cache = gspread.service_account()
-        
-        # IMPORTANTE: Garante que o hardcode existe ANTES de carregar o cache
-        # Isso garante que funcione na primeira execução
-        ws_cache = create_cache_sheet(gc_cache, GOOGLE_SHEET_ID)
-        if ws_cache:
-            existing_cache = ws_cache.get_all_records()
-            existing_codes = set(str(row.get('COD_TJRJ', '')) for row in existing_cache)
-            
-            # HARDCODED: Garante que 4450 → 091041 está no cache (6 dígitos)
-            if '4450' not in existing_codes:
-                ws_cache.append_row([
-                    '4450',
-                    '091041',  # 6 dígitos com zero à esquerda
-                    'OFICIO UNICO MACUCO',
-                    'Cartório do Ofício Único de Cordeiro',
-                    'CORDEIRO',
-                    'hardcoded',
-                    datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
-                    'TRUE'
-                ])
-                print("  [CACHE] Match hardcoded 4450→091041 adicionado ao cache")
-        
-        # Agora carrega o cache (incluindo o hardcode recém-adicionado)
-        cache_df = load_cns_cache(gc_cache, GOOGLE_SHEET_ID)
+        # Ambiente novo (banco local vazio): importa a aba de espelho inteira
+        if cns_cache_utils.total_vinculos() == 0:
+            importados, _ = cns_cache_utils.importar_planilha(GOOGLE_SHEET_ID)
+            print(f"  [CACHE] {importados} matches importados da aba '{cns_cache_utils.ABA_ESPELHO}'")
+    
+    except Exception as e:
+        print(f"  [CACHE] Erro ao importar cache da planilha: {e}")
+    
+    try:
+        # HARDCODED: Garante que 4450 → 091041 está no cache (6 dígitos)
+        if cns_cache_utils.gravar_vinculos([{
+            'COD_TJRJ': '4450',
+            'CNS': '091041',  # 6 dígitos com zero à esquerda
+            'NOME_TJRJ': 'OFICIO UNICO MACUCO',
+            'NOME_CNJ': 'Cartório do Ofício Único de Cordeiro',
+            'CIDADE': 'CORDEIRO',
+            'METODO_MATCH': 'hardcoded',
+            'MANUAL': 'TRUE',
+        }]):
+            print("  [CACHE] Match hardcoded 4450→091041 adicionado ao cache")
         
-        if len(cache_df) > 0:
-            cache_map = dict(zip(cache_df['COD_TJRJ'].astype(str), cache_df['CNS'].astype(str)))
-            
-            def apply_cache(row):
-                cod = str(row.get('cod', ''))
-                if cod in cache_map:
-                    return cache_map[cod]
-                return 'NAO_ENCONTRADO'
-            
-            df_brutos['CNS'] = df_brutos.apply(apply_cache, axis=1)
-            df_brutos['FROM_CACHE'] = df_brutos['CNS'] != 'NAO_ENCONTRADO'
-            
-            cache_hits = df_brutos['FROM_CACHE'].sum()
-            print(f"  [CACHE] {cache_hits} matches encontrados no cache")
-        else:
-            df_brutos['CNS'] = 'NAO_ENCONTRADO'
-            df_brutos['FROM_CACHE'] = False
-
+        cache_map = cns_cache_utils.carregar_vinculos()
+        etapa.registrar(linhas=len(cache_map))
+        print(f"  [CACHE] Carregados {len(cache_map)} matches do cache local")
     
     except Exception as e:
         print(f"  [CACHE] Erro ao carregar cache: {e}")
-        df_brutos['CNS'] = 'NAO_ENCONTRADO'
-        df_brutos['FROM_CACHE'] = False
     
     # 1. Carregar Base de Conhecimento (Serventias CNJ)
+    etapa = rastreio.proxima('base_cnj')
     df_serventias = None
     try:
         # Tentar CSV local (cache)
@@ -885,24 +1252,7 @@ def enrich_tjrj_with_cns(df_brutos):
         
         # Tentar Google Sheets se não achou local
         if df_serventias is None:
-             if "GCP_SERVICE_ACCOUNT" in os.environ:
-                  import json
-                  creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-                  # Correção de chave privada
-                  if "private_key" in creds_dict:
-                      creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-                  gc_map = gspread.service_account_from_dict(creds_dict)
-             elif st and hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-                  # Converte AttrDict para dict mutável e sanitiza
-                  creds_dict = dict(st.secrets["gcp_service_account"])
-                  if "private_key" in creds_dict:
-                      creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-                  gc_map = gspread.service_account_from_dict(creds_dict)
-             else:
-                  gc_map = gspread.service_account()
-             
-             sh_map = gc_map.open_by_key("1Cx_ceynq_Y_pFKRUtFyHkLEJIvBvlWFjGo5LuOAvW-Y")
-             ws_map = sh_map.worksheet("Lista de Serventias")
+             ws_map = gsheets_client_utils.obter_aba("1Cx_ceynq_Y_pFKRUtFyHkLEJIvBvlWFjGo5LuOAvW-Y", "Lista de Serventias")
              df_serventias = pd.DataFrame(ws_map.get_all_records())
              print("  -> Carregado do Google Sheets")
              
@@ -912,255 +1262,30 @@ def enrich_tjrj_with_cns(df_brutos):
 
     if df_serventias is None or df_serventias.empty:
         return df_brutos
+    etapa.registrar(linhas=len(df_serventias))
 
     try:
-         # Função helper interna
-         def normalize_name(name):
-             if not isinstance(name, str): return ""
-             # Remove acentos e apóstrofos
-             normalized = normalize('NFKD', name).encode('ASCII', 'ignore').decode('ASCII')
-             normalized = normalized.replace("'", " ")  # D'ARAUJO → D ARAUJO
-             normalized = normalized.upper().strip()
-             return normalized
-         
          print(f"  [DEBUG] Colunas encontradas na base CNJ: {list(df_serventias.columns)}")
          
-         # Identificar colunas
-         col_nome = next((c for c in df_serventias.columns if 'nome' in c.lower() or 'denominacao' in c.lower() or 'denominação' in c.lower()), 'Denominação')
-         col_municipio = next((c for c in df_serventias.columns if 'municipio' in c.lower() or 'cidade' in c.lower()), 'Município')
-         col_cns = next((c for c in df_serventias.columns if 'cns' in c.lower()), 'CNS')
-         col_gestor = next((c for c in df_serventias.columns if ('titular' in c.lower() or 'responsavel' in c.lower() or 'responsável' in c.lower()) and 'data' not in c.lower() and 'dat.' not in c.lower()), 'Titular')
-         col_atribuicao = next((c for c in df_serventias.columns if 'atribuicao' in c.lower() or 'atribuição' in c.lower()), 'Atribuições')
-         
-         # Indexar Base CNJ
-         cnj_map_nome = {}
-         cnj_map_gestor = {}
-
-         for _, row in df_serventias.iterrows():
-             cns = str(row[col_cns]).strip()
-             nome = normalize_name(row[col_nome])
-             mun = normalize_name(row[col_municipio])
-             gestor = normalize_name(row[col_gestor])
-             atribs = str(row[col_atribuicao]).upper()
-             
-             cnj_map_nome[f"{mun}_{nome}"] = cns
-             cnj_map_nome[nome] = cns
-             
-             if gestor:
-                 if gestor not in cnj_map_gestor: cnj_map_gestor[gestor] = []
-                 cnj_map_gestor[gestor].append({
-                     'cns': cns,
-                     'municipio': mun,
-                     'atribuicoes': atribs,
-                     'nome_cartorio': nome
-                 })
-                 
-                 # NOVO: Indexa também por primeiros 3 nomes do gestor
-                 partes = gestor.split()
-                 if len(partes) >= 3:
-                     gestor_3 = ' '.join(partes[:3])
-                     if gestor_3 not in cnj_map_gestor: cnj_map_gestor[gestor_3] = []
-                     cnj_map_gestor[gestor_3].append({
-                         'cns': cns,
-                         'municipio': mun,
-                         'atribuicoes': atribs,
-                         'nome_cartorio': nome
-                     })
-         
-         print(f"  -> Base indexada: {len(cnj_map_nome)} nomes, {len(cnj_map_gestor)} gestores.")
-
-         # Lógica de Busca
-         def find_cns(row):
-             tjrj_mun = normalize_name(row['cidade'])
-             tjrj_nome = normalize_name(row['designacao'])
-             tjrj_gestor = normalize_name(row['gestor'])
-             
-             # 1. Match Exato (Mun + Nome)
-             key_exact = f"{tjrj_mun}_{tjrj_nome}"
-             if key_exact in cnj_map_nome: return cnj_map_nome[key_exact]
-             
-             # 2. Match Gestor Completo (com Desambiguação de Atribuição)
-             if tjrj_gestor and tjrj_gestor in cnj_map_gestor:
-                 candidatos = cnj_map_gestor[tjrj_gestor]
-                 # Filtra municipio
-                 cand_mun = [c for c in candidatos if c['municipio'] == tjrj_mun]
-                 if not cand_mun: cand_mun = candidatos # Fallback
-                 
-                 if len(cand_mun) == 1:
-                     return cand_mun[0]['cns']
-                 elif len(cand_mun) > 1:
-                     # Desambiguação por Atribuição (Receita vs Atribuição CNJ)
-                     pontuacao = []
-                     cols_receita = ['RCPJ', 'RCPN', 'RI', 'RTD', 'Notas', 'Protesto']
-                     atribuicoes_row = []
-                     for c in cols_receita:
-                         val = pd.to_numeric(row.get(c, 0), errors='coerce')
-                         if val > 0: atribuicoes_row.append(c)
-                     
-                     for cand in cand_mun:
-                         score = 0
-                         cand_atribs = cand['atribuicoes']
-                         for atrib_req in atribuicoes_row:
-                             termos = [atrib_req]
-                             if atrib_req == 'Notas': termos += ['TABELIE', 'NOTAS']
-                             if atrib_req == 'RI': termos += ['REGISTRO DE IMOVEIS']
-                             if atrib_req == 'RCPN': termos += ['CIVIL DAS PESSOAS NATURAIS']
-                             if atrib_req == 'RCPJ': termos += ['CIVIL DAS PESSOAS JURIDICAS']
-                             if atrib_req == 'RTD': termos += ['TITULOS E DOCUMENTOS']
-                             
-                             for t in termos:
-                                 if t in cand_atribs: 
-                                     score += 1
-                                     break
-                         
-                         # Tie-breaker: Nome similar
-                         from difflib import SequenceMatcher
-                         ratio = SequenceMatcher(None, tjrj_nome, cand['nome_cartorio']).ratio()
-                         score += ratio
-                         pontuacao.append((score, cand['cns']))
-                     
-                     pontuacao.sort(key=lambda x: x[0], reverse=True)
-                     if pontuacao: return pontuacao[0][1]
-             
-             # 3. Match Gestor Parcial (primeiros 3 nomes)
-             if tjrj_gestor:
-                 partes_tjrj = tjrj_gestor.split()
-                 if len(partes_tjrj) >= 3:
-                     gestor_3_tjrj = ' '.join(partes_tjrj[:3])
-                     if gestor_3_tjrj in cnj_map_gestor:
-                         candidatos = cnj_map_gestor[gestor_3_tjrj]
-                         cand_mun = [c for c in candidatos if c['municipio'] == tjrj_mun]
-                         if not cand_mun: cand_mun = candidatos
-                         
-                         if len(cand_mun) == 1:
-                             return cand_mun[0]['cns']
-             
-             # Critérios removidos:
-             # - Cross-city search (causava matches incorretos)
-             # - Match Numérico (baixa confiabilidade)
-             # - Fuzzy Match (baixa confiabilidade)
-             # Casos não resolvidos serão tratados via hardcoding manual
-             
-             return "NAO_ENCONTRADO"
-
-
-         df_brutos['CNS'] = df_brutos.apply(find_cns, axis=1)
-         
-         # Reordenar colunas
-         cols = ['CNS'] + [c for c in df_brutos.columns if c != 'CNS']
-         df_brutos = df_brutos[cols]
-         
-         # Função helper para fallback por código (reutilizável)
-         def apply_code_fallback_step(df, step_name):
-             """Aplica fallback por código e retorna quantidade recuperada"""
-             if 'cod' not in df.columns:
-                 return 0
-             
-             before_count = df[df['CNS'] != 'NAO_ENCONTRADO'].shape[0]
-             
-             # Cria mapeamento: cod -> CNS (apenas CNS válidos)
-             cod_to_cns = df[df['CNS'] != 'NAO_ENCONTRADO'].groupby('cod')['CNS'].first().to_dict()
-             
-             # Função para aplicar fallback
-             def apply_fallback(row):
-                 if row['CNS'] == 'NAO_ENCONTRADO' and row['cod'] in cod_to_cns:
-                     return cod_to_cns[row['cod']]
-                 return row['CNS']
-             
-             # Aplica fallback
-             df['CNS'] = df.apply(apply_fallback, axis=1)
-             
-             after_count = df[df['CNS'] != 'NAO_ENCONTRADO'].shape[0]
-             recovered = after_count - before_count
-             
-             if recovered > 0:
-                 print(f"  -> [{step_name}] Recuperados {recovered} via código")
-             
-             return recovered
+         # Indexar Base CNJ (uma vez) e casar todos os serviços
+         base_cnj = cns_match_utils.BaseCNJ(df_serventias)
+         colunas_cnj = base_cnj.colunas
+         col_nome, col_municipio = colunas_cnj['nome'], colunas_cnj['municipio']
+         col_cns, col_gestor, col_atribuicao = colunas_cnj['cns'], colunas_cnj['gestor'], colunas_cnj['atribuicao']
+         print(f"  -> Base indexada: {len(base_cnj)} serventias, {len(base_cnj.por_gestor)} gestores.")
          
-         # Estatísticas iniciais
          print(f"\n  [MATCHING] Iniciando processo de enriquecimento...")
+         etapa = rastreio.proxima('casamento')
+         casamento, contagem = cns_match_utils.casar_cns(df_brutos, df_serventias, fixos=cache_map, base=base_cnj)
+         for metodo, total in contagem.items():
+             print(f"  -> [{metodo}] {total} cartórios")
          
-         # CRITÉRIO 0: Cache (já aplicado antes do find_cns)
-         cache_count = df_brutos[df_brutos.get('FROM_CACHE', False)].shape[0]
-         print(f"  -> [Cache] {cache_count} matches do cache")
-         
-         # CRITÉRIO 1: Match Exato + Fallback
-         success_after_cache = df_brutos['CNS'].ne('NAO_ENCONTRADO').sum()
-         print(f"  -> [Critério 1-3] Matching principal: {success_after_cache}/{len(df_brutos)} mapeados")
-         
-         # Fallback após critérios principais
-         apply_code_fallback_step(df_brutos, "Fallback após critérios 1-3")
-         
-         # CRITÉRIO 4: Matching por Atribuições Únicas
-         print("  -> [Critério 4] Aplicando matching por atribuições únicas...")
-         
-         nao_encontrados = df_brutos[df_brutos['CNS'] == 'NAO_ENCONTRADO'].copy()
-         
-         if len(nao_encontrados) > 0 and 'cidade' in df_brutos.columns:
-             # IMPORTANTE: Filtra CNS já usados (mapeados anteriormente)
-             cns_ja_usados = set(df_brutos[df_brutos['CNS'] != 'NAO_ENCONTRADO']['CNS'].unique())
-             
-             # Para cada NAO_ENCONTRADO, identifica suas atribuições (colunas com receita > 0)
-             cols_receita = ['RCPJ', 'RCPN', 'RI', 'RTD', 'Notas', 'Protesto']
-             
-             for idx, row in nao_encontrados.iterrows():
-                 cidade = row['cidade']
-                 
-                 # Identifica atribuições do registro TJRJ
-                 atribs_tjrj = set()
-                 for col in cols_receita:
-                     if col in row.index:
-                         val = pd.to_numeric(row[col], errors='coerce')
-                         if pd.notna(val) and val > 0:
-                             atribs_tjrj.add(col)
-                 
-                 if not atribs_tjrj:
-                     continue  # Sem atribuições identificadas
-                 
-                 # Busca no CNJ cartórios da mesma cidade com as mesmas atribuições
-                 # MAS APENAS OS QUE AINDA NÃO FORAM USADOS
-                 candidatos_cnj = []
-                 for _, cnj_row in df_serventias[df_serventias[col_municipio].str.upper().str.strip() == cidade.upper().strip()].iterrows():
-                     cns_cand = str(cnj_row[col_cns]).strip()
-                     
-                     # FILTRO CRÍTICO: Ignora CNS já mapeados
-                     if cns_cand in cns_ja_usados:
-                         continue
-                     
-                     atribs_cnj_str = str(cnj_row[col_atribuicao]).upper()
-                     
-                     # Verifica se todas as atribuições do TJRJ estão no CNJ
-                     match_count = 0
-                     for atrib in atribs_tjrj:
-                         termos_busca = [atrib]
-                         if atrib == 'Notas': termos_busca += ['TABELIE', 'NOTAS']
-                         if atrib == 'RI': termos_busca += ['REGISTRO DE IMOVEIS', 'IMOVEIS']
-                         if atrib == 'RCPN': termos_busca += ['CIVIL DAS PESSOAS NATURAIS', 'PESSOAS NATURAIS']
-                         if atrib == 'RCPJ': termos_busca += ['CIVIL DAS PESSOAS JURIDICAS', 'PESSOAS JURIDICAS']
-                         if atrib == 'RTD': termos_busca += ['TITULOS E DOCUMENTOS']
-                         if atrib == 'Protesto': termos_busca += ['PROTESTO']
-                         
-                         if any(termo in atribs_cnj_str for termo in termos_busca):
-                             match_count += 1
-                     
-                     # Se todas as atribuições batem, é candidato
-                     if match_count == len(atribs_tjrj):
-                         candidatos_cnj.append(cns_cand)
-                 
-                 # Se há exatamente 1 candidato (único), atribui o CNS
-                 if len(candidatos_cnj) == 1:
-                     df_brutos.at[idx, 'CNS'] = candidatos_cnj[0]
-         
-         # Conta recuperados por atribuição
-         before_attr = success_after_cache + apply_code_fallback_step.__defaults__[0] if hasattr(apply_code_fallback_step, '__defaults__') else success_after_cache
-         after_attr = df_brutos[df_brutos['CNS'] != 'NAO_ENCONTRADO'].shape[0]
-         
-         # Fallback após atribuições únicas
-         apply_code_fallback_step(df_brutos, "Fallback após atribuições")
-         
-         # Match 1-para-1 REMOVIDO (será tratado via hardcoding manual)
-         
+         df_brutos = df_brutos.drop(columns=['CNS', 'CNS_METODO', 'CNS_CONFIANCA'], errors='ignore')
+         df_brutos = pd.concat([casamento, df_brutos], axis=1)
+         df_brutos['FROM_CACHE'] = df_brutos['CNS_METODO'] == 'cache'
+         print(f"  [CACHE] {df_brutos['FROM_CACHE'].sum()} matches encontrados no cache")
+         etapa.registrar(linhas=len(df_brutos), mapeados=int(df_brutos['CNS'].ne('NAO_ENCONTRADO').sum()))
+         rastreio.proxima('validacao')
          
          # Log Detalhado: NAO_ENCONTRADO com comparação CNJ
          nao_encontrados_final = df_brutos[df_brutos['CNS'] == 'NAO_ENCONTRADO']
@@ -1193,9 +1318,9 @@ def enrich_tjrj_with_cns(df_brutos):
                      print(f"     ... e mais {len(grupo) - 3} registros")
                  
                  # Mostra cartórios CNJ disponíveis na mesma cidade
-                 cnj_cidade = df_serventias[df_serventias[col_municipio].str.upper().str.strip() == cidade.upper().strip()]
+                 cnj_cidade = df_serventias[df_serventias[col_municipio].map(cns_match_utils.normalizar_nome) == cns_match_utils.normalizar_nome(cidade)]
                  cns_ja_usados = set(df_brutos[df_brutos['CNS'] != 'NAO_ENCONTRADO']['CNS'].unique())
-                 cnj_disponiveis = cnj_cidade[~cnj_cidade[col_cns].isin(cns_ja_usados)]
+                 cnj_disponiveis = cnj_cidade[~cnj_cidade[col_cns].astype(str).map(normalize_cns).isin(cns_ja_usados)]
                  
                  print(f"  -> CNJ disponíveis (não mapeados): {len(cnj_disponiveis)}")
                  for idx, cnj_row in cnj_disponiveis.head(3).iterrows():
@@ -1262,16 +1387,15 @@ def enrich_tjrj_with_cns(df_brutos):
                      cnss = cns_validos[cns_validos['cod'] == cod]['CNS'].unique()
                      print(f"     COD {cod} → CNS {list(cnss)}")
          
-         # Salvar novos matches no cache
-         try:
-             save_to_cache(gc_cache, GOOGLE_SHEET_ID, df_brutos, df_serventias, col_cns, col_nome)
-         except Exception as e:
-             print(f"  [CACHE] Erro ao salvar cache: {e}")
+         # Salvar novos matches no cache local e espelhar na planilha em segundo plano
+         save_to_cache(df_brutos, df_serventias, col_cns, col_nome)
+         cns_cache_utils.espelhar_em_segundo_plano(GOOGLE_SHEET_ID)
          
          return df_brutos
 
     except Exception as e:
         print(f"[ERRO ENRIQUECIMENTO] {e}")
+        rastreio.fechar('erro')
         import traceback
         traceback.print_exc()
         return df_brutos
@@ -1279,4 +1403,9 @@ def enrich_tjrj_with_cns(df_brutos):
 if __name__ == "__main__":
     # Esta seção é apenas para teste local no ambiente Python puro
     # Em produção, o Google Cloud Functions chamará a função cloud_main(request)
-    cloud_main(None)
+    import argparse
+    parser = argparse.ArgumentParser(description="Orquestrador da Receita TJRJ")
+    parser.add_argument('--resume', nargs='?', const=True, default=False, metavar='RUN_ID',
+                        help="Retoma a última execução interrompida (ou a de RUN_ID), pulando as etapas concluídas")
+    args = parser.parse_args()
+    cloud_main(None, retomar=args.resume)
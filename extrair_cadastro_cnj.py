@@ -1,6 +1,5 @@
-import gspread
-from google.oauth2.service_account import Credentials
-import json
+import gsheets_client_utils
+import gsheets_escrita_utils
 import os
 import pandas as pd
 from datetime import datetime
@@ -12,7 +11,6 @@ def main():
     
     # 1. Autenticação e Configuração
     try:
-        creds_dict = None
         sheet_id = None
         
         # Tenta carregar de .streamlit/secrets.toml primeiro para pegar o SHEET_ID correto
@@ -20,25 +18,15 @@ def main():
              import toml
              if os.path.exists(".streamlit/secrets.toml"):
                  secrets = toml.load(".streamlit/secrets.toml")
-                 if "gcp_service_account" in secrets:
-                     creds_dict = secrets["gcp_service_account"]
                  if "SHEET_ID" in secrets:
                      sheet_id = secrets["SHEET_ID"]
         except Exception as e:
              print(f"Erro ao ler secrets.toml: {e}")
-
-        # Se não achou creds no toml, tenta env var
-        if not creds_dict and "GCP_SERVICE_ACCOUNT" in os.environ:
-             creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
         
         # Se não achou SHEET_ID no toml, tenta env var
         if not sheet_id and "SHEET_ID" in os.environ:
             sheet_id = os.environ["SHEET_ID"]
             
-        if not creds_dict:
-             print("ERRO: Credenciais GCP não encontradas (Env ou TOML)")
-             return
-             
         if not sheet_id:
             # Fallback para o ID descoberto como correto se nada mais funcionar
             print("AVISO: SHEET_ID não encontrado. Usando ID hardcoded descoberto (1_BX...).")
@@ -46,9 +34,7 @@ def main():
 
         print(f"Usando Planilha ID: {sheet_id}")
 
-        scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-        credentials = Credentials.from_service_account_info(creds_dict, scopes=scope)
-        gc = gspread.authorize(credentials)
+        gsheets_client_utils.obter_cliente()
         print("Autenticação Google Sheets OK.")
         
     except Exception as e:
@@ -99,24 +85,27 @@ def main():
     WORKSHEET_NAME = 'Lista de Serventias'  # Mudado de 'Dados CNJ' para 'Lista de Serventias'
     
     try:
-        sh = gc.open_by_key(sheet_id)
+        sh = gsheets_client_utils.abrir_planilha(sheet_id)
         try:
             ws = sh.worksheet(WORKSHEET_NAME)
-            print(f"Aba '{WORKSHEET_NAME}' encontrada. Limpando...")
-            ws.clear()
+            print(f"Aba '{WORKSHEET_NAME}' encontrada.")
         except:
             print(f"Aba '{WORKSHEET_NAME}' não existe. Criando...")
             ws = sh.add_worksheet(title=WORKSHEET_NAME, rows=len(df)+100, cols=len(df.columns)+5)
         
-        print("Enviando dados...")
-        data_to_write = [df.columns.values.tolist()] + df.values.tolist()
-        ws.update(data_to_write, value_input_option='USER_ENTERED')
-        
-        # Formatação básica
-        ws.freeze(rows=1)
-        try:
-            ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
-        except: pass
+        # Só as serventias que mudaram (data_upload não conta como mudança)
+        delta = gsheets_escrita_utils.sincronizar_aba(ws, df, ['cns'], ignorar=['data_upload'])
+        if delta is None:
+            print("Limpando e enviando dados...")
+            ws.clear()
+            data_to_write = [df.columns.values.tolist()] + df.values.tolist()
+            ws.update(data_to_write, value_input_option='USER_ENTERED')
+            
+            # Formatação básica
+            ws.freeze(rows=1)
+            try:
+                ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
+            except: pass
         
         print(f"✅ Upload concluído! {len(df)} registros salvos em '{WORKSHEET_NAME}'")
         
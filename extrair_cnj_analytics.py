@@ -4,6 +4,9 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver import ActionChains
+import gsheets_client_utils
+import gsheets_escrita_utils
+import esquema_utils
 
 # Configurações
 CNJ_URL = "https://paineisanalytics.cnj.jus.br/single/?appid=6ae52b4b-f6fb-4e06-8f8a-19c0656b1408&sheet=8413120e-2be0-4713-ae80-8152be891d36&lang=pt-BR&opt=ctxmenu,currsel"
@@ -259,12 +262,19 @@ def normalize_cns(val):
     if not nums: return ""
     return nums.zfill(6)
 
-def upload_sheet_df(sh, df, tab_name):
-    """Sobe um DataFrame para uma aba com suporte a chunks"""
+def upload_sheet_df(sh, df, tab_name, chave=None):
+    """
+    Sobe um DataFrame para uma aba com suporte a chunks.
+    Com `chave` (colunas da chave primária), só as linhas que mudaram são gravadas
+    (gsheets_escrita_utils.sincronizar_aba); sem ela, ou se a aba não permitir, a aba é regravada.
+    """
     print(f"Subindo {len(df)} linhas para '{tab_name}'...")
     try:
         try:
             ws = sh.worksheet(tab_name)
+            if chave and gsheets_escrita_utils.sincronizar_aba(ws, df.astype(str), chave) is not None:
+                print(f"Upload '{tab_name}' concluído.")
+                return
             ws.clear()
             # Garante que a aba tem linhas suficientes
             ws.resize(rows=len(df) + 500)
@@ -286,25 +296,11 @@ def upload_sheet_df(sh, df, tab_name):
             end_row = start_row + len(chunk) - 1
             print(f"  Enviando lote {i} a {i+len(chunk)} (linhas {start_row}-{end_row})...")
             
-            # Retry robusto com múltiplas tentativas
-            max_retries = 5
-            for attempt in range(max_retries):
-                try:
-                    # Usa update com range específico em vez de append
-                    # Isso garante que os dados vão para as linhas corretas
-                    range_name = f'A{start_row}:{chr(65 + len(df.columns) - 1)}{end_row}'
-                    ws.update(range_name=range_name, values=chunk, value_input_option='USER_ENTERED')
-                    time.sleep(0.5)  # Pausa entre lotes bem-sucedidos
-                    break  # Sucesso, sai do loop de retry
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 3  # Backoff exponencial: 3s, 6s, 9s, 12s, 15s
-                        print(f"  ⚠ Erro no lote {i} (tentativa {attempt + 1}/{max_retries}): {e}")
-                        print(f"  Aguardando {wait_time}s antes de tentar novamente...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"  ❌ FALHA CRÍTICA no lote {i} após {max_retries} tentativas!")
-                        raise  # Re-lança exceção após todas as tentativas
+            # Usa update com range específico em vez de append
+            # Isso garante que os dados vão para as linhas corretas
+            # (cota e retentativas ficam a cargo do cliente compartilhado, ver gsheets_client_utils)
+            range_name = f'A{start_row}:{chr(65 + len(df.columns) - 1)}{end_row}'
+            ws.update(range_name=range_name, values=chunk, value_input_option='USER_ENTERED')
         
         try:
             ws.freeze(rows=1)
@@ -336,7 +332,8 @@ def sync_to_supabase(df_arrecadacao, df_serventias):
         # 2. Insere dados em lotes (Supabase tem limite de 1000 por request)
         if df_arrecadacao is not None and not df_arrecadacao.empty:
             # Garante tipos de dados compatíveis com SQL
-            df_sync = df_arrecadacao.copy()
+            # Categóricas voltam a texto: o where(..., None) abaixo precisa de colunas object
+            df_sync = esquema_utils.descompactar_categorias(df_arrecadacao.copy())
             
             # Converte datas para string ISO (YYYY-MM-DD)
             date_cols = ['Dat. inicio periodo', 'Dat. final periodo']
@@ -440,23 +437,7 @@ def upload_to_gsheets(files_dict):
 
     print("Conectando ao Google Sheets...")
     try:
-        # Autenticação
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-            import json
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            gc = gspread.service_account_from_dict(creds_dict)
-        elif os.path.exists(".streamlit/secrets.toml"):
-            import toml
-            secrets = toml.load(".streamlit/secrets.toml")
-            if "gcp_service_account" in secrets:
-                creds_dict = dict(secrets["gcp_service_account"])
-                gc = gspread.service_account_from_dict(creds_dict)
-            else:
-                gc = gspread.service_account()
-        else:
-            gc = gspread.service_account()
-            
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         
         # 1. Leitura e Preparação
         df_serv = None
@@ -483,7 +464,7 @@ def upload_to_gsheets(files_dict):
                     print("Normalizando CNS Serventias...")
                     df_serv['CNS_Raw'] = df_serv['CNS'] # Backup
                     df_serv['CNS'] = df_serv['CNS'].apply(normalize_cns)
-                    upload_sheet_df(sh, df_serv, "Lista de Serventias")
+                    upload_sheet_df(sh, df_serv, "Lista de Serventias", chave=['CNS'])
             
         if 'arrecadacao' in files_dict:
             df_arr = read_csv_robust(files_dict['arrecadacao'])
@@ -494,6 +475,7 @@ def upload_to_gsheets(files_dict):
                     if col.lower() == 'cns':
                         df_arr.rename(columns={col: 'CNS'}, inplace=True)
                         break
+                df_arr = esquema_utils.compactar(df_arr, esquema_utils.ESQUEMA_CNJ, rotulo="Arrecadacao (arquivo)")
                 ws_arr = sh.worksheet("Arrecadacao")
                 ws_serv = sh.worksheet("Lista de Serventias")
                 
@@ -696,6 +678,9 @@ def upload_to_gsheets(files_dict):
                         df_proc['Semestre_Num'] = df_proc['Semestre'].astype(str).str.extract(r'(\d)S').fillna(0).astype(int)
                         print("✓ Colunas Ano e Semestre_Num adicionadas")
                     
+                    # Tipos compactos (categóricas, inteiros e floats reduzidos sem perda)
+                    df_proc = esquema_utils.compactar(df_proc, esquema_utils.ESQUEMA_CNJ, rotulo="Arrecadacao")
+                    
                     # Atualiza a aba com as novas colunas
                     ws_arr.clear()
                     df_proc_str = df_proc.astype(str)
@@ -714,7 +699,7 @@ def upload_to_gsheets(files_dict):
                             df_proc[col] = pd.to_numeric(df_proc[col], errors='coerce').fillna(0)
                     
                     # 1. Agregado Total (por Semestre)
-                    df_total = df_proc.groupby(['Semestre', 'Ano', 'Semestre_Num']).agg({
+                    df_total = df_proc.groupby(['Semestre', 'Ano', 'Semestre_Num'], observed=True).agg({
                         'Valor arrecadação': 'sum',
                         'Valor custeio': 'sum',
                         'Valor repasse': 'sum',
@@ -738,7 +723,7 @@ def upload_to_gsheets(files_dict):
                     if 'Estado' in df_proc.columns:
                         df_rj = df_proc[df_proc['Estado'].astype(str).str.upper() == 'RJ'].copy()
                         if not df_rj.empty:
-                            df_rj_agg = df_rj.groupby(['Semestre', 'Ano', 'Semestre_Num']).agg({
+                            df_rj_agg = df_rj.groupby(['Semestre', 'Ano', 'Semestre_Num'], observed=True).agg({
                                 'Valor arrecadação': 'sum',
                                 'Valor custeio': 'sum',
                                 'Valor repasse': 'sum',
@@ -771,7 +756,7 @@ def upload_to_gsheets(files_dict):
                             
                             df_atrib = df_proc[df_proc['Atribuição'] == atrib].copy()
                             if not df_atrib.empty:
-                                df_atrib_agg = df_atrib.groupby(['Semestre', 'Ano', 'Semestre_Num']).agg({
+                                df_atrib_agg = df_atrib.groupby(['Semestre', 'Ano', 'Semestre_Num'], observed=True).agg({
                                     'Valor arrecadação': 'sum',
                                     'Valor custeio': 'sum',
                                     'Valor repasse': 'sum',
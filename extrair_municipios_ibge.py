@@ -1,7 +1,8 @@
 import os
-import requests
+import http_utils
 import pandas as pd
-import gspread
+import gsheets_client_utils
+import gsheets_escrita_utils
 from datetime import datetime
 import time
 
@@ -17,7 +18,7 @@ def get_sidra_data(table_code, variable_code, desc):
     
     for attempt in range(3):
         try:
-            response = requests.get(url, timeout=60)
+            response = http_utils.get(url, timeout=(http_utils.TIMEOUT_CONEXAO, 60))
             if response.status_code == 200:
                 data = response.json()
                 if len(data) > 1:
@@ -156,7 +157,7 @@ def extract_ibge_data():
     
     try:
         # 1. Dados básicos de municípios (INCLUI ÁREA!)
-        response = requests.get(IBGE_API_URL, timeout=30)
+        response = http_utils.get(IBGE_API_URL, timeout=(http_utils.TIMEOUT_CONEXAO, 30))
         response.raise_for_status()
         
         data = response.json()
@@ -256,23 +257,7 @@ def upload_to_gsheets(df):
     print("Conectando ao Google Sheets...")
     
     try:
-        # Autenticação
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-            import json
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            gc = gspread.service_account_from_dict(creds_dict)
-        elif os.path.exists(".streamlit/secrets.toml"):
-            import toml
-            secrets = toml.load(".streamlit/secrets.toml")
-            if "gcp_service_account" in secrets:
-                creds_dict = dict(secrets["gcp_service_account"])
-                gc = gspread.service_account_from_dict(creds_dict)
-            else:
-                gc = gspread.service_account()
-        else:
-            gc = gspread.service_account()
-            
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         
         # Adiciona timestamp
         df.insert(0, 'data_atualizacao', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
@@ -283,22 +268,26 @@ def upload_to_gsheets(df):
         # Cria ou atualiza aba
         try:
             ws = sh.worksheet(WORKSHEET_NAME)
-            ws.clear()
             print(f"Atualizando aba existente '{WORKSHEET_NAME}'...")
         except:
             ws = sh.add_worksheet(title=WORKSHEET_NAME, rows=len(df)+100, cols=len(df.columns)+5)
             print(f"Criando nova aba '{WORKSHEET_NAME}'...")
             
-        # Upload
-        ws.update([df.columns.values.tolist()] + df.values.tolist())
-        
-        # Formatação
-        try:
-            ws.freeze(rows=1)
-            ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
-            print("Formatação aplicada.")
-        except Exception as e_fmt:
-            print(f"Aviso de formatação: {e_fmt}")
+        # Só os municípios que mudaram (data_atualizacao não conta como mudança)
+        delta = gsheets_escrita_utils.sincronizar_aba(ws, df, ['codigo_municipio'], ignorar=['data_atualizacao'],
+                                                      value_input_option='RAW')
+        if delta is None:
+            # Upload
+            ws.clear()
+            ws.update([df.columns.values.tolist()] + df.values.tolist())
+            
+            # Formatação
+            try:
+                ws.freeze(rows=1)
+                ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
+                print("Formatação aplicada.")
+            except Exception as e_fmt:
+                print(f"Aviso de formatação: {e_fmt}")
         
         # Log
         try:
@@ -322,6 +311,7 @@ if __name__ == "__main__":
         df = extract_ibge_data()
         if df is not None:
             upload_to_gsheets(df)
+            print(f"[HTTP] {http_utils.resumo_hosts()}")
             print_end_log(start_time, success=True)
         else:
             print("Falha na extração.")
@@ -1,8 +1,14 @@
 import extrai_transp_tjrj
 import sys
+import argparse
 
 if __name__ == "__main__":
     from logging_utils import print_start_log, print_end_log
+
+    parser = argparse.ArgumentParser(description="Extração da Receita TJRJ")
+    parser.add_argument('--resume', nargs='?', const=True, default=False, metavar='RUN_ID',
+                        help="Retoma a última execução interrompida (ou a de RUN_ID)")
+    args = parser.parse_args()
     
     start_time = print_start_log("Extração Receitas TJRJ")
     
@@ -10,7 +16,7 @@ if __name__ == "__main__":
         # Chama a função principal do módulo extrai_transp_tjrj
         # Passa None como request, pois não é uma requisição HTTP real
         print("Iniciando extração via extrai_transp_tjrj...")
-        res = extrai_transp_tjrj.cloud_main(None)
+        res = extrai_transp_tjrj.cloud_main(None, retomar=args.resume)
         print(f"Resultado: {res}")
         print_end_log(start_time, success=True)
         sys.exit(0)
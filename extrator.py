@@ -1,10 +1,12 @@
-import pdfplumber
 import pandas as pd
 import re
 import os
 import time
 import datetime
-from unicodedata import normalize
+
+from municipios_utils import separar_cidade_designacao
+from moeda_utils import extrair_valores_brl as extrair_valores
+import pdf_texto_utils
 
 # --- CONFIGURACOES GERAIS ---
 # O script agora procura os PDFs dentro da subpasta "pdfs".
@@ -22,62 +24,8 @@ COLUNAS_BRUTAS = [
 COLS_NUMERICAS = ['RCPJ', 'RCPN', 'IT', 'RI', 'RTD', 'Notas', 'Protesto', 
                   'Emolumentos', 'Funarpem', 'Gratuitos', 'Total']
 
-# Lista de Municipios (100% ASCII - SEM ACENTOS)
-MUNICIPIOS_RJ = [
-    "ANGRA DOS REIS", "APERIBE", "ARARUAMA", "AREAL", "ARMACAO DOS BUZIOS",
-    "ARRAIAL DO CABO", "BARRA DO PIRAI", "BARRA MANSA", "BELFORD ROXO", "BOM JARDIM",
-    "BOM JESUS DO ITABAPOANA", "CABO FRIO", "CACHOEIRAS DE MACACU", "CAMBUCI", "CAMPOS DOS GOYTACAZES",
-    "CANTAGALO", "CARAPEBUS", "CARDOSO MOREIRA", "CARMO", "CASIMIRO DE ABREU", "COMENDADOR LEVY GASPARIAN",
-    "CONCEICAO DE MACABU", "CORDEIRO", "DUAS BARRAS", "DUQUE DE CAXIAS",
-    "ENGENHEIRO PAULO DE FRONTIN", "GUAPIMIRIM", "IGUABA GRANDE", "ITABORAI", "ITAGUAI",
-    "ITALVA", "ITAOCARA", "ITAPERUNA", "ITATIAIA", "JAPERI", "LAJE DO MURIAE", "MACAE",
-    "MACUCO", "MAGE", "MANGARATIBA", "MARICA", "MENDES", "MESQUITA", "MIGUEL PEREIRA",
-    "MIRACEMA", "NATIVIDADE", "NILOPOLIS", "NITEROI", "NOVA FRIBURGO", "NOVA IGUACU",
-    "PARACAMBI", "PARAIBA DO SUL", "PARATY", "PATY DO ALFERES", "PETROPOLIS",
-    "PINHEIRAL", "PIRAI", "PORCIUNCULA", "PORTO REAL", "QUATIS", "QUEIMADOS", "QUISSAMA",
-    "RESENDE", "RIO BONITO", "RIO CLARO", "RIO DAS FLORES", "RIO DAS OSTRAS", "RIO DE JANEIRO",
-    "SANTA MARIA MADALENA", "SANTO ANTONIO DE PADUA", "SAO FIDELIS",
-    "SAO FRANCISCO DE ITABAPOANA", "SAO GONCALO",
-    "SAO JOAO DA BARRA", "SAO JOAO DE MERITI",
-    "SAO JOSE DE UBA", "SAO JOSE DO VALE DO RIO PRETO",
-    "SAO PEDRO DA ALDEIA", "SAO SEBASTIAO DO ALTO",
-    "SAPUCAIA", "SAQUAREMA", "SEROPEDICA", "SILVA JARDIM", "SUMIDOURO", "TANGUA",
-    "TERESOPOLIS", "TRAJANO DE MORAES", "TRES RIOS", "VALENCA",
-    "VARRE-SAI", "VASSOURAS", "VOLTA REDONDA", "CAPITAL"
-]
-
 # --- FUNCOES DE EXTRACAO E ANALISE ---
 
-def normalizar_para_match(texto):
-    """Remove acentos e converte para maiúsculas para comparação."""
-    if not texto: return ""
-    return normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
-
-def extrair_valores(linha):
-    """Extrai valores numéricos formatados em BRL (ponto como milhar, vírgula como decimal)."""
-    valores_str = re.findall(r'[\d\.]+\,\d{2}', linha)
-    valores_float = []
-    for v in valores_str:
-        v_limpo = v.replace('.', '').replace(',', '.')
-        try:
-            valores_float.append(float(v_limpo))
-        except ValueError:
-            pass
-    return valores_float
-
-def separar_cidade_designacao(texto_completo):
-    """Separa o nome do município da designação do cartório."""
-    if not texto_completo: return "", ""
-    texto_norm = normalizar_para_match(texto_completo)
-    municipios_ordenados = sorted(MUNICIPIOS_RJ, key=len, reverse=True)
-    
-    for municipio in municipios_ordenados:
-        if texto_norm.startswith(municipio):
-            designacao = texto_norm[len(municipio):].strip()
-            if designacao.startswith("-"): designacao = designacao[1:].strip()
-            return municipio, designacao
-    return "OUTRA/VERIFICAR", texto_completo
-
 def eh_distrito_valido(designacao):
     """Verifica se a designação se refere a um RCPN de Distrito (a partir do 2º)."""
     if not isinstance(designacao, str): return False
@@ -91,8 +39,13 @@ def eh_distrito_valido(designacao):
         except: return False
     return False
 
-def processar_pdfs():
-    """Função principal que processa os PDFs e gera as planilhas de análise."""
+def processar_pdfs(backend=None):
+    """
+    Função principal que processa os PDFs e gera as planilhas de análise.
+
+    Args:
+        backend: Motor de extração de texto (pdf_texto_utils; padrão: TJRJ_PDF_BACKEND)
+    """
     inicio_total = time.time()
 
     print("#" * 70)
@@ -129,7 +82,7 @@ def processar_pdfs():
             ano_arquivo, mes_arquivo = "N/A", "N/A"
         
         try:
-            with pdfplumber.open(caminho_completo) as pdf:
+            with pdf_texto_utils.abrir_documento(caminho_completo, backend) as pdf:
                 # O mês/ano do arquivo será usado como fallback, mas tentamos extrair do PDF
                 mes_atual = mes_arquivo
                 ano_atual = ano_arquivo
@@ -145,8 +98,7 @@ def processar_pdfs():
                     r'Tabelionatos de Protesto de T.tulos': "Protesto"
                 }
 
-                for pagina in pdf.pages:
-                    texto = pagina.extract_text()
+                for texto in pdf.textos():
                     if not texto: continue
                     
                     # Limpeza de texto para facilitar a extração
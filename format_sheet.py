@@ -1,7 +1,4 @@
-import gspread
-import os
-import json
-import toml
+import gsheets_client_utils
 
 SECTION_ID = "1SkxwQoAnNpcNBg1niLpaRaMs79h8rp143NPgsr1weZeekg8E2CbOiQfE"
 
@@ -9,29 +6,10 @@ def get_gspread_client():
     """Authenticates with Google Sheets using available credentials."""
     print("Connecting to Google Sheets...")
     
-    # 1. Try environment variable (GitHub Actions/Cloud)
-    if "GCP_SERVICE_ACCOUNT" in os.environ:
-        try:
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            return gspread.service_account_from_dict(creds_dict)
-        except Exception as e:
-            print(f"Error loading from env: {e}")
-
-    # 2. Try local secrets.toml (Streamlit)
-    if os.path.exists(".streamlit/secrets.toml"):
-        try:
-            secrets = toml.load(".streamlit/secrets.toml")
-            if "gcp_service_account" in secrets:
-                creds_dict = dict(secrets["gcp_service_account"])
-                return gspread.service_account_from_dict(creds_dict)
-        except Exception as e:
-            print(f"Error loading from secrets.toml: {e}")
-
-    # 3. Fallback to default gspread (looks for service_account.json)
     try:
-        return gspread.service_account()
+        return gsheets_client_utils.obter_cliente()
     except Exception as e:
-        print(f"Error with default service_account: {e}")
+        print(f"Error authenticating: {e}")
         return None
 
 def format_sheet():
@@ -0,0 +1,234 @@
+"""
+Gerador de relatórios sintéticos no formato do "Relatório de Receita Cartorária
+Extrajudicial" do TJRJ.
+
+Produz PDFs de texto simples (fonte Helvetica, sem dependências externas) para
+testes e benchmarks do extrator, sem baixar os PDFs reais do site. Os relatórios
+têm as variações encontradas nos PDFs reais: serviços com linhas extras (endereço,
+observações), serviços que começam numa página e terminam na seguinte e as formas
+de "Gestor do Serviço"/"Condição do Gestor" (mesma linha, linhas separadas, ausente).
+
+Uso:
+    python gerador_relatorio_tjrj.py 200 saida.pdf            (200 serviços)
+    python gerador_relatorio_tjrj.py --paginas 600 saida.pdf  (600 páginas)
+"""
+import random
+import argparse
+
+COLUNAS_ATRIBUICAO = {
+    "RCPJ": "Registro Civil das Pessoas Jurídicas",
+    "RCPN": "Registro Civil das Pessoas Naturais",
+    "IT": "Registro de Interdições e Tutelas",
+    "RI": "Ofícios e Atos do Registro de Imóveis",
+    "RTD": "Registro de Títulos e Documentos",
+    "Notas": "Ofícios e Atos de Notas",
+    "Protesto": "Tabelionatos de Protesto de Títulos",
+}
+
+CIDADES = ["CAPITAL", "NITEROI", "SAO GONCALO", "CAMPOS DOS GOYTACAZES", "RIO DAS OSTRAS",
+           "PETROPOLIS", "NOVA IGUACU", "VARRE-SAI", "BARRA MANSA", "MACUCO", "RIO BONITO"]
+DESIGNACOES = ["1 OFICIO DE JUSTICA", "2 OF DE NOTAS", "RCPN 3 DISTR", "OFICIO UNICO",
+               "5 RCPN DA 2 CIRCUNSCRICAO", "4 OFICIO", "REGISTRO DE IMOVEIS"]
+# Como o gestor aparece no relatório
+VARIANTES_GESTOR = ["mesma_linha", "linhas_separadas", "sem_gestor"]
+# Texto da condição no PDF -> cargo esperado do extrator ("Delegat..." vira Titular)
+CONDICOES = {"Delegatário": "Titular", "Delegatária": "Titular", "Interino": "Interino",
+             "Responsável pelo Expediente": "Responsável pelo Expediente", "Interventor": "Interventor"}
+LOGRADOUROS = ["RUA DA ASSEMBLEIA", "AV PRESIDENTE VARGAS", "RUA CORONEL GOMES MACHADO",
+               "PRACA XV DE NOVEMBRO", "ESTRADA DO CAMPINHO"]
+
+
+def formatar_brl(valor):
+    """Formata um float no padrão brasileiro (1.234,56)."""
+    inteiro, dec = f"{valor:.2f}".split('.')
+    sinal = '-' if inteiro.startswith('-') else ''
+    return sinal + f"{abs(int(inteiro)):,}".replace(',', '.') + ',' + dec
+
+
+def gerar_servicos(n_servicos, seed=1):
+    """
+    Gera a especificação dos serviços do relatório (o que o extrator deve encontrar).
+
+    Returns:
+        list[dict]: cod, cidade, designacao, gestor, cargo, valores por coluna,
+        Emolumentos, Funarpem, Gratuitos e Total, mais a forma de renderização
+        (condicao, variante_gestor, linhas_extras)
+    """
+    rnd = random.Random(seed)
+    # Sorteio separado para a forma do texto: os valores de cada seed não mudam
+    rnd_forma = random.Random(seed * 7919 + 1)
+    servicos = []
+    for i in range(n_servicos):
+        valores = {col: round(rnd.uniform(10, 250000), 2)
+                   for col in rnd.sample(list(COLUNAS_ATRIBUICAO), rnd.randint(1, 4))}
+        emolumentos = round(sum(valores.values()), 2)
+        funarpem = round(emolumentos * 0.2, 2)
+        gratuitos = round(rnd.uniform(0, 50), 2)
+        cidade = rnd.choice(CIDADES)
+        designacao = rnd.choice(DESIGNACOES)
+        cargo = rnd.choice(['Titular', 'Interino', 'Responsável pelo Expediente'])
+
+        condicao = rnd_forma.choice([c for c, esperado in CONDICOES.items() if esperado == cargo])
+        if rnd_forma.random() < 0.15:
+            condicao, cargo = "Interventor", "Interventor"
+        variante = rnd_forma.choices(VARIANTES_GESTOR, weights=[70, 25, 5])[0]
+        gestor = f"GESTOR {i} DA SILVA"
+        if variante == "sem_gestor":
+            gestor = cargo = "NAO IDENTIFICADO"
+        linhas_extras = []
+        if rnd_forma.random() < 0.3:
+            linhas_extras.append(f"Endereço: {rnd_forma.choice(LOGRADOUROS)}, {rnd_forma.randint(1, 2000)} - {cidade}")
+            if rnd_forma.random() < 0.5:
+                linhas_extras.append("Observação: serventia com atendimento em dois endereços")
+
+        servicos.append({
+            'cod': str(1000 + i),
+            'cidade': cidade,
+            'designacao': designacao,
+            'gestor': gestor,
+            'cargo': cargo,
+            'condicao': condicao,
+            'variante_gestor': variante,
+            'linhas_extras': linhas_extras,
+            'valores': valores,
+            'Emolumentos': emolumentos,
+            'Funarpem': funarpem,
+            'Gratuitos': gratuitos,
+            'Total': round(emolumentos + funarpem + gratuitos, 2),
+        })
+    return servicos
+
+
+def linhas_servico(servico):
+    """Renderiza um serviço nas linhas do relatório."""
+    condicao = servico.get('condicao') or ('Delegatário' if servico['cargo'] == 'Titular' else servico['cargo'])
+    variante = servico.get('variante_gestor', "mesma_linha")
+    linhas = [f"Serviço: {servico['cod']} - {servico['cidade']} {servico['designacao']}"]
+    if variante == "mesma_linha":
+        linhas.append(f"Gestor do Serviço: {servico['gestor']} Condição do Gestor: {condicao}")
+    elif variante == "linhas_separadas":
+        linhas.append(f"Gestor do Serviço: {servico['gestor']}")
+        linhas.append(f"Condição do Gestor: {condicao}")
+    linhas.extend(servico.get('linhas_extras', []))
+    linhas.append("Atribuição Quantidade Emolumentos")
+    for col, valor in servico['valores'].items():
+        linhas.append(f"{COLUNAS_ATRIBUICAO[col]} {int(valor) % 997 + 1} {formatar_brl(valor)}")
+    linhas.append(
+        f"Total Geral {formatar_brl(servico['Emolumentos'])} {formatar_brl(servico['Funarpem'])} "
+        f"{formatar_brl(servico['Gratuitos'])} {formatar_brl(servico['Total'])}"
+    )
+    return linhas
+
+
+def paginar(servicos, mes, ano, linhas_por_pagina=50):
+    """
+    Distribui as linhas dos serviços em páginas com cabeçalho. Os serviços NÃO são
+    alinhados às páginas: um serviço pode começar numa página e terminar na seguinte.
+    """
+    cabecalho = [
+        "TRIBUNAL DE JUSTIÇA DO ESTADO DO RIO DE JANEIRO",
+        "Relatório de Receita Cartorária Extrajudicial",
+        f"Período: {mes:02d}/{ano}",
+    ]
+    corpo = [linha for servico in servicos for linha in linhas_servico(servico)]
+    por_pagina = max(1, linhas_por_pagina - len(cabecalho))
+    return [cabecalho + corpo[i:i + por_pagina] for i in range(0, len(corpo), por_pagina)] or [cabecalho]
+
+
+def montar_pdf(paginas):
+    """
+    Monta um PDF mínimo (Helvetica, WinAnsiEncoding) com uma linha de texto por linha da lista.
+
+    Args:
+        paginas: Lista de páginas; cada página é uma lista de strings
+
+    Returns:
+        bytes: Conteúdo do PDF
+    """
+    objetos = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>", b""]
+    id_fonte, id_paginas = 1, 2
+    kids = []
+    for linhas in paginas:
+        ops = ["BT /F1 9 Tf"]
+        y = 810
+        for linha in linhas:
+            texto = linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"1 0 0 1 30 {y} Tm ({texto}) Tj")
+            y -= 15
+        ops.append("ET")
+        stream = "\n".join(ops).encode("cp1252")
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objetos.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (id_paginas, len(objetos), id_fonte)
+        )
+        kids.append(len(objetos))
+    objetos[id_paginas - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    objetos.append(b"<< /Type /Catalog /Pages %d 0 R >>" % id_paginas)
+    id_catalogo = len(objetos)
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objetos, 1):
+        offsets.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for off in offsets:
+        saida += b"%010d 00000 n \n" % off
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1, id_catalogo, inicio_xref)
+    return bytes(saida)
+
+
+def servicos_para_paginas(n_paginas, linhas_por_pagina=50, seed=1):
+    """
+    Gera serviços suficientes para um relatório de exatamente `n_paginas` páginas.
+
+    Returns:
+        list[dict]: Especificação dos serviços (como gerar_servicos)
+    """
+    por_pagina = max(1, linhas_por_pagina - 3)
+    alvo = (n_paginas - 1) * por_pagina + 1  # linhas de corpo para abrir a última página
+    # Os serviços de uma seed são sempre os mesmos: basta cortar uma lista grande o suficiente
+    candidatos = gerar_servicos(max(1, alvo // 4 + 1), seed=seed)
+    servicos, linhas = [], 0
+    for servico in candidatos:
+        if linhas >= alvo:
+            break
+        servicos.append(servico)
+        linhas += len(linhas_servico(servico))
+    return servicos
+
+
+def gerar_relatorio(n_servicos=50, mes=10, ano=2025, linhas_por_pagina=50, seed=1, n_paginas=None):
+    """
+    Gera um relatório sintético completo.
+
+    Args:
+        n_servicos: Nº de serviços (ignorado se n_paginas for informado)
+        n_paginas: Nº exato de páginas do relatório
+
+    Returns:
+        tuple: (pdf_bytes, servicos) — servicos é a especificação de gerar_servicos()
+    """
+    if n_paginas:
+        servicos = servicos_para_paginas(n_paginas, linhas_por_pagina, seed=seed)
+    else:
+        servicos = gerar_servicos(n_servicos, seed=seed)
+    return montar_pdf(paginar(servicos, mes, ano, linhas_por_pagina)), servicos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um relatório sintético do TJRJ")
+    parser.add_argument('args', nargs='*', help="[nº de serviços] [arquivo de saída]")
+    parser.add_argument('--paginas', type=int, help="Nº exato de páginas (substitui o nº de serviços)")
+    parser.add_argument('--seed', type=int, default=1)
+    opcoes = parser.parse_args()
+    n = next((int(a) for a in opcoes.args if a.isdigit()), 50)
+    destino = next((a for a in opcoes.args if not a.isdigit()), "relatorio_sintetico.pdf")
+    pdf_bytes, servicos = gerar_relatorio(n, seed=opcoes.seed, n_paginas=opcoes.paginas)
+    with open(destino, "wb") as f:
+        f.write(pdf_bytes)
+    print(f"[OK] {destino}: {len(servicos)} serviços, {len(pdf_bytes)} bytes")
@@ -0,0 +1,215 @@
+"""
+Cliente do Google Sheets compartilhado (gspread).
+
+Um único lugar para autenticar: as credenciais são resolvidas uma vez por processo
+(GCP_SERVICE_ACCOUNT -> st.secrets -> .streamlit/secrets.toml -> service_account.json
+padrão do gspread) e todos os scripts e páginas usam o mesmo cliente, com uma sessão
+HTTP que mantém as conexões abertas. Planilhas e abas já abertas ficam em memória:
+abrir a planilha e listar as abas custa uma chamada à API por planilha, não uma por uso.
+Todas as chamadas à API são contadas por execução (ver resumo_chamadas).
+
+Todas as chamadas passam pelo limite de taxa central (limitador_utils): um balde de
+tokens para as leituras e outro para as escritas, modelando as cotas por minuto da
+API, e retentativa com backoff exponencial com jitter (respeitando o Retry-After)
+para 429/5xx e erros de conexão. O tempo útil e o tempo perdido com o limite entram
+no resumo.
+"""
+import os
+import json
+import time
+import threading
+from collections import Counter
+
+import gspread
+import requests
+from gspread.http_client import HTTPClient
+from requests.adapters import HTTPAdapter
+
+import limitador_utils
+
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+try:
+    import toml
+except ImportError:
+    toml = None
+
+ESCOPOS = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+CAMINHO_SECRETS = os.path.join(".streamlit", "secrets.toml")
+TAMANHO_POOL = int(os.environ.get('GSHEETS_POOL_CONEXOES', '10'))
+# Cotas por minuto da API (por usuário) e retentativas
+LEITURAS_POR_MINUTO = float(os.environ.get('GSHEETS_LEITURAS_POR_MINUTO', '60'))
+ESCRITAS_POR_MINUTO = float(os.environ.get('GSHEETS_ESCRITAS_POR_MINUTO', '60'))
+MAX_TENTATIVAS = int(os.environ.get('GSHEETS_MAX_TENTATIVAS', '6'))
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+_lock = threading.RLock()
+_cliente = None
+_planilhas = {}
+_abas = {}
+_chamadas = Counter()
+_metricas = limitador_utils.MetricasTaxa()
+_baldes = {
+    'leitura': limitador_utils.balde_por_minuto(LEITURAS_POR_MINUTO, _metricas),
+    'escrita': limitador_utils.balde_por_minuto(ESCRITAS_POR_MINUTO, _metricas),
+}
+
+
+class _HTTPClientContado(HTTPClient):
+    """HTTPClient do gspread com pool de conexões maior e contagem das chamadas."""
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        adaptador = HTTPAdapter(pool_connections=TAMANHO_POOL, pool_maxsize=TAMANHO_POOL)
+        self.session.mount('https://', adaptador)
+
+    def request(self, method, endpoint, *args, **kwargs):
+        tipo = 'leitura' if method.upper() == 'GET' else 'escrita'
+        for tentativa in range(MAX_TENTATIVAS):
+            _baldes[tipo].adquirir()
+            with _lock:
+                _chamadas[tipo] += 1
+            inicio = time.monotonic()
+            try:
+                resposta = super().request(method, endpoint, *args, **kwargs)
+            except (gspread.exceptions.APIError, requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                resposta_erro = getattr(e, 'response', None)
+                status = getattr(resposta_erro, 'status_code', None)
+                if (status is not None and status not in STATUS_REPETIR) or tentativa == MAX_TENTATIVAS - 1:
+                    raise
+                retry_after = limitador_utils.ler_retry_after(
+                    resposta_erro.headers.get('Retry-After') if resposta_erro is not None else None)
+                atraso = limitador_utils.atraso_backoff(tentativa, retry_after=retry_after)
+                print(f"   [AVISO] Google Sheets respondeu {status or type(e).__name__}; "
+                      f"nova tentativa em {atraso:.1f}s ({tentativa + 1}/{MAX_TENTATIVAS - 1})")
+                time.sleep(atraso)
+                _metricas.registrar('backoff', time.monotonic() - inicio)
+                continue
+            _metricas.registrar('util', time.monotonic() - inicio)
+            return resposta
+
+
+def _corrigir_chave(creds_dict):
+    creds_dict = dict(creds_dict)
+    if "private_key" in creds_dict:
+        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+    return creds_dict
+
+
+def resolver_credenciais():
+    """
+    Procura as credenciais da conta de serviço.
+
+    Returns:
+        dict com a conta de serviço ou None (usar o service_account.json padrão do gspread)
+    """
+    if "GCP_SERVICE_ACCOUNT" in os.environ:
+        return _corrigir_chave(json.loads(os.environ["GCP_SERVICE_ACCOUNT"]))
+    try:
+        if st is not None and "gcp_service_account" in st.secrets:
+            return _corrigir_chave(st.secrets["gcp_service_account"])
+    except Exception:
+        pass  # Fora do Streamlit (ou sem secrets.toml) st.secrets levanta exceção
+    if toml is not None and os.path.exists(CAMINHO_SECRETS):
+        secrets = toml.load(CAMINHO_SECRETS)
+        if "gcp_service_account" in secrets:
+            return _corrigir_chave(secrets["gcp_service_account"])
+    return None
+
+
+def obter_cliente():
+    """Cliente gspread autenticado (criado na primeira chamada e reaproveitado)."""
+    global _cliente
+    with _lock:
+        if _cliente is None:
+            creds_dict = resolver_credenciais()
+            if creds_dict is not None:
+                _cliente = gspread.service_account_from_dict(creds_dict, scopes=ESCOPOS,
+                                                             http_client=_HTTPClientContado)
+            else:
+                _cliente = gspread.service_account(scopes=ESCOPOS, http_client=_HTTPClientContado)
+        return _cliente
+
+
+def abrir_planilha(sheet_id):
+    """Planilha pela chave (aberta uma vez por processo)."""
+    with _lock:
+        if sheet_id not in _planilhas:
+            _planilhas[sheet_id] = obter_cliente().open_by_key(sheet_id)
+        return _planilhas[sheet_id]
+
+
+def obter_aba(sheet_id, titulo, criar=False, rows=1000, cols=26, cabecalho=None):
+    """
+    Aba de uma planilha. Na primeira aba pedida de cada planilha todas as abas são
+    listadas de uma vez (uma chamada); as seguintes saem da memória.
+
+    Args:
+        sheet_id: Chave da planilha
+        titulo: Nome da aba
+        criar: Cria a aba se não existir (senão levanta gspread.WorksheetNotFound)
+        rows, cols: Tamanho da aba criada
+        cabecalho: Linha gravada na aba recém-criada
+
+    Returns:
+        gspread.Worksheet
+    """
+    with _lock:
+        if not any(chave[0] == sheet_id for chave in _abas):
+            for ws in abrir_planilha(sheet_id).worksheets():
+                _abas[(sheet_id, ws.title)] = ws
+        ws = _abas.get((sheet_id, titulo))
+        if ws is None:
+            if not criar:
+                raise gspread.WorksheetNotFound(titulo)
+            print(f"Aba '{titulo}' não encontrada. Criando...")
+            ws = abrir_planilha(sheet_id).add_worksheet(title=titulo, rows=rows, cols=cols)
+            if cabecalho:
+                ws.append_row(cabecalho)
+            _abas[(sheet_id, titulo)] = ws
+        return ws
+
+
+def esquecer(sheet_id=None, titulo=None):
+    """Descarta planilhas/abas da memória (ex.: depois de apagar ou renomear uma aba)."""
+    with _lock:
+        if titulo is not None:
+            _abas.pop((sheet_id, titulo), None)
+            return
+        for chave in [c for c in _abas if sheet_id is None or c[0] == sheet_id]:
+            del _abas[chave]
+        for chave in [c for c in _planilhas if sheet_id is None or c == sheet_id]:
+            del _planilhas[chave]
+
+
+def contar_chamadas():
+    """dict {'leitura': n, 'escrita': n, 'total': n} das chamadas à API desde o início (ou zerar)."""
+    with _lock:
+        contagem = dict(_chamadas)
+    contagem.setdefault('leitura', 0)
+    contagem.setdefault('escrita', 0)
+    contagem['total'] = contagem['leitura'] + contagem['escrita']
+    return contagem
+
+
+def metricas_taxa():
+    """dict do limite de taxa: 'tempo_util', 'tempo_limitado' (s), 'esperas', 'retentativas'."""
+    return _metricas.resumo()
+
+
+def zerar_contagem():
+    with _lock:
+        _chamadas.clear()
+    _metricas.zerar()
+
+
+def resumo_chamadas():
+    """Texto curto para os logs: 'N chamadas (L leituras, E escritas); tempo útil x limitado'."""
+    c, m = contar_chamadas(), metricas_taxa()
+    return (f"{c['total']} chamadas à API do Google Sheets ({c['leitura']} leituras, {c['escrita']} escritas); "
+            f"{m['tempo_util']:.1f}s úteis, {m['tempo_limitado']:.1f}s limitados "
+            f"({m['esperas']} esperas de cota, {m['retentativas']} retentativas)")
@@ -0,0 +1,236 @@
+"""
+Escrita em lote de abas do Google Sheets.
+
+Em vez de clear/update/freeze/set_basic_filter/format por aba (5 chamadas à API por
+aba), todas as abas de uma planilha são gravadas com duas chamadas:
+1. spreadsheets.batchUpdate: tamanho da grade, cabeçalho congelado, limpeza dos
+   valores, filtro automático e formato numérico de todas as abas;
+2. values.batchUpdate: os valores de todas as abas (USER_ENTERED).
+
+O formato numérico aplicado antes dos valores é mantido: números digitados numa
+célula formatada preservam o formato.
+
+Sincronização por linha (sincronizar_aba): em vez de limpar e regravar a aba, lê o
+conteúdo atual uma vez, compara linha a linha pela chave primária e grava só as
+linhas inseridas/alteradas e remove as que saíram (no máximo 3 chamadas: leitura,
+batchUpdate de estrutura e values.batchUpdate), mantendo a ordem das linhas do
+DataFrame, como a regravação completa. GSHEETS_SINCRONIA=completa volta à
+regravação completa.
+"""
+import os
+
+from gspread.utils import a1_to_rowcol, absolute_range_name, rowcol_to_a1, ValueRenderOption, DateTimeOption
+
+import gsheets_client_utils
+import esquema_utils
+
+FORMATO_NUMERO = {"type": "NUMBER", "pattern": "#,##0.00"}
+MODO_SINCRONIA = os.environ.get('GSHEETS_SINCRONIA', 'delta')
+
+
+def _indice_coluna(letra):
+    """'A' -> 0, 'G' -> 6, 'AA' -> 26."""
+    return a1_to_rowcol(f"{letra}1")[1] - 1
+
+
+def compilar_aba(aba_id, valores, colunas_formato=None):
+    """
+    Requisições de batchUpdate que preparam uma aba para receber `valores`.
+
+    Args:
+        aba_id: sheetId da aba (Worksheet.id)
+        valores: Lista de linhas, a primeira é o cabeçalho
+        colunas_formato: (coluna_inicial, coluna_final) em letras para o formato
+                         numérico das linhas de dados, ou None
+
+    Returns:
+        list: Requisições (redimensionar + congelar, limpar, filtro, formato)
+    """
+    n_linhas, n_colunas = len(valores), max(len(valores[0]), 1)
+    grade = {"sheetId": aba_id, "startRowIndex": 0, "endRowIndex": n_linhas,
+             "startColumnIndex": 0, "endColumnIndex": n_colunas}
+    requisicoes = [
+        {"updateSheetProperties": {
+            # Uma linha livre além dos dados: a grade não pode ter todas as linhas congeladas
+            "properties": {"sheetId": aba_id, "gridProperties": {
+                "rowCount": n_linhas + 1, "columnCount": n_colunas, "frozenRowCount": 1}},
+            "fields": "gridProperties(rowCount,columnCount,frozenRowCount)"}},
+        {"updateCells": {"range": {"sheetId": aba_id}, "fields": "userEnteredValue"}},
+        {"setBasicFilter": {"filter": {"range": grade}}},
+    ]
+    if colunas_formato and n_linhas > 1:
+        inicio, fim = colunas_formato
+        requisicoes.append({"repeatCell": {
+            "range": {"sheetId": aba_id, "startRowIndex": 1, "endRowIndex": n_linhas,
+                      "startColumnIndex": _indice_coluna(inicio), "endColumnIndex": _indice_coluna(fim) + 1},
+            "cell": {"userEnteredFormat": {"numberFormat": FORMATO_NUMERO}},
+            "fields": "userEnteredFormat.numberFormat"}})
+    return requisicoes
+
+
+def escrever_abas(sheet_id, abas, value_input_option='USER_ENTERED'):
+    """
+    Grava várias abas de uma planilha com um batchUpdate e um values.batchUpdate.
+
+    Args:
+        sheet_id: Chave da planilha
+        abas: Lista de (titulo, df, colunas_formato) — colunas_formato como em compilar_aba
+        value_input_option: 'USER_ENTERED' ou 'RAW'
+
+    Returns:
+        int: Nº de chamadas à API feitas (inclui a listagem das abas, se ainda não
+             estava em memória, e a criação de abas inexistentes)
+    """
+    antes = gsheets_client_utils.contar_chamadas()['total']
+    requisicoes, dados = [], []
+    for titulo, df, colunas_formato in abas:
+        # Previne NaN (categóricas não aceitam o 0.0 como nova categoria)
+        df = esquema_utils.descompactar_categorias(df).fillna(0.0)
+        valores = [df.columns.values.tolist()] + df.values.tolist()
+        ws = gsheets_client_utils.obter_aba(sheet_id, titulo, criar=True,
+                                            rows=len(valores) + 50, cols=len(df.columns) + 5)
+        requisicoes.extend(compilar_aba(ws.id, valores, colunas_formato))
+        dados.append({"range": absolute_range_name(titulo, "A1"), "values": valores})
+
+    planilha = gsheets_client_utils.abrir_planilha(sheet_id)
+    planilha.batch_update({"requests": requisicoes})
+    planilha.values_batch_update({"valueInputOption": value_input_option, "data": dados})
+    return gsheets_client_utils.contar_chamadas()['total'] - antes
+
+
+def _comparavel(valor):
+    """
+    Forma canônica de uma célula para comparar o DataFrame com a aba: números pelo
+    valor (USER_ENTERED grava '000123' e '1.50' como números), booleanos em maiúsculas.
+    """
+    texto = str(valor).strip()
+    if texto.upper() in ('TRUE', 'FALSE'):
+        return texto.upper()
+    try:
+        numero = float(texto)
+    except ValueError:
+        return texto
+    return texto.lower() if numero != numero else round(numero, 6)
+
+
+def _blocos(indices):
+    """[1, 2, 3, 7, 8] -> [(1, 3), (7, 8)] (intervalos fechados de índices consecutivos)."""
+    blocos = []
+    for i in sorted(indices):
+        if blocos and i == blocos[-1][1] + 1:
+            blocos[-1][1] = i
+        else:
+            blocos.append([i, i])
+    return [tuple(b) for b in blocos]
+
+
+def sincronizar_aba(ws, df, chave, ignorar=(), filtro=True, value_input_option='USER_ENTERED'):
+    """
+    Atualiza a aba só nas linhas que mudaram, comparando pela chave primária.
+
+    A aba termina na ordem de `df` (a mesma da regravação completa): as linhas removidas
+    são apagadas (deleteDimension) e as inseridas entram na sua posição em `df`
+    (insertDimension, herdando a formatação da linha anterior). Se as linhas que
+    continuam mudaram de ordem entre si, a sincronização não se aplica.
+
+    Args:
+        ws: gspread.Worksheet
+        df: DataFrame com o conteúdo completo desejado (mesmas colunas da aba)
+        chave: Lista de colunas que identificam a linha (ex.: ['cod', 'ano', 'mes'])
+        ignorar: Colunas fora da comparação (ex.: data de atualização); a linha só é
+                 regravada, com o valor novo delas, se outra coluna mudou
+        filtro: Reaplica o cabeçalho congelado e o filtro automático quando o nº de
+                linhas muda
+        value_input_option: 'USER_ENTERED' ou 'RAW'
+
+    Returns:
+        dict com 'inseridas', 'atualizadas', 'removidas', 'celulas' e 'chamadas', ou
+        None quando a sincronização por linha não se aplica (modo completo, aba vazia ou
+        com outro cabeçalho, chave ausente ou repetida, linhas fora da ordem de `df`) — o
+        chamador regrava a aba inteira.
+    """
+    if MODO_SINCRONIA == 'completa':
+        return None
+    colunas = [str(c) for c in df.columns]
+    if not set(chave) <= set(colunas):
+        print(f"   [AVISO] Chave {chave} ausente em '{ws.title}'; regravando a aba inteira.")
+        return None
+
+    antes = gsheets_client_utils.contar_chamadas()['total']
+    atuais = ws.get_all_values(value_render_option=ValueRenderOption.unformatted,
+                               date_time_render_option=DateTimeOption.formatted_string)
+    if not atuais or [str(c) for c in atuais[0][:len(colunas)]] != colunas or \
+            any(str(c).strip() for c in atuais[0][len(colunas):]):
+        return None
+
+    pos_chave = [colunas.index(c) for c in chave]
+    comparar = [i for i, c in enumerate(colunas) if c not in set(ignorar)]
+
+    def chave_de(linha):
+        return tuple(_comparavel(linha[i]) for i in pos_chave)
+
+    def conteudo(linha):
+        return [_comparavel(linha[i]) for i in comparar]
+
+    linhas_aba = [l[:len(colunas)] + [''] * (len(colunas) - len(l)) for l in atuais[1:]]
+    linhas_df = df.values.tolist()
+    indice_aba = {chave_de(l): i for i, l in enumerate(linhas_aba)}
+    indice_df = {chave_de(l): i for i, l in enumerate(linhas_df)}
+    if len(indice_aba) != len(linhas_aba) or len(indice_df) != len(linhas_df):
+        print(f"   [AVISO] Chave {chave} repetida em '{ws.title}'; regravando a aba inteira.")
+        return None
+
+    # As linhas que continuam devem estar na mesma ordem relativa da aba e de `df`
+    mantidas_aba = [k for k in indice_aba if k in indice_df]
+    if mantidas_aba != [k for k in indice_df if k in indice_aba]:
+        print(f"   [AVISO] Linhas de '{ws.title}' fora da ordem do DataFrame; regravando a aba inteira.")
+        return None
+
+    removidas = [i for i, l in enumerate(linhas_aba) if chave_de(l) not in indice_df]
+    novas = [j for j, l in enumerate(linhas_df) if chave_de(l) not in indice_aba]
+
+    # Posições finais (1 = cabeçalho) = posição em `df` + 2
+    destino = {j + 2: linhas_df[j] for j in novas}
+    atualizadas = 0
+    for k in mantidas_aba:
+        i, j = indice_aba[k], indice_df[k]
+        if conteudo(linhas_aba[i]) != conteudo(linhas_df[j]):
+            destino[j + 2] = linhas_df[j]
+            atualizadas += 1
+
+    # Remoções de baixo para cima; depois as inserções em ordem crescente, já na posição final
+    requisicoes = []
+    for inicio, fim in reversed(_blocos(removidas)):
+        requisicoes.append({"deleteDimension": {"range": {
+            "sheetId": ws.id, "dimension": "ROWS", "startIndex": inicio + 1, "endIndex": fim + 2}}})
+    for inicio, fim in _blocos(novas):
+        requisicoes.append({"insertDimension": {"range": {
+            "sheetId": ws.id, "dimension": "ROWS", "startIndex": inicio + 1, "endIndex": fim + 2},
+            # Logo abaixo do cabeçalho, herdar a formatação seria herdar a do cabeçalho
+            "inheritFromBefore": inicio > 0}})
+    if requisicoes and filtro:
+        requisicoes.append({"updateSheetProperties": {
+            "properties": {"sheetId": ws.id, "gridProperties": {"frozenRowCount": 1}},
+            "fields": "gridProperties.frozenRowCount"}})
+        requisicoes.append({"setBasicFilter": {"filter": {"range": {
+            "sheetId": ws.id, "startRowIndex": 0, "endRowIndex": len(linhas_df) + 1,
+            "startColumnIndex": 0, "endColumnIndex": len(colunas)}}}})
+
+    dados = []
+    for inicio, fim in _blocos(destino):
+        intervalo = f"A{inicio}:{rowcol_to_a1(fim, len(colunas))}"
+        dados.append({"range": absolute_range_name(ws.title, intervalo),
+                      "values": [destino[r] for r in range(inicio, fim + 1)]})
+
+    if requisicoes:
+        ws.spreadsheet.batch_update({"requests": requisicoes})
+    if dados:
+        ws.spreadsheet.values_batch_update({"valueInputOption": value_input_option, "data": dados})
+
+    resultado = {'inseridas': len(novas), 'atualizadas': atualizadas, 'removidas': len(removidas),
+                 'celulas': len(destino) * len(colunas),
+                 'chamadas': gsheets_client_utils.contar_chamadas()['total'] - antes}
+    print(f"   [DELTA] '{ws.title}': {resultado['inseridas']} inseridas, {resultado['atualizadas']} atualizadas, "
+          f"{resultado['removidas']} removidas ({resultado['celulas']} células gravadas, "
+          f"{resultado['chamadas']} chamadas à API)")
+    return resultado
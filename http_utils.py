@@ -0,0 +1,175 @@
+"""
+Camada HTTP compartilhada dos extratores (TJRJ, IBGE/SIDRA, CNJ).
+
+Uma sessão requests por host, com pool de conexões keep-alive (a conexão TCP/TLS é
+reaproveitada entre requisições e entre threads), timeouts de conexão/leitura
+configuráveis e retentativa de transporte (erros de conexão e 429/5xx, com backoff e
+respeitando o Retry-After) para GET/HEAD. Os chamadores continuam tratando o status
+final e as suas próprias validações (ex.: assinatura %PDF).
+
+HTTP/2 opcional (HTTP2=1 e httpx[http2] instalado) para requisições sem stream; as
+respostas httpx têm .status_code, .text, .encoding, .json() e .raise_for_status()
+(nesse caso só as falhas de conexão são repetidas). Como no requests, os
+redirecionamentos são seguidos; argumentos de requests sem equivalente no httpx
+levantam TypeError em vez de serem ignorados.
+
+Cada requisição é contada por host (nº, erros e latência até os cabeçalhos), ver
+estatisticas() / resumo_hosts().
+
+Configuração (variáveis de ambiente):
+    HTTP_TIMEOUT_CONEXAO   (padrão 20 s)
+    HTTP_TIMEOUT_LEITURA   (padrão 120 s)
+    HTTP_POOL_CONEXOES     conexões mantidas por host (padrão 10)
+    HTTP_TENTATIVAS        retentativas de transporte (padrão 2)
+    HTTP_BACKOFF           fator do backoff exponencial entre retentativas (padrão 1 s)
+    HTTP2                  1 = usa HTTP/2 quando disponível
+"""
+import os
+import time
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+TIMEOUT_CONEXAO = float(os.environ.get('HTTP_TIMEOUT_CONEXAO', '20'))
+TIMEOUT_LEITURA = float(os.environ.get('HTTP_TIMEOUT_LEITURA', '120'))
+TAMANHO_POOL = int(os.environ.get('HTTP_POOL_CONEXOES', '10'))
+TENTATIVAS = int(os.environ.get('HTTP_TENTATIVAS', '2'))
+BACKOFF = float(os.environ.get('HTTP_BACKOFF', '1.0'))
+USAR_HTTP2 = os.environ.get('HTTP2', '0') == '1'
+USER_AGENT = "Mozilla/5.0"
+# Argumentos de requests.get aceitos no caminho HTTP/2 (allow_redirects vira follow_redirects)
+_ARGUMENTOS_HTTP2 = {'headers', 'params', 'auth', 'allow_redirects'}
+
+_lock = threading.Lock()
+_sessoes = {}
+_clientes_http2 = {}
+_estatisticas = defaultdict(lambda: {'requisicoes': 0, 'erros': 0, 'latencia': 0.0, 'bytes': 0})
+
+
+def _politica_retentativa():
+    return Retry(total=TENTATIVAS, connect=TENTATIVAS, read=TENTATIVAS, status=TENTATIVAS,
+                 backoff_factor=BACKOFF, status_forcelist=(429, 500, 502, 503, 504),
+                 allowed_methods=frozenset(['GET', 'HEAD']), respect_retry_after_header=True,
+                 raise_on_status=False)
+
+
+def _host(url):
+    partes = urlparse(url)
+    return f"{partes.scheme}://{partes.netloc}"
+
+
+def sessao(url):
+    """Sessão requests do host de `url` (criada na primeira requisição e reaproveitada)."""
+    host = _host(url)
+    with _lock:
+        s = _sessoes.get(host)
+        if s is None:
+            s = requests.Session()
+            s.headers['User-Agent'] = USER_AGENT
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=TAMANHO_POOL,
+                                    max_retries=_politica_retentativa())
+            s.mount('https://', adaptador)
+            s.mount('http://', adaptador)
+            _sessoes[host] = s
+        return s
+
+
+def _cliente_http2(verify):
+    with _lock:
+        cliente = _clientes_http2.get(verify)
+        if cliente is None:
+            # retries do httpx cobre só falhas de conexão
+            transporte = httpx.HTTPTransport(http2=True, verify=verify, retries=TENTATIVAS,
+                                             limits=httpx.Limits(max_keepalive_connections=TAMANHO_POOL))
+            # follow_redirects: o httpx não segue 3xx por padrão, o requests segue
+            cliente = httpx.Client(transport=transporte, headers={'User-Agent': USER_AGENT}, follow_redirects=True)
+            _clientes_http2[verify] = cliente
+        return cliente
+
+
+def _registrar(host, segundos, erro=False, tamanho=0):
+    with _lock:
+        e = _estatisticas[host]
+        e['requisicoes'] += 1
+        e['latencia'] += segundos
+        e['erros'] += int(erro)
+        e['bytes'] += tamanho
+
+
+def _tamanho(resposta):
+    # Content-Length (respostas chunked sem o cabeçalho contam 0)
+    try:
+        return int(resposta.headers.get('Content-Length') or 0)
+    except ValueError:
+        return 0
+
+
+def get(url, timeout=None, stream=False, verify=True, **kwargs):
+    """
+    GET pelo pool do host.
+
+    Args:
+        url: Endereço
+        timeout: Segundos ou (conexão, leitura); padrão (TIMEOUT_CONEXAO, TIMEOUT_LEITURA)
+        stream: Corpo sob demanda (iter_content); use a resposta com `with` para devolver
+                a conexão ao pool
+        verify: Verificação do certificado TLS
+        **kwargs: headers, params etc. (como em requests.get; com HTTP/2 só headers,
+                  params, auth e allow_redirects)
+
+    Returns:
+        requests.Response (ou httpx.Response com HTTP/2 ativo e stream=False)
+
+    Raises:
+        TypeError: Argumento sem suporte no caminho HTTP/2
+    """
+    timeout = timeout if timeout is not None else (TIMEOUT_CONEXAO, TIMEOUT_LEITURA)
+    usar_http2 = USAR_HTTP2 and httpx is not None and not stream
+    if usar_http2:
+        sem_suporte = sorted(set(kwargs) - _ARGUMENTOS_HTTP2)
+        if sem_suporte:
+            raise TypeError(f"http_utils.get com HTTP/2: argumento(s) sem suporte {', '.join(sem_suporte)}")
+    host = _host(url)
+    inicio = time.perf_counter()
+    try:
+        if usar_http2:
+            conexao, leitura = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            opcoes = dict(kwargs)
+            opcoes['follow_redirects'] = opcoes.pop('allow_redirects', True)
+            resposta = _cliente_http2(verify).get(url, timeout=httpx.Timeout(leitura, connect=conexao), **opcoes)
+        else:
+            resposta = sessao(url).get(url, timeout=timeout, stream=stream, verify=verify, **kwargs)
+    except Exception:
+        _registrar(host, time.perf_counter() - inicio, erro=True)
+        raise
+    _registrar(host, time.perf_counter() - inicio, erro=resposta.status_code >= 400, tamanho=_tamanho(resposta))
+    return resposta
+
+
+def estatisticas():
+    """dict {host: {'requisicoes', 'erros', 'latencia' (s, soma até os cabeçalhos), 'bytes' (Content-Length)}}."""
+    with _lock:
+        return {host: dict(e) for host, e in _estatisticas.items()}
+
+
+def zerar_estatisticas():
+    with _lock:
+        _estatisticas.clear()
+
+
+def resumo_hosts():
+    """Texto curto para os logs: requisições, erros e latência média por host."""
+    partes = []
+    for host, e in sorted(estatisticas().items()):
+        media = e['latencia'] / e['requisicoes'] * 1000 if e['requisicoes'] else 0.0
+        partes.append(f"{urlparse(host).netloc}: {e['requisicoes']} req, {e['erros']} erros, {media:.0f} ms/req")
+    return "; ".join(partes) or "nenhuma requisição HTTP"
@@ -0,0 +1,197 @@
+"""
+Medição por etapa do orquestrador TJRJ (cloud_main e enrich_tjrj_with_cns).
+
+Um Rastreio agrupa as etapas de uma execução. Cada Etapa registra duração, linhas,
+bytes e chamadas (API do Google Sheets via gsheets_client_utils e requisições HTTP via
+http_utils, pela diferença dos contadores entre a abertura e o fechamento), além de
+atributos livres (ex.: tempo somado dos downloads). Ao fechar, a etapa vira uma linha
+JSON em METRICAS_ARQUIVO; resumo() dá o texto curto gravado no 'Log Execucoes'.
+
+Uso:
+    rastreio = instrumentacao_utils.Rastreio('cloud_main', run_id)
+    with rastreio.etapa('links') as etapa:
+        links = descobrir_links()
+        etapa.registrar(linhas=len(links))
+    rastreio.fechar()
+"""
+import os
+import json
+import time
+import datetime
+import threading
+
+import gsheets_client_utils
+import http_utils
+
+METRICAS_ARQUIVO = os.environ.get('TJRJ_METRICAS_ARQUIVO', os.path.join(os.getcwd(), 'metricas_tjrj.jsonl'))
+
+_lock = threading.Lock()
+_abertas = []  # Etapas abertas (a última recebe os valores de acumular)
+
+
+def _contadores():
+    hosts = http_utils.estatisticas().values()
+    return {
+        'chamadas_sheets': gsheets_client_utils.contar_chamadas()['total'],
+        'requisicoes_http': sum(e['requisicoes'] for e in hosts),
+        'bytes': sum(e.get('bytes', 0) for e in hosts),
+    }
+
+
+def acumular(chave, valor):
+    """
+    Soma `valor` ao atributo `chave` da etapa aberta mais recente (sem etapa aberta, não faz
+    nada). Pode ser chamada de threads (ex.: tempo de cada download do pool).
+    """
+    with _lock:
+        if _abertas:
+            atributos = _abertas[-1].atributos
+            atributos[chave] = atributos.get(chave, 0) + valor
+
+
+class Etapa:
+    """Uma etapa medida; use como context manager ou feche com fechar()."""
+
+    def __init__(self, rastreio, nome, **atributos):
+        self.rastreio = rastreio
+        self.nome = nome
+        self.inicio = datetime.datetime.now().isoformat(timespec='seconds')
+        self.duracao = None
+        self.linhas = 0
+        self.bytes = 0
+        self.status = None
+        self.atributos = dict(atributos)
+        self._base = _contadores()
+        self._t0 = time.perf_counter()
+        with _lock:
+            _abertas.append(self)
+
+    def registrar(self, linhas=None, bytes=None, **atributos):
+        """Soma linhas/bytes processados pela etapa e define atributos (ex.: arquivos=12)."""
+        if linhas is not None:
+            self.linhas += int(linhas)
+        if bytes is not None:
+            self.bytes += int(bytes)
+        self.atributos.update(atributos)
+        return self
+
+    def fechar(self, status='ok'):
+        """Encerra a medição e grava a linha JSON (chamadas repetidas são ignoradas)."""
+        if self.duracao is not None:
+            return self
+        self.duracao = time.perf_counter() - self._t0
+        self.status = status
+        with _lock:
+            if self in _abertas:
+                _abertas.remove(self)
+        fim = _contadores()
+        self.chamadas_sheets = fim['chamadas_sheets'] - self._base['chamadas_sheets']
+        self.requisicoes_http = fim['requisicoes_http'] - self._base['requisicoes_http']
+        self.bytes += fim['bytes'] - self._base['bytes']
+        self.rastreio._gravar(self.como_dict())
+        return self
+
+    def como_dict(self):
+        return {
+            'run_id': self.rastreio.run_id,
+            'processo': self.rastreio.processo,
+            'etapa': self.nome,
+            'inicio': self.inicio,
+            'duracao_s': round(self.duracao or 0.0, 3),
+            'linhas': self.linhas,
+            'bytes': self.bytes,
+            'chamadas_sheets': getattr(self, 'chamadas_sheets', 0),
+            'requisicoes_http': getattr(self, 'requisicoes_http', 0),
+            'status': self.status,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.atributos.items()},
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        self.fechar('erro' if tipo else 'ok')
+        return False
+
+
+class Rastreio:
+    """
+    Etapas de uma execução de `processo`.
+
+    Args:
+        processo: Nome do processo ('cloud_main', 'enrich_tjrj_with_cns')
+        run_id: Id da execução (padrão: data/hora de início, como em execucao_tjrj_utils)
+        arquivo: Arquivo JSON lines (padrão: METRICAS_ARQUIVO; '' desliga a gravação)
+    """
+
+    def __init__(self, processo, run_id=None, arquivo=None):
+        self.processo = processo
+        self.run_id = run_id or datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.arquivo = METRICAS_ARQUIVO if arquivo is None else arquivo
+        self.etapas = []
+        self.fechado = False
+        self._t0 = time.perf_counter()
+
+    def etapa(self, nome, **atributos):
+        """Abre uma etapa (já medindo)."""
+        etapa = Etapa(self, nome, **atributos)
+        self.etapas.append(etapa)
+        return etapa
+
+    def proxima(self, nome, **atributos):
+        """Fecha a etapa aberta mais recente deste rastreio e abre a seguinte (código linear)."""
+        abertas = [e for e in self.etapas if e.duracao is None]
+        if abertas:
+            abertas[-1].fechar()
+        return self.etapa(nome, **atributos)
+
+    def fechar(self, status='ok'):
+        """Fecha as etapas abertas e grava a linha 'total' da execução (só na primeira chamada)."""
+        if self.fechado:
+            return
+        self.fechado = True
+        for etapa in reversed(self.etapas):
+            etapa.fechar(status)
+        fechadas = [e.como_dict() for e in self.etapas]
+        self._gravar({
+            'run_id': self.run_id, 'processo': self.processo, 'etapa': 'total',
+            'duracao_s': round(time.perf_counter() - self._t0, 3),
+            'linhas': None, 'bytes': sum(e['bytes'] for e in fechadas),
+            'chamadas_sheets': sum(e['chamadas_sheets'] for e in fechadas),
+            'requisicoes_http': sum(e['requisicoes_http'] for e in fechadas),
+            'status': status,
+        })
+
+    def _gravar(self, registro):
+        if not self.arquivo:
+            return
+        try:
+            with _lock, open(self.arquivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[METRICAS] Falha ao gravar {self.arquivo}: {e}")
+
+    def resumo(self):
+        """
+        Texto curto por etapa para o 'Log Execucoes'.
+
+        Ex.: "links 1.2s 14 lin 2 req; pdfs 45.0s (download 30.1s, extracao 80.4s) 4320 lin 18.3 MB 13 req"
+        """
+        partes = []
+        for etapa in self.etapas:
+            texto = f"{etapa.nome} {etapa.duracao or time.perf_counter() - etapa._t0:.1f}s"
+            tempos = [f"{k[:-2]} {v:.1f}s" for k, v in etapa.atributos.items() if k.endswith('_s')]
+            if tempos:
+                texto += f" ({', '.join(tempos)})"
+            if etapa.linhas:
+                texto += f" {etapa.linhas} lin"
+            if etapa.bytes:
+                texto += f" {etapa.bytes / 1024 ** 2:.1f} MB"
+            if getattr(etapa, 'requisicoes_http', 0):
+                texto += f" {etapa.requisicoes_http} req"
+            if getattr(etapa, 'chamadas_sheets', 0):
+                texto += f" {etapa.chamadas_sheets} api"
+            if etapa.status == 'erro':
+                texto += " ERRO"
+            partes.append(texto)
+        return "; ".join(partes)
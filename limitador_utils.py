@@ -0,0 +1,123 @@
+"""
+Limite de taxa e retentativas para chamadas a APIs externas.
+
+- BaldeTokens: balde de tokens compartilhado entre threads (rajada de até `capacidade`
+  chamadas, depois `taxa` por segundo). LimitadorTaxa é o caso de rajada 1 (início das
+  requisições espaçado em 1/rps), usado no backfill do TJRJ.
+- atraso_backoff: backoff exponencial com jitter ("full jitter"), respeitando o
+  Retry-After do servidor como mínimo.
+- MetricasTaxa: tempo útil (chamadas bem-sucedidas) x tempo perdido com limite de taxa
+  (espera no balde, backoff e chamadas que falharam).
+"""
+import time
+import random
+import threading
+import email.utils
+from collections import Counter
+
+
+class MetricasTaxa:
+    """Acumula tempos (s) e contagens por categoria: 'util', 'espera', 'backoff'."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tempos = Counter()
+        self.contagens = Counter()
+
+    def registrar(self, categoria, segundos):
+        with self._lock:
+            self.tempos[categoria] += segundos
+            self.contagens[categoria] += 1
+
+    def zerar(self):
+        with self._lock:
+            self.tempos.clear()
+            self.contagens.clear()
+
+    def resumo(self):
+        """dict com os tempos úteis e limitados (s) e o nº de esperas e retentativas."""
+        with self._lock:
+            tempos, contagens = dict(self.tempos), dict(self.contagens)
+        return {
+            'tempo_util': tempos.get('util', 0.0),
+            'tempo_limitado': tempos.get('espera', 0.0) + tempos.get('backoff', 0.0),
+            'esperas': contagens.get('espera', 0),
+            'retentativas': contagens.get('backoff', 0),
+        }
+
+
+class BaldeTokens:
+    """
+    Balde de tokens: começa cheio com `capacidade` tokens e repõe `taxa` por segundo.
+    Cada chamada consome um token; sem token disponível, a chamada reserva o próximo e
+    dorme até ele (a ordem de chegada é mantida entre threads).
+    """
+
+    def __init__(self, taxa, capacidade=1.0, metricas=None, relogio=time.monotonic, dormir=time.sleep):
+        self.taxa = float(taxa) if taxa and taxa > 0 else 0.0
+        self.capacidade = max(float(capacidade), 1.0)
+        self.metricas = metricas
+        self._relogio, self._dormir = relogio, dormir
+        self._tokens = self.capacidade
+        self._atualizado = relogio()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Consome um token, esperando se necessário. Returns: segundos de espera."""
+        if not self.taxa:
+            return 0.0
+        with self._lock:
+            agora = self._relogio()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            self._tokens -= 1
+            espera = -self._tokens / self.taxa if self._tokens < 0 else 0.0
+        if espera > 0:
+            self._dormir(espera)
+            if self.metricas is not None:
+                self.metricas.registrar('espera', espera)
+        return espera
+
+    def __call__(self):
+        return self.adquirir()
+
+
+class LimitadorTaxa(BaldeTokens):
+    """Limita o início das requisições a `rps` por segundo (compartilhado entre threads)."""
+
+    def __init__(self, rps, metricas=None):
+        super().__init__(rps, capacidade=1.0, metricas=metricas)
+
+
+def balde_por_minuto(cota, metricas=None):
+    """
+    Balde para uma cota por minuto: rajada de 10% da cota e o restante distribuído ao
+    longo do minuto, de modo que nenhuma janela de 60 s ultrapasse a cota.
+    """
+    return BaldeTokens(cota * 0.9 / 60.0, capacidade=max(cota * 0.1, 1.0), metricas=metricas)
+
+
+def ler_retry_after(valor):
+    """Cabeçalho Retry-After (segundos ou data HTTP) -> segundos, ou None."""
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        data = email.utils.parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(data.timestamp() - time.time(), 0.0)
+
+
+def atraso_backoff(tentativa, base=1.0, teto=64.0, retry_after=None, aleatorio=random.random):
+    """
+    Atraso antes da retentativa nº `tentativa` (0 = primeira): sorteado entre 0 e
+    min(teto, base * 2^tentativa); o Retry-After, se houver, é o mínimo.
+    """
+    atraso = aleatorio() * min(teto, base * 2 ** tentativa)
+    if retry_after is not None:
+        atraso = max(atraso, retry_after)
+    return atraso
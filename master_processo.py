@@ -6,14 +6,19 @@ import os
 import re
 import time
 import datetime
-import requests
+import http_utils
 from urllib.parse import urljoin, urlparse
 from datetime import date
-from unicodedata import normalize
 
 import pdfplumber
 import pandas as pd
 
+import pdf_cache_utils
+import pdf_stream_utils
+import agregacao_tjrj_utils
+from municipios_utils import separar_cidade_designacao
+from moeda_utils import extrair_valores_brl as extrair_valores
+
 # ============================================================
 # CONFIGURAÇÕES GLOBAIS (unificadas)
 # ============================================================
@@ -52,7 +57,7 @@ def log_error_baixador(msg: str):
 def safe_get(url):
     """Baixa HTML sem exibir erros no console (requests)."""
     try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+        r = http_utils.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
         r.raise_for_status()
         return r.text
     except Exception as e:
@@ -103,35 +108,46 @@ def extrair_mes_ano(url):
     return (mes, ano) if mes and ano else (None, None)
 
 def download_stream(url, dest):
-    """Download robusto com retries — erros só no log."""
+    """Download robusto com retries — erros só no log.
+
+    O PDF é guardado no cache compartilhado (pdf_cache_utils) e exportado para `dest`;
+    se o servidor responder 304, a cópia do cache é reaproveitada sem novo download.
+    """
+    tmp = dest + ".part"
     for attempt in range(1, RETRIES + 1):
         try:
-            with requests.Session() as s:
-                r = s.get(
-                    url,
-                    headers={"User-Agent": "Mozilla/5.0"},
-                    stream=True,
-                    timeout=(TIMEOUT_CONNECT, TIMEOUT_READ)
-                )
+            headers = {"User-Agent": "Mozilla/5.0"}
+            headers.update(pdf_cache_utils.cabecalhos_condicionais(url))
+
+            # Conexão reaproveitada do pool do host (http_utils); o `with` a devolve ao pool
+            with http_utils.get(
+                url,
+                headers=headers,
+                stream=True,
+                timeout=(TIMEOUT_CONNECT, TIMEOUT_READ)
+            ) as r:
+                if r.status_code == 304 and pdf_cache_utils.exportar_pdf(url, dest):
+                    print(f"[CACHE] {os.path.basename(dest)}")
+                    return True
+                if r.status_code == 304:
+                    pdf_cache_utils.remover(url)
+                    raise Exception("304 sem cópia no cache")
                 r.raise_for_status()
 
-                with open(dest, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-
-            if os.path.getsize(dest) < MIN_PDF_BYTES:
-                raise Exception("Arquivo muito pequeno")
+                # Assinatura %PDF conferida no primeiro bloco: páginas de erro são abortadas na hora
+                pdf_stream_utils.gravar_resposta_pdf(r, tmp, MIN_PDF_BYTES)
 
-            with open(dest, "rb") as f:
-                if b"%PDF" not in f.read(10):
-                    raise Exception("Assinatura PDF inválida")
+            pdf_cache_utils.guardar_pdf_arquivo(url, tmp, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            if not pdf_cache_utils.exportar_pdf(url, dest):
+                raise Exception("Falha ao exportar do cache")
 
             print(f"[OK] {os.path.basename(dest)}")
             return True
 
         except Exception as e:
             log_error_baixador(f"[DOWNLOAD ERRO {attempt}/{RETRIES}] {url} — {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
             time.sleep(1 + attempt * 2)
 
     log_error_baixador(f"[FALHA] {url}")
@@ -207,12 +223,7 @@ def microsservico_download():
         nome_arquivo_local = f"{ano} {mes:02d}.pdf"
         caminho_local = os.path.join(OUTDIR, nome_arquivo_local)
 
-        if os.path.exists(caminho_local):
-            print(f"[JA EXISTE] {nome_arquivo_local}")
-            meses_baixados.add(chave)
-            baixados_contador += 1
-            continue
-
+        # Sem atalho por arquivo existente: o download é condicional (304 reaproveita o cache)
         print(f"[Baixando] {nome_arquivo_local}...", end=" ", flush=True)
         if download_stream(url, caminho_local):
             print("Sucesso.")
@@ -226,6 +237,7 @@ def microsservico_download():
     else:
         print("\n[AVISO] Nenhum arquivo baixado ou encontrado. Verifique a conexão ou logs.")
 
+    print(f"[HTTP] {http_utils.resumo_hosts()}")
     print("="*70)
     return baixados_contador
 
@@ -248,67 +260,6 @@ COLUNAS_BRUTAS = [
 COLS_NUMERICAS = ['RCPJ', 'RCPN', 'IT', 'RI', 'RTD', 'Notas', 'Protesto', 
                   'Emolumentos', 'Funarpem', 'Gratuitos', 'Total']
 
-MUNICIPIOS_RJ = [
-    "ANGRA DOS REIS", "APERIBE", "ARARUAMA", "AREAL", "ARMACAO DOS BUZIOS",
-    "ARRAIAL DO CABO", "BARRA DO PIRAI", "BARRA MANSA", "BELFORD ROXO", "BOM JARDIM",
-    "BOM JESUS DO ITABAPOANA", "CABO FRIO", "CACHOEIRAS DE MACACU", "CAMBUCI", "CAMPOS DOS GOYTACAZES",
-    "CANTAGALO", "CARAPEBUS", "CARDOSO MOREIRA", "CARMO", "CASIMIRO DE ABREU", "COMENDADOR LEVY GASPARIAN",
-    "CONCEICAO DE MACABU", "CORDEIRO", "DUAS BARRAS", "DUQUE DE CAXIAS",
-    "ENGENHEIRO PAULO DE FRONTIN", "GUAPIMIRIM", "IGUABA GRANDE", "ITABORAI", "ITAGUAI",
-    "ITALVA", "ITAOCARA", "ITAPERUNA", "ITATIAIA", "JAPERI", "LAJE DO MURIAE", "MACAE",
-    "MACUCO", "MAGE", "MANGARATIBA", "MARICA", "MENDES", "MESQUITA", "MIGUEL PEREIRA",
-    "MIRACEMA", "NATIVIDADE", "NILOPOLIS", "NITEROI", "NOVA FRIBURGO", "NOVA IGUACU",
-    "PARACAMBI", "PARAIBA DO SUL", "PARATY", "PATY DO ALFERES", "PETROPOLIS",
-    "PINHEIRAL", "PIRAI", "PORCIUNCULA", "PORTO REAL", "QUATIS", "QUEIMADOS", "QUISSAMA",
-    "RESENDE", "RIO BONITO", "RIO CLARO", "RIO DAS FLORES", "RIO DAS OSTRAS", "RIO DE JANEIRO",
-    "SANTA MARIA MADALENA", "SANTO ANTONIO DE PADUA", "SAO FIDELIS",
-    "SAO FRANCISCO DE ITABAPOANA", "SAO GONCALO",
-    "SAO JOAO DA BARRA", "SAO JOAO DE MERITI",
-    "SAO JOSE DE UBA", "SAO JOSE DO VALE DO RIO PRETO",
-    "SAO PEDRO DA ALDEIA", "SAO SEBASTIAO DO ALTO",
-    "SAPUCAIA", "SAQUAREMA", "SEROPEDICA", "SILVA JARDIM", "SUMIDOURO", "TANGUA",
-    "TERESOPOLIS", "TRAJANO DE MORAES", "TRES RIOS", "VALENCA",
-    "VARRE-SAI", "VASSOURAS", "VOLTA REDONDA", "CAPITAL"
-]
-
-def normalizar_para_match(texto):
-    if not texto: return ""
-    return normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
-
-def extrair_valores(linha):
-    valores_str = re.findall(r'[\d\.]+\,\d{2}', linha)
-    valores_float = []
-    for v in valores_str:
-        v_limpo = v.replace('.', '').replace(',', '.')
-        try:
-            valores_float.append(float(v_limpo))
-        except ValueError:
-            pass
-    return valores_float
-
-def separar_cidade_designacao(texto_completo):
-    if not texto_completo: return "", ""
-    texto_norm = normalizar_para_match(texto_completo)
-    municipios_ordenados = sorted(MUNICIPIOS_RJ, key=len, reverse=True)
-    
-    for municipio in municipios_ordenados:
-        if texto_norm.startswith(municipio):
-            designacao = texto_norm[len(municipio):].strip()
-            if designacao.startswith("-"): designacao = designacao[1:].strip()
-            return municipio, designacao
-    return "OUTRA/VERIFICAR", texto_completo
-
-def eh_distrito_valido(designacao):
-    if not isinstance(designacao, str): return False
-    texto = designacao.upper()
-    if "DISTR" not in texto: return False
-    match = re.search(r'(\d+).*?DISTR', texto)
-    if match:
-        try:
-            return int(match.group(1)) >= 2
-        except: return False
-    return False
-
 def processar_pdfs():
     """Função principal que processa os PDFs e gera as planilhas de análise."""
     inicio_total = time.time()
@@ -491,29 +442,11 @@ def processar_pdfs():
 
         df_brutos.sort_values(by=['cidade', 'designacao', 'ano', 'mes'], inplace=True)
 
-        # ANALISE 12 MESES (Média por Cartório)
-        df_analise = df_brutos.groupby(['cod', 'cidade', 'designacao'], as_index=False).agg({
-            'RCPJ': 'mean', 'RCPN': 'mean', 'IT': 'mean', 'RI': 'mean', 'RTD': 'mean', 
-            'Notas': 'mean', 'Protesto': 'mean', 'Emolumentos': 'mean', 'Funarpem': 'mean', 
-            'Gratuitos': 'mean', 'Total': 'mean', 'gestor': 'last', 'cargo': 'last'
-        })
-        
-        # DISTRITOS (Filtro)
-        df_distritos = df_analise[df_analise['designacao'].apply(eh_distrito_valido)].copy()
-        
-        # ANALISE POR CIDADE
-        df_cidades_media = df_analise.groupby('cidade', as_index=False)['Total'].sum()
-        df_cidades_media.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
-
-        df_cidades_acum = df_brutos.groupby('cidade', as_index=False)['Total'].sum()
-        df_cidades_acum.rename(columns={'Total': 'Faturamento Acumulado Bruto (R$)'}, inplace=True)
-        
-        df_cidades_cont = df_analise.groupby('cidade').size().reset_index(name='Numero de Servicos Unicos')
-        df_cidades_reg = df_brutos.groupby('cidade').size().reset_index(name='Total de Registros Mensais')
+        # ANALISE 12 MESES, DISTRITOS e CIDADES (uma passada agrupada)
+        df_analise, eh_distrito, df_cidades = agregacao_tjrj_utils.agregar(df_brutos)
+        df_distritos = df_analise[eh_distrito].copy()
 
-        df_cidades = pd.merge(df_cidades_media, df_cidades_acum, on='cidade', how='left')
-        df_cidades = pd.merge(df_cidades, df_cidades_cont, on='cidade', how='left')
-        df_cidades = pd.merge(df_cidades, df_cidades_reg, on='cidade', how='left')
+        df_cidades = df_cidades.rename(columns={'Qtd Cartorios': 'Numero de Servicos Unicos'})
         df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False, inplace=True)
         
         # GERAÇÃO DO ARQUIVO FINAL
@@ -0,0 +1,118 @@
+"""
+Conversão de valores em Real (BRL) para float.
+
+Um único lugar para o formato brasileiro (ponto de milhar, vírgula decimal):
+- extrair_valores_brl: valores de uma linha de texto do relatório do TJRJ
+- converter_brl: colunas inteiras (Series/listas) vindas do Google Sheets, numa
+  única passada vetorizada (pyarrow.compute) em vez de .apply célula a célula
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None  # Sem pyarrow a conversão usa os métodos .str do pandas
+
+RE_VALOR_BRL = re.compile(r'[\d\.]+\,\d{2}')
+# Sinal separado do número depois de remover o "R$" ("-R$ 10,00" -> "- 10,00")
+_PADRAO_SINAL = r'^([-+])\s+'
+_RE_SINAL = re.compile(_PADRAO_SINAL)
+_PADRAO_NUMERO = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+_TABELA_BRL = str.maketrans({'.': None, ',': '.'})
+
+
+def brl_para_float(texto):
+    """
+    Converte um valor BRL ("1.234,56", "R$ -1.234,56") para float.
+
+    Returns:
+        float ou None se o texto não for um número
+    """
+    limpo = _RE_SINAL.sub(r'\1', texto.replace('R$', '').strip()).translate(_TABELA_BRL)
+    try:
+        return float(limpo)
+    except ValueError:
+        return None
+
+
+def extrair_valores_brl(linha):
+    """Extrai os valores BRL (ponto como milhar, vírgula como decimal) de uma linha de texto."""
+    # O regex só aceita dígitos e pontos antes da vírgula: a conversão nunca falha
+    return [float(v.translate(_TABELA_BRL)) for v in RE_VALOR_BRL.findall(linha)]
+
+
+def converter_brl(valores, vazio=0.0, invalido=0.0):
+    """
+    Converte uma coluna de valores BRL para float64 de uma vez.
+
+    Textos como "1.234,56", "R$ -1.234,56" e "-0,50" viram números; o ponto é sempre
+    separador de milhar. Valores que já são números (ex.: get_all_records) são mantidos.
+
+    Args:
+        valores: Series, lista ou array
+        vazio: Valor para textos em branco ("", "  ")
+        invalido: Valor para textos que não são números ("N/A", "-")
+
+    Returns:
+        pandas.Series float64 (mesmo índice da entrada; ausentes continuam NaN)
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return serie.astype('float64')
+
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo in ('string', 'empty'):
+        return pd.Series(_converter_textos(serie, vazio, invalido), index=serie.index, dtype='float64')
+
+    # Coluna mista: só os textos passam pela conversão BRL
+    eh_texto = serie.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    saida = pd.to_numeric(serie.where(~eh_texto), errors='coerce').to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    if eh_texto.any():
+        saida[eh_texto] = _converter_textos(serie[eh_texto], vazio, invalido)
+    return pd.Series(saida, index=serie.index, dtype='float64')
+
+
+def _converter_textos(serie, vazio, invalido):
+    """Converte uma Series só de textos (e ausentes) num array float64."""
+    if pa is None:
+        return _converter_textos_pandas(serie, vazio, invalido)
+
+    textos = pa.array(serie, type=pa.string(), from_pandas=True)
+    ausente = textos.is_null()
+    limpos = pc.utf8_trim_whitespace(pc.replace_substring(textos, 'R$', ''))
+    limpos = pc.replace_substring(pc.replace_substring(limpos, '.', ''), ',', '.')
+    em_branco = pc.equal(limpos, '')
+    limpos = pc.if_else(em_branco, pa.scalar(None, pa.string()), limpos)
+    try:
+        numeros = pc.cast(limpos, pa.float64())
+    except pa.ArrowInvalid:
+        # Algum texto fora do formato simples: junta o sinal ao número, anula os inválidos
+        # e converte o restante
+        if pc.any(pc.match_substring(limpos, ' ')).as_py():
+            limpos = pc.replace_substring_regex(limpos, _PADRAO_SINAL, r'\1')
+        valido = pc.match_substring_regex(limpos, _PADRAO_NUMERO)
+        numeros = pc.cast(pc.if_else(valido, limpos, pa.scalar(None, pa.string())), pa.float64())
+
+    saida = numeros.to_numpy(zero_copy_only=False).astype('float64', copy=True)
+    em_branco = pc.fill_null(em_branco, False).to_numpy(zero_copy_only=False)
+    invalidos = np.isnan(saida) & ~em_branco & ~ausente.to_numpy(zero_copy_only=False)
+    saida[em_branco] = vazio
+    saida[invalidos] = invalido
+    return saida
+
+
+def _converter_textos_pandas(serie, vazio, invalido):
+    textos = serie.astype(object)
+    ausente = textos.isna().to_numpy()
+    limpos = (textos.str.replace('R$', '', regex=False).str.strip().str.replace(_PADRAO_SINAL, r'\1', regex=True)
+              .str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    em_branco = (limpos == '').to_numpy()
+    saida = pd.to_numeric(limpos.where(~em_branco), errors='coerce').to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    invalidos = np.isnan(saida) & ~em_branco & ~ausente
+    saida[em_branco] = vazio
+    saida[invalidos] = invalido
+    return saida
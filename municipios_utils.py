@@ -0,0 +1,110 @@
+"""
+Municípios do RJ e separação "cidade + designação" do nome dos serviços do TJRJ.
+
+Compartilhado por extrai_transp_tjrj.py, extrator.py e master_processo.py.
+A lista de municípios é compilada uma única vez numa regex em forma de trie
+(prefixos comuns fatorados), que encontra o maior município no início do texto
+numa só busca.
+"""
+import re
+from functools import lru_cache
+from unicodedata import normalize
+
+# Lista de Municipios (100% ASCII - SEM ACENTOS)
+MUNICIPIOS_RJ = [
+    "ANGRA DOS REIS", "APERIBE", "ARARUAMA", "AREAL", "ARMACAO DOS BUZIOS",
+    "ARRAIAL DO CABO", "BARRA DO PIRAI", "BARRA MANSA", "BELFORD ROXO", "BOM JARDIM",
+    "BOM JESUS DO ITABAPOANA", "CABO FRIO", "CACHOEIRAS DE MACACU", "CAMBUCI", "CAMPOS DOS GOYTACAZES",
+    "CANTAGALO", "CARAPEBUS", "CARDOSO MOREIRA", "CARMO", "CASIMIRO DE ABREU", "COMENDADOR LEVY GASPARIAN",
+    "CONCEICAO DE MACABU", "CORDEIRO", "DUAS BARRAS", "DUQUE DE CAXIAS",
+    "ENGENHEIRO PAULO DE FRONTIN", "GUAPIMIRIM", "IGUABA GRANDE", "ITABORAI", "ITAGUAI",
+    "ITALVA", "ITAOCARA", "ITAPERUNA", "ITATIAIA", "JAPERI", "LAJE DO MURIAE", "MACAE",
+    "MACUCO", "MAGE", "MANGARATIBA", "MARICA", "MENDES", "MESQUITA", "MIGUEL PEREIRA",
+    "MIRACEMA", "NATIVIDADE", "NILOPOLIS", "NITEROI", "NOVA FRIBURGO", "NOVA IGUACU",
+    "PARACAMBI", "PARAIBA DO SUL", "PARATY", "PATY DO ALFERES", "PETROPOLIS",
+    "PINHEIRAL", "PIRAI", "PORCIUNCULA", "PORTO REAL", "QUATIS", "QUEIMADOS", "QUISSAMA",
+    "RESENDE", "RIO BONITO", "RIO CLARO", "RIO DAS FLORES", "RIO DAS OSTRAS", "RIO DE JANEIRO",
+    "SANTA MARIA MADALENA", "SANTO ANTONIO DE PADUA", "SAO FIDELIS",
+    "SAO FRANCISCO DE ITABAPOANA", "SAO GONCALO",
+    "SAO JOAO DA BARRA", "SAO JOAO DE MERITI",
+    "SAO JOSE DE UBA", "SAO JOSE DO VALE DO RIO PRETO",
+    "SAO PEDRO DA ALDEIA", "SAO SEBASTIAO DO ALTO",
+    "SAPUCAIA", "SAQUAREMA", "SEROPEDICA", "SILVA JARDIM", "SUMIDOURO", "TANGUA",
+    "TERESOPOLIS", "TRAJANO DE MORAES", "TRES RIOS", "VALENCA",
+    "VARRE-SAI", "VASSOURAS", "VOLTA REDONDA", "CAPITAL"
+]
+
+# Nomes usados pelo TJRJ que não são o nome oficial do município
+ALIASES_MUNICIPIOS = {
+    "CAPITAL": "RIO DE JANEIRO",
+}
+
+CIDADE_NAO_IDENTIFICADA = "OUTRA/VERIFICAR"
+
+
+def normalizar_para_match(texto):
+    """Remove acentos e converte para maiúsculas para comparação."""
+    if not texto: return ""
+    return normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').upper().strip()
+
+
+def _regex_trie(palavras):
+    """
+    Monta uma alternação em forma de trie para as palavras.
+
+    Os ramos mais longos vêm antes do fim de palavra (quantificador guloso), então a
+    regex sempre casa o MAIOR prefixo presente na lista.
+    """
+    trie = {}
+    for palavra in palavras:
+        no = trie
+        for letra in palavra:
+            no = no.setdefault(letra, {})
+        no[''] = {}
+
+    def montar(no):
+        termina = '' in no
+        ramos = [re.escape(letra) + montar(filho) for letra, filho in sorted(no.items()) if letra]
+        if not ramos:
+            return ''
+        corpo = ramos[0] if len(ramos) == 1 else '(?:' + '|'.join(ramos) + ')'
+        if termina:
+            return '(?:' + corpo + ')?' if len(ramos) == 1 else corpo + '?'
+        return corpo
+
+    return montar(trie)
+
+
+RE_MUNICIPIO = re.compile(_regex_trie(MUNICIPIOS_RJ))
+
+
+def resolver_alias(cidade):
+    """Converte o nome usado pelo TJRJ no nome oficial (ex.: CAPITAL → RIO DE JANEIRO)."""
+    return ALIASES_MUNICIPIOS.get(cidade, cidade)
+
+
+@lru_cache(maxsize=16384)
+def separar_cidade_designacao(texto_completo, resolver_aliases=False):
+    """
+    Separa o nome do município da designação do cartório.
+
+    Args:
+        texto_completo: Nome do serviço como aparece no relatório (ex: 'NITEROI 1 OFICIO')
+        resolver_aliases: Se True, devolve o nome oficial do município (CAPITAL → RIO DE JANEIRO)
+
+    Returns:
+        tuple: (cidade, designacao). Sem município reconhecido: ('OUTRA/VERIFICAR', texto_completo)
+    """
+    if not texto_completo: return "", ""
+    texto_norm = normalizar_para_match(texto_completo)
+
+    match = RE_MUNICIPIO.match(texto_norm)
+    if not match:
+        return CIDADE_NAO_IDENTIFICADA, texto_completo
+
+    municipio = match.group()
+    designacao = texto_norm[len(municipio):].strip()
+    if designacao.startswith("-"): designacao = designacao[1:].strip()
+    if resolver_aliases:
+        municipio = resolver_alias(municipio)
+    return municipio, designacao
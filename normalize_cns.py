@@ -1,11 +1,10 @@
-import gspread
-import toml
+import gsheets_client_utils
 import time
 
 print("=== Normalizando CNS em Lista de Serventias ===\n")
 
 # Conecta
-gc = gspread.service_account_from_dict(toml.load('.streamlit/secrets.toml')['gcp_service_account'])
+gc = gsheets_client_utils.obter_cliente()
 sh = gc.open_by_key('1Cx_ceynq_Y_pFKRUtFyHkLEJIvBvlWFjGo5LuOAvW-Y')
 ws = sh.worksheet('Lista de Serventias')
 
@@ -9,12 +9,12 @@ from datetime import datetime, timedelta
 import sys
 import os
 import gspread
-from google.oauth2.service_account import Credentials
 
 # Adiciona o diretório pai ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from cnj_api import CNJClient
+import gsheets_client_utils
 import auth_utils # Módulo de autenticação
 
 # ============================================================================
@@ -55,33 +55,7 @@ ESTADOS_BRASIL = [
 
 def autenticar_google_sheets():
     """Autentica com Google Sheets usando st.secrets"""
-    scope = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
-    
-    # Prepara credenciais (suporte a st.secrets e env var)
-    creds_dict = None
-    if "gcp_service_account" in st.secrets:
-        # Converte AttrDict para dict normal para ser mutável
-        creds_dict = dict(st.secrets["gcp_service_account"])
-    elif "GCP_SERVICE_ACCOUNT" in os.environ:
-        import json
-        creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-    
-    if creds_dict:
-        # Correção de chave privada (comum erro de \n escapado)
-        if "private_key" in creds_dict:
-            creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-
-        credentials = Credentials.from_service_account_info(
-            creds_dict,
-            scopes=scope
-        )
-        return gspread.authorize(credentials)
-    else:
-        # Fallback para default (local com gcloud auth)
-        return gspread.service_account()
+    return gsheets_client_utils.obter_cliente()
 
 def salvar_em_sheets(df):
     """
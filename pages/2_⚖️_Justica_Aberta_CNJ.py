@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import gspread
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
@@ -8,6 +7,9 @@ import os
 import subprocess
 import sys
 import time
+import moeda_utils
+import esquema_utils
+import gsheets_client_utils
 
 # Configuração da página
 st.set_page_config(page_title="Justiça Aberta CNJ", page_icon="⚖️", layout="wide")
@@ -167,11 +169,7 @@ with st.sidebar:
                     
                     # Conecta ao Google Sheets
                     with st.spinner("Conectando ao Google Sheets..."):
-                        import toml
-                        secrets = toml.load(".streamlit/secrets.toml")
-                        creds_dict = secrets["gcp_service_account"]
-                        gc = gspread.service_account_from_dict(creds_dict)
-                        sh = gc.open_by_key(NEW_SHEET_ID)
+                        sh = gsheets_client_utils.abrir_planilha(NEW_SHEET_ID)
                     
                     # Atualiza aba
                     with st.spinner("Enviando dados para 'Lista de Serventias'..."):
@@ -252,7 +250,7 @@ def carregar_dados():
                     df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
             
             print(f"✅ Dados carregados do Supabase: {len(df)} registros")
-            return df
+            return esquema_utils.compactar(df, esquema_utils.ESQUEMA_CNJ, rotulo="Arrecadacao (Supabase)")
             
     except Exception as e:
         print(f"ℹ️ Usando Google Sheets (Supabase: {e})")
@@ -260,18 +258,7 @@ def carregar_dados():
 
     # 2. Fallback: Google Sheets (Lento)
     try:
-        import toml
-        # Tenta carregar credenciais
-        if os.path.exists(".streamlit/secrets.toml"):
-             secrets = toml.load(".streamlit/secrets.toml")
-             creds_dict = secrets["gcp_service_account"]
-        else:
-             # Tenta via env var se não tiver toml
-             import json
-             creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-             
-        gc = gspread.service_account_from_dict(creds_dict)
-        sh = gc.open_by_key(NEW_SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(NEW_SHEET_ID)
         
         # Tenta abas agregadas primeiro (Agregado_Total não serve para analise detalhada, mas ok)
         # Na verdade, precisamos da base cheia para os filtros. 
@@ -284,7 +271,7 @@ def carregar_dados():
             
         data = ws.get_all_records()
         df = pd.DataFrame(data)
-        return df
+        return esquema_utils.compactar(df, esquema_utils.ESQUEMA_CNJ, rotulo="Arrecadacao (Sheets)")
     except Exception as e:
         st.error(f"❌ Erro crítico ao carregar dados: {e}")
         return pd.DataFrame()
@@ -298,9 +285,8 @@ def processar_dados(df):
     numeric_cols = ['Quantidade de atos praticados', 'Valor arrecadação', 'Valor custeio', 'Valor repasse']
     for col in numeric_cols:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
-            # Normaliza valores negativos para positivos (abs)
-            df[col] = df[col].abs()
+            # Vazios e textos inválidos viram NaN; normaliza valores negativos para positivos (abs)
+            df[col] = moeda_utils.converter_brl(df[col], vazio=float('nan'), invalido=float('nan')).abs()
     
     # Processa data final período
     # Tenta encontrar a coluna de data (pode ter nomes diferentes)
@@ -339,7 +325,8 @@ def processar_dados(df):
             axis=1
         ).round(4)
     
-    return df
+    # Semestre/Ano recém-criados e valores reconvertidos: compacta de novo
+    return esquema_utils.compactar(df, esquema_utils.ESQUEMA_CNJ)
 
 # ============================================================================
 # INTERFACE
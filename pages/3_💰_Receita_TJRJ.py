@@ -12,6 +12,8 @@ import gspread
 import plotly.express as px
 import plotly.graph_objects as go
 import extrai_transp_tjrj
+import moeda_utils
+import esquema_utils
 import traceback
 import base64
 import sys
@@ -25,6 +27,7 @@ importlib.reload(extrai_transp_tjrj)
 
 # Adiciona diretório pai
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import gsheets_client_utils
 import auth_utils # Módulo de autenticação
 
 # ============================================================================
@@ -155,36 +158,43 @@ def format_br_currency(val):
     """Formata valor para padrão brasileiro (R$ 1.234,56)"""
     return f"R$ {val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def clean_currency(x):
-    """Converte string brasileira para float (1.234,56 -> 1234.56)"""
-    if not isinstance(x, str): 
-        return x
-    if not x.strip(): 
-        return 0.0
-    clean = x.replace('.', '').replace(',', '.')
-    try:
-        return float(clean)
-    except ValueError:
-        return 0.0
-
 # ============================================================================
 # CARREGAMENTO DE DADOS
 # ============================================================================
+def _preparar_analise(df):
+    """Limpeza da 'Análise 12 Meses' (vinda da aba ou do dataset local)."""
+    df = df.drop_duplicates()
+    
+    # Remove linhas de totalização
+    if 'cidade' in df.columns:
+        df = df[~df['cidade'].astype(str).str.contains('Total', case=False, na=False)]
+    if 'designacao' in df.columns:
+        df = df[~df['designacao'].astype(str).str.contains('Total', case=False, na=False)]
+    
+    # Converte colunas numéricas (1.234,56 -> 1234.56; vazios viram 0.0)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = moeda_utils.converter_brl(df[col])
+    
+    # Substitui "Responsavel pelo Expediente" por "R.E." na coluna cargo
+    if 'cargo' in df.columns:
+        df['cargo'] = df['cargo'].astype(str).str.replace('Responsavel pelo Expediente', 'R.E.', case=False, regex=False)
+        df['cargo'] = df['cargo'].str.replace('Responsável pelo Expediente', 'R.E.', case=False, regex=False)
+    
+    # Tipos compactos: cada sessão do Streamlit guarda a sua cópia do quadro
+    return esquema_utils.compactar(df, esquema_utils.ESQUEMA_TJRJ, rotulo="Análise 12 Meses")
+
 @st.cache_data(ttl=60)  # Cache de 1 minuto para facilitar testes
 def load_data():
-    """Carrega dados da planilha Google Sheets com cache de 10 minutos"""
+    """Carrega a 'Análise 12 Meses' (dataset local ou planilha Google Sheets)"""
     try:
+        # Dataset canônico local (mesma máquina do cloud_main): lido do disco, sem o Sheets
+        df = extrai_transp_tjrj.carregar_analise_local()
+        if df is not None:
+            return _preparar_analise(df)
+        
         # Autenticação robusta (compatível com Cloud e Local)
-        if hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-            gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-        elif "GCP_SERVICE_ACCOUNT" in os.environ:
-            import json
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            gc = gspread.service_account_from_dict(creds_dict)
-        else:
-            gc = gspread.service_account()
-
-        sh = gc.open_by_key(extrai_transp_tjrj.GOOGLE_SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(extrai_transp_tjrj.GOOGLE_SHEET_ID)
         
         try:
             worksheet = sh.worksheet("Análise 12 Meses")
@@ -196,28 +206,7 @@ def load_data():
             # Processa headers e dados
             header = [h.strip() for h in rows[0]]
             data = rows[1:]
-            df = pd.DataFrame(data, columns=header)
-            
-            # Limpeza de dados
-            df = df.drop_duplicates()
-            
-            # Remove linhas de totalização
-            if 'cidade' in df.columns:
-                df = df[~df['cidade'].astype(str).str.contains('Total', case=False, na=False)]
-            if 'designacao' in df.columns:
-                df = df[~df['designacao'].astype(str).str.contains('Total', case=False, na=False)]
-            
-            # Converte colunas numéricas
-            for col in NUMERIC_COLUMNS:
-                if col in df.columns:
-                    df[col] = df[col].apply(clean_currency)
-            
-            # Substitui "Responsavel pelo Expediente" por "R.E." na coluna cargo
-            if 'cargo' in df.columns:
-                df['cargo'] = df['cargo'].astype(str).str.replace('Responsavel pelo Expediente', 'R.E.', case=False, regex=False)
-                df['cargo'] = df['cargo'].str.replace('Responsável pelo Expediente', 'R.E.', case=False, regex=False)
-            
-            return df
+            return _preparar_analise(pd.DataFrame(data, columns=header))
             
         except gspread.exceptions.WorksheetNotFound:
             st.warning("A conexão foi feita, mas as abas de dados ainda não existem. Por favor, faça a atualização inicial.")
@@ -453,16 +442,7 @@ if not df.empty:
 
         try:
             # Carrega Log usando a mesma lógica do load_data
-            if hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-                 gc_log = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-            elif "GCP_SERVICE_ACCOUNT" in os.environ:
-                 import json
-                 creds = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-                 gc_log = gspread.service_account_from_dict(creds)
-            else:
-                 gc_log = gspread.service_account()
-            
-            sh_log = gc_log.open_by_key(extrai_transp_tjrj.GOOGLE_SHEET_ID)
+            sh_log = gsheets_client_utils.abrir_planilha(extrai_transp_tjrj.GOOGLE_SHEET_ID)
             ws_log = sh_log.worksheet("Log Execucoes")
             rows_log = ws_log.get_all_values()
             
@@ -496,7 +476,7 @@ if not df.empty:
             # Agrupa dados
             # 1. Receita Média Total por Cidade (Soma das médias dos cartórios da cidade)
             # 2. Quantidade de Cartórios
-            df_cidades = df.groupby("cidade").agg({
+            df_cidades = df.groupby("cidade", observed=True).agg({
                 col_total_name: 'sum',
                 'cidade': 'count'
             }).rename(columns={'cidade': 'Qtd Cartórios'}).reset_index()
@@ -744,7 +724,7 @@ if not df.empty:
                 
                 if 'cargo' in df_filtered.columns:
                     # Agrupa por cargo
-                    df_cargo = df_filtered.groupby('cargo')[col_total].sum().reset_index()
+                    df_cargo = df_filtered.groupby('cargo', observed=True)[col_total].sum().reset_index()
                     df_cargo = df_cargo[df_cargo[col_total] > 0]
                     
                     if not df_cargo.empty:
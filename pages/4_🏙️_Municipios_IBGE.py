@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 import os
 import sys
 import subprocess
@@ -9,6 +7,7 @@ import subprocess
 # Adiciona o diretório pai ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import auth_utils
+import gsheets_client_utils
 
 # ============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -93,10 +92,7 @@ with st.sidebar:
 def load_data_from_sheets():
     """Carrega dados da planilha"""
     try:
-        scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-        credentials = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scope)
-        gc = gspread.authorize(credentials)
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         ws = sh.worksheet(WORKSHEET_NAME)
         data = ws.get_all_records()
         return pd.DataFrame(data)
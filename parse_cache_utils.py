@@ -0,0 +1,91 @@
+"""
+Cache dos resultados de extração dos PDFs do TJRJ.
+
+As linhas extraídas de cada PDF são salvas em Parquet, indexadas pelo SHA-256 do
+conteúdo + nome do arquivo + versão do parser. Um PDF idêntico ao da última execução
+é resolvido lendo o Parquet, sem abrir o PDF. Ao incrementar a versão do parser, os
+resultados antigos deixam de ser encontrados (e são apagados na próxima gravação).
+"""
+import os
+import shutil
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # Sem pyarrow o cache fica desativado
+
+PARSE_CACHE_DIR = os.environ.get('TJRJ_PARSE_CACHE_DIR', os.path.join(os.getcwd(), 'cache_parse'))
+
+_versoes_limpas = set()
+_lock = threading.Lock()
+
+
+def _dir_versao(versao):
+    return os.path.join(PARSE_CACHE_DIR, f"v{versao}")
+
+
+def _caminho(sha256, nome_arquivo, versao, backend=None):
+    base = os.path.splitext(os.path.basename(nome_arquivo))[0]
+    # Backends de texto diferentes podem gerar linhas diferentes: resultados separados
+    if backend and backend != 'pdfplumber':
+        base = f"{base}_{backend}"
+    return os.path.join(_dir_versao(versao), f"{sha256}_{base}.parquet")
+
+
+def carregar_resultado(sha256, nome_arquivo, versao, backend=None):
+    """
+    Busca as linhas já extraídas de um PDF.
+
+    Args:
+        sha256: Hash do conteúdo do PDF
+        nome_arquivo: Nome lógico do arquivo (ex: '2025_10.pdf')
+        versao: Versão do parser que gerou o resultado
+        backend: Backend de extração de texto (pdf_texto_utils); None = pdfplumber
+
+    Returns:
+        list[dict] com as linhas ou None se não houver resultado em cache
+    """
+    if pa is None:
+        return None
+    caminho = _caminho(sha256, nome_arquivo, versao, backend)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return pq.read_table(caminho).to_pylist()
+    except Exception as e:
+        print(f"[CACHE PARSE] Arquivo inválido {caminho}: {e}")
+        return None
+
+
+def salvar_resultado(sha256, nome_arquivo, versao, linhas, backend=None):
+    """Grava as linhas extraídas de um PDF (gravação atômica)."""
+    if pa is None:
+        return
+    _limpar_versoes_antigas(versao)
+
+    caminho = _caminho(sha256, nome_arquivo, versao, backend)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(pa.Table.from_pylist(linhas), tmp, compression='zstd')
+        os.replace(tmp, caminho)
+    except Exception as e:
+        print(f"[CACHE PARSE] Falha ao gravar {caminho}: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _limpar_versoes_antigas(versao):
+    """Remove os diretórios de versões anteriores do parser (uma vez por processo)."""
+    with _lock:
+        if versao in _versoes_limpas or not os.path.isdir(PARSE_CACHE_DIR):
+            _versoes_limpas.add(versao)
+            return
+        _versoes_limpas.add(versao)
+        atual = os.path.basename(_dir_versao(versao))
+        for nome in os.listdir(PARSE_CACHE_DIR):
+            if nome.startswith('v') and nome != atual:
+                shutil.rmtree(os.path.join(PARSE_CACHE_DIR, nome), ignore_errors=True)
+                print(f"[CACHE PARSE] Resultados da versão {nome} descartados.")
@@ -0,0 +1,256 @@
+"""
+Cache local de PDFs do TJRJ, compartilhado pelos baixadores
+(extrai_transp_tjrj.py, master_processo.py e baixa.py).
+
+Os arquivos são guardados pelo conteúdo (SHA-256) e indexados pela URL de origem,
+junto com ETag/Last-Modified para permitir requisições condicionais (HTTP 304).
+O tamanho total é limitado; os PDFs acessados há mais tempo são removidos primeiro.
+Dentro de limpeza_adiada() a remoção espera o fim do bloco, para não apagar um PDF
+cujo caminho já foi entregue a uma extração ainda na fila.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import contextlib
+
+PDF_CACHE_DIR = os.environ.get('TJRJ_PDF_CACHE_DIR', os.path.join(os.getcwd(), 'cache_pdfs'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('TJRJ_PDF_CACHE_MAX_MB', '500')) * 1024 * 1024
+
+_lock = threading.RLock()
+_adiamentos = 0  # Blocos limpeza_adiada() abertos neste processo
+
+
+def _caminho_indice():
+    return os.path.join(PDF_CACHE_DIR, 'indice.json')
+
+
+def caminho_blob(sha256):
+    """Caminho do PDF armazenado para um hash SHA-256."""
+    return os.path.join(PDF_CACHE_DIR, 'blobs', sha256[:2], f"{sha256}.pdf")
+
+
+def _carregar_indice():
+    try:
+        with open(_caminho_indice(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _salvar_indice(indice):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    tmp = _caminho_indice() + f".{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, _caminho_indice())
+
+
+def _entrada_valida(url):
+    """Retorna a entrada do índice para a URL se o PDF correspondente ainda existir em disco."""
+    entrada = _carregar_indice().get(url)
+    if entrada and os.path.exists(caminho_blob(entrada['sha256'])):
+        return entrada
+    return None
+
+
+def cabecalhos_condicionais(url):
+    """
+    Monta os cabeçalhos de revalidação (If-None-Match / If-Modified-Since) para a URL.
+
+    Returns:
+        dict: Vazio se a URL não estiver no cache.
+    """
+    with _lock:
+        entrada = _entrada_valida(url)
+    if not entrada:
+        return {}
+
+    headers = {}
+    if entrada.get('etag'):
+        headers['If-None-Match'] = entrada['etag']
+    if entrada.get('last_modified'):
+        headers['If-Modified-Since'] = entrada['last_modified']
+    return headers
+
+
+def caminho_pdf(url):
+    """Caminho do PDF em cache para a URL (ou None), marcando o acesso para o LRU."""
+    with _lock:
+        indice = _carregar_indice()
+        entrada = indice.get(url)
+        if not entrada or not os.path.exists(caminho_blob(entrada['sha256'])):
+            return None
+        entrada['ultimo_acesso'] = time.time()
+        _salvar_indice(indice)
+        return caminho_blob(entrada['sha256'])
+
+
+def ler_pdf(url):
+    """Lê os bytes do PDF em cache para a URL (ou None se não houver)."""
+    caminho = caminho_pdf(url)
+    if not caminho:
+        return None
+    try:
+        with open(caminho, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _registrar(url, sha256, tamanho, etag, last_modified):
+    with _lock:
+        indice = _carregar_indice()
+        indice[url] = {
+            'sha256': sha256,
+            'tamanho': tamanho,
+            'etag': etag,
+            'last_modified': last_modified,
+            'baixado_em': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ultimo_acesso': time.time(),
+        }
+        _salvar_indice(indice)
+        if not _adiamentos:
+            limpar_cache(manter=sha256)
+
+
+@contextlib.contextmanager
+def limpeza_adiada():
+    """
+    Adia a remoção LRU até o fim do bloco (o cache pode passar do limite enquanto isso).
+
+    Use em volta de um lote de downloads cujos caminhos ainda serão lidos depois
+    (ex.: pipeline download -> extração): a limpeza roda uma vez, ao sair do último
+    bloco aberto, quando nenhum desses caminhos está mais em uso.
+    """
+    global _adiamentos
+    with _lock:
+        _adiamentos += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _adiamentos -= 1
+            if not _adiamentos:
+                limpar_cache()
+
+
+def guardar_pdf(url, conteudo, etag=None, last_modified=None):
+    """
+    Guarda os bytes de um PDF no cache e associa à URL.
+
+    Returns:
+        str: SHA-256 do conteúdo
+    """
+    sha256 = hashlib.sha256(conteudo).hexdigest()
+    destino = caminho_blob(sha256)
+    if not os.path.exists(destino):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(conteudo)
+        os.replace(tmp, destino)
+
+    _registrar(url, sha256, len(conteudo), etag, last_modified)
+    return sha256
+
+
+def guardar_pdf_arquivo(url, caminho, etag=None, last_modified=None):
+    """
+    Move um PDF já gravado em disco (ex.: download em stream) para o cache.
+
+    Returns:
+        str: SHA-256 do conteúdo
+    """
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    sha256 = h.hexdigest()
+
+    destino = caminho_blob(sha256)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if os.path.exists(destino):
+        os.remove(caminho)
+    else:
+        shutil.move(caminho, destino)
+
+    _registrar(url, sha256, os.path.getsize(destino), etag, last_modified)
+    return sha256
+
+
+def exportar_pdf(url, destino):
+    """
+    Disponibiliza o PDF em cache em outro caminho (hard link quando possível, senão cópia).
+
+    Returns:
+        bool: True se o arquivo foi exportado
+    """
+    origem = caminho_pdf(url)
+    if not origem:
+        return False
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    if os.path.exists(destino):
+        os.remove(destino)
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copyfile(origem, destino)
+    return True
+
+
+def remover(url):
+    """Remove a URL do índice (o PDF é apagado pelo LRU se nenhuma outra URL o usar)."""
+    with _lock:
+        indice = _carregar_indice()
+        if indice.pop(url, None) is not None:
+            _salvar_indice(indice)
+
+
+def limpar_cache(max_bytes=None, manter=None):
+    """
+    Remove os PDFs menos usados até o cache caber em `max_bytes`.
+
+    Args:
+        max_bytes: Limite em bytes (padrão: PDF_CACHE_MAX_BYTES)
+        manter: SHA-256 que nunca deve ser removido (ex.: o que acabou de ser salvo)
+
+    Returns:
+        int: Quantidade de PDFs removidos
+    """
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    with _lock:
+        indice = _carregar_indice()
+
+        # Um mesmo PDF pode estar associado a várias URLs: vale o acesso mais recente
+        blobs = {}
+        for url, entrada in indice.items():
+            sha = entrada['sha256']
+            acesso = entrada.get('ultimo_acesso', 0)
+            if sha not in blobs or acesso > blobs[sha]['acesso']:
+                blobs[sha] = {'acesso': acesso, 'tamanho': entrada.get('tamanho', 0)}
+
+        total = sum(b['tamanho'] for b in blobs.values())
+        removidos = 0
+        for sha, info in sorted(blobs.items(), key=lambda item: item[1]['acesso']):
+            if total <= max_bytes:
+                break
+            if sha == manter:
+                continue
+            try:
+                os.remove(caminho_blob(sha))
+            except FileNotFoundError:
+                pass
+            total -= info['tamanho']
+            removidos += 1
+            for url in [u for u, e in indice.items() if e['sha256'] == sha]:
+                del indice[url]
+
+        if removidos:
+            _salvar_indice(indice)
+            print(f"[CACHE PDF] {removidos} arquivo(s) removido(s) para respeitar o limite de tamanho.")
+        return removidos
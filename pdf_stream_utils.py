@@ -0,0 +1,100 @@
+"""
+Download de PDFs em stream, com memória constante.
+
+A resposta HTTP é gravada em disco bloco a bloco; a assinatura %PDF é conferida
+no primeiro bloco, então páginas HTML de erro são abortadas sem baixar o resto.
+Para a extração, o arquivo é aberto via mmap (páginas do arquivo, não memória do
+processo), em vez de carregar os bytes inteiros na RAM.
+"""
+import os
+import mmap
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+PDF_ASSINATURA = b"%PDF"
+# A assinatura deve aparecer logo no início (mesma janela usada antes no master_processo)
+JANELA_ASSINATURA = 10
+CHUNK_BYTES = 64 * 1024
+
+
+class PDFInvalidoError(Exception):
+    """Conteúdo baixado não é um PDF válido (página de erro, arquivo truncado...)."""
+
+
+def criar_temporario(diretorio=None):
+    """
+    Cria um arquivo temporário vazio para receber um download.
+
+    Args:
+        diretorio: Onde criar (ex.: o diretório do cache, para que mover o arquivo
+                   para lá depois seja um simples rename). Padrão: temp do sistema.
+
+    Returns:
+        str: Caminho do arquivo
+    """
+    if diretorio:
+        diretorio = os.path.join(diretorio, 'tmp')
+        os.makedirs(diretorio, exist_ok=True)
+    fd, caminho = tempfile.mkstemp(suffix='.pdf.part', dir=diretorio)
+    os.close(fd)
+    return caminho
+
+
+def gravar_resposta_pdf(resposta, destino, min_bytes=0, chunk_size=CHUNK_BYTES):
+    """
+    Grava uma resposta `requests` aberta com stream=True em `destino`.
+
+    Args:
+        resposta: requests.Response (stream=True)
+        destino: Caminho do arquivo de saída (apagado se a validação falhar)
+        min_bytes: Tamanho mínimo aceito
+
+    Returns:
+        int: Bytes gravados
+
+    Raises:
+        PDFInvalidoError: Assinatura ausente no primeiro bloco ou arquivo pequeno demais
+    """
+    tamanho = 0
+    cabecalho = b""
+    try:
+        with open(destino, 'wb') as f:
+            for bloco in resposta.iter_content(chunk_size=chunk_size):
+                if not bloco:
+                    continue
+                if len(cabecalho) < JANELA_ASSINATURA:
+                    cabecalho += bloco[:JANELA_ASSINATURA - len(cabecalho)]
+                    if len(cabecalho) >= JANELA_ASSINATURA and PDF_ASSINATURA not in cabecalho:
+                        tipo = resposta.headers.get('Content-Type', 'desconhecido')
+                        raise PDFInvalidoError(f"Assinatura PDF inválida (Content-Type: {tipo})")
+                f.write(bloco)
+                tamanho += len(bloco)
+
+        if PDF_ASSINATURA not in cabecalho:
+            raise PDFInvalidoError("Assinatura PDF inválida")
+        if tamanho < min_bytes:
+            raise PDFInvalidoError(f"Arquivo pequeno ({tamanho} bytes)")
+        return tamanho
+    except BaseException:
+        resposta.close()  # Interrompe a transferência do restante
+        if os.path.exists(destino):
+            os.remove(destino)
+        raise
+
+
+def sha256_arquivo(caminho):
+    """SHA-256 do arquivo lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+@contextmanager
+def abrir_mmap(caminho):
+    """Abre o arquivo como mmap somente leitura (objeto com read/seek/tell, aceito pelo pdfplumber)."""
+    with open(caminho, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa
@@ -0,0 +1,147 @@
+"""
+Backends de extração de texto dos PDFs do TJRJ.
+
+Todos os extratores (extrai_transp_tjrj.py, extrator.py) leem os PDFs por aqui, e o
+motor de extração pode ser trocado sem alterar a máquina de estados:
+
+    pdfplumber  (padrão) layout calculado caractere a caractere; mais lento
+    pdfium      pypdfium2 (PDFium, em C); muito mais rápido, texto na ordem do conteúdo
+
+Escolha por execução com TJRJ_PDF_BACKEND=pdfium ou pelo argumento `backend`.
+Antes de trocar o padrão, compare as linhas extraídas com comparar_backends_tjrj.py.
+"""
+import io
+import os
+from contextlib import contextmanager
+
+import pdfplumber
+
+import pdf_stream_utils
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None  # pypdfium2 vem como dependência do pdfplumber, mas pode faltar
+
+BACKEND_PADRAO = os.environ.get('TJRJ_PDF_BACKEND', 'pdfplumber')
+
+
+class Documento:
+    """PDF aberto por um backend: len(doc) páginas, doc.texto(i) e doc.textos()."""
+    backend = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def texto(self, indice):
+        raise NotImplementedError
+
+    def textos(self, inicio=0, fim=None):
+        """Gera o texto das páginas [inicio, fim) em ordem."""
+        fim = len(self) if fim is None else fim
+        for indice in range(inicio, fim):
+            yield self.texto(indice)
+
+    def close(self):
+        pass
+
+
+class _DocumentoPdfplumber(Documento):
+    backend = 'pdfplumber'
+
+    def __init__(self, origem):
+        self._pdf = pdfplumber.open(origem)
+
+    def __len__(self):
+        return len(self._pdf.pages)
+
+    def texto(self, indice):
+        pagina = self._pdf.pages[indice]
+        texto = pagina.extract_text()
+        pagina.close()  # Libera o cache de layout que o pdfplumber mantém por página
+        return texto
+
+    def close(self):
+        self._pdf.close()
+
+
+class _DocumentoPdfium(Documento):
+    backend = 'pdfium'
+
+    def __init__(self, origem):
+        self._pdf = pdfium.PdfDocument(origem)
+
+    def __len__(self):
+        return len(self._pdf)
+
+    def texto(self, indice):
+        pagina = self._pdf[indice]
+        textpage = pagina.get_textpage()
+        try:
+            # PDFium separa as linhas com \r\n; o restante do extrator espera \n
+            return textpage.get_text_range().replace('\r\n', '\n').replace('\r', '\n')
+        finally:
+            textpage.close()
+            pagina.close()
+
+    def close(self):
+        self._pdf.close()
+
+
+BACKENDS = {
+    'pdfplumber': _DocumentoPdfplumber,
+    'pdfium': _DocumentoPdfium,
+}
+
+
+def backends_disponiveis():
+    """Nomes dos backends utilizáveis neste ambiente."""
+    return [nome for nome in BACKENDS if nome != 'pdfium' or pdfium is not None]
+
+
+def resolver_backend(backend=None):
+    """
+    Valida o nome do backend (padrão: BACKEND_PADRAO).
+
+    Returns:
+        str: Nome do backend a usar ('pdfplumber' se o pedido não estiver disponível)
+    """
+    backend = (backend or BACKEND_PADRAO).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de PDF desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    if backend not in backends_disponiveis():
+        print(f"[AVISO] Backend '{backend}' indisponível (pypdfium2 não instalado). Usando pdfplumber.")
+        return 'pdfplumber'
+    return backend
+
+
+@contextmanager
+def abrir_documento(origem, backend=None):
+    """
+    Abre um PDF para extração de texto.
+
+    Args:
+        origem: Bytes do PDF ou caminho do arquivo (aberto via mmap, sem carregar na memória)
+        backend: 'pdfplumber' ou 'pdfium' (padrão: TJRJ_PDF_BACKEND)
+    """
+    backend = resolver_backend(backend)
+    classe = BACKENDS[backend]
+
+    with _fonte(origem, backend) as fonte:
+        documento = classe(fonte)
+        try:
+            yield documento
+        finally:
+            documento.close()
+
+
+@contextmanager
+def _fonte(origem, backend):
+    """O que cada backend recebe: PDFium lê bytes ou caminho por conta própria; o pdfplumber, um objeto de arquivo."""
+    if isinstance(origem, (bytes, bytearray)):
+        yield bytes(origem) if backend == 'pdfium' else io.BytesIO(origem)
+    elif backend == 'pdfium':
+        yield os.fspath(origem)
+    else:
+        with pdf_stream_utils.abrir_mmap(origem) as mapa:
+            yield mapa
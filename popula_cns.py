@@ -1,7 +1,10 @@
 import os
 import pandas as pd
-import gspread
+import gsheets_client_utils
+import gsheets_escrita_utils
 import extrai_transp_tjrj
+import dataset_tjrj_utils
+import cns_cache_utils
 from logging_utils import print_start_log, print_end_log
 import sys
 
@@ -10,18 +13,10 @@ def main():
     
     try:
         # 1. Conectar ao Google Sheets
-        print("Conectando ao Google Sheets...")
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-             import json
-             creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-             gc = gspread.service_account_from_dict(creds_dict)
-        else:
-             gc = gspread.service_account()
-        
         # ID da Planilha TJRJ (Prioridade: Env Var -> Hardcoded)
         SHEET_ID = os.environ.get('SHEET_ID', '1SkxwQoAnNpcNBg1niLpaRaMs79h8rp143NPgsr1EAXo') 
         print(f"Abrindo planilha ID: {SHEET_ID}")
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         
         # 2. Ler Dados Brutos Atuais
         print("Lendo aba 'Dados Brutos' (buscando por nome aproximado)...")
@@ -43,14 +38,19 @@ def main():
                 print(f"   - '{s.title}' (len={len(s.title)})")
             return
 
-        data = ws.get_all_records()
-        df_brutos = pd.DataFrame(data)
+        # Dataset canônico local (gravado pelo cloud_main); a aba só é lida sem ele
+        df_brutos = extrai_transp_tjrj.carregar_dados_brutos(colunas=None)
+        if df_brutos is not None:
+            print(f"Lidas {len(df_brutos)} linhas do dataset local ({dataset_tjrj_utils.dir_canonico()}).")
+        else:
+            data = ws.get_all_records()
+            df_brutos = pd.DataFrame(data)
         
-        if df_brutos.empty:
-            print("Aba 'Dados Brutos' está vazia.")
-            sys.exit(0)
+            if df_brutos.empty:
+                print("Aba 'Dados Brutos' está vazia.")
+                sys.exit(0)
             
-        print(f"Lidas {len(df_brutos)} linhas.")
+            print(f"Lidas {len(df_brutos)} linhas.")
         
         # 3. Remover CNS antigo se existir (para forçar re-mapeamento)
         if 'CNS' in df_brutos.columns:
@@ -66,10 +66,21 @@ def main():
         from logging_utils import save_debug_snapshot
         save_debug_snapshot(df_enriquecido, "tjrj_cns_enriquecido")
         
-        ws.clear()
-        ws.update([df_enriquecido.columns.values.tolist()] + df_enriquecido.astype(str).values.tolist(), value_input_option='USER_ENTERED')
+        # O resultado volta para o sistema de registro e a aba é renderizada a partir dele
+        if dataset_tjrj_utils.gravar_brutos(df_enriquecido):
+            print("[DATASET] Enriquecimento gravado no dataset canônico.")
+        
+        # Ausentes como no exportar_para_sheets (fillna(0.0)), não como 'nan'
+        df_saida = df_enriquecido.fillna(0.0).astype(str)
+        if gsheets_escrita_utils.sincronizar_aba(ws, df_saida, extrai_transp_tjrj.CHAVE_DADOS_BRUTOS) is None:
+            ws.clear()
+            ws.update([df_saida.columns.values.tolist()] + df_saida.values.tolist(), value_input_option='USER_ENTERED')
         
         print("✅ Dados atualizados com sucesso na aba 'Dados Brutos'.")
+        
+        # Espelho do cache de CNS (iniciado em segundo plano pelo enriquecimento)
+        cns_cache_utils.aguardar_espelho()
+        print(f"[INFO] {gsheets_client_utils.resumo_chamadas()}")
         print_end_log(start_time, success=True)
         
     except Exception as e:
@@ -0,0 +1,163 @@
+"""
+Teste da agregação de uma passada (agregacao_tjrj_utils).
+
+Compara 'Análise 12 Meses', 'Distritos' e 'Cidades' (layouts do cloud_main e do
+master_processo) com a implementação anterior — groupby por serviço, apply de
+eh_distrito_valido linha a linha e três groupbys com merges para as cidades — num
+quadro sintético de vários anos.
+
+Uso:
+    python test_agregacao_tjrj_utils.py     (testes + benchmark)
+    pytest test_agregacao_tjrj_utils.py
+"""
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import agregacao_tjrj_utils
+import extrai_transp_tjrj as tjrj
+
+# ============================================================
+# REFERÊNCIA: implementação anterior (não alterar)
+# ============================================================
+
+def eh_distrito_valido(designacao):
+    """Verifica se a designação se refere a um RCPN de Distrito (a partir do 2º)."""
+    if not isinstance(designacao, str): return False
+    texto = designacao.upper()
+    if "DISTR" not in texto: return False
+    match = re.search(r'(\d+).*?DISTR', texto)
+    if match:
+        try:
+            # Consideramos Distritos a partir do 2º.
+            return int(match.group(1)) >= 2
+        except: return False
+    return False
+
+
+def gerar_analises_legado(df_brutos):
+    df_analise = df_brutos.groupby(['cod', 'cidade', 'designacao'], as_index=False).agg({
+        'RCPJ': 'mean', 'RCPN': 'mean', 'IT': 'mean', 'RI': 'mean', 'RTD': 'mean',
+        'Notas': 'mean', 'Protesto': 'mean', 'Emolumentos': 'mean', 'Funarpem': 'mean',
+        'Gratuitos': 'mean', 'Total': 'mean', 'gestor': 'last', 'cargo': 'last'
+    })
+    df_analise_compat = df_analise.copy()
+    df_analise_compat.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
+    df_distritos = df_analise[df_analise['designacao'].apply(eh_distrito_valido)].copy()
+    df_cidades_media = df_analise.groupby('cidade', as_index=False)['Total'].sum()
+    df_cidades_media.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
+    df_cidades_acum = df_brutos.groupby('cidade', as_index=False)['Total'].sum()
+    df_cidades_acum.rename(columns={'Total': 'Faturamento Acumulado Bruto (R$)'}, inplace=True)
+    df_cidades_cont = df_analise.groupby('cidade').size().reset_index(name='Qtd Cartorios')
+    df_cidades = pd.merge(df_cidades_media, df_cidades_acum, on='cidade', how='left')
+    df_cidades = pd.merge(df_cidades, df_cidades_cont, on='cidade', how='left')
+    df_cidades['Média por cartório'] = df_cidades['Media Mensal Total (R$)'] / df_cidades['Qtd Cartorios']
+    df_cidades['Média por cartório'] = df_cidades['Média por cartório'].round(2)
+    cols_cidades = ['cidade', 'Media Mensal Total (R$)', 'Faturamento Acumulado Bruto (R$)', 'Qtd Cartorios', 'Média por cartório']
+    df_cidades = df_cidades[cols_cidades]
+    df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False, inplace=True)
+    return df_analise_compat, df_distritos, df_cidades
+
+
+def cidades_master_legado(df_brutos, df_analise):
+    df_cidades_media = df_analise.groupby('cidade', as_index=False)['Total'].sum()
+    df_cidades_media.rename(columns={'Total': 'Media Mensal Total (R$)'}, inplace=True)
+    df_cidades_acum = df_brutos.groupby('cidade', as_index=False)['Total'].sum()
+    df_cidades_acum.rename(columns={'Total': 'Faturamento Acumulado Bruto (R$)'}, inplace=True)
+    df_cidades_cont = df_analise.groupby('cidade').size().reset_index(name='Numero de Servicos Unicos')
+    df_cidades_reg = df_brutos.groupby('cidade').size().reset_index(name='Total de Registros Mensais')
+    df_cidades = pd.merge(df_cidades_media, df_cidades_acum, on='cidade', how='left')
+    df_cidades = pd.merge(df_cidades, df_cidades_cont, on='cidade', how='left')
+    df_cidades = pd.merge(df_cidades, df_cidades_reg, on='cidade', how='left')
+    df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False, inplace=True)
+    return df_cidades
+
+# ============================================================
+
+DESIGNACOES = ['1 RCPN DISTR', '2 RCPN DISTR', '3o OFICIO RCPN 4 DISTRITO', 'OFICIO UNICO',
+               '12 OFICIO DE NOTAS', 'RCPN 1 DISTRITO', 'SUBDISTRITO', '10 RCPN DISTR SEDE']
+CIDADES = ['CAPITAL', 'NITEROI', 'MACAE', 'CAMPOS DOS GOYTACAZES', 'PARATY', 'PETROPOLIS']
+
+
+def quadro_sintetico(anos=3, servicos=1500, semente=7):
+    """Quadro no formato de 'Dados Brutos' com `servicos` cartórios por mês durante `anos` anos."""
+    rnd = np.random.default_rng(semente)
+    n = anos * 12 * servicos
+    cods = np.tile(np.arange(servicos), anos * 12)
+    meses = np.repeat(np.arange(anos * 12), servicos)
+    df = pd.DataFrame({
+        'cod': cods.astype(str),
+        'cidade': np.array(CIDADES, dtype=object)[cods % len(CIDADES)],
+        'designacao': np.array([f"{d} {c // 48}" if c % 5 == 0 else d for c, d in
+                                zip(range(servicos), np.array(DESIGNACOES)[np.arange(servicos) % len(DESIGNACOES)])],
+                               dtype=object)[cods],
+        'arquivo_origem': [f"{2020 + m // 12}_{m % 12 + 1:02d}.pdf" for m in meses],
+        'mes': meses % 12 + 1,
+        'ano': 2020 + meses // 12,
+    })
+    for col in agregacao_tjrj_utils.COLUNAS_VALOR:
+        valores = rnd.uniform(0, 50000, n).round(2)
+        valores[rnd.random(n) < 0.3] = np.nan  # atribuições ausentes
+        df[col] = valores
+    df['gestor'] = [f"GESTOR {c % 900}" if m % 7 else None for c, m in zip(cods, meses)]
+    df['cargo'] = np.where(meses % 11 == 0, 'Responsavel pelo Expediente', 'Titular')
+    return df.reindex(columns=tjrj.COLUNAS_BRUTAS)
+
+
+def _comparar(novo, legado):
+    pd.testing.assert_frame_equal(novo.reset_index(drop=True), legado.reset_index(drop=True))
+    assert list(novo.index) == list(legado.index)
+
+
+def test_marca_de_distrito_igual_a_regra_linha_a_linha():
+    casos = DESIGNACOES + ['2 distr', 'DISTR', '1 2 DISTR', 'ABC', '', None, np.nan, 5, '0 DISTR', '02 RCPN DISTR']
+    esperado = [eh_distrito_valido(v) for v in casos]
+    assert agregacao_tjrj_utils.marcar_distritos(pd.Series(casos, dtype=object)).tolist() == esperado
+    assert agregacao_tjrj_utils.marcar_distritos(pd.Series(casos[:4], dtype='category')).tolist() == esperado[:4]
+    assert agregacao_tjrj_utils.marcar_distritos([]).tolist() == []
+
+
+def test_abas_iguais_a_implementacao_anterior():
+    df = quadro_sintetico(anos=2, servicos=300)
+    for novo, legado in zip(agregacao_tjrj_utils.gerar_analises(df), gerar_analises_legado(df)):
+        _comparar(novo, legado)
+
+    # Chaves já categóricas na entrada: mesmo resultado (chaves continuam categóricas)
+    categorico = df.astype({'cidade': 'category', 'designacao': 'category'})
+    for novo, legado in zip(agregacao_tjrj_utils.gerar_analises(categorico), gerar_analises_legado(df)):
+        assert novo.shape == legado.shape
+        assert np.allclose(novo.select_dtypes('number'), legado.select_dtypes('number'), equal_nan=True)
+
+
+def test_cidades_do_master_processo():
+    df = quadro_sintetico(anos=1, servicos=200)
+    df_analise, eh_distrito, df_cidades = agregacao_tjrj_utils.agregar(df)
+    df_cidades = df_cidades.rename(columns={'Qtd Cartorios': 'Numero de Servicos Unicos'})
+    df_cidades.sort_values(by='Media Mensal Total (R$)', ascending=False, inplace=True)
+    _comparar(df_cidades, cidades_master_legado(df, df_analise))
+    assert eh_distrito.sum() == df_analise['designacao'].map(eh_distrito_valido).sum()
+
+
+def benchmark(anos=5, servicos=1500, repeticoes=3):
+    df = quadro_sintetico(anos=anos, servicos=servicos)
+    for rotulo, quadro in (("chaves texto", df),
+                           ("chaves categóricas", df.astype({c: 'category' for c in ['cod', 'cidade', 'designacao']}))):
+        tempos = {}
+        for nome, funcao in (("anterior", gerar_analises_legado), ("uma passada", agregacao_tjrj_utils.gerar_analises)):
+            funcao(quadro)
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                funcao(quadro)
+            tempos[nome] = (time.perf_counter() - inicio) / repeticoes * 1000
+        print(f"  {len(quadro)} linhas ({anos} anos x {servicos} serviços, {rotulo}): "
+              f"{tempos['anterior']:.0f} ms -> {tempos['uma passada']:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_marca_de_distrito_igual_a_regra_linha_a_linha()
+    test_abas_iguais_a_implementacao_anterior()
+    test_cidades_do_master_processo()
+    print("[OK] Agregação de uma passada igual à implementação anterior.")
+    benchmark()
@@ -0,0 +1,154 @@
+"""
+Teste da carga histórica (backfill_tjrj).
+
+Site simulado (sem rede): a página principal lista alguns anos, as páginas anuais
+têm os links mensais e cada download devolve um relatório sintético. Confere a
+descoberta de todos os anos, a retomada após interrupção, a idempotência e o
+limite de requisições por segundo.
+
+Uso:
+    python test_backfill_tjrj.py
+    pytest test_backfill_tjrj.py
+"""
+import os
+import time
+import tempfile
+import threading
+
+import dataset_tjrj_utils
+import parse_cache_utils
+import backfill_tjrj as backfill
+import extrai_transp_tjrj as tjrj
+import gerador_relatorio_tjrj as gerador
+
+MESES_URL = ['janeiro', 'fevereiro', 'marco', 'abril', 'maio', 'junho', 'julho',
+             'agosto', 'setembro', 'outubro', 'novembro', 'dezembro']
+# Anos publicados no site simulado; a página principal só lista os mais recentes
+ANOS_SITE = {2021: range(6, 13), 2022: range(1, 13), 2023: range(1, 4)}
+
+
+def _url_pdf(ano, mes):
+    return f"{tjrj.ROOT}/documents/d/guest/receita-{MESES_URL[mes - 1]}-{ano}"
+
+
+def _pagina(links, anos_listados=()):
+    corpo = "".join(f'<a href="{url}">PDF</a>' for url in links)
+    corpo += "".join(f'<a href="{tjrj.BASE_PAGE}/{ano}">{ano}</a>' for ano in anos_listados)
+    return f"<html><body>{corpo}</body></html>"
+
+
+class _SiteFalso:
+    """Substitui safe_get e baixar_pdf_arquivo, registrando os acessos."""
+
+    def __init__(self, tmp):
+        self.tmp = tmp
+        self.paginas = []
+        self.downloads = []
+        self._lock = threading.Lock()
+
+    def safe_get(self, url):
+        self.paginas.append(url)
+        if url == tjrj.BASE_PAGE:
+            return _pagina([_url_pdf(2023, 3), _url_pdf(2023, 2)], anos_listados=[2023, 2022])
+        ano = int(url.rsplit('/', 1)[-1])
+        return _pagina([_url_pdf(ano, mes) for mes in ANOS_SITE.get(ano, [])])
+
+    def baixar_pdf_arquivo(self, url):
+        mes, ano = tjrj.extrair_mes_ano(url)
+        with self._lock:
+            self.downloads.append(url)
+        pdf_bytes, _ = gerador.gerar_relatorio(n_servicos=6, mes=mes, ano=ano, linhas_por_pagina=40, seed=ano * 100 + mes)
+        caminho = os.path.join(self.tmp, f"{ano}_{mes:02d}.pdf")
+        with open(caminho, "wb") as f:
+            f.write(pdf_bytes)
+        return caminho, True
+
+
+def _executar(site, dataset_dir, **kwargs):
+    originais = (tjrj.safe_get, tjrj.baixar_pdf_arquivo, dataset_tjrj_utils.DATASET_DIR,
+                 parse_cache_utils.PARSE_CACHE_DIR, tjrj.PARSE_WORKERS)
+    tjrj.safe_get, tjrj.baixar_pdf_arquivo = site.safe_get, site.baixar_pdf_arquivo
+    dataset_tjrj_utils.DATASET_DIR = dataset_dir
+    parse_cache_utils.PARSE_CACHE_DIR = os.path.join(site.tmp, "cache_parse")
+    tjrj.PARSE_WORKERS = 1
+    try:
+        return backfill.executar_backfill(rps=0, **kwargs)
+    finally:
+        (tjrj.safe_get, tjrj.baixar_pdf_arquivo, dataset_tjrj_utils.DATASET_DIR,
+         parse_cache_utils.PARSE_CACHE_DIR, tjrj.PARSE_WORKERS) = originais
+
+
+def _meses_site():
+    return {(ano, mes) for ano, meses in ANOS_SITE.items() for mes in meses}
+
+
+def test_descobre_todos_os_anos():
+    with tempfile.TemporaryDirectory() as tmp:
+        site = _SiteFalso(tmp)
+        originais = tjrj.safe_get
+        tjrj.safe_get = site.safe_get
+        try:
+            links = backfill.descobrir_links(ate=2023)
+        finally:
+            tjrj.safe_get = originais
+        # 2021 não aparece na página principal, mas é encontrado; a busca para após 2 anos vazios
+        assert {(ano, mes) for mes, ano in map(tjrj.extrair_mes_ano, links)} == _meses_site()
+        assert len(links) == len(_meses_site())
+        assert links[0] == _url_pdf(2023, 3) and links[-1] == _url_pdf(2021, 6)
+        assert site.paginas[-1].endswith("/2019")
+
+
+def test_backfill_retomavel_e_idempotente():
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as dataset_dir:
+        site = _SiteFalso(tmp)
+        links = [_url_pdf(ano, mes) for ano, mes in sorted(_meses_site(), reverse=True)]
+
+        # Execução "interrompida": só parte dos meses chegou ao dataset
+        stats = _executar(site, dataset_dir, links=links[:5], tamanho_lote=2)
+        assert stats['gravados'] == 5 and stats['falhas'] == 0
+        linhas_antes = dataset_tjrj_utils.carregar_mes(2023, 3, dataset_dir)
+
+        # Retomada: baixa apenas os meses que faltam
+        site.downloads.clear()
+        stats = _executar(site, dataset_dir, links=links, tamanho_lote=4)
+        assert stats['pulados'] == 5
+        assert sorted(site.downloads) == sorted(links[5:])
+        assert dataset_tjrj_utils.meses_materializados(dataset_dir) == _meses_site()
+
+        # Nova execução: nada a baixar
+        site.downloads.clear()
+        stats = _executar(site, dataset_dir, links=links)
+        assert site.downloads == [] and stats['gravados'] == 0
+
+        # Reprocessar tudo grava o mesmo conteúdo
+        _executar(site, dataset_dir, links=links[:1], forcar=True)
+        assert dataset_tjrj_utils.carregar_mes(2023, 3, dataset_dir) == linhas_antes
+
+        df = dataset_tjrj_utils.carregar_dataframe(dataset_dir=dataset_dir)
+        assert set(zip(df['ano'], df['mes'])) == _meses_site()
+        assert len(dataset_tjrj_utils.carregar_dataframe([2021], dataset_dir)) == 7 * len(linhas_antes)
+
+
+def test_limitador_taxa():
+    limitador = backfill.LimitadorTaxa(rps=20)
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=limitador) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 8 requisições a 20/s: a primeira sai na hora, as outras 7 espaçadas de 50 ms
+    assert time.monotonic() - inicio >= 7 * 0.05 - 0.01
+
+    sem_limite = backfill.LimitadorTaxa(rps=0)
+    inicio = time.monotonic()
+    for _ in range(100):
+        sem_limite()
+    assert time.monotonic() - inicio < 0.05
+
+
+if __name__ == "__main__":
+    test_descobre_todos_os_anos()
+    test_backfill_retomavel_e_idempotente()
+    test_limitador_taxa()
+    print("[OK] Backfill retomável e idempotente.")
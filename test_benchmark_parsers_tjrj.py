@@ -0,0 +1,68 @@
+"""
+Teste do gerador de relatórios sintéticos e do benchmark dos extratores
+(gerador_relatorio_tjrj + benchmark_parsers_tjrj).
+
+Uso:
+    python test_benchmark_parsers_tjrj.py
+    pytest test_benchmark_parsers_tjrj.py
+"""
+import os
+import tempfile
+
+import extrai_transp_tjrj as tjrj
+import gerador_relatorio_tjrj as gerador
+import benchmark_parsers_tjrj as bench
+
+
+def test_relatorio_com_todas_as_variantes():
+    pdf_bytes, servicos = gerador.gerar_relatorio(n_servicos=200, linhas_por_pagina=30, seed=11)
+    assert {s['variante_gestor'] for s in servicos} == set(gerador.VARIANTES_GESTOR)
+    assert {s['condicao'] for s in servicos} == set(gerador.CONDICOES)
+    assert any(s['linhas_extras'] for s in servicos)
+
+    dados = tjrj.processar_pdf_content(pdf_bytes, "2025_10.pdf", usar_cache=False, workers_paginas=1)
+    assert len(dados) == len(servicos)
+    for linha, servico in zip(dados, servicos):
+        assert (linha['cod'], linha['gestor'], linha['cargo']) == (servico['cod'], servico['gestor'], servico['cargo'])
+        assert linha['Total'] == servico['Total']
+        for coluna, valor in servico['valores'].items():
+            assert linha[coluna] == valor
+
+
+def test_numero_exato_de_paginas():
+    for n_paginas in (1, 2, 9):
+        servicos = gerador.servicos_para_paginas(n_paginas, linhas_por_pagina=25, seed=n_paginas)
+        assert len(gerador.paginar(servicos, 1, 2025, linhas_por_pagina=25)) == n_paginas
+    # Mesma seed: os serviços de um relatório menor são o início dos de um maior
+    assert gerador.gerar_servicos(5, seed=4) == gerador.gerar_servicos(9, seed=4)[:5]
+
+
+def test_benchmark_mede_e_detecta_regressao():
+    resultado = bench.executar_benchmark(n_arquivos=1, n_paginas=3, casos=["processar_pdf_content"])
+    m = resultado['casos']["processar_pdf_content"]
+    assert 'erro' not in m, m
+    assert m['servicos'] == m['servicos_esperados'] > 0
+    assert m['paginas_s'] > 0 and m['pico_mb'] > 0
+
+    assert bench.comparar_com_base(resultado, resultado) == []
+    lento = {'parametros': resultado['parametros'],
+             'casos': {"processar_pdf_content": dict(m, paginas_s=m['paginas_s'] / 2, servicos=m['servicos'] - 1)}}
+    regressoes = bench.comparar_com_base(lento, resultado)
+    assert len(regressoes) == 2
+    # Parâmetros diferentes não são comparáveis
+    outro = {'parametros': dict(resultado['parametros'], paginas=99), 'casos': resultado['casos']}
+    assert bench.comparar_com_base(lento, outro) == []
+
+
+def test_gerar_pdfs_nomes_dos_scripts_locais():
+    with tempfile.TemporaryDirectory() as pasta:
+        esperados = bench.gerar_pdfs(pasta, n_arquivos=3, n_paginas=2)
+        assert sorted(os.listdir(pasta)) == sorted(esperados) == ["2025 10.pdf", "2025 11.pdf", "2025 12.pdf"]
+
+
+if __name__ == "__main__":
+    test_relatorio_com_todas_as_variantes()
+    test_numero_exato_de_paginas()
+    test_benchmark_mede_e_detecta_regressao()
+    test_gerar_pdfs_nomes_dos_scripts_locais()
+    print("[OK] Gerador sintético e benchmark dos extratores.")
@@ -0,0 +1,185 @@
+"""
+Teste do cache local de vínculos COD TJRJ -> CNS (cns_cache_utils).
+
+Usa um banco SQLite temporário e uma aba falsa (conta as chamadas de leitura e
+escrita) para verificar: vínculos automáticos nunca sobrescrevem os existentes,
+edições manuais da planilha prevalecem, o espelho só regrava a aba quando o banco
+muda e o enriquecimento usa o cache local sem ler a planilha.
+
+Uso:
+    python test_cns_cache_utils.py     (testes + tempo de consulta)
+    pytest test_cns_cache_utils.py
+"""
+import io
+import os
+import time
+import tempfile
+import contextlib
+
+import cns_cache_utils
+import gsheets_client_utils
+from cns_cache_utils import COLUNAS_PLANILHA
+
+
+class _AbaFalsa:
+    def __init__(self, linhas=None):
+        self.valores = [list(COLUNAS_PLANILHA)] + [list(l) for l in (linhas or [])]
+        self.leituras = 0
+        self.escritas = 0
+
+    def get_all_values(self):
+        self.leituras += 1
+        return [list(l) for l in self.valores]
+
+    def clear(self):
+        self.escritas += 1
+        self.valores = []
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self.escritas += 1
+        self.valores = [list(map(str, l)) for l in values]
+
+
+@contextlib.contextmanager
+def _aba_na_planilha(aba):
+    """Faz gsheets_client_utils.obter_aba devolver a aba falsa."""
+    original = gsheets_client_utils.obter_aba
+
+    def obter_aba(sheet_id, titulo, **kwargs):
+        assert titulo == cns_cache_utils.ABA_ESPELHO
+        return aba
+    gsheets_client_utils.obter_aba = obter_aba
+    try:
+        yield
+    finally:
+        gsheets_client_utils.obter_aba = original
+
+
+@contextlib.contextmanager
+def _banco_temporario():
+    original = cns_cache_utils.CNS_CACHE_DB
+    with tempfile.TemporaryDirectory() as pasta:
+        cns_cache_utils.CNS_CACHE_DB = os.path.join(pasta, 'cache_cns', 'vinculos.sqlite')
+        try:
+            yield
+        finally:
+            cns_cache_utils.CNS_CACHE_DB = original
+
+
+def _vinculo(cod, cns, manual='FALSE', metodo='auto'):
+    return {'COD_TJRJ': cod, 'CNS': cns, 'NOME_TJRJ': f"SERVICO {cod}", 'CIDADE': 'NITEROI',
+            'METODO_MATCH': metodo, 'MANUAL': manual}
+
+
+def test_automatico_nao_sobrescreve():
+    with _banco_temporario():
+        assert cns_cache_utils.total_vinculos() == 0
+        assert cns_cache_utils.gravar_vinculos([_vinculo('10', '59'), _vinculo('20', '000123')]) == 2
+        # Mesmo código com outro CNS: ignorado
+        assert cns_cache_utils.gravar_vinculos([_vinculo('10', '999999'), _vinculo('30', '7')]) == 1
+        assert cns_cache_utils.carregar_vinculos() == {'10': '000059', '20': '000123', '30': '000007'}
+        # Edição manual substitui; repetir a mesma edição não altera nada
+        assert cns_cache_utils.gravar_vinculos([_vinculo('10', '111111', 'TRUE', 'manual')], substituir=True) == 1
+        assert cns_cache_utils.gravar_vinculos([_vinculo('10', '111111', 'TRUE', 'manual')], substituir=True) == 0
+        df = cns_cache_utils.carregar_dataframe()
+        assert list(df.columns) == COLUNAS_PLANILHA
+        assert df.set_index('COD_TJRJ').loc['10', ['CNS', 'MANUAL']].tolist() == ['111111', 'TRUE']
+        # Linhas sem código ou CNS são descartadas
+        assert cns_cache_utils.gravar_vinculos([_vinculo('', '1'), _vinculo('40', '')]) == 0
+
+
+def test_importar_planilha_preserva_manuais():
+    with _banco_temporario():
+        cns_cache_utils.gravar_vinculos([_vinculo('10', '000059'), _vinculo('20', '000123')])
+        aba = _AbaFalsa([
+            ['10', '91041', 'OFICIO UNICO', 'Cartório', 'CORDEIRO', 'manual', '2025-01-01 10:00', 'TRUE'],
+            ['20', '000999', 'X', '', 'NITEROI', 'auto', '2025-01-01 10:00', 'FALSE'],
+            ['30', '000555', 'Y', '', 'NITEROI', 'auto', '2025-01-01 10:00'],  # MANUAL vazio
+        ])
+        with _aba_na_planilha(aba):
+            importados, linhas = cns_cache_utils.importar_planilha('id')
+        assert (importados, linhas) == (2, 3)
+        # Manual da planilha vence; automático da planilha não altera o banco
+        assert cns_cache_utils.carregar_vinculos() == {'10': '091041', '20': '000123', '30': '000555'}
+        # Aba sem o cabeçalho esperado não é importada
+        assert cns_cache_utils.importar_planilha('id', ws=_AbaFalsa()) == (0, 0)
+
+
+def test_espelho_so_regrava_quando_muda():
+    with _banco_temporario():
+        aba = _AbaFalsa()
+        cns_cache_utils.gravar_vinculos([_vinculo('10', '59'), _vinculo('20', '123')])
+        with _aba_na_planilha(aba), contextlib.redirect_stdout(io.StringIO()):
+            assert cns_cache_utils.espelhar_planilha('id') == 2
+            assert (aba.leituras, aba.escritas) == (1, 2)
+            assert [l[:2] for l in aba.valores] == [COLUNAS_PLANILHA[:2], ['10', '000059'], ['20', '000123']]
+
+            # Nada mudou: só a leitura
+            assert cns_cache_utils.espelhar_planilha('id') == 0
+            assert (aba.leituras, aba.escritas) == (2, 2)
+
+            # Edição manual na aba: importada e mantida na regravação
+            aba.valores[1][1], aba.valores[1][7] = '777777', 'TRUE'
+            assert cns_cache_utils.espelhar_planilha('id') == 2
+            assert cns_cache_utils.carregar_vinculos()['10'] == '777777'
+            assert aba.valores[1][1] == '777777' and aba.valores[1][7] == 'TRUE'
+
+            # Novo vínculo automático: espelho em segundo plano
+            cns_cache_utils.gravar_vinculos([_vinculo('30', '5')])
+            cns_cache_utils.espelhar_em_segundo_plano('id')
+            cns_cache_utils.aguardar_espelho()
+        assert [l[0] for l in aba.valores[1:]] == ['10', '20', '30']
+
+
+def test_enrich_usa_cache_local():
+    import extrai_transp_tjrj as tjrj
+    import test_cns_match_tjrj as casamento
+
+    df_serventias, df_brutos, rotulos = casamento.gerar_base(seed=6)
+    cod = next(c for c, v in rotulos.items() if v != 'NAO_ENCONTRADO')
+    cwd, obter_cliente = os.getcwd(), gsheets_client_utils.obter_cliente
+    with _banco_temporario(), tempfile.TemporaryDirectory() as pasta:
+        # Vínculo manual já no banco: o motor não o altera
+        cns_cache_utils.gravar_vinculos([_vinculo(cod, '424242', 'TRUE', 'manual')])
+        os.makedirs(os.path.join(pasta, "downloads"))
+        df_serventias.to_csv(os.path.join(pasta, "downloads", "serventias.csv"), index=False)
+
+        def sem_credenciais(*args, **kwargs):
+            raise FileNotFoundError("credenciais")
+        try:
+            os.chdir(pasta)
+            gsheets_client_utils.obter_cliente = sem_credenciais
+            with contextlib.redirect_stdout(io.StringIO()):
+                enriquecido = tjrj.enrich_tjrj_with_cns(df_brutos.copy())
+        finally:
+            os.chdir(cwd)
+            cns_cache_utils.aguardar_espelho()
+            gsheets_client_utils.obter_cliente = obter_cliente
+
+        linhas = enriquecido[enriquecido['cod'] == cod]
+        assert set(linhas['CNS']) == {'424242'} and linhas['FROM_CACHE'].all()
+        # Novos matches gravados com o método do motor; hardcoded presente
+        df_cache = cns_cache_utils.carregar_dataframe().set_index('COD_TJRJ')
+        assert df_cache.loc['4450', 'CNS'] == '091041' and df_cache.loc['4450', 'MANUAL'] == 'TRUE'
+        casados = enriquecido[(enriquecido['CNS'] != 'NAO_ENCONTRADO') & ~enriquecido['FROM_CACHE']]
+        assert set(casados['cod']) <= set(df_cache.index)
+        assert set(df_cache.loc[list(set(casados['cod'])), 'METODO_MATCH']) <= \
+            {'exato', 'gestor', 'gestor_parcial', 'atribuicao_unica', 'similaridade'}
+
+
+def benchmark(n=20000):
+    with _banco_temporario():
+        cns_cache_utils.gravar_vinculos([_vinculo(str(i), str(i)) for i in range(n)])
+        inicio = time.perf_counter()
+        vinculos = cns_cache_utils.carregar_vinculos()
+        t = time.perf_counter() - inicio
+    print(f"  {len(vinculos):,} vínculos carregados do banco local em {t * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_automatico_nao_sobrescreve()
+    test_importar_planilha_preserva_manuais()
+    test_espelho_so_regrava_quando_muda()
+    test_enrich_usa_cache_local()
+    print("[OK] Cache local de CNS.")
+    benchmark()
@@ -0,0 +1,467 @@
+"""
+Teste do motor de casamento TJRJ -> CNS (cns_match_utils).
+
+Usa uma base sintética rotulada (Lista de Serventias do CNJ + meses do TJRJ) com
+acentos, abreviações, gestores acumulando cartórios, homônimos em outras cidades,
+interinos, erros de digitação e cartórios sem correspondente dos dois lados.
+Compara acertos/precisão com a implementação anterior (cópia congelada abaixo:
+find_cns linha a linha + fallback por código + critério 4 com iterrows) e mede o
+tempo conforme a base cresce.
+
+Uso:
+    python test_cns_match_tjrj.py     (testes + benchmark)
+    pytest test_cns_match_tjrj.py
+"""
+import io
+import os
+import time
+import tempfile
+import random
+import contextlib
+from difflib import SequenceMatcher
+from unicodedata import normalize
+
+import pandas as pd
+
+import cns_match_utils
+from cns_match_utils import casar_cns, NAO_ENCONTRADO
+from cns_utils import normalize_cns
+import extrai_transp_tjrj as tjrj
+
+# ============================================================
+# REFERÊNCIA: implementação anterior (não alterar)
+# ============================================================
+
+def casar_legado(df_brutos, df_serventias):
+    def normalize_name(name):
+        if not isinstance(name, str): return ""
+        normalized = normalize('NFKD', name).encode('ASCII', 'ignore').decode('ASCII')
+        normalized = normalized.replace("'", " ")
+        normalized = normalized.upper().strip()
+        return normalized
+
+    col_nome = next((c for c in df_serventias.columns if 'nome' in c.lower() or 'denominacao' in c.lower() or 'denominação' in c.lower()), 'Denominação')
+    col_municipio = next((c for c in df_serventias.columns if 'municipio' in c.lower() or 'cidade' in c.lower()), 'Município')
+    col_cns = next((c for c in df_serventias.columns if 'cns' in c.lower()), 'CNS')
+    col_gestor = next((c for c in df_serventias.columns if ('titular' in c.lower() or 'responsavel' in c.lower() or 'responsável' in c.lower()) and 'data' not in c.lower() and 'dat.' not in c.lower()), 'Titular')
+    col_atribuicao = next((c for c in df_serventias.columns if 'atribuicao' in c.lower() or 'atribuição' in c.lower()), 'Atribuições')
+
+    cnj_map_nome = {}
+    cnj_map_gestor = {}
+    for _, row in df_serventias.iterrows():
+        cns = str(row[col_cns]).strip()
+        nome = normalize_name(row[col_nome])
+        mun = normalize_name(row[col_municipio])
+        gestor = normalize_name(row[col_gestor])
+        atribs = str(row[col_atribuicao]).upper()
+        cnj_map_nome[f"{mun}_{nome}"] = cns
+        cnj_map_nome[nome] = cns
+        if gestor:
+            if gestor not in cnj_map_gestor: cnj_map_gestor[gestor] = []
+            cnj_map_gestor[gestor].append({'cns': cns, 'municipio': mun, 'atribuicoes': atribs, 'nome_cartorio': nome})
+            partes = gestor.split()
+            if len(partes) >= 3:
+                gestor_3 = ' '.join(partes[:3])
+                if gestor_3 not in cnj_map_gestor: cnj_map_gestor[gestor_3] = []
+                cnj_map_gestor[gestor_3].append({'cns': cns, 'municipio': mun, 'atribuicoes': atribs, 'nome_cartorio': nome})
+
+    def find_cns(row):
+        tjrj_mun = normalize_name(row['cidade'])
+        tjrj_nome = normalize_name(row['designacao'])
+        tjrj_gestor = normalize_name(row['gestor'])
+        key_exact = f"{tjrj_mun}_{tjrj_nome}"
+        if key_exact in cnj_map_nome: return cnj_map_nome[key_exact]
+        if tjrj_gestor and tjrj_gestor in cnj_map_gestor:
+            candidatos = cnj_map_gestor[tjrj_gestor]
+            cand_mun = [c for c in candidatos if c['municipio'] == tjrj_mun]
+            if not cand_mun: cand_mun = candidatos
+            if len(cand_mun) == 1:
+                return cand_mun[0]['cns']
+            elif len(cand_mun) > 1:
+                pontuacao = []
+                cols_receita = ['RCPJ', 'RCPN', 'RI', 'RTD', 'Notas', 'Protesto']
+                atribuicoes_row = []
+                for c in cols_receita:
+                    val = pd.to_numeric(row.get(c, 0), errors='coerce')
+                    if val > 0: atribuicoes_row.append(c)
+                for cand in cand_mun:
+                    score = 0
+                    cand_atribs = cand['atribuicoes']
+                    for atrib_req in atribuicoes_row:
+                        termos = [atrib_req]
+                        if atrib_req == 'Notas': termos += ['TABELIE', 'NOTAS']
+                        if atrib_req == 'RI': termos += ['REGISTRO DE IMOVEIS']
+                        if atrib_req == 'RCPN': termos += ['CIVIL DAS PESSOAS NATURAIS']
+                        if atrib_req == 'RCPJ': termos += ['CIVIL DAS PESSOAS JURIDICAS']
+                        if atrib_req == 'RTD': termos += ['TITULOS E DOCUMENTOS']
+                        for t in termos:
+                            if t in cand_atribs:
+                                score += 1
+                                break
+                    ratio = SequenceMatcher(None, tjrj_nome, cand['nome_cartorio']).ratio()
+                    score += ratio
+                    pontuacao.append((score, cand['cns']))
+                pontuacao.sort(key=lambda x: x[0], reverse=True)
+                if pontuacao: return pontuacao[0][1]
+        if tjrj_gestor:
+            partes_tjrj = tjrj_gestor.split()
+            if len(partes_tjrj) >= 3:
+                gestor_3_tjrj = ' '.join(partes_tjrj[:3])
+                if gestor_3_tjrj in cnj_map_gestor:
+                    candidatos = cnj_map_gestor[gestor_3_tjrj]
+                    cand_mun = [c for c in candidatos if c['municipio'] == tjrj_mun]
+                    if not cand_mun: cand_mun = candidatos
+                    if len(cand_mun) == 1:
+                        return cand_mun[0]['cns']
+        return "NAO_ENCONTRADO"
+
+    df_brutos['CNS'] = df_brutos.apply(find_cns, axis=1)
+
+    def apply_code_fallback_step(df, step_name):
+        if 'cod' not in df.columns:
+            return 0
+        cod_to_cns = df[df['CNS'] != 'NAO_ENCONTRADO'].groupby('cod')['CNS'].first().to_dict()
+        def apply_fallback(row):
+            if row['CNS'] == 'NAO_ENCONTRADO' and row['cod'] in cod_to_cns:
+                return cod_to_cns[row['cod']]
+            return row['CNS']
+        df['CNS'] = df.apply(apply_fallback, axis=1)
+
+    apply_code_fallback_step(df_brutos, "Fallback após critérios 1-3")
+
+    nao_encontrados = df_brutos[df_brutos['CNS'] == 'NAO_ENCONTRADO'].copy()
+    if len(nao_encontrados) > 0 and 'cidade' in df_brutos.columns:
+        cns_ja_usados = set(df_brutos[df_brutos['CNS'] != 'NAO_ENCONTRADO']['CNS'].unique())
+        cols_receita = ['RCPJ', 'RCPN', 'RI', 'RTD', 'Notas', 'Protesto']
+        for idx, row in nao_encontrados.iterrows():
+            cidade = row['cidade']
+            atribs_tjrj = set()
+            for col in cols_receita:
+                if col in row.index:
+                    val = pd.to_numeric(row[col], errors='coerce')
+                    if pd.notna(val) and val > 0:
+                        atribs_tjrj.add(col)
+            if not atribs_tjrj:
+                continue
+            candidatos_cnj = []
+            for _, cnj_row in df_serventias[df_serventias[col_municipio].str.upper().str.strip() == cidade.upper().strip()].iterrows():
+                cns_cand = str(cnj_row[col_cns]).strip()
+                if cns_cand in cns_ja_usados:
+                    continue
+                atribs_cnj_str = str(cnj_row[col_atribuicao]).upper()
+                match_count = 0
+                for atrib in atribs_tjrj:
+                    termos_busca = [atrib]
+                    if atrib == 'Notas': termos_busca += ['TABELIE', 'NOTAS']
+                    if atrib == 'RI': termos_busca += ['REGISTRO DE IMOVEIS', 'IMOVEIS']
+                    if atrib == 'RCPN': termos_busca += ['CIVIL DAS PESSOAS NATURAIS', 'PESSOAS NATURAIS']
+                    if atrib == 'RCPJ': termos_busca += ['CIVIL DAS PESSOAS JURIDICAS', 'PESSOAS JURIDICAS']
+                    if atrib == 'RTD': termos_busca += ['TITULOS E DOCUMENTOS']
+                    if atrib == 'Protesto': termos_busca += ['PROTESTO']
+                    if any(termo in atribs_cnj_str for termo in termos_busca):
+                        match_count += 1
+                if match_count == len(atribs_tjrj):
+                    candidatos_cnj.append(cns_cand)
+            if len(candidatos_cnj) == 1:
+                df_brutos.at[idx, 'CNS'] = candidatos_cnj[0]
+
+    apply_code_fallback_step(df_brutos, "Fallback após atribuições")
+    df_brutos['CNS'] = df_brutos['CNS'].apply(lambda x: normalize_cns(x) if x != 'NAO_ENCONTRADO' else x)
+    return df_brutos
+
+# ============================================================
+
+MUNICIPIOS = ["Niterói", "São Gonçalo", "Petrópolis", "Nova Iguaçu", "Duque de Caxias", "Macaé",
+              "Cabo Frio", "Volta Redonda", "Teresópolis", "Angra dos Reis", "Três Rios", "Valença",
+              "Itaperuna", "Paraty", "Miguel Pereira", "Cordeiro", "Macuco", "Varre-Sai", "Itaboraí",
+              "Resende", "Barra Mansa", "Nova Friburgo", "Maricá", "Saquarema", "Búzios"]
+PRIMEIROS = ["José", "Maria", "João", "Ana", "Antônio", "Márcia", "Luiz", "Cláudia", "Sérgio", "Fátima",
+             "Paulo", "Helena", "Carlos", "Beatriz", "Jorge", "Lúcia"]
+SOBRENOMES = ["da Silva", "Souza", "Ávila", "Gonçalves", "D'Araújo", "Pereira", "Lima", "Castro",
+              "Magalhães", "Brandão", "Conceição", "Rocha", "Figueiredo", "Assunção", "Teixeira", "Barros"]
+ROTULOS_ATRIBUICAO = {
+    'RCPN': "Registro Civil das Pessoas Naturais", 'Notas': "Tabelionato de Notas",
+    'RI': "Registro de Imóveis", 'RTD': "Registro de Títulos e Documentos",
+    'RCPJ': "Registro Civil das Pessoas Jurídicas", 'Protesto': "Tabelionato de Protesto de Títulos",
+}
+# (denominação CNJ, designação TJRJ, atribuições); {n} = número do cartório no município
+TIPOS = [
+    ("{n}º Ofício de Justiça", "{n}O OF DE JUSTICA", None),
+    ("{n}º Ofício de Notas", "{n} OF DE NOTAS", ['Notas']),
+    ("Registro Civil das Pessoas Naturais da {n}ª Circunscrição", "RCPN {n}A CIRC", ['RCPN']),
+    ("{n}º Ofício de Registro de Imóveis", "{n}O OF DO REGISTRO DE IMOVEIS", ['RI']),
+    ("{n}º Ofício de Protesto de Títulos", "{n} OF DE PROTESTO", ['Protesto']),
+    ("{n}º Registro de Títulos e Documentos e Civil das Pessoas Jurídicas", "{n} RTD E RCPJ", ['RTD', 'RCPJ']),
+]
+
+
+def _sem_acento(texto):
+    return normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').upper()
+
+
+def _designacao_normalizada(designacao):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tjrj.normalize_tjrj_designations(pd.DataFrame({'designacao': [designacao]}))['designacao'][0]
+
+
+def _nome(rnd, palavras=None):
+    sobrenomes = rnd.sample(SOBRENOMES, palavras or rnd.choice([2, 3]))
+    return " ".join([rnd.choice(PRIMEIROS)] + sobrenomes)
+
+
+def _com_erro(rnd, nome):
+    partes = nome.split()
+    i = rnd.randrange(1, len(partes))
+    p = partes[i]
+    if len(p) > 3:
+        j = rnd.randrange(1, len(p) - 1)
+        partes[i] = p[:j] + p[j + 1:]
+    return " ".join(partes)
+
+
+def gerar_base(n_municipios=25, tamanho_capital=60, meses=12, seed=1):
+    """
+    Returns:
+        tuple: (df_serventias CNJ, df_brutos TJRJ, {cod: CNS esperado ou NAO_ENCONTRADO})
+    """
+    rnd = random.Random(seed)
+    municipios = [("Rio de Janeiro", "CAPITAL", tamanho_capital)]
+    for i in range(n_municipios):
+        nome = MUNICIPIOS[i % len(MUNICIPIOS)] + ("" if i < len(MUNICIPIOS) else f" {i // len(MUNICIPIOS)}")
+        municipios.append((nome, _sem_acento(nome), rnd.choice([1, 1, 2, 3, 4, 6, 9, 14])))
+
+    serventias, brutos, rotulos = [], [], {}
+    cns_seq = iter(rnd.sample(range(10000, 999999), 20 * (tamanho_capital + 15 * n_municipios)))
+    cod_seq = iter(rnd.sample(range(1000, 999999), 20 * (tamanho_capital + 15 * n_municipios)))
+    gestores_usados = []
+
+    for municipio, cidade_tjrj, tamanho in municipios:
+        contadores = {}
+        gestor_anterior = None
+        for k in range(tamanho):
+            if tamanho == 1:
+                den, des, atribs = "Ofício Único", "OFICIO UNICO", list(ROTULOS_ATRIBUICAO)
+            else:
+                den, des, atribs = rnd.choice(TIPOS)
+                atribs = atribs or rnd.sample(list(ROTULOS_ATRIBUICAO), rnd.randint(2, 4))
+                n = contadores[den] = contadores.get(den, 0) + 1
+                den, des = den.format(n=n), des.format(n=n)
+            forma = rnd.random()
+            if forma < 0.25:
+                den = f"Cartório do {den} de {municipio}"
+            elif forma < 0.35:
+                den = _designacao_normalizada(des).title()  # Mesmo texto do TJRJ (casa no critério exato)
+
+            # Gestor: homônimo de outra cidade, acumulando cartórios ou novo
+            sorteio = rnd.random()
+            if sorteio < 0.03 and gestores_usados:
+                gestor = rnd.choice(gestores_usados)
+            elif sorteio < 0.08 and gestor_anterior:
+                gestor = gestor_anterior
+            else:
+                gestor = _nome(rnd)
+            gestores_usados.append(gestor)
+            gestor_anterior = gestor
+
+            cns = f"{next(cns_seq):06d}"
+            if rnd.random() < 0.9:
+                cns_cnj = cns.lstrip('0') if rnd.random() < 0.3 else cns  # Planilha perde o zero à esquerda
+                serventias.append({'CNS': cns_cnj, 'Denominação': den, 'Município': municipio, 'UF': 'RJ',
+                                   'Responsável': gestor, 'Data Responsável': '01/01/2020',
+                                   'Atribuições': "; ".join(ROTULOS_ATRIBUICAO[a] for a in atribs)})
+                esperado = cns
+            else:
+                esperado = NAO_ENCONTRADO  # Cartório sem cadastro no CNJ
+
+            # Gestor no TJRJ
+            sorteio = rnd.random()
+            gestor_tjrj = _sem_acento(gestor)
+            troca_no_mes = None
+            if sorteio < 0.12:
+                gestor_tjrj = _sem_acento(_nome(rnd, 3))  # Interino (CNJ desatualizado)
+            elif sorteio < 0.20:
+                gestor_tjrj = _sem_acento(_com_erro(rnd, gestor))
+            elif sorteio < 0.24:
+                gestor_tjrj = "NAO IDENTIFICADO"
+            elif sorteio < 0.28:
+                troca_no_mes = rnd.randint(2, meses)  # Gestor anterior nos primeiros meses
+
+            cod = str(next(cod_seq))
+            rotulos[cod] = esperado
+            for mes in range(1, meses + 1):
+                receitas = {c: (round(rnd.uniform(100, 1e5), 2) if c in atribs and rnd.random() < 0.9 else 0.0)
+                            for c in ROTULOS_ATRIBUICAO}
+                g = gestor_tjrj
+                if troca_no_mes and mes < troca_no_mes:
+                    g = _sem_acento(_nome(rnd, 3))
+                brutos.append({'cod': cod, 'cidade': cidade_tjrj, 'designacao': des, 'gestor': g,
+                               'ano': 2025, 'mes': mes, **receitas, 'Total': sum(receitas.values())})
+
+        # Cartórios só no CNJ (distratores: mesmo tipo, outro número)
+        for _ in range(max(1, tamanho // 8)):
+            den, _, atribs = rnd.choice(TIPOS)
+            atribs = atribs or rnd.sample(list(ROTULOS_ATRIBUICAO), 3)
+            serventias.append({'CNS': f"{next(cns_seq):06d}", 'Denominação': den.format(n=rnd.randint(20, 30)),
+                               'Município': municipio, 'UF': 'RJ', 'Responsável': _nome(rnd),
+                               'Data Responsável': '01/01/2020',
+                               'Atribuições': "; ".join(ROTULOS_ATRIBUICAO[a] for a in atribs)})
+
+    df_serventias = pd.DataFrame(serventias).sample(frac=1, random_state=seed).reset_index(drop=True)
+    df_brutos = pd.DataFrame(brutos)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_brutos = tjrj.normalize_tjrj_designations(df_brutos)
+    return df_serventias, df_brutos, rotulos
+
+
+def avaliar(df_brutos, cns, rotulos):
+    """Acertos, erros e precisão por linha (mês) contra os rótulos."""
+    esperado = df_brutos['cod'].map(rotulos)
+    previsto = cns != NAO_ENCONTRADO
+    acertos = int(((cns == esperado) & previsto).sum())
+    erros = int(previsto.sum()) - acertos
+    return {'acertos': acertos, 'erros': erros, 'precisao': acertos / max(1, acertos + erros),
+            'cobertura': acertos / max(1, int((esperado != NAO_ENCONTRADO).sum()))}
+
+
+def _legado(df_serventias, df_brutos):
+    return casar_legado(df_brutos.copy(), df_serventias.copy())['CNS']
+
+
+def test_melhor_que_legado():
+    for seed in range(1, 6):
+        df_serventias, df_brutos, rotulos = gerar_base(seed=seed)
+        legado = avaliar(df_brutos, _legado(df_serventias, df_brutos), rotulos)
+        resultado, _ = casar_cns(df_brutos, df_serventias)
+        novo = avaliar(df_brutos, resultado['CNS'], rotulos)
+        assert novo['acertos'] >= legado['acertos'], (seed, novo, legado)
+        assert novo['precisao'] >= legado['precisao'], (seed, novo, legado)
+
+
+def test_um_para_um_e_consistente_por_codigo():
+    df_serventias, df_brutos, _ = gerar_base(seed=3)
+    resultado, contagem = casar_cns(df_brutos, df_serventias)
+    casados = resultado.assign(cod=df_brutos['cod'])[resultado['CNS'] != NAO_ENCONTRADO]
+    assert casados.groupby('cod')['CNS'].nunique().max() == 1
+    assert casados.groupby('CNS')['cod'].nunique().max() == 1
+    assert sum(contagem.values()) == casados['cod'].nunique()
+    # Método e confiança acompanham cada CNS
+    assert (casados['CNS_METODO'] != "").all() and casados['CNS_CONFIANCA'].between(0.5, 1).all()
+    assert (resultado.loc[resultado['CNS'] == NAO_ENCONTRADO, 'CNS_METODO'] == "").all()
+    assert resultado['CNS'].str.len().loc[casados.index].eq(6).all()
+
+
+def test_cache_tem_prioridade():
+    df_serventias, df_brutos, rotulos = gerar_base(seed=2)
+    cod = next(c for c, v in rotulos.items() if v != NAO_ENCONTRADO)
+    outro = next(c for c, v in rotulos.items() if v != NAO_ENCONTRADO and c != cod)
+    # Vínculo manual: `cod` recebe o CNS de `outro` (sem zero à esquerda, como vem da planilha)
+    resultado, contagem = casar_cns(df_brutos, df_serventias, fixos={cod: rotulos[outro].lstrip('0')})
+    assert set(resultado.loc[df_brutos['cod'] == cod, 'CNS']) == {rotulos[outro]}
+    assert set(resultado.loc[df_brutos['cod'] == cod, 'CNS_METODO']) == {'cache'}
+    # O CNS já usado não é dado a mais ninguém
+    assert set(resultado.loc[df_brutos['cod'] == outro, 'CNS']) != {rotulos[outro]}
+    assert contagem['cache'] == 1
+
+
+def test_vinculos_fixos_com_cns_repetido():
+    df_serventias, df_brutos, rotulos = gerar_base(seed=2)
+    cod, outro = [c for c, v in rotulos.items() if v != NAO_ENCONTRADO][:2]
+    # Cache + manual (como 4450 -> 091041): dois códigos com o mesmo CNS, ambos mantidos
+    fixos = {cod: rotulos[cod], outro: rotulos[cod]}
+    resultado, contagem = casar_cns(df_brutos, df_serventias, fixos=fixos)
+    for c in (cod, outro):
+        assert set(resultado.loc[df_brutos['cod'] == c, 'CNS']) == {rotulos[cod]}
+        assert set(resultado.loc[df_brutos['cod'] == c, 'CNS_METODO']) == {'cache'}
+    assert contagem['cache'] == 2
+    # O motor não dá o CNS a um terceiro código
+    assert resultado.loc[~df_brutos['cod'].isin(fixos), 'CNS'].ne(rotulos[cod]).all()
+
+
+def test_criterios_isolados():
+    df_serventias = pd.DataFrame({
+        'CNS': ['1', '000002', '3', '4', '5'],
+        'Denominação': ["1 Ofício de Notas", "Cartório do 2º Ofício de Notas de Niterói",
+                        "Registro de Imóveis", "Ofício Único", "Registro Civil das Pessoas Naturais da 1ª Circunscrição"],
+        'Município': ["Niterói", "Niterói", "Niterói", "Macuco", "Niterói"],
+        'Responsável': ["Ana Lima", "José da Silva Souza Rocha", "Paulo Castro", "Jorge Barros", "Maria Pereira"],
+        'Atribuições': ["Tabelionato de Notas", "Tabelionato de Notas", "Registro de Imóveis",
+                        "Registro Civil das Pessoas Naturais; Tabelionato de Notas", "Registro Civil das Pessoas Naturais"],
+    })
+    df_brutos = pd.DataFrame({
+        'cod': ['10', '20', '30', '40', '50', '60'],
+        'cidade': ["NITEROI", "NITEROI", "NITEROI", "MACUCO", "NITEROI", "NITEROI"],
+        'designacao': ["1 OFICIO DE NOTAS", "2 OFICIO DE NOTAS", "OFICIO DO RI", "OFICIO UNICO X",
+                       "RCPN 1A CIRC", "9 OFICIO DE NOTAS"],
+        'gestor': ["X", "JOSE DA SILVA SOUZA", "NAO IDENTIFICADO", "NAO IDENTIFICADO", "MARIA PEREIRA", "NAO IDENTIFICADO"],
+        'RI': [0, 0, 500.0, 0, 0, 0], 'Notas': [1.0, 2.0, 0, 3.0, 0, 9.0], 'RCPN': [0, 0, 0, 1.0, 7.0, 0],
+    })
+    resultado, _ = casar_cns(df_brutos, df_serventias)
+    assert resultado['CNS'].tolist() == ['000001', '000002', '000003', '000004', '000005', NAO_ENCONTRADO]
+    assert resultado['CNS_METODO'].tolist() == ['exato', 'gestor_parcial', 'atribuicao_unica',
+                                                'atribuicao_unica', 'gestor', '']
+
+
+def test_nome_canonico():
+    assert cns_match_utils._nome_canonico("CARTORIO DO 2O OFICIO DE NOTAS DE NITEROI", "NITEROI") == \
+        ("OFICIO NOTAS", frozenset({'2'}))
+    assert cns_match_utils._nome_canonico("RCPN 03A CIRC", "RIO DE JANEIRO") == \
+        ("REGISTRO CIVIL PESSOAS NATURAIS CIRCUNSCRICAO", frozenset({'3'}))
+
+
+def test_enrich_com_serventias_locais():
+    # Sem credenciais: o cache falha e a base vem de downloads/serventias.csv
+    df_serventias, df_brutos, rotulos = gerar_base(seed=4)
+    cwd, obter_cliente, banco = os.getcwd(), tjrj.gsheets_client_utils.obter_cliente, tjrj.cns_cache_utils.CNS_CACHE_DB
+    with tempfile.TemporaryDirectory() as pasta:
+        tjrj.cns_cache_utils.CNS_CACHE_DB = os.path.join(pasta, "vinculos.sqlite")
+        os.makedirs(os.path.join(pasta, "downloads"))
+        df_serventias.to_csv(os.path.join(pasta, "downloads", "serventias.csv"), index=False)
+
+        def sem_credenciais(*args, **kwargs):
+            raise FileNotFoundError("credenciais")
+        try:
+            os.chdir(pasta)
+            tjrj.gsheets_client_utils.obter_cliente = sem_credenciais
+            with contextlib.redirect_stdout(io.StringIO()) as saida:
+                enriquecido = tjrj.enrich_tjrj_with_cns(df_brutos.copy())
+        finally:
+            os.chdir(cwd)
+            tjrj.cns_cache_utils.aguardar_espelho()
+            tjrj.gsheets_client_utils.obter_cliente = obter_cliente
+            tjrj.cns_cache_utils.CNS_CACHE_DB = banco
+    assert list(enriquecido.columns[:3]) == ['CNS', 'CNS_METODO', 'CNS_CONFIANCA']
+    assert len(enriquecido) == len(df_brutos) and not enriquecido['FROM_CACHE'].any()
+    resultado, _ = casar_cns(df_brutos, df_serventias)
+    assert enriquecido['CNS'].tolist() == resultado['CNS'].tolist()
+    assert "[similaridade]" in saida.getvalue()
+
+
+def benchmark(tamanhos=((25, 60), (100, 200), (300, 600))):
+    print(f"  {'serviços':>9} {'linhas':>8} {'anterior':>10} {'motor':>8}   acertos/erros (anterior -> motor)")
+    for n_municipios, capital in tamanhos:
+        df_serventias, df_brutos, rotulos = gerar_base(n_municipios, capital, seed=n_municipios)
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            legado = avaliar(df_brutos, _legado(df_serventias, df_brutos), rotulos)
+            t_legado = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        resultado, _ = casar_cns(df_brutos, df_serventias)
+        t_novo = time.perf_counter() - inicio
+        novo = avaliar(df_brutos, resultado['CNS'], rotulos)
+        print(f"  {len(rotulos):>9,} {len(df_brutos):>8,} {t_legado:>9.2f}s {t_novo:>7.2f}s"
+              f"   {legado['acertos']}/{legado['erros']} -> {novo['acertos']}/{novo['erros']}"
+              f"  (precisão {legado['precisao']:.1%} -> {novo['precisao']:.1%},"
+              f" cobertura {legado['cobertura']:.1%} -> {novo['cobertura']:.1%})")
+
+
+if __name__ == "__main__":
+    test_melhor_que_legado()
+    test_um_para_um_e_consistente_por_codigo()
+    test_cache_tem_prioridade()
+    test_vinculos_fixos_com_cns_repetido()
+    test_criterios_isolados()
+    test_nome_canonico()
+    test_enrich_com_serventias_locais()
+    print("[OK] Motor de casamento CNS: mais acertos e precisão que a implementação anterior.")
+    print("\n=== Tempo e qualidade por tamanho da base ===")
+    benchmark()
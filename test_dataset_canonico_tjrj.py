@@ -0,0 +1,153 @@
+"""
+Teste do dataset canônico de 'Dados Brutos' (dataset_tjrj_utils.gravar_brutos /
+carregar_brutos e extrai_transp_tjrj.carregar_dados_brutos).
+
+Sem rede: as linhas vêm do gerador determinístico de test_incremental_tjrj. Confere
+que os tipos sobrevivem à ida e volta, que regravar um mês o substitui sem tocar nos
+demais nem perder as colunas de CNS, que o mês fica na mesma partição do modo
+incremental e que as abas renderizadas do dataset são as mesmas calculadas em memória.
+
+Uso:
+    python test_dataset_canonico_tjrj.py     (testes + tempo de leitura de 12 meses)
+    pytest test_dataset_canonico_tjrj.py
+"""
+import os
+import time
+import tempfile
+
+import pandas as pd
+
+import dataset_tjrj_utils
+import extrai_transp_tjrj as tjrj
+from test_incremental_tjrj import _linhas_mes
+
+
+def _df_brutos(meses):
+    linhas = []
+    for ano, mes in meses:
+        linhas.extend(_linhas_mes(ano, mes))
+    return tjrj.montar_dados_brutos(linhas)
+
+
+def _meses(n, ano=2024, mes=1):
+    return [divmod(ano * 12 + mes - 1 + i, 12) for i in range(n)]
+
+
+def _com_dataset(dataset_dir, funcao, *args, **kwargs):
+    original = dataset_tjrj_utils.DATASET_DIR
+    dataset_tjrj_utils.DATASET_DIR = dataset_dir
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        dataset_tjrj_utils.DATASET_DIR = original
+
+
+def test_tipos_e_substituicao_de_mes():
+    meses = [(a, m + 1) for a, m in _meses(3)]
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        df = _df_brutos(meses)
+        # cod como número (ex.: lido com get_all_records) vira texto no dataset
+        df['cod'] = pd.to_numeric(df['cod'])
+        assert dataset_tjrj_utils.gravar_brutos(df, dataset_dir) == meses
+        lido = dataset_tjrj_utils.carregar_brutos(dataset_dir=dataset_dir)
+        assert len(lido) == len(df)
+        assert pd.api.types.is_string_dtype(lido['cod']) and lido['cod'].iloc[0] == str(df['cod'].iloc[0])
+        assert lido['ano'].dtype == 'int16' and lido['Total'].dtype == 'float64'
+        assert lido['RCPN'].isna().sum() == df['RCPN'].isna().sum()
+
+        # Regravar um mês (ex.: com as colunas de CNS) não altera os outros
+        df_mes = df[(df['ano'] == meses[0][0]) & (df['mes'] == meses[0][1])].head(5).copy()
+        df_mes['CNS'] = '091041'
+        df_mes['CNS_CONFIANCA'] = 0.9
+        assert dataset_tjrj_utils.gravar_brutos(df_mes, dataset_dir) == [meses[0]]
+        lido = dataset_tjrj_utils.carregar_brutos(dataset_dir=dataset_dir)
+        assert len(lido) == len(df) - 30 + 5
+        assert lido['CNS'].notna().sum() == 5
+        assert dataset_tjrj_utils.ultimos_meses(2, dataset_dir) == meses[1:]
+        so_um = dataset_tjrj_utils.carregar_brutos([meses[2]], ['cod', 'Total'], dataset_dir)
+        assert list(so_um.columns) == ['cod', 'Total'] and len(so_um) == 30
+
+
+def test_regravar_mes_mantem_cns():
+    meses = [(a, m + 1) for a, m in _meses(2)]
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        df = _df_brutos(meses)
+        # Uma só árvore: 'Dados Brutos' do mês ao lado das linhas do extrator
+        dataset_tjrj_utils.gravar_mes(*meses[0], _linhas_mes(*meses[0]), dataset_dir)
+        dataset_tjrj_utils.gravar_brutos(df, dataset_dir)
+        particao = dataset_tjrj_utils._dir_particao(*meses[0], dataset_dir)
+        assert sorted(os.listdir(particao)) == ['brutos.parquet', 'dados.parquet']
+
+        # popula_cns.py grava o enriquecimento...
+        enriquecido = dataset_tjrj_utils.carregar_brutos(dataset_dir=dataset_dir)
+        enriquecido['CNS'] = enriquecido['cod'].str.zfill(6)
+        enriquecido['CNS_METODO'] = 'exato'
+        enriquecido['CNS_CONFIANCA'] = 1.0
+        enriquecido['FROM_CACHE'] = enriquecido['cod'] == '1'
+        dataset_tjrj_utils.gravar_brutos(enriquecido, dataset_dir)
+
+        # ...e o cloud_main da semana seguinte regrava os meses sem as colunas de CNS
+        novo = df[df['cod'] != '2']
+        assert dataset_tjrj_utils.gravar_brutos(novo, dataset_dir) == meses
+        lido = dataset_tjrj_utils.carregar_brutos(dataset_dir=dataset_dir)
+        assert len(lido) == len(novo)
+        assert (lido['CNS'] == lido['cod'].str.zfill(6)).all()
+        assert (lido['CNS_METODO'] == 'exato').all() and (lido['CNS_CONFIANCA'] == 1.0).all()
+        assert lido['FROM_CACHE'].dtype == bool and lido['FROM_CACHE'].sum() == len(meses)
+
+        # Remover o mês remove os dois arquivos
+        dataset_tjrj_utils.remover_mes(*meses[0], dataset_dir)
+        assert dataset_tjrj_utils.meses_canonicos(dataset_dir) == {meses[1]}
+
+
+def test_migra_arvore_antiga():
+    meses = [(a, m + 1) for a, m in _meses(2)]
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        dataset_tjrj_utils.gravar_brutos(_df_brutos(meses), os.path.join(dataset_dir, 'canonico'))
+        assert dataset_tjrj_utils.meses_canonicos(dataset_dir) == set(meses)
+        assert not os.path.exists(os.path.join(dataset_dir, 'canonico'))
+        assert len(dataset_tjrj_utils.carregar_brutos(dataset_dir=dataset_dir)) == 60
+
+
+def test_abas_renderizadas_do_dataset():
+    meses = [(a, m + 1) for a, m in _meses(14)]
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        df = _df_brutos(meses)
+        assert _com_dataset(dataset_dir, tjrj.carregar_dados_brutos) is None
+        dataset_tjrj_utils.gravar_brutos(df, dataset_dir)
+
+        # Padrão: os 12 meses mais recentes, só as colunas da aba
+        projetado = _com_dataset(dataset_dir, tjrj.carregar_dados_brutos)
+        assert list(projetado.columns) == tjrj.COLUNAS_BRUTAS
+        ultimos = df[df['ano'] * 100 + df['mes'] >= meses[2][0] * 100 + meses[2][1]]
+        assert len(projetado) == len(ultimos)
+
+        for em_memoria, do_dataset in zip(tjrj.gerar_analises(ultimos), tjrj.gerar_analises(projetado)):
+            pd.testing.assert_frame_equal(em_memoria.reset_index(drop=True), do_dataset.reset_index(drop=True),
+                                          check_dtype=False)
+        analise = _com_dataset(dataset_dir, tjrj.carregar_analise_local)
+        assert analise['Media Mensal Total (R$)'].notna().all()
+        assert len(analise) == len(tjrj.gerar_analises(projetado)[0])
+
+
+def medir_leitura(n_meses=12, repeticoes=5):
+    meses = [(a, m + 1) for a, m in _meses(n_meses)]
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        df = _df_brutos(meses)
+        # Volume de um mês real: ~1.500 serviços
+        df = pd.concat([df.assign(cod=df['cod'] + f"_{i}") for i in range(50)], ignore_index=True)
+        dataset_tjrj_utils.gravar_brutos(df, dataset_dir)
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            lido = _com_dataset(dataset_dir, tjrj.carregar_dados_brutos, meses)
+        ms = (time.perf_counter() - inicio) / repeticoes * 1000
+        print(f"  {len(lido)} linhas ({n_meses} meses) lidas do dataset canônico em {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_tipos_e_substituicao_de_mes()
+    test_regravar_mes_mantem_cns()
+    test_migra_arvore_antiga()
+    test_abas_renderizadas_do_dataset()
+    print("[OK] Dataset canônico de 'Dados Brutos'.")
+    medir_leitura()
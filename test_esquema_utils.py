@@ -0,0 +1,119 @@
+"""
+Teste dos tipos compactos (esquema_utils).
+
+Sem rede: quadros sintéticos no formato de 'Dados Brutos' (TJRJ) e da arrecadação do
+CNJ. Confere os tipos atribuídos, que nenhum valor muda na conversão (float32 só
+quando exato, textos com números intactos), que as abas agregadas e a escrita no
+Sheets dão o mesmo resultado com a entrada compactada.
+
+Uso:
+    python test_esquema_utils.py     (testes + memória antes/depois)
+    pytest test_esquema_utils.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import esquema_utils
+import gsheets_escrita_utils
+import extrai_transp_tjrj as tjrj
+from test_agregacao_tjrj_utils import quadro_sintetico
+from test_gsheets_escrita_utils import _PlanilhaFalsa, _planilha
+
+UFS = ['RJ', 'SP', 'MG', 'BA', 'RS', 'PR', 'PE', 'CE']
+
+
+def quadro_cnj(n=470_000, semente=3):
+    """Quadro no formato da aba de arrecadação do CNJ (~470 mil linhas, 2010-2025)."""
+    rnd = np.random.default_rng(semente)
+    cartorio = rnd.integers(0, 13_000, n)
+    ano = rnd.integers(2010, 2026, n)
+    semestre_num = rnd.integers(1, 3, n)
+    return pd.DataFrame({
+        'CNS': pd.Series(cartorio).map('{:06d}'.format).to_numpy(dtype=object),
+        'Estado': np.array(UFS, dtype=object)[cartorio % len(UFS)],
+        'Município': pd.Series(cartorio % 3_000).map('MUNICIPIO {}'.format).to_numpy(dtype=object),
+        'Atribuição': np.array(['Notas', 'RCPN', 'RI', 'Protesto'], dtype=object)[cartorio % 4],
+        'Semestre': [f"{s}S{a}" for s, a in zip(semestre_num, ano)],
+        'Ano': ano,
+        'Semestre_Num': semestre_num,
+        'Quantidade de atos praticados': rnd.integers(0, 50_000, n),
+        'Valor arrecadação': rnd.uniform(0, 1e6, n).round(2),
+        'Valor custeio': rnd.uniform(0, 5e5, n).round(2),
+        'Valor repasse': rnd.uniform(0, 2e5, n).round(2),
+    })
+
+
+def test_tipos_atribuidos():
+    df = quadro_cnj(2_000)
+    df['Quantidade de atos praticados'] = df['Quantidade de atos praticados'].astype(float)
+    compacto = esquema_utils.compactar(df, esquema_utils.ESQUEMA_CNJ)
+    assert all(isinstance(compacto[c].dtype, pd.CategoricalDtype) for c in ['Estado', 'Atribuição', 'Semestre'])
+    assert compacto['Ano'].dtype == 'int16' and compacto['Semestre_Num'].dtype == 'int8'
+    # float inteiro sem ausentes vira inteiro
+    assert compacto['Quantidade de atos praticados'].dtype == 'int32'
+    # Centavos não cabem exatos em float32: continuam float64
+    assert compacto['Valor arrecadação'].dtype == 'float64'
+    # CNS quase único por linha: categórica não compensa
+    assert compacto['CNS'].dtype == df['CNS'].dtype
+    # A entrada não é alterada e os valores são os mesmos
+    assert not isinstance(df['Estado'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(compacto.astype(df.dtypes.to_dict()), df)
+
+
+def test_conversoes_sem_perda():
+    df = pd.DataFrame({
+        'mes': [1.0, 2.0, np.nan],           # com ausente: não vira inteiro
+        'ano': [2024, 2024, 2025],
+        'RCPN': [0.5, 1024.0, np.nan],       # exatos em float32
+        'Total': [0.1, 1.0, 2.0],            # 0.1 não é exato em float32
+        'cod': ['001', '002', '001'],        # texto com número: continua texto (zeros à esquerda)
+        'cidade': ['A', 'A', 'A'],
+        'gestor': [True, False, True],       # booleanos ficam como estão
+        'Emolumentos': ['1.234,56', '', 'N/A'],  # texto BRL ainda não convertido: intocado
+    })
+    compacto = esquema_utils.compactar(df, esquema_utils.ESQUEMA_TJRJ)
+    assert compacto['mes'].dtype == 'float32' and compacto['mes'].isna().sum() == 1
+    assert compacto['ano'].dtype == 'int16'
+    assert compacto['RCPN'].dtype == 'float32' and compacto['Total'].dtype == 'float64'
+    assert compacto['cod'].astype(str).tolist() == ['001', '002', '001']
+    assert compacto['gestor'].dtype == bool
+    assert compacto['Emolumentos'].tolist() == ['1.234,56', '', 'N/A']
+    assert esquema_utils._compactar_numero(pd.Series([1.0, np.inf]), 'inteiro').dtype == 'float32'
+
+
+def test_abas_e_escrita_com_entrada_compactada():
+    df = quadro_sintetico(anos=1, servicos=300)
+    compacto = esquema_utils.compactar(df, esquema_utils.ESQUEMA_TJRJ)
+    assert isinstance(compacto['cidade'].dtype, pd.CategoricalDtype) and compacto['mes'].dtype == 'int8'
+    for novo, original in zip(tjrj.gerar_analises(compacto), tjrj.gerar_analises(df)):
+        assert novo.shape == original.shape
+        assert np.allclose(novo.select_dtypes('number'), original.select_dtypes('number'), equal_nan=True)
+        assert novo['cidade'].astype(str).tolist() == original['cidade'].astype(str).tolist()
+
+    # Mesmo payload para o Sheets (fillna(0.0) em categórica levantaria TypeError)
+    enviados = []
+    for quadro in (df, compacto):
+        planilha = _PlanilhaFalsa(["Dados Brutos"])
+        with _planilha(planilha):
+            gsheets_escrita_utils.escrever_abas("id", [("Dados Brutos", quadro, ("G", "Q"))])
+        enviados.append(planilha.valores[0]['data'][0]['values'])
+    assert enviados[1] == enviados[0]
+    json.dumps(enviados[1])
+    assert esquema_utils.descompactar_categorias(df) is df
+
+
+def relatorio_memoria():
+    for rotulo, df, esquema in (("CNJ sintético", quadro_cnj(), esquema_utils.ESQUEMA_CNJ),
+                                ("TJRJ 12 meses", quadro_sintetico(anos=1, servicos=1500), esquema_utils.ESQUEMA_TJRJ)):
+        print(f"  {len(df)} linhas:", end=" ")
+        esquema_utils.compactar(df, esquema, rotulo=rotulo)
+
+
+if __name__ == "__main__":
+    test_tipos_atribuidos()
+    test_conversoes_sem_perda()
+    test_abas_e_escrita_com_entrada_compactada()
+    print("[OK] Tipos compactos sem alteração de valores.")
+    relatorio_memoria()
@@ -0,0 +1,222 @@
+"""
+Teste das execuções retomáveis do cloud_main (execucao_tjrj_utils + --resume).
+
+Sem rede: a descoberta de links, o download/extração (gerador determinístico de
+test_incremental_tjrj) e o Google Sheets são simulados. Uma execução morre no PDF 9
+de 12 e outra na exportação; as retomadas processam só os PDFs e as abas que
+faltaram e enviam as mesmas abas de uma execução sem falhas.
+
+Uso:
+    python test_execucao_tjrj.py     (testes + custo da re-execução)
+    pytest test_execucao_tjrj.py
+"""
+import io
+import os
+import tempfile
+import contextlib
+
+import pandas as pd
+
+import dataset_tjrj_utils
+import execucao_tjrj_utils
+import instrumentacao_utils
+import gsheets_client_utils
+import gsheets_escrita_utils
+import logging_utils
+import extrai_transp_tjrj as tjrj
+from test_incremental_tjrj import _links, _linhas_mes
+
+LINKS = _links(2024, 10, 14)
+
+
+class _Simulacao:
+    """Descoberta, pipeline de PDFs e Sheets falsos, com contadores e falhas programadas."""
+
+    def __init__(self):
+        self.descobertas = 0
+        self.pdfs = []
+        self.falhar_no_pdf = None
+        self.falhar_exportacao = False
+        self.sincronizadas = 0
+        self.escritas = []
+
+    def descobrir_links(self):
+        self.descobertas += 1
+        return list(LINKS)
+
+    def pipeline(self, links, *args, ao_concluir=None, **kwargs):
+        saida = []
+        for i, url in enumerate(links):
+            if self.falhar_no_pdf is not None and len(self.pdfs) + 1 == self.falhar_no_pdf:
+                raise RuntimeError(f"processo encerrado no PDF {self.falhar_no_pdf}")
+            self.pdfs.append(url)
+            mes, ano = tjrj.extrair_mes_ano(url)
+            nome, dados = f"{ano}_{mes:02d}.pdf", _linhas_mes(ano, mes)
+            if ao_concluir:
+                ao_concluir(i, nome, dados)
+            saida.append((nome, dados))
+        return saida
+
+    def sincronizar_aba(self, ws, df, chave, **kwargs):
+        self.sincronizadas += 1
+        return {'inseridas': len(df), 'atualizadas': 0, 'removidas': 0, 'celulas': 0, 'chamadas': 1}
+
+    def escrever_abas(self, sheet_id, abas, **kwargs):
+        if self.falhar_exportacao:
+            raise RuntimeError("quota excedida")
+        self.escritas.append({titulo: df.copy() for titulo, df, _ in abas})
+        return 2
+
+
+@contextlib.contextmanager
+def _ambiente(simulacao, base):
+    substituicoes = [
+        (tjrj, 'descobrir_links', simulacao.descobrir_links),
+        (tjrj, 'baixar_e_processar_pdfs', simulacao.pipeline),
+        (tjrj, 'log_execution', lambda *args, **kwargs: None),
+        (gsheets_client_utils, 'obter_aba', lambda *args, **kwargs: None),
+        (gsheets_escrita_utils, 'sincronizar_aba', simulacao.sincronizar_aba),
+        (gsheets_escrita_utils, 'escrever_abas', simulacao.escrever_abas),
+        (logging_utils, 'save_debug_snapshot', lambda *args, **kwargs: None),
+        (dataset_tjrj_utils, 'DATASET_DIR', os.path.join(base, 'dados_tjrj')),
+        (execucao_tjrj_utils, 'EXECUCOES_DIR', os.path.join(base, 'execucoes_tjrj')),
+        (instrumentacao_utils, 'METRICAS_ARQUIVO', os.path.join(base, 'metricas_tjrj.jsonl')),
+    ]
+    originais = [(modulo, nome, getattr(modulo, nome)) for modulo, nome, _ in substituicoes]
+    for modulo, nome, valor in substituicoes:
+        setattr(modulo, nome, valor)
+    try:
+        yield
+    finally:
+        for modulo, nome, valor in originais:
+            setattr(modulo, nome, valor)
+
+
+def _executar(simulacao, base, retomar=False):
+    with _ambiente(simulacao, base):
+        try:
+            return tjrj.cloud_main(None, retomar=retomar)
+        except RuntimeError as e:
+            return str(e)
+
+
+def test_checkpoints_da_execucao():
+    with tempfile.TemporaryDirectory() as base:
+        execucao = execucao_tjrj_utils.abrir_execucao(base_dir=base)
+        assert not execucao.concluida('links') and execucao.carregar('links') is None
+        execucao.salvar('links', LINKS[:2])
+        execucao.salvar('exportacao', ['Dados Brutos'], concluida=False)
+        quadro = pd.DataFrame({'cidade': ['A', 'B', 'A'], 'Total': [1.5, None, 3.0]}).astype({'cidade': 'category'})
+        execucao.salvar('analises', (quadro, quadro.head(1)))
+
+        reaberta = execucao_tjrj_utils.abrir_execucao(True, base)
+        assert reaberta.run_id == execucao.run_id
+        assert reaberta.carregar('links') == LINKS[:2]
+        assert reaberta.concluida('analises') and not reaberta.concluida('exportacao')
+        assert reaberta.carregar('exportacao') == ['Dados Brutos']
+        pd.testing.assert_frame_equal(reaberta.carregar('analises')[0], quadro)
+
+        # Concluída com sucesso não é retomada; id explícito sempre é
+        reaberta.finalizar(execucao_tjrj_utils.STATUS_SUCESSO)
+        assert execucao_tjrj_utils.abrir_execucao(True, base).run_id != execucao.run_id
+        assert execucao_tjrj_utils.abrir_execucao(execucao.run_id, base).run_id == execucao.run_id
+
+        # Só as EXECUCOES_MANTER mais recentes ficam em disco
+        for _ in range(execucao_tjrj_utils.EXECUCOES_MANTER + 2):
+            execucao_tjrj_utils.abrir_execucao(base_dir=base)
+        assert len(execucao_tjrj_utils.listar_execucoes(base)) == execucao_tjrj_utils.EXECUCOES_MANTER
+
+
+def test_cloud_main_retoma_de_onde_parou():
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as base_referencia:
+        referencia = _Simulacao()
+        assert _executar(referencia, base_referencia)[1] == 200
+
+        sim = _Simulacao()
+        sim.falhar_no_pdf = 9
+        assert "PDF 9" in _executar(sim, base)
+        execucao = execucao_tjrj_utils.listar_execucoes(os.path.join(base, 'execucoes_tjrj'))[0]
+        assert sum(etapa.startswith('mes_') for etapa in execucao.estado['etapas']) == 8
+
+        # Retomada 1: sem nova descoberta, só os 4 PDFs restantes; a exportação falha depois de 'Dados Brutos'
+        sim.falhar_no_pdf, sim.falhar_exportacao, sim.pdfs = None, True, []
+        assert _executar(sim, base, retomar=True)[1] == 500
+        assert sim.descobertas == 1 and sim.pdfs == LINKS[8:12]
+        assert sim.sincronizadas == 1 and sim.escritas == []
+        falha = execucao_tjrj_utils.Execucao(execucao.run_id, os.path.join(base, 'execucoes_tjrj'))
+        assert falha.estado['status'] == "ERRO EXPORTACAO"
+
+        # Retomada 2: só as 3 abas agregadas são enviadas
+        sim.falhar_exportacao, sim.pdfs = False, []
+        assert _executar(sim, base, retomar=True)[1] == 200
+        assert sim.pdfs == [] and sim.sincronizadas == 1
+        assert list(sim.escritas[0]) == ["Análise 12 Meses", "Distritos", "Cidades"]
+        for titulo, df in sim.escritas[0].items():
+            pd.testing.assert_frame_equal(df, referencia.escritas[0][titulo])
+        execucao = execucao_tjrj_utils.Execucao(execucao.run_id, os.path.join(base, 'execucoes_tjrj'))
+        assert execucao.estado['status'] == execucao_tjrj_utils.STATUS_SUCESSO
+
+        # Nada a retomar: execução nova, do zero
+        _executar(sim, base, retomar=True)
+        assert sim.descobertas == 2 and len(sim.pdfs) == 12
+
+
+def test_incremental_reexporta_apos_falha():
+    with tempfile.TemporaryDirectory() as base:
+        sim = _Simulacao()
+
+        def incremental():
+            with _ambiente(sim, base), contextlib.redirect_stdout(io.StringIO()):
+                return tjrj.cloud_main(None, incremental=True)
+
+        # Meses gravados no dataset, mas a exportação falha
+        sim.falhar_exportacao = True
+        assert incremental()[1] == 500 and len(sim.pdfs) == 12
+
+        # Sem mês novo: as abas ainda não refletem o dataset, então são reenviadas
+        sim.falhar_exportacao, sim.pdfs = False, []
+        assert incremental() == ('Planilha atualizada com sucesso', 200)
+        assert sim.pdfs == [] and len(sim.escritas) == 1
+
+        # Agora sim, nada a fazer
+        assert incremental() == ('Nenhum mês novo para processar', 200)
+        assert len(sim.escritas) == 1
+
+        # Um mês alterado no dataset depois da exportação também é reenviado
+        ano, mes = tjrj.extrair_mes_ano(LINKS[0])[::-1]
+        dataset_tjrj_utils.gravar_mes(ano, mes, _linhas_mes(ano, mes)[:-1], os.path.join(base, 'dados_tjrj'))
+        assert incremental()[0] == 'Planilha atualizada com sucesso' and len(sim.escritas) == 2
+
+
+def test_ao_concluir_em_serie():
+    originais = tjrj._baixar_limitado, tjrj.processar_pdf_content
+    tjrj._baixar_limitado = lambda url, limitador=None: (url, False)
+    tjrj.processar_pdf_content = lambda caminho, nome, *args, **kwargs: [{'arquivo_origem': nome}]
+    entregues = []
+    try:
+        resultado = tjrj.baixar_e_processar_pdfs(LINKS[:3], parse_workers=1,
+                                                 ao_concluir=lambda i, nome, dados: entregues.append((i, nome)))
+    finally:
+        tjrj._baixar_limitado, tjrj.processar_pdf_content = originais
+    assert sorted(entregues) == [(i, nome) for i, (nome, _) in enumerate(resultado)]
+
+
+def custo_da_reexecucao():
+    with tempfile.TemporaryDirectory() as base:
+        sim = _Simulacao()
+        sim.falhar_no_pdf = 9
+        _executar(sim, base)
+        sem_checkpoint = len(LINKS[:12])
+        sim.falhar_no_pdf, sim.pdfs = None, []
+        _executar(sim, base, retomar=True)
+        print(f"  Re-execução após falha no PDF 9 de 12: {sem_checkpoint} PDFs + descoberta de links "
+              f"-> {len(sim.pdfs)} PDFs, {sim.descobertas - 1} descobertas")
+
+
+if __name__ == "__main__":
+    test_checkpoints_da_execucao()
+    test_cloud_main_retoma_de_onde_parou()
+    test_incremental_reexporta_apos_falha()
+    test_ao_concluir_em_serie()
+    print("[OK] Execuções retomáveis do cloud_main.")
+    custo_da_reexecucao()
@@ -0,0 +1,172 @@
+"""
+Teste do cliente compartilhado do Google Sheets (gsheets_client_utils).
+
+Sem rede: a autenticação do gspread é substituída por um cliente falso que conta
+as aberturas de planilha e listagens de abas, para verificar que cliente, planilhas
+e abas são reaproveitados, que as chamadas HTTP são contadas e que 429/5xx são
+repetidos com backoff (respeitando o Retry-After).
+
+Uso:
+    python test_gsheets_client_utils.py
+    pytest test_gsheets_client_utils.py
+"""
+import io
+import os
+import json
+import contextlib
+
+import gspread
+from google.auth.credentials import AnonymousCredentials
+
+import gsheets_client_utils
+
+
+class _AbaFalsa:
+    def __init__(self, title):
+        self.title = title
+        self.linhas = []
+
+    def append_row(self, linha):
+        self.linhas.append(linha)
+
+
+class _PlanilhaFalsa:
+    def __init__(self):
+        self.listagens = 0
+        self.abas = [_AbaFalsa("Dados Brutos"), _AbaFalsa("Log Execucoes")]
+
+    def worksheets(self):
+        self.listagens += 1
+        return list(self.abas)
+
+    def add_worksheet(self, title, rows, cols):
+        aba = _AbaFalsa(title)
+        self.abas.append(aba)
+        return aba
+
+
+class _ClienteFalso:
+    def __init__(self):
+        self.aberturas = 0
+        self.planilhas = {}
+
+    def open_by_key(self, sheet_id):
+        self.aberturas += 1
+        return self.planilhas.setdefault(sheet_id, _PlanilhaFalsa())
+
+
+@contextlib.contextmanager
+def _cliente_falso():
+    """Credenciais pela variável de ambiente e gspread.service_account_from_dict falso."""
+    criados = []
+
+    def service_account_from_dict(info, scopes=None, http_client=None):
+        assert info["private_key"] == "linha1\nlinha2"
+        assert http_client is gsheets_client_utils._HTTPClientContado
+        criados.append(_ClienteFalso())
+        return criados[-1]
+
+    original, env = gspread.service_account_from_dict, os.environ.get("GCP_SERVICE_ACCOUNT")
+    os.environ["GCP_SERVICE_ACCOUNT"] = json.dumps({"private_key": "linha1\\nlinha2"})
+    gspread.service_account_from_dict = service_account_from_dict
+    gsheets_client_utils._cliente = None
+    gsheets_client_utils.esquecer()
+    try:
+        yield criados
+    finally:
+        gspread.service_account_from_dict = original
+        gsheets_client_utils._cliente = None
+        gsheets_client_utils.esquecer()
+        if env is None:
+            os.environ.pop("GCP_SERVICE_ACCOUNT")
+        else:
+            os.environ["GCP_SERVICE_ACCOUNT"] = env
+
+
+def test_cliente_e_abas_reaproveitados():
+    with _cliente_falso() as criados:
+        assert gsheets_client_utils.obter_cliente() is gsheets_client_utils.obter_cliente()
+        assert len(criados) == 1
+        cliente = criados[0]
+
+        aba = gsheets_client_utils.obter_aba("id", "Dados Brutos")
+        assert gsheets_client_utils.obter_aba("id", "Log Execucoes").title == "Log Execucoes"
+        assert gsheets_client_utils.obter_aba("id", "Dados Brutos") is aba
+        planilha = gsheets_client_utils.abrir_planilha("id")
+        assert cliente.aberturas == 1 and planilha.listagens == 1
+
+        try:
+            gsheets_client_utils.obter_aba("id", "Inexistente")
+            assert False, "deveria levantar WorksheetNotFound"
+        except gspread.WorksheetNotFound:
+            pass
+        with contextlib.redirect_stdout(io.StringIO()):
+            nova = gsheets_client_utils.obter_aba("id", "Nova", criar=True, cabecalho=["A", "B"])
+        assert nova.linhas == [["A", "B"]]
+        assert gsheets_client_utils.obter_aba("id", "Nova") is nova
+        assert planilha.listagens == 1
+
+        # Depois de esquecer a planilha, a lista de abas é relida
+        gsheets_client_utils.esquecer("id")
+        gsheets_client_utils.obter_aba("id", "Dados Brutos")
+        assert cliente.aberturas == 2
+
+
+def test_contagem_de_chamadas():
+    class _Resposta:
+        ok = True
+
+    http = gsheets_client_utils._HTTPClientContado(AnonymousCredentials())
+    http.session.request = lambda *args, **kwargs: _Resposta()
+    gsheets_client_utils.zerar_contagem()
+    http.request("get", "https://sheets.googleapis.com/v4/spreadsheets/id")
+    http.request("post", "https://sheets.googleapis.com/v4/spreadsheets/id:batchUpdate")
+    http.request("put", "https://sheets.googleapis.com/v4/spreadsheets/id/values/A1")
+    assert gsheets_client_utils.contar_chamadas() == {'leitura': 1, 'escrita': 2, 'total': 3}
+    assert gsheets_client_utils.resumo_chamadas().startswith("3 chamadas")
+    gsheets_client_utils.zerar_contagem()
+    assert gsheets_client_utils.contar_chamadas()['total'] == 0
+
+
+def test_retentativa_com_retry_after():
+    class _Resposta:
+        def __init__(self, status, headers=None):
+            self.status_code, self.headers = status, headers or {}
+            self.ok = status < 400
+            self.text = ""
+
+        def json(self):
+            return {"error": {"code": self.status_code, "message": "quota", "status": "X"}}
+
+    respostas = [_Resposta(429, {"Retry-After": "3"}), _Resposta(503), _Resposta(200)]
+    esperas = []
+    http = gsheets_client_utils._HTTPClientContado(AnonymousCredentials())
+    http.session.request = lambda *args, **kwargs: respostas.pop(0)
+    dormir = gsheets_client_utils.time.sleep
+    gsheets_client_utils.zerar_contagem()
+    try:
+        gsheets_client_utils.time.sleep = esperas.append
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert http.request("get", "https://sheets.googleapis.com/v4/spreadsheets/id").ok
+        assert len(esperas) == 2 and esperas[0] >= 3
+        assert gsheets_client_utils.contar_chamadas()['leitura'] == 3
+        assert gsheets_client_utils.metricas_taxa()['retentativas'] == 2
+
+        # Erro que não se resolve com nova tentativa: repassado na hora
+        respostas[:] = [_Resposta(404)]
+        try:
+            http.request("get", "https://sheets.googleapis.com/v4/spreadsheets/id")
+            assert False, "deveria levantar APIError"
+        except gspread.exceptions.APIError:
+            pass
+        assert len(esperas) == 2
+    finally:
+        gsheets_client_utils.time.sleep = dormir
+        gsheets_client_utils.zerar_contagem()
+
+
+if __name__ == "__main__":
+    test_cliente_e_abas_reaproveitados()
+    test_contagem_de_chamadas()
+    test_retentativa_com_retry_after()
+    print("[OK] Cliente compartilhado do Google Sheets.")
@@ -0,0 +1,299 @@
+"""
+Teste da escrita em lote de abas (gsheets_escrita_utils).
+
+Sem rede: a planilha falsa guarda os corpos enviados ao batchUpdate e ao
+values.batchUpdate, e contabiliza as chamadas como o cliente compartilhado.
+Compara o nº de chamadas com a exportação anterior (5 chamadas por aba). A
+sincronização por linha é verificada numa aba simulada que aplica as remoções,
+inserções e gravações de intervalos como a API, inclusive a ordem final das linhas
+(a mesma da regravação completa).
+
+Uso:
+    python test_gsheets_escrita_utils.py     (testes + contagem de chamadas)
+    pytest test_gsheets_escrita_utils.py
+"""
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+import gsheets_client_utils
+import gsheets_escrita_utils
+
+
+def _contar(tipo):
+    with gsheets_client_utils._lock:
+        gsheets_client_utils._chamadas[tipo] += 1
+
+
+class _AbaFalsa:
+    def __init__(self, title, id):
+        self.title, self.id = title, id
+
+    # Métodos usados pela exportação anterior (uma chamada cada)
+    def clear(self):
+        _contar('escrita')
+
+    def update(self, values, value_input_option=None):
+        _contar('escrita')
+
+    def freeze(self, rows=None):
+        _contar('escrita')
+
+    def set_basic_filter(self, *args):
+        _contar('escrita')
+
+    def format(self, intervalo, formato):
+        _contar('escrita')
+
+
+class _PlanilhaFalsa:
+    def __init__(self, titulos):
+        self.abas = {t: _AbaFalsa(t, 100 + i) for i, t in enumerate(titulos)}
+        self.lotes, self.valores = [], []
+
+    def batch_update(self, body):
+        _contar('escrita')
+        self.lotes.append(body)
+
+    def values_batch_update(self, body):
+        _contar('escrita')
+        self.valores.append(body)
+
+
+@contextlib.contextmanager
+def _planilha(planilha):
+    originais = gsheets_client_utils.obter_aba, gsheets_client_utils.abrir_planilha
+
+    def obter_aba(sheet_id, titulo, criar=False, **kwargs):
+        if titulo not in planilha.abas:
+            _contar('escrita')
+            planilha.abas[titulo] = _AbaFalsa(titulo, 100 + len(planilha.abas))
+        return planilha.abas[titulo]
+    gsheets_client_utils.obter_aba = obter_aba
+    gsheets_client_utils.abrir_planilha = lambda sheet_id: planilha
+    try:
+        yield
+    finally:
+        gsheets_client_utils.obter_aba, gsheets_client_utils.abrir_planilha = originais
+
+
+def _df(n, colunas=('cod', 'cidade', 'Total')):
+    df = pd.DataFrame({c: [f"{c}{i}" for i in range(n)] for c in colunas})
+    df['Total'] = np.arange(n, dtype=float)
+    if n:
+        df.loc[0, 'Total'] = np.nan
+    return df
+
+
+# ####################################################################
+# REFERÊNCIA: implementação anterior (não alterar)
+# ####################################################################
+def enviar_aba_legado(df, nome_aba, col_inicial_format=None, col_final_format=None):
+    ws = gsheets_client_utils.obter_aba("id", nome_aba, criar=True, rows=len(df)+50, cols=len(df.columns)+5)
+    df = df.fillna(0.0) # Previne NaN
+    values = [df.columns.values.tolist()] + df.values.tolist()
+    ws.clear()
+    ws.update(values, value_input_option='USER_ENTERED')
+    ws.freeze(rows=1)
+    ws.set_basic_filter(1, 1, len(df)+1, len(df.columns))
+    if col_inicial_format and col_final_format:
+        range_sq = f"{col_inicial_format}2:{col_final_format}{len(df)+1}"
+        ws.format(range_sq, {"numberFormat": {"type": "NUMBER", "pattern": "#,##0.00"}})
+
+
+def test_compilar_aba():
+    valores = [['cod', 'cidade', 'Total'], ['1', 'A', 1.0], ['2', 'B', 2.0]]
+    req = gsheets_escrita_utils.compilar_aba(7, valores, ("C", "C"))
+    tipos = [list(r)[0] for r in req]
+    assert tipos == ['updateSheetProperties', 'updateCells', 'setBasicFilter', 'repeatCell']
+    grade = req[0]['updateSheetProperties']['properties']['gridProperties']
+    assert grade == {'rowCount': 4, 'columnCount': 3, 'frozenRowCount': 1}
+    assert req[2]['setBasicFilter']['filter']['range'] == {
+        'sheetId': 7, 'startRowIndex': 0, 'endRowIndex': 3, 'startColumnIndex': 0, 'endColumnIndex': 3}
+    formato = req[3]['repeatCell']['range']
+    assert (formato['startRowIndex'], formato['endRowIndex']) == (1, 3)
+    assert (formato['startColumnIndex'], formato['endColumnIndex']) == (2, 3)
+    # Sem colunas de formato (ou sem linhas de dados): sem repeatCell
+    assert len(gsheets_escrita_utils.compilar_aba(7, valores)) == 3
+    assert len(gsheets_escrita_utils.compilar_aba(7, valores[:1], ("C", "C"))) == 3
+    assert gsheets_escrita_utils._indice_coluna("AA") == 26
+
+
+def test_escrever_abas_em_duas_chamadas():
+    planilha = _PlanilhaFalsa(["Dados Brutos", "Cidades"])
+    abas = [("Dados Brutos", _df(5), ("C", "C")), ("Cidades", _df(2), None), ("Nova", _df(0), None)]
+    with _planilha(planilha):
+        chamadas = gsheets_escrita_utils.escrever_abas("id", abas)
+    # 1 criação da aba inexistente + 1 batchUpdate + 1 values.batchUpdate
+    assert chamadas == 3
+    assert len(planilha.lotes) == 1 and len(planilha.valores) == 1
+    ids = {r[list(r)[0]].get('properties', {}).get('sheetId') for r in planilha.lotes[0]['requests']} - {None}
+    assert ids == {planilha.abas[t].id for t, _, _ in abas}
+
+    corpo = planilha.valores[0]
+    assert corpo['valueInputOption'] == 'USER_ENTERED'
+    assert [d['range'] for d in corpo['data']] == ["'Dados Brutos'!A1", "'Cidades'!A1", "'Nova'!A1"]
+    brutos = corpo['data'][0]['values']
+    assert brutos[0] == ['cod', 'cidade', 'Total'] and brutos[1] == ['cod0', 'cidade0', 0.0] and len(brutos) == 6
+
+
+class _AbaSimulada:
+    """Aba em memória: aplica deleteDimension/insertDimension e values.batchUpdate."""
+
+    def __init__(self, valores, title="Dados Brutos"):
+        self.title, self.id, self.spreadsheet = title, 1, self
+        self.valores = [[str(v) for v in l] for l in valores]
+        self.leituras, self.lotes, self.celulas = 0, [], 0
+
+    def get_all_values(self, **kwargs):
+        _contar('leitura')
+        self.leituras += 1
+        return [list(l) for l in self.valores]
+
+    def batch_update(self, body):
+        _contar('escrita')
+        self.lotes.append(body)
+        for req in body['requests']:
+            if 'deleteDimension' in req:
+                r = req['deleteDimension']['range']
+                del self.valores[r['startIndex']:r['endIndex']]
+            elif 'insertDimension' in req:
+                r = req['insertDimension']['range']
+                largura = len(self.valores[0])
+                for _ in range(r['endIndex'] - r['startIndex']):
+                    self.valores.insert(r['startIndex'], [''] * largura)
+
+    def values_batch_update(self, body):
+        _contar('escrita')
+        for bloco in body['data']:
+            inicio = int(bloco['range'].split('!A')[1].split(':')[0])
+            for n, linha in enumerate(bloco['values']):
+                self.valores[inicio - 1 + n] = [str(v) for v in linha]
+                self.celulas += len(linha)
+
+
+def _linhas(df):
+    return [[str(v) for v in l] for l in df.values.tolist()]
+
+
+def _base(n):
+    return pd.DataFrame({'cod': [str(i) for i in range(n)], 'ano': 2025, 'mes': 1,
+                         'Total': [float(i) for i in range(n)], 'atualizado': 'ontem'})
+
+
+def test_sincronizar_aba_grava_so_o_que_mudou():
+    antigo = _base(10)
+    aba = _AbaSimulada([list(antigo.columns)] + antigo.values.tolist())
+    novo = antigo.drop(index=[2, 3, 7]).copy()
+    novo.loc[[0, 5], 'Total'] = [100.0, 500.0]
+    novo = pd.concat([novo, _base(14).iloc[10:]], ignore_index=True)  # 4 novas
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = gsheets_escrita_utils.sincronizar_aba(aba, novo, ['cod', 'ano', 'mes'])
+    assert {k: resultado[k] for k in ('inseridas', 'atualizadas', 'removidas')} == \
+        {'inseridas': 4, 'atualizadas': 2, 'removidas': 3}
+    assert resultado['chamadas'] == 3 and aba.leituras == 1
+    assert aba.valores[0] == list(novo.columns)
+    assert aba.valores[1:] == _linhas(novo)
+    # 4 inseridas + 2 alteradas
+    assert aba.celulas == 6 * len(novo.columns)
+
+    # Mesmo conteúdo, só a coluna ignorada muda: nenhuma escrita
+    novo['atualizado'] = 'hoje'
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = gsheets_escrita_utils.sincronizar_aba(aba, novo, ['cod', 'ano', 'mes'], ignorar=['atualizado'])
+    assert resultado['chamadas'] == 1 and resultado['celulas'] == 0
+
+    # Só remoções: linhas apagadas, nada gravado
+    menor = novo.iloc[:5]
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = gsheets_escrita_utils.sincronizar_aba(aba, menor, ['cod', 'ano', 'mes'], ignorar=['atualizado'])
+    assert resultado['removidas'] == len(novo) - 5 and resultado['celulas'] == 0
+    assert aba.valores[1:] == _linhas(menor.assign(atualizado='ontem'))
+
+    # Números gravados pela API sem zeros à esquerda/casas decimais são o mesmo valor
+    aba.valores[1][0] = aba.valores[1][0].zfill(6)
+    aba.valores[2][3] = aba.valores[2][3].replace('.0', '')
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert gsheets_escrita_utils.sincronizar_aba(aba, menor, ['cod', 'ano', 'mes'],
+                                                     ignorar=['atualizado'])['celulas'] == 0
+
+
+def test_sincronizar_aba_mantem_ordem():
+    # 'Dados Brutos': ordenada por cidade/designacao/ano/mes; sai o mês mais antigo, entra o novo
+    def brutos(meses):
+        return pd.DataFrame([{'cod': str(c), 'cidade': cidade, 'ano': 2025, 'mes': m, 'Total': float(c * m)}
+                             for cidade, cods in (('CAPITAL', (1, 2)), ('MACAE', (3,)), ('NITEROI', (4, 5)))
+                             for c in cods for m in meses])
+    antigo, novo = brutos([1, 2, 3]), brutos([2, 3, 4])
+    novo.loc[novo['cod'] == '3', 'Total'] += 1  # 2 linhas alteradas
+    novo = pd.concat([novo, pd.DataFrame([{'cod': '0', 'cidade': 'ANGRA', 'ano': 2025, 'mes': 4, 'Total': 9.0}])])
+    novo = novo.sort_values(['cidade', 'cod', 'ano', 'mes'], ignore_index=True)
+    aba = _AbaSimulada([list(antigo.columns)] + antigo.values.tolist())
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = gsheets_escrita_utils.sincronizar_aba(aba, novo, ['cod', 'ano', 'mes'])
+    assert {k: resultado[k] for k in ('inseridas', 'atualizadas', 'removidas')} == \
+        {'inseridas': 6, 'atualizadas': 2, 'removidas': 5}
+    assert aba.valores == [list(novo.columns)] + _linhas(novo)
+    assert aba.celulas == 8 * len(novo.columns) and resultado['chamadas'] == 3
+    # Inserção logo abaixo do cabeçalho não herda a formatação dele
+    insercoes = [r['insertDimension'] for r in aba.lotes[0]['requests'] if 'insertDimension' in r]
+    assert insercoes[0]['range']['startIndex'] == 1 and not insercoes[0]['inheritFromBefore']
+
+    # Linhas mantidas em outra ordem (ex.: aba reordenada à mão): regravação completa
+    aba.valores[1:] = aba.valores[1:][::-1]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert gsheets_escrita_utils.sincronizar_aba(aba, novo, ['cod', 'ano', 'mes']) is None
+
+
+def test_sincronizar_aba_sem_delta():
+    df = _base(3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Aba vazia, cabeçalho diferente, chave ausente ou repetida: regravação completa
+        assert gsheets_escrita_utils.sincronizar_aba(_AbaSimulada([]), df, ['cod']) is None
+        assert gsheets_escrita_utils.sincronizar_aba(_AbaSimulada([['x']]), df, ['cod']) is None
+        aba = _AbaSimulada([list(df.columns)] + df.values.tolist())
+        assert gsheets_escrita_utils.sincronizar_aba(aba, df, ['cnpj']) is None
+        assert gsheets_escrita_utils.sincronizar_aba(aba, df, ['ano', 'mes']) is None
+        modo = gsheets_escrita_utils.MODO_SINCRONIA
+        gsheets_escrita_utils.MODO_SINCRONIA = 'completa'
+        try:
+            assert gsheets_escrita_utils.sincronizar_aba(aba, df, ['cod']) is None
+        finally:
+            gsheets_escrita_utils.MODO_SINCRONIA = modo
+
+
+def comparar_delta(n=13000, alteradas=25):
+    antigo = _base(n)
+    aba = _AbaSimulada([list(antigo.columns)] + antigo.values.tolist())
+    novo = antigo.copy()
+    novo.loc[novo.index[::n // alteradas], 'Total'] += 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = gsheets_escrita_utils.sincronizar_aba(aba, novo, ['cod', 'ano', 'mes'])
+    print(f"  Sincronização de {n:,} linhas com {resultado['atualizadas']} alteradas: "
+          f"{resultado['celulas']:,} células gravadas (regravação completa: {(n + 1) * len(novo.columns):,})")
+
+
+def comparar_chamadas():
+    abas = [("Dados Brutos", _df(3000), ("G", "Q")), ("Análise 12 Meses", _df(300), ("D", "N")),
+            ("Distritos", _df(400), ("D", "N")), ("Cidades", _df(90), ("B", "E"))]
+    with _planilha(_PlanilhaFalsa([t for t, _, _ in abas])), contextlib.redirect_stdout(io.StringIO()):
+        gsheets_client_utils.zerar_contagem()
+        for titulo, df, (inicio, fim) in abas:
+            enviar_aba_legado(df, titulo, inicio, fim)
+        legado = gsheets_client_utils.contar_chamadas()['total']
+        lote = gsheets_escrita_utils.escrever_abas("id", abas)
+    gsheets_client_utils.zerar_contagem()
+    print(f"  Exportação de {len(abas)} abas: {legado} chamadas à API (anterior) -> {lote} (em lote)")
+
+
+if __name__ == "__main__":
+    test_compilar_aba()
+    test_escrever_abas_em_duas_chamadas()
+    test_sincronizar_aba_grava_so_o_que_mudou()
+    test_sincronizar_aba_mantem_ordem()
+    test_sincronizar_aba_sem_delta()
+    print("[OK] Escrita em lote e sincronização por linha.")
+    comparar_chamadas()
+    comparar_delta()
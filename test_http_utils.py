@@ -0,0 +1,163 @@
+"""
+Teste da camada HTTP compartilhada (http_utils).
+
+Sobe um servidor HTTP local (keep-alive) que registra as conexões abertas: as
+requisições ao mesmo host reaproveitam a conexão, 503 com Retry-After é repetido
+pela política de transporte e as estatísticas por host são contadas. Com HTTP2=1
+(cliente httpx), os redirecionamentos são seguidos como no requests e os argumentos
+repassados.
+
+Uso:
+    python test_http_utils.py     (testes + comparação com requests.get sem pool)
+    pytest test_http_utils.py
+"""
+import time
+import socket
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import http_utils
+
+
+class _Servidor(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    conexoes = set()
+    falhas = {}
+
+    def setup(self):
+        super().setup()
+        # Cabeçalhos e corpo saem em escritas separadas: sem NODELAY o keep-alive esbarra no ACK atrasado
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        type(self).conexoes.add(self.client_address)
+        if self.path.startswith("/redireciona"):
+            self._responder(302, b"", {"Location": "/destino" + self.path[len("/redireciona"):]})
+            return
+        if self.path.startswith("/eco"):
+            corpo = f"{self.path} {self.headers.get('X-Teste')}"
+            self._responder(200, corpo.encode())
+            return
+        if self.falhas.get(self.path, 0) > 0:
+            self.falhas[self.path] -= 1
+            self._responder(503, b"ocupado", {"Retry-After": "0"})
+            return
+        self._responder(200, b"%PDF-1.4 ok")
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def _servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Servidor)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    _Servidor.conexoes, _Servidor.falhas = set(), {}
+    try:
+        yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        http_utils.zerar_estatisticas()
+
+
+def test_conexao_reaproveitada_e_estatisticas():
+    with _servidor() as base:
+        http_utils.zerar_estatisticas()
+        for i in range(20):
+            r = http_utils.get(f"{base}/pagina/{i}", timeout=5)
+            assert r.status_code == 200 and r.text.startswith("%PDF")
+        with http_utils.get(f"{base}/arquivo.pdf", stream=True, timeout=5) as r:
+            assert b"".join(r.iter_content(4)) == b"%PDF-1.4 ok"
+        assert len(_Servidor.conexoes) == 1
+        assert http_utils.sessao(f"{base}/x") is http_utils.sessao(f"{base}/y")
+
+        e = http_utils.estatisticas()[base]
+        assert e['requisicoes'] == 21 and e['erros'] == 0 and e['latencia'] > 0
+        assert "21 req, 0 erros" in http_utils.resumo_hosts()
+
+
+def test_retentativa_de_transporte():
+    backoff, sessoes = http_utils.BACKOFF, dict(http_utils._sessoes)
+    http_utils.BACKOFF = 0.01
+    http_utils._sessoes.clear()
+    try:
+        with _servidor() as base:
+            _Servidor.falhas = {"/instavel": 2, "/fora": 10}
+            assert http_utils.get(f"{base}/instavel", timeout=5).status_code == 200
+            assert _Servidor.falhas["/instavel"] == 0
+            # Esgotadas as tentativas, o status final volta para o chamador
+            assert http_utils.get(f"{base}/fora", timeout=5).status_code == 503
+            assert _Servidor.falhas["/fora"] == 10 - (http_utils.TENTATIVAS + 1)
+            assert http_utils.estatisticas()[base]['erros'] == 1
+    finally:
+        http_utils.BACKOFF = backoff
+        http_utils._sessoes.clear()
+        http_utils._sessoes.update(sessoes)
+
+
+def test_caminho_http2():
+    if http_utils.httpx is None:
+        print("[AVISO] httpx não instalado: caminho HTTP/2 não testado.")
+        return
+    usar, clientes = http_utils.USAR_HTTP2, dict(http_utils._clientes_http2)
+    http_utils.USAR_HTTP2 = True
+    http_utils._clientes_http2.clear()
+    try:
+        with _servidor() as base:
+            r = http_utils.get(f"{base}/redireciona?x=1", timeout=5)
+            assert r.status_code == 200 and r.text == "%PDF-1.4 ok" and str(r.url).endswith("/destino?x=1")
+            assert http_utils.get(f"{base}/redireciona", timeout=5, allow_redirects=False).status_code == 302
+
+            r = http_utils.get(f"{base}/eco", timeout=5, params={'q': 'a'}, headers={'X-Teste': 'sim'})
+            assert r.text == "/eco?q=a sim"
+            try:
+                http_utils.get(f"{base}/eco", timeout=5, cookies={'sessao': '1'}, proxies={'http': 'x'})
+                assert False, "argumento sem suporte deveria levantar TypeError"
+            except TypeError as e:
+                assert "cookies, proxies" in str(e)
+            # stream=True continua no requests (sem restrição de argumentos)
+            with http_utils.get(f"{base}/eco", timeout=5, stream=True, proxies={}) as r:
+                assert r.status_code == 200
+            assert http_utils.estatisticas()[base]['requisicoes'] == 4
+    finally:
+        http_utils.USAR_HTTP2 = usar
+        for cliente in http_utils._clientes_http2.values():
+            cliente.close()
+        http_utils._clientes_http2.clear()
+        http_utils._clientes_http2.update(clientes)
+
+
+def comparar(n=200):
+    with _servidor() as base:
+        inicio = time.perf_counter()
+        for i in range(n):
+            requests.get(f"{base}/{i}", timeout=5).text
+        sem_pool, conexoes_sem_pool = time.perf_counter() - inicio, len(_Servidor.conexoes)
+        _Servidor.conexoes = set()
+        inicio = time.perf_counter()
+        for i in range(n):
+            http_utils.get(f"{base}/{i}", timeout=5).text
+        com_pool = time.perf_counter() - inicio
+        print(f"  {n} GETs locais: {sem_pool * 1000:.0f} ms / {conexoes_sem_pool} conexões (requests.get) -> "
+              f"{com_pool * 1000:.0f} ms / {len(_Servidor.conexoes)} conexão (http_utils)")
+
+
+if __name__ == "__main__":
+    test_conexao_reaproveitada_e_estatisticas()
+    test_retentativa_de_transporte()
+    test_caminho_http2()
+    print("[OK] Camada HTTP compartilhada.")
+    comparar()
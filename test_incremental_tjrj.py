@@ -0,0 +1,123 @@
+"""
+Teste do modo incremental do cloud_main (extrai_transp_tjrj.atualizar_meses).
+
+O download/extração é simulado (sem rede): cada mês gera linhas determinísticas.
+Confere que uma execução incremental só processa os meses ausentes do dataset
+local e que as abas recalculadas são idênticas às de uma execução completa.
+
+Uso:
+    python test_incremental_tjrj.py
+    pytest test_incremental_tjrj.py
+"""
+import random
+import tempfile
+
+import pandas as pd
+
+import dataset_tjrj_utils
+import extrai_transp_tjrj as tjrj
+
+MESES_URL = ['janeiro', 'fevereiro', 'marco', 'abril', 'maio', 'junho', 'julho',
+             'agosto', 'setembro', 'outubro', 'novembro', 'dezembro']
+
+
+def _links(ano_inicio, mes_inicio, n):
+    """n links mensais a partir de (ano_inicio, mes_inicio), do mais recente para o mais antigo."""
+    links = []
+    for i in range(n):
+        indice = ano_inicio * 12 + (mes_inicio - 1) + i
+        ano, mes = divmod(indice, 12)
+        links.append(f"https://www.tjrj.jus.br/documents/d/guest/receita-{MESES_URL[mes]}-{ano}")
+    return links[::-1]
+
+
+def _linhas_mes(ano, mes):
+    rnd = random.Random(ano * 100 + mes)
+    linhas = []
+    for cod in range(1, 31):
+        linha = {col: None for col in tjrj.COLUNAS_BRUTAS}
+        linha.update(cod=str(cod), cidade=rnd.choice(['NITEROI', 'CAPITAL', 'MACAE']),
+                     designacao=f"{cod % 4 + 1} RCPN DISTR", arquivo_origem=f"{ano}_{mes:02d}.pdf",
+                     mes=mes, ano=ano, gestor=f"GESTOR {cod}", cargo='Titular')
+        # Colunas ausentes (None) em parte dos meses: o dataset deve preservar o None
+        if rnd.random() < 0.6:
+            linha['RCPN'] = round(rnd.uniform(100, 5000), 2)
+        linha['Total'] = round(rnd.uniform(1000, 90000), 2)
+        linhas.append(linha)
+    return linhas
+
+
+class _PipelineFalso:
+    """Substitui baixar_e_processar_pdfs, registrando os links pedidos."""
+
+    def __init__(self):
+        self.pedidos = []
+
+    def __call__(self, links, *args, **kwargs):
+        self.pedidos.extend(links)
+        saida = []
+        for url in links:
+            mes, ano = tjrj.extrair_mes_ano(url)
+            saida.append((f"{ano}_{mes:02d}.pdf", _linhas_mes(ano, mes)))
+        return saida
+
+
+def _executar(links, incremental, dataset_dir):
+    original_pipeline, original_dir = tjrj.baixar_e_processar_pdfs, dataset_tjrj_utils.DATASET_DIR
+    falso = _PipelineFalso()
+    tjrj.baixar_e_processar_pdfs = falso
+    dataset_tjrj_utils.DATASET_DIR = dataset_dir
+    try:
+        dados, resumo = tjrj.atualizar_meses(links, incremental=incremental)
+    finally:
+        tjrj.baixar_e_processar_pdfs, dataset_tjrj_utils.DATASET_DIR = original_pipeline, original_dir
+    return dados, resumo, falso.pedidos
+
+
+def _abas(dados):
+    df_brutos = tjrj.montar_dados_brutos(dados)
+    return (df_brutos,) + tjrj.gerar_analises(df_brutos)
+
+
+def test_incremental_processa_so_meses_novos():
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        janela_antiga = _links(2024, 10, 12)
+        _, _, pedidos = _executar(janela_antiga, incremental=False, dataset_dir=dataset_dir)
+        assert pedidos == janela_antiga
+        assert len(dataset_tjrj_utils.meses_materializados(dataset_dir)) == 12
+
+        # Um mês novo publicado: a janela dos 12 mais recentes avança um mês
+        janela_nova = _links(2024, 11, 12)
+        dados_inc, resumo, pedidos = _executar(janela_nova, incremental=True, dataset_dir=dataset_dir)
+        assert pedidos == [janela_nova[0]]
+        assert [origem for _, origem, _ in resumo] == ['PDF'] + ['DATASET'] * 11
+
+        # Mesmo resultado de uma execução completa sobre a mesma janela
+        with tempfile.TemporaryDirectory() as outro_dir:
+            dados_full, _, pedidos_full = _executar(janela_nova, incremental=False, dataset_dir=outro_dir)
+        assert len(pedidos_full) == 12
+        assert dados_inc == dados_full
+        for aba_inc, aba_full in zip(_abas(dados_inc), _abas(dados_full)):
+            pd.testing.assert_frame_equal(aba_inc, aba_full)
+
+        # Nada novo: nenhum download
+        _, resumo, pedidos = _executar(janela_nova, incremental=True, dataset_dir=dataset_dir)
+        assert pedidos == []
+        assert all(origem == 'DATASET' for _, origem, _ in resumo)
+
+
+def test_dataset_preserva_valores_ausentes():
+    with tempfile.TemporaryDirectory() as dataset_dir:
+        linhas = _linhas_mes(2025, 1)
+        assert dataset_tjrj_utils.gravar_mes(2025, 1, linhas, dataset_dir)
+        assert dataset_tjrj_utils.carregar_mes(2025, 1, dataset_dir) == linhas
+        assert not dataset_tjrj_utils.gravar_mes(2025, 2, [], dataset_dir)
+        assert dataset_tjrj_utils.meses_materializados(dataset_dir) == {(2025, 1)}
+        dataset_tjrj_utils.remover_mes(2025, 1, dataset_dir)
+        assert dataset_tjrj_utils.meses_materializados(dataset_dir) == set()
+
+
+if __name__ == "__main__":
+    test_incremental_processa_so_meses_novos()
+    test_dataset_preserva_valores_ausentes()
+    print("[OK] Modo incremental idêntico à execução completa.")
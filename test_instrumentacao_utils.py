@@ -0,0 +1,174 @@
+"""
+Teste da medição por etapa (instrumentacao_utils) no cloud_main e no
+enrich_tjrj_with_cns.
+
+Sem rede: contadores de chamadas do Sheets e de requisições HTTP incrementados à mão,
+o cloud_main simulado de test_execucao_tjrj e o enriquecimento com a base sintética
+de test_cns_match_tjrj. Confere as linhas JSON gravadas, o resumo do 'Log Execucoes'
+e a coluna 'Detalhes'.
+
+Uso:
+    python test_instrumentacao_utils.py     (testes + custo da medição por etapa)
+    pytest test_instrumentacao_utils.py
+"""
+import io
+import os
+import json
+import time
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import gsheets_client_utils
+import http_utils
+import instrumentacao_utils
+import extrai_transp_tjrj as tjrj
+import test_cns_match_tjrj as casamento
+from test_execucao_tjrj import _Simulacao, _ambiente
+
+
+def _linhas(arquivo):
+    with open(arquivo, encoding='utf-8') as f:
+        return [json.loads(l) for l in f]
+
+
+def _contar_sheets(n):
+    with gsheets_client_utils._lock:
+        gsheets_client_utils._chamadas['escrita'] += n
+
+
+def test_etapas_e_linhas_json():
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, 'metricas.jsonl')
+        rastreio = instrumentacao_utils.Rastreio('cloud_main', 'r1', arquivo)
+        with rastreio.etapa('links') as etapa:
+            http_utils._registrar('https://exemplo', 0.01, tamanho=2048)
+            http_utils._registrar('https://exemplo', 0.01, tamanho=1024 ** 2)
+            etapa.registrar(linhas=14)
+        with rastreio.etapa('pdfs') as etapa:
+            # Tempos somados de threads (ex.: downloads simultâneos)
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(lambda _: instrumentacao_utils.acumular('download_s', 0.5), range(8)))
+        try:
+            with rastreio.etapa('exportacao'):
+                _contar_sheets(3)
+                raise RuntimeError("quota")
+        except RuntimeError:
+            pass
+        instrumentacao_utils.acumular('download_s', 1.0)  # sem etapa aberta: ignorado
+        rastreio.fechar()
+        rastreio.fechar()
+
+        registros = _linhas(arquivo)
+        assert [r['etapa'] for r in registros] == ['links', 'pdfs', 'exportacao', 'total']
+        links, pdfs, exportacao, total = registros
+        assert links['linhas'] == 14 and links['requisicoes_http'] == 2 and links['bytes'] == 2048 + 1024 ** 2
+        assert pdfs['download_s'] == 4.0 and pdfs['requisicoes_http'] == 0
+        assert exportacao['status'] == 'erro' and exportacao['chamadas_sheets'] == 3
+        assert total['requisicoes_http'] == 2 and total['chamadas_sheets'] == 3
+        assert {r['run_id'] for r in registros} == {'r1'}
+
+        resumo = rastreio.resumo()
+        assert resumo.startswith("links ") and "14 lin 1.0 MB 2 req" in resumo
+        assert "pdfs 0.0s (download 4.0s)" in resumo and "3 api ERRO" in resumo
+
+
+def test_proxima_fecha_a_anterior():
+    rastreio = instrumentacao_utils.Rastreio('enrich_tjrj_with_cns', arquivo='')
+    rastreio.proxima('normalizacao').registrar(linhas=5)
+    rastreio.proxima('cache')
+    assert rastreio.etapas[0].duracao is not None and rastreio.etapas[1].duracao is None
+    rastreio.fechar('erro')
+    assert [e.status for e in rastreio.etapas] == ['ok', 'erro']
+
+
+def test_cloud_main_registra_etapas_e_log():
+    with tempfile.TemporaryDirectory() as base:
+        sim, logs = _Simulacao(), []
+        with _ambiente(sim, base):
+            original = tjrj.log_execution
+            tjrj.log_execution = lambda *args: logs.append(args)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    assert tjrj.cloud_main(None)[1] == 200
+            finally:
+                tjrj.log_execution = original
+        registros = _linhas(os.path.join(base, 'metricas_tjrj.jsonl'))
+        assert [r['etapa'] for r in registros] == ['links', 'pdfs', 'analises', 'exportacao', 'total']
+        por_etapa = {r['etapa']: r for r in registros}
+        assert por_etapa['links']['linhas'] == 14
+        assert por_etapa['pdfs']['linhas'] == 12 * 30 and por_etapa['pdfs']['arquivos'] == 12
+        assert por_etapa['analises']['bytes'] > 0
+        status, mensagem, _, detalhes = logs[0]
+        assert status == "SUCESSO" and detalhes.startswith("links ") and "; exportacao " in detalhes
+
+
+def test_coluna_detalhes_do_log():
+    class _Aba:
+        linhas = []
+
+        def append_row(self, linha):
+            self.linhas.append(linha)
+
+    original = gsheets_client_utils.obter_aba
+    gsheets_client_utils.obter_aba = lambda *args, **kwargs: _Aba()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tjrj.log_execution("SUCESSO", "Processo concluído", 12.345, "links 1.0s; pdfs 9.0s")
+            tjrj.log_execution("ERRO", "Falha", 1)
+    finally:
+        gsheets_client_utils.obter_aba = original
+    assert _Aba.linhas[0][2:] == [12.35, "Processo concluído", "Cloud Function/Streamlit | links 1.0s; pdfs 9.0s"]
+    assert _Aba.linhas[1][4] == "Cloud Function/Streamlit"
+
+
+def test_enriquecimento_por_etapa():
+    df_serventias, df_brutos, _ = casamento.gerar_base(seed=5)
+    cwd, obter_cliente = os.getcwd(), gsheets_client_utils.obter_cliente
+    banco, arquivo = tjrj.cns_cache_utils.CNS_CACHE_DB, instrumentacao_utils.METRICAS_ARQUIVO
+    with tempfile.TemporaryDirectory() as pasta:
+        tjrj.cns_cache_utils.CNS_CACHE_DB = os.path.join(pasta, "vinculos.sqlite")
+        instrumentacao_utils.METRICAS_ARQUIVO = os.path.join(pasta, "metricas.jsonl")
+        os.makedirs(os.path.join(pasta, "downloads"))
+        df_serventias.to_csv(os.path.join(pasta, "downloads", "serventias.csv"), index=False)
+
+        def sem_credenciais(*args, **kwargs):
+            raise FileNotFoundError("credenciais")
+        try:
+            os.chdir(pasta)
+            gsheets_client_utils.obter_cliente = sem_credenciais
+            with contextlib.redirect_stdout(io.StringIO()) as saida:
+                enriquecido = tjrj.enrich_tjrj_with_cns(df_brutos.copy())
+        finally:
+            os.chdir(cwd)
+            tjrj.cns_cache_utils.aguardar_espelho()
+            gsheets_client_utils.obter_cliente = obter_cliente
+            tjrj.cns_cache_utils.CNS_CACHE_DB = banco
+            instrumentacao_utils.METRICAS_ARQUIVO = arquivo
+        registros = _linhas(os.path.join(pasta, "metricas.jsonl"))
+    assert [r['etapa'] for r in registros] == ['normalizacao', 'cache', 'base_cnj', 'casamento', 'validacao', 'total']
+    assert {r['processo'] for r in registros} == {'enrich_tjrj_with_cns'}
+    por_etapa = {r['etapa']: r for r in registros}
+    assert por_etapa['base_cnj']['linhas'] == len(df_serventias)
+    assert por_etapa['casamento']['mapeados'] == int(enriquecido['CNS'].ne('NAO_ENCONTRADO').sum())
+    assert "[METRICAS] normalizacao " in saida.getvalue()
+
+
+def custo_da_medicao(n=2000):
+    rastreio = instrumentacao_utils.Rastreio('benchmark', arquivo='')
+    inicio = time.perf_counter()
+    for i in range(n):
+        with rastreio.etapa(f"etapa_{i}") as etapa:
+            etapa.registrar(linhas=1)
+    por_etapa = (time.perf_counter() - inicio) / n * 1e6
+    print(f"  {n} etapas abertas/fechadas: {por_etapa:.0f} µs por etapa (sem gravação em disco)")
+
+
+if __name__ == "__main__":
+    test_etapas_e_linhas_json()
+    test_proxima_fecha_a_anterior()
+    test_cloud_main_registra_etapas_e_log()
+    test_coluna_detalhes_do_log()
+    test_enriquecimento_por_etapa()
+    print("[OK] Medição por etapa do orquestrador TJRJ.")
+    custo_da_medicao()
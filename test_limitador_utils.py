@@ -0,0 +1,87 @@
+"""
+Teste do limite de taxa e do backoff (limitador_utils).
+
+Usa um relógio simulado: o balde de tokens nunca ultrapassa a cota em nenhuma janela
+de 60 s, o backoff cresce exponencialmente com jitter e respeita o Retry-After.
+
+Uso:
+    python test_limitador_utils.py     (testes + simulação de uma carga grande)
+    pytest test_limitador_utils.py
+"""
+import random
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import limitador_utils
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.agora += segundos
+
+
+def _simular(cota, chamadas, metricas=None):
+    relogio = _Relogio()
+    balde = limitador_utils.balde_por_minuto(cota, metricas)
+    balde._relogio, balde._dormir, balde._atualizado = relogio, relogio.dormir, 0.0
+    instantes = []
+    for _ in range(chamadas):
+        balde.adquirir()
+        instantes.append(relogio.agora)
+    return instantes
+
+
+def test_balde_respeita_cota_por_minuto():
+    metricas = limitador_utils.MetricasTaxa()
+    instantes = _simular(60, 300, metricas)
+    # Rajada inicial de 10% da cota sem espera
+    assert instantes[5] == 0.0 and instantes[6] > 0.0
+    # Nenhuma janela de 60 s com mais chamadas que a cota
+    inicio = 0
+    for fim, t in enumerate(instantes):
+        while instantes[inicio] <= t - 60.0:
+            inicio += 1
+        assert fim - inicio + 1 <= 60
+    resumo = metricas.resumo()
+    assert resumo['esperas'] == 300 - 6 and abs(resumo['tempo_limitado'] - sum(
+        b - a for a, b in zip([0.0] + instantes[:-1], instantes))) < 1e-6
+
+
+def test_limitador_taxa_sem_limite():
+    assert limitador_utils.LimitadorTaxa(rps=0)() == 0.0
+    assert limitador_utils.BaldeTokens(None).adquirir() == 0.0
+
+
+def test_backoff_e_retry_after():
+    assert limitador_utils.atraso_backoff(0, aleatorio=lambda: 1.0) == 1.0
+    assert limitador_utils.atraso_backoff(3, aleatorio=lambda: 1.0) == 8.0
+    assert limitador_utils.atraso_backoff(20, aleatorio=lambda: 1.0) == 64.0
+    assert limitador_utils.atraso_backoff(0, retry_after=30, aleatorio=lambda: 0.5) == 30
+    sorteios = [limitador_utils.atraso_backoff(4, aleatorio=random.Random(1).random) for _ in range(50)]
+    assert all(0 <= s <= 16 for s in sorteios)
+
+    assert limitador_utils.ler_retry_after("7") == 7.0
+    assert limitador_utils.ler_retry_after(None) is None
+    assert limitador_utils.ler_retry_after("amanhã") is None
+    data = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+    assert 110 <= limitador_utils.ler_retry_after(data) <= 121
+
+
+def simular_carga(cota=60, chamadas=1000):
+    instantes = _simular(cota, chamadas)
+    print(f"  {chamadas} chamadas com cota de {cota}/min: {instantes[-1] / 60:.1f} min "
+          f"(mínimo teórico sem 429: {(chamadas - cota) / cota:.1f} min)")
+
+
+if __name__ == "__main__":
+    test_balde_respeita_cota_por_minuto()
+    test_limitador_taxa_sem_limite()
+    test_backoff_e_retry_after()
+    print("[OK] Limite de taxa e backoff.")
+    simular_carga()
@@ -0,0 +1,150 @@
+"""
+Teste da conversão de valores BRL de moeda_utils.
+
+Compara com as implementações anteriores (cópias congeladas abaixo: clean_currency
+dos dashboards via .apply, extrair_valores do extrator e a conversão da página
+Justiça Aberta) e mede o tempo numa coluna de 500 mil linhas.
+
+Uso:
+    python test_moeda_utils.py     (testes + benchmark)
+    pytest test_moeda_utils.py
+"""
+import math
+import time
+import random
+
+import numpy as np
+import pandas as pd
+
+import moeda_utils
+from moeda_utils import converter_brl, extrair_valores_brl, brl_para_float
+
+# ============================================================
+# REFERÊNCIA: implementações anteriores (não alterar)
+# ============================================================
+
+def clean_currency_legado(x):
+    if not isinstance(x, str):
+        return x
+    if not x.strip():
+        return 0.0
+    clean = x.replace('.', '').replace(',', '.')
+    try:
+        return float(clean)
+    except ValueError:
+        return 0.0
+
+
+def extrair_valores_legado(linha):
+    import re
+    valores_str = re.findall(r'[\d\.]+\,\d{2}', linha)
+    valores_float = []
+    for v in valores_str:
+        v_limpo = v.replace('.', '').replace(',', '.')
+        try:
+            valores_float.append(float(v_limpo))
+        except ValueError:
+            pass
+    return valores_float
+
+
+def justica_aberta_legado(serie):
+    return pd.to_numeric(serie.astype(str).str.replace(',', '.'), errors='coerce').abs()
+
+# ============================================================
+
+
+def formatar_brl(valor):
+    inteiro, dec = f"{valor:.2f}".split('.')
+    sinal = '-' if inteiro.startswith('-') else ''
+    return sinal + f"{abs(int(inteiro)):,}".replace(',', '.') + ',' + dec
+
+
+def gerar_coluna(n, seed=7, especiais=True):
+    rnd = random.Random(seed)
+    valores = [formatar_brl(rnd.uniform(-1e7, 1e7)) for _ in range(n)]
+    if especiais:
+        for i in range(0, n, 97):
+            valores[i] = rnd.choice(["", "  ", "N/A", "-", "0,00", "12", "1.000", "abc"])
+    return valores
+
+
+def _iguais(a, b):
+    return all((math.isnan(x) and math.isnan(y)) or x == y for x, y in zip(a, b)) and len(a) == len(b)
+
+
+def test_identico_ao_clean_currency():
+    valores = gerar_coluna(20000)
+    esperado = [clean_currency_legado(v) for v in valores]
+    assert _iguais(converter_brl(pd.Series(valores)).tolist(), esperado)
+    assert _iguais(converter_brl(valores).tolist(), esperado)
+    # Sem pyarrow o resultado é o mesmo
+    assert _iguais(moeda_utils._converter_textos_pandas(pd.Series(valores), 0.0, 0.0).tolist(), esperado)
+
+
+def test_identico_ao_extrair_valores():
+    rnd = random.Random(3)
+    for _ in range(2000):
+        valores = [formatar_brl(rnd.uniform(0, 1e6)) for _ in range(rnd.randint(0, 5))]
+        linha = f"Total Geral {rnd.randint(1, 999)} " + " ".join(valores)
+        assert extrair_valores_brl(linha) == extrair_valores_legado(linha)
+    assert extrair_valores_brl("Notas 1.,50 x .,25") == extrair_valores_legado("Notas 1.,50 x .,25")
+
+
+def test_formatos_com_simbolo_e_sinal():
+    serie = pd.Series(["R$ 1.234,56", "R$ -1.234,56", "-R$ 10,00", " 7,5 ", "R$\xa0900,00", None],
+                      index=list("abcdef"))
+    convertido = converter_brl(serie)
+    assert convertido.index.tolist() == list("abcdef")
+    assert convertido.tolist()[:5] == [1234.56, -1234.56, -10.0, 7.5, 900.0]
+    assert math.isnan(convertido['f'])
+    assert convertido.dtype == np.float64
+    assert brl_para_float("R$ -1.234,56") == -1234.56 and brl_para_float("x") is None
+
+
+def test_colunas_numericas_e_mistas():
+    assert converter_brl(pd.Series([1, 2, 3])).tolist() == [1.0, 2.0, 3.0]
+    assert _iguais(moeda_utils._converter_textos_pandas(pd.Series(["-R$ 10,00", "x", ""]), 0.0, np.nan).tolist(), [-10.0, np.nan, 0.0])
+    assert converter_brl(pd.Series([], dtype=object)).tolist() == []
+    # get_all_records: números já convertidos misturados com textos BRL
+    mista = pd.Series([1234.5, 7, "1.234,56", "", "N/A", -3])
+    assert _iguais(converter_brl(mista, vazio=np.nan, invalido=np.nan).tolist(),
+                   [1234.5, 7.0, 1234.56, np.nan, np.nan, -3.0])
+
+
+def test_justica_aberta_compativel():
+    # Onde o formato anterior acertava (números e "1234,56"), o resultado é o mesmo
+    serie = pd.Series([1500, 12.75, "1234,56", "-80,5", "", "N/A"])
+    novo = converter_brl(serie, vazio=np.nan, invalido=np.nan).abs()
+    assert _iguais(novo.tolist(), justica_aberta_legado(serie).tolist())
+    # "1.234,56" antes virava NaN
+    assert converter_brl(pd.Series(["1.234,56"]), vazio=np.nan, invalido=np.nan).tolist() == [1234.56]
+
+
+def benchmark(n=500_000):
+    """Coluna de `n` textos BRL (como a vinda de get_all_values), sem e com células inválidas."""
+    for titulo, especiais in (("só valores", False), ("com vazios/inválidos", True)):
+        serie = pd.Series(gerar_coluna(n, especiais=especiais))
+        inicio = time.perf_counter()
+        legado = serie.apply(clean_currency_legado)
+        t_legado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        novo = converter_brl(serie)
+        t_novo = time.perf_counter() - inicio
+        assert _iguais(novo.tolist(), legado.tolist())
+
+        print(f"  [{titulo}]")
+        print(f"    .apply(clean_currency): {t_legado:6.3f}s ({n / t_legado:,.0f} linhas/s)")
+        print(f"    converter_brl:          {t_novo:6.3f}s ({n / t_novo:,.0f} linhas/s)  -> {t_legado / t_novo:.1f}x")
+
+
+if __name__ == "__main__":
+    test_identico_ao_clean_currency()
+    test_identico_ao_extrair_valores()
+    test_formatos_com_simbolo_e_sinal()
+    test_colunas_numericas_e_mistas()
+    test_justica_aberta_compativel()
+    print("[OK] Conversão BRL idêntica às implementações anteriores.")
+    print("\n=== Coluna de 500 mil valores BRL ===")
+    benchmark()
@@ -0,0 +1,104 @@
+"""
+Teste do separador cidade/designação de municipios_utils.
+
+Compara com a implementação anterior (cópia congelada abaixo: lista reordenada a
+cada chamada + varredura com startswith) e mede linhas/segundo num volume de
+vários anos de relatórios.
+
+Uso:
+    python test_municipios_utils.py     (testes + benchmark)
+    pytest test_municipios_utils.py
+"""
+import time
+import random
+
+import municipios_utils
+from municipios_utils import MUNICIPIOS_RJ, normalizar_para_match, separar_cidade_designacao
+
+# ============================================================
+# REFERÊNCIA: implementação anterior (não alterar)
+# ============================================================
+
+def separar_cidade_designacao_legado(texto_completo):
+    if not texto_completo: return "", ""
+    texto_norm = normalizar_para_match(texto_completo)
+    municipios_ordenados = sorted(MUNICIPIOS_RJ, key=len, reverse=True)
+
+    for municipio in municipios_ordenados:
+        if texto_norm.startswith(municipio):
+            designacao = texto_norm[len(municipio):].strip()
+            if designacao.startswith("-"): designacao = designacao[1:].strip()
+            return municipio, designacao
+    return "OUTRA/VERIFICAR", texto_completo
+
+
+DESIGNACOES = ["1 OFICIO DE JUSTICA", "2º OF DE NOTAS", "RCPN 3º DISTR", "OFICIO UNICO",
+               "- 5 RCPN DA 2ª CIRCUNSCRICAO", "4 OFICIO", "REGISTRO DE IMOVEIS", ""]
+ESPECIAIS = ["", None, "Niterói 1º Ofício", "São Gonçalo - 2 RCPN", "CARMOPOLIS 1 OF",
+             "CIDADE DESCONHECIDA 1 OFICIO", "rio das ostras ofício único", "RIO", "VARRE-SAI",
+             "SAO JOSE DO VALE DO RIO PRETO 1 OF", "SAO JOSE DE UBA OFICIO UNICO"]
+
+
+def gerar_nomes(n, seed=3):
+    rnd = random.Random(seed)
+    return [f"{rnd.choice(MUNICIPIOS_RJ)} {rnd.choice(DESIGNACOES)}".strip() for _ in range(n)]
+
+
+# ============================================================
+# TESTES
+# ============================================================
+
+def test_identico_ao_legado():
+    nomes = ESPECIAIS + gerar_nomes(5000) + [m for m in MUNICIPIOS_RJ]
+    for nome in nomes:
+        assert separar_cidade_designacao(nome) == separar_cidade_designacao_legado(nome), nome
+
+
+def test_maior_prefixo():
+    assert separar_cidade_designacao("RIO DAS OSTRAS 1 OF") == ("RIO DAS OSTRAS", "1 OF")
+    assert separar_cidade_designacao("BARRA DO PIRAI 2 OF") == ("BARRA DO PIRAI", "2 OF")
+    assert separar_cidade_designacao("PIRAI 2 OF") == ("PIRAI", "2 OF")
+    assert separar_cidade_designacao("Niterói - 1º Ofício") == ("NITEROI", "1O OFICIO")
+
+
+def test_aliases():
+    assert separar_cidade_designacao("CAPITAL 5 RCPN") == ("CAPITAL", "5 RCPN")
+    assert separar_cidade_designacao("CAPITAL 5 RCPN", resolver_aliases=True) == ("RIO DE JANEIRO", "5 RCPN")
+    assert separar_cidade_designacao("NITEROI 1 OF", resolver_aliases=True) == ("NITEROI", "1 OF")
+    assert municipios_utils.resolver_alias("CAPITAL") == "RIO DE JANEIRO"
+    assert municipios_utils.resolver_alias("MACAE") == "MACAE"
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+def benchmark(anos=10, servicos_por_mes=1500):
+    """Volume de `anos` de relatórios mensais (os mesmos serviços se repetem a cada mês)."""
+    servicos = gerar_nomes(servicos_por_mes)
+    nomes = servicos * (12 * anos)
+    sem_cache = separar_cidade_designacao.__wrapped__
+
+    resultados = {}
+    for nome, func in (("anterior", separar_cidade_designacao_legado),
+                       ("trie", sem_cache),
+                       ("trie + cache", separar_cidade_designacao)):
+        separar_cidade_designacao.cache_clear()
+        inicio = time.perf_counter()
+        for texto in nomes:
+            func(texto)
+        resultados[nome] = time.perf_counter() - inicio
+
+    print(f"Linhas: {len(nomes)} ({anos} anos x 12 meses x {servicos_por_mes} serviços)")
+    for nome, segundos in resultados.items():
+        print(f"  {nome:>12}: {segundos:6.2f}s  ({len(nomes) / segundos:,.0f} linhas/s)  "
+              f"{resultados['anterior'] / segundos:.1f}x")
+
+
+if __name__ == "__main__":
+    test_identico_ao_legado()
+    test_maior_prefixo()
+    test_aliases()
+    print("[OK] Saída idêntica à implementação anterior.")
+    print("\n=== Benchmark ===")
+    benchmark()
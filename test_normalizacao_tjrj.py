@@ -0,0 +1,142 @@
+"""
+Teste da normalização de designações (extrai_transp_tjrj.normalize_tjrj_designations).
+
+Compara com a implementação anterior (cópia congelada abaixo: iterrows + contagem
+da cidade sobre o DataFrame inteiro a cada linha) em quadros com CAPITAL/RIO DE
+JANEIRO intercalados perto do limite de 10 registros, valores ausentes e espaços, e
+mede o tempo conforme o nº de linhas cresce (a versão anterior é quadrática).
+
+Uso:
+    python test_normalizacao_tjrj.py     (testes + benchmark)
+    pytest test_normalizacao_tjrj.py
+"""
+import io
+import re
+import time
+import random
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+import extrai_transp_tjrj as tjrj
+
+# ============================================================
+# REFERÊNCIA: implementação anterior (não alterar)
+# ============================================================
+
+def normalize_tjrj_designations_legado(df_brutos):
+    print("  [NORMALIZAÇÃO] Aplicando regras de padronização...")
+    if 'designacao' not in df_brutos.columns:
+        return df_brutos
+    alteracoes = 0
+    for idx, row in df_brutos.iterrows():
+        original = str(row['designacao'])
+        normalizado = original.upper().strip()
+        normalizado = re.sub(r'\bOF DE JUSTICA\b', 'OFICIO DE JUSTICA', normalizado)
+        normalizado = re.sub(r'\bOF DE\b', 'OFICIO DE', normalizado)
+        normalizado = re.sub(r'\bOF\b(?! DE)', 'OFICIO', normalizado)
+        normalizado = re.sub(r'\bDISTR\b', 'DISTRITO', normalizado)
+        normalizado = re.sub(r'\bSUBDIST\b', 'SUBDISTRITO', normalizado)
+        if 'cidade' in df_brutos.columns and row['cidade'] == 'CAPITAL':
+            df_brutos.at[idx, 'cidade'] = 'RIO DE JANEIRO'
+        if 'cidade' in df_brutos.columns:
+            cidade = row['cidade']
+            total_cidade = len(df_brutos[df_brutos['cidade'] == cidade])
+            if total_cidade < 10:
+                normalizado = re.sub(r'\b([1-9])O\b', r'\1o', normalizado)
+                normalizado = re.sub(r'\b([1-9])A\b', r'\1a', normalizado)
+            normalizado = re.sub(r'\b0([1-9])\b', r'\1', normalizado)
+        normalizado = re.sub(r'\s+', ' ', normalizado).strip()
+        if normalizado != original.upper().strip():
+            df_brutos.at[idx, 'designacao'] = normalizado
+            alteracoes += 1
+    print(f"  [NORMALIZAÇÃO] {alteracoes} designações normalizadas")
+    return df_brutos
+
+# ============================================================
+
+DESIGNACOES = ["1O OF DE JUSTICA", "2 OF DE NOTAS", "RCPN 3 DISTR", "OFICIO UNICO", "01 OF",
+               "5A SUBDIST", "2o  ofício", "  4 OF  ", "1 OF DE", "OF", "RCPN 07 DISTR", "3A CIRC",
+               "9O OFICIO", "OF DE JUSTICA", "1O RCPN", None, float('nan'), "2A  VARA\tUNICA"]
+CIDADES = ["CAPITAL", "RIO DE JANEIRO", "NITEROI", "MACUCO", "VARRE-SAI", None]
+
+
+def gerar_brutos(n, seed=1, pesos=(30, 8, 20, 3, 2, 1)):
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        'cod': [str(rnd.randint(1, 3000)) for _ in range(n)],
+        'cidade': rnd.choices(CIDADES, weights=pesos, k=n),
+        'designacao': [rnd.choice(DESIGNACOES) for _ in range(n)],
+        'mes': [rnd.randint(1, 12) for _ in range(n)],
+        'Total': [round(rnd.uniform(0, 1e5), 2) for _ in range(n)],
+    })
+
+
+def _comparar(df):
+    saida_legado, saida_nova = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(saida_legado):
+        esperado = normalize_tjrj_designations_legado(df.copy())
+    with contextlib.redirect_stdout(saida_nova):
+        obtido = tjrj.normalize_tjrj_designations(df.copy())
+    pd.testing.assert_frame_equal(obtido, esperado)
+    assert saida_nova.getvalue() == saida_legado.getvalue()
+
+
+def test_identico_ao_legado():
+    for seed in range(12):
+        # Tamanhos em torno do limite de 10 registros por cidade
+        _comparar(gerar_brutos(random.Random(seed).randint(5, 60), seed=seed))
+    _comparar(gerar_brutos(500, seed=99))
+
+
+def test_capital_e_rio_intercalados():
+    # 12 CAPITAL e 4 RIO DE JANEIRO alternados: a contagem muda conforme as trocas avançam
+    cidades = ["CAPITAL", "RIO DE JANEIRO", "CAPITAL", "CAPITAL"] * 4
+    df = pd.DataFrame({'cidade': cidades, 'designacao': ["1O OF", "2A OF DE NOTAS", "3O DISTR", "04 OF"] * 4,
+                       'Total': np.arange(16, dtype=float)})
+    _comparar(df)
+    _comparar(df.iloc[::-1])
+    _comparar(df.sort_values('cidade'))
+
+
+def test_sem_cidade_e_vazio():
+    _comparar(pd.DataFrame({'designacao': ["1O OF", "2  OF DE NOTAS"], 'Total': [1.0, 2.0]}))
+    _comparar(pd.DataFrame({'cidade': ["NITEROI"], 'Total': [1.0]}))
+    _comparar(gerar_brutos(0))
+
+
+def test_dados_brutos_do_pipeline():
+    # Como popula_cns lê a aba (get_all_records): números e textos, índice padrão
+    df = gerar_brutos(300, seed=5)
+    df['ano'] = 2025
+    _comparar(df.sort_values(by=['cidade', 'designacao'], na_position='last'))
+
+
+def benchmark(tamanhos=(1000, 4000, 16000), tamanho_grande=1_000_000):
+    print(f"  {'linhas':>9} {'anterior':>10} {'vetorizada':>11}")
+    for n in tamanhos:
+        df = gerar_brutos(n, seed=n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            normalize_tjrj_designations_legado(df.copy())
+            t_legado = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            tjrj.normalize_tjrj_designations(df.copy())
+            t_novo = time.perf_counter() - inicio
+        print(f"  {n:>9,} {t_legado:>9.2f}s {t_novo:>10.3f}s")
+    df = gerar_brutos(tamanho_grande, seed=7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        tjrj.normalize_tjrj_designations(df)
+    print(f"  {tamanho_grande:>9,} {'-':>10} {time.perf_counter() - inicio:>10.3f}s")
+
+
+if __name__ == "__main__":
+    test_identico_ao_legado()
+    test_capital_e_rio_intercalados()
+    test_sem_cidade_e_vazio()
+    test_dados_brutos_do_pipeline()
+    print("[OK] Normalização vetorizada idêntica à anterior.")
+    print("\n=== Tempo por nº de linhas ===")
+    benchmark()
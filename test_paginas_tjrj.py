@@ -0,0 +1,95 @@
+"""
+Teste da extração por faixas de páginas de processar_pdf_content (extrai_transp_tjrj).
+
+Usa relatórios sintéticos (gerador_relatorio_tjrj) em que os serviços começam numa
+página e terminam na seguinte, e confere que a extração em paralelo é idêntica à
+extração em série.
+
+Uso:
+    python test_paginas_tjrj.py     (testes + comparação de tempo)
+    pytest test_paginas_tjrj.py
+"""
+import time
+
+import extrai_transp_tjrj as tjrj
+import gerador_relatorio_tjrj as gerador
+
+
+def _processar(pdf_bytes, nome_arquivo, workers_paginas):
+    return tjrj.processar_pdf_content(pdf_bytes, nome_arquivo, usar_cache=False, workers_paginas=workers_paginas)
+
+
+def test_dividir_paginas():
+    for n_paginas in (1, 7, 8, 25, 100):
+        for partes in (1, 2, 3, 4, 16, 200):
+            faixas = tjrj.dividir_paginas(n_paginas, partes)
+            paginas = [p for inicio, fim in faixas for p in range(inicio, fim)]
+            assert paginas == list(range(n_paginas))
+            tamanhos = [fim - inicio for inicio, fim in faixas]
+            assert max(tamanhos) - min(tamanhos) <= 1
+
+
+def test_servico_cruzando_paginas_texto():
+    paginas = [
+        "Período: 10/2025\n"
+        "Serviço: 10 - NITEROI 1 OFICIO\n"
+        "Gestor do Serviço: FULANO Condição do Gestor: Delegatário\n"
+        "Registro Civil das Pessoas Naturais 3 1.000,00",
+        "Período: 10/2025\n"
+        "Ofícios e Atos de Notas 2 500,00\n"
+        "Total Geral 5 1.500,00 300,00 0,00 1.800,00\n"
+        "Serviço: 11 - MACUCO OFICIO UNICO",
+        "Período: 10/2025\n"
+        "Gestor do Serviço: BELTRANO\n"
+        "Condição do Gestor: Interino\n"
+        "Total Geral 1 10,00 2,00 0,00 12,00",
+    ]
+    dados = []
+    tjrj.extrair_servicos_textos(paginas, "2025_10.pdf", dados)
+    assert [d['cod'] for d in dados] == ['10', '11']
+    assert dados[0]['RCPN'] == 1000.0 and dados[0]['Notas'] == 500.0
+    assert dados[0]['Total'] == 1800.0 and dados[0]['cargo'] == 'Titular'
+    assert dados[1]['gestor'] == 'BELTRANO' and dados[1]['cargo'] == 'Interino'
+
+
+def test_relatorio_com_servicos_cruzando_paginas():
+    pdf_bytes, servicos = gerador.gerar_relatorio(n_servicos=40, linhas_por_pagina=12, seed=3)
+    paginas = gerador.paginar(servicos, 10, 2025, linhas_por_pagina=12)
+    assert any(not pagina[-1].startswith("Total Geral") for pagina in paginas[:-1])
+
+    dados = _processar(pdf_bytes, "2025_10.pdf", workers_paginas=1)
+    assert len(dados) == len(servicos)
+    for linha, servico in zip(dados, servicos):
+        assert linha['cod'] == servico['cod']
+        assert linha['gestor'] == servico['gestor']
+        assert linha['cargo'] == servico['cargo']
+        assert linha['Total'] == servico['Total']
+        assert linha['Emolumentos'] == servico['Emolumentos']
+        for coluna, valor in servico['valores'].items():
+            assert linha[coluna] == valor
+
+
+def test_paralelo_identico_ao_serial():
+    pdf_bytes, servicos = gerador.gerar_relatorio(n_servicos=120, linhas_por_pagina=20, seed=5)
+    serial = _processar(pdf_bytes, "2025_07.pdf", workers_paginas=1)
+    for workers in (2, 3, 4):
+        assert _processar(pdf_bytes, "2025_07.pdf", workers_paginas=workers) == serial
+    assert len(serial) == len(servicos)
+
+
+def comparar_tempos(n_servicos=1500, workers=4):
+    pdf_bytes, _ = gerador.gerar_relatorio(n_servicos=n_servicos)
+    for nome, w in (("serial", 1), (f"{workers} processos", workers)):
+        inicio = time.perf_counter()
+        dados = _processar(pdf_bytes, "2025_10.pdf", workers_paginas=w)
+        print(f"  {nome:>12}: {time.perf_counter() - inicio:6.2f}s ({len(dados)} serviços)")
+
+
+if __name__ == "__main__":
+    test_dividir_paginas()
+    test_servico_cruzando_paginas_texto()
+    test_relatorio_com_servicos_cruzando_paginas()
+    test_paralelo_identico_ao_serial()
+    print("[OK] Serviços entre páginas extraídos; paralelo idêntico ao serial.")
+    print("\n=== Extração de um PDF grande (serial x faixas de páginas) ===")
+    comparar_tempos()
@@ -0,0 +1,192 @@
+"""
+Teste do download em stream dos PDFs (pdf_stream_utils + extrai_transp_tjrj.baixar_pdf_arquivo).
+
+Usa respostas HTTP simuladas (sem rede): confere que páginas HTML de erro são
+abortadas no primeiro bloco, que o PDF vai para o cache sem passar pela memória,
+que a extração a partir do arquivo (mmap) é idêntica à extração a partir dos bytes e
+que o LRU do cache não apaga PDFs ainda na fila de extração.
+
+Uso:
+    python test_pdf_stream_utils.py     (testes + pico de memória por nº de meses)
+    pytest test_pdf_stream_utils.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import subprocess
+
+import pdf_cache_utils
+import pdf_stream_utils
+import extrai_transp_tjrj as tjrj
+import gerador_relatorio_tjrj as gerador
+
+
+class RespostaFalsa:
+    """Imita requests.Response com stream=True, contando os blocos consumidos."""
+
+    def __init__(self, conteudo, status_code=200, headers=None, chunk=1024):
+        self.conteudo = conteudo
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.chunk = chunk
+        self.blocos_lidos = 0
+        self.fechada = False
+
+    def iter_content(self, chunk_size=1024):
+        for i in range(0, len(self.conteudo), self.chunk):
+            if self.fechada:
+                return
+            self.blocos_lidos += 1
+            yield self.conteudo[i:i + self.chunk]
+
+    def close(self):
+        self.fechada = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+HTML_ERRO = b"<!DOCTYPE html><html><body>Erro 500</body></html>" * 2000
+
+
+def test_html_abortado_no_primeiro_bloco():
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = os.path.join(tmp, "x.pdf")
+        resposta = RespostaFalsa(HTML_ERRO, headers={'Content-Type': 'text/html'})
+        try:
+            pdf_stream_utils.gravar_resposta_pdf(resposta, destino)
+            assert False, "HTML deveria ser rejeitado"
+        except pdf_stream_utils.PDFInvalidoError as e:
+            assert "text/html" in str(e)
+        assert resposta.blocos_lidos == 1
+        assert resposta.fechada
+        assert not os.path.exists(destino)
+
+
+def test_pdf_pequeno_e_valido():
+    pdf_bytes, _ = gerador.gerar_relatorio(n_servicos=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = os.path.join(tmp, "x.pdf")
+        try:
+            pdf_stream_utils.gravar_resposta_pdf(RespostaFalsa(pdf_bytes), destino, min_bytes=len(pdf_bytes) + 1)
+            assert False, "Arquivo pequeno deveria ser rejeitado"
+        except pdf_stream_utils.PDFInvalidoError:
+            assert not os.path.exists(destino)
+
+        tamanho = pdf_stream_utils.gravar_resposta_pdf(RespostaFalsa(pdf_bytes, chunk=3), destino, min_bytes=100)
+        assert tamanho == len(pdf_bytes)
+        with open(destino, 'rb') as f:
+            assert f.read() == pdf_bytes
+
+
+def _com_rede_falsa(respostas, func):
+    """Executa func() com http_utils.get devolvendo as respostas em ordem e cache em diretório temporário."""
+    get_original, dir_original = tjrj.http_utils.get, pdf_cache_utils.PDF_CACHE_DIR
+    fila = list(respostas)
+    tjrj.http_utils.get = lambda *args, **kwargs: fila.pop(0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_cache_utils.PDF_CACHE_DIR = tmp
+            return func()
+    finally:
+        tjrj.http_utils.get, pdf_cache_utils.PDF_CACHE_DIR = get_original, dir_original
+
+
+def test_baixar_pdf_arquivo_para_cache_e_mmap():
+    pdf_bytes, servicos = gerador.gerar_relatorio(n_servicos=30)
+    url = "https://www.tjrj.jus.br/documents/d/guest/receita-outubro-2025"
+
+    def executar():
+        caminho, temporario = tjrj.baixar_pdf_arquivo(url)
+        assert not temporario
+        assert caminho.startswith(pdf_cache_utils.PDF_CACHE_DIR)
+        assert os.listdir(os.path.join(pdf_cache_utils.PDF_CACHE_DIR, 'tmp')) == []
+        do_arquivo = tjrj.processar_pdf_content(caminho, "2025_10.pdf", usar_cache=False)
+        dos_bytes = tjrj.processar_pdf_content(pdf_bytes, "2025_10.pdf", usar_cache=False)
+        assert do_arquivo == dos_bytes
+        assert len(do_arquivo) == len(servicos)
+
+        # Revalidação: 304 devolve a cópia do cache sem novo download
+        assert tjrj.baixar_pdf_arquivo(url) == (caminho, False)
+
+    _com_rede_falsa([RespostaFalsa(pdf_bytes, headers={'ETag': '"v1"'}), RespostaFalsa(b"", status_code=304)], executar)
+
+
+def test_baixar_pdf_arquivo_html():
+    url = "https://www.tjrj.jus.br/documents/d/guest/receita-outubro-2025"
+    resultado = _com_rede_falsa([RespostaFalsa(HTML_ERRO, headers={'Content-Type': 'text/html'})],
+                                lambda: tjrj.baixar_pdf_arquivo(url))
+    assert resultado == (None, False)
+
+
+def test_lru_nao_apaga_pdf_na_fila():
+    links = [f"https://www.tjrj.jus.br/documents/d/guest/receita-{m}-2025" for m in ('janeiro', 'fevereiro', 'marco')]
+    todos_no_cache = threading.Barrier(len(links))
+    lidos = {}
+
+    def baixar(url, limitador=None):
+        sha = pdf_cache_utils.guardar_pdf(url, url.encode() * 400)
+        todos_no_cache.wait()  # Cada PDF novo passa do limite antes de qualquer extração
+        return pdf_cache_utils.caminho_blob(sha), False
+
+    def extrair(caminho, nome, *args, **kwargs):
+        lidos[nome] = os.path.exists(caminho)
+        return [], 0.0
+
+    originais = tjrj._baixar_limitado, tjrj._processar_medindo, pdf_cache_utils.PDF_CACHE_MAX_BYTES
+    tjrj._baixar_limitado, tjrj._processar_medindo = baixar, extrair
+    pdf_cache_utils.PDF_CACHE_MAX_BYTES = 30_000
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            dir_original, pdf_cache_utils.PDF_CACHE_DIR = pdf_cache_utils.PDF_CACHE_DIR, tmp
+            try:
+                tjrj.baixar_e_processar_pdfs(links, download_workers=len(links), parse_workers=1)
+                # Limpeza no fim do lote: o cache volta ao limite
+                restantes = len(pdf_cache_utils._carregar_indice())
+            finally:
+                pdf_cache_utils.PDF_CACHE_DIR = dir_original
+    finally:
+        tjrj._baixar_limitado, tjrj._processar_medindo, pdf_cache_utils.PDF_CACHE_MAX_BYTES = originais
+    assert lidos == {"2025_01.pdf": True, "2025_02.pdf": True, "2025_03.pdf": True}
+    assert restantes == 1 and pdf_cache_utils._adiamentos == 0
+
+
+# ============================================================
+# PICO DE MEMÓRIA x Nº DE MESES
+# ============================================================
+
+_SCRIPT_RSS = r"""
+import sys, resource
+import test_pdf_stream_utils as t, extrai_transp_tjrj as tjrj, gerador_relatorio_tjrj as g
+pdf_bytes, _ = g.gerar_relatorio(n_servicos=300, seed=1)
+meses = ['janeiro','fevereiro','marco','abril','maio','junho','julho','agosto','setembro','outubro','novembro','dezembro']
+links = [f"https://x/receita-{m}-{2020 + i // 12}" for i, m in enumerate(meses * 4)][:int(sys.argv[1])]
+respostas = [t.RespostaFalsa(pdf_bytes, chunk=64 * 1024) for _ in links]
+resultado = t._com_rede_falsa(respostas, lambda: tjrj.baixar_e_processar_pdfs(links, 4, 1))
+print(sum(len(d) for _, d in resultado), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)
+"""
+
+
+def medir_pico_memoria(meses_testados=(1, 6, 18)):
+    """Pico de RSS (processo novo para cada medição) processando N meses do mesmo tamanho."""
+    ambiente = dict(os.environ, TJRJ_PARSE_CACHE_DIR=tempfile.mkdtemp())
+    for n in meses_testados:
+        saida = subprocess.run([sys.executable, "-c", _SCRIPT_RSS, str(n)], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), env=ambiente)
+        linhas, rss = saida.stdout.strip().split("\n")[-1].split()
+        print(f"  {n:>3} meses: {linhas:>6} linhas, pico RSS {rss} MB")
+
+
+if __name__ == "__main__":
+    test_html_abortado_no_primeiro_bloco()
+    test_pdf_pequeno_e_valido()
+    test_baixar_pdf_arquivo_para_cache_e_mmap()
+    test_baixar_pdf_arquivo_html()
+    test_lru_nao_apaga_pdf_na_fila()
+    print("[OK] Download em stream validado.")
+    print("\n=== Pico de memória por nº de meses processados ===")
+    medir_pico_memoria()
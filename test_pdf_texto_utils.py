@@ -0,0 +1,63 @@
+"""
+Teste dos backends de extração de texto (pdf_texto_utils).
+
+Uso:
+    python test_pdf_texto_utils.py
+    pytest test_pdf_texto_utils.py
+"""
+import os
+import tempfile
+
+import pdf_texto_utils
+import comparar_backends_tjrj as comparador
+import gerador_relatorio_tjrj as gerador
+
+
+def test_backends_equivalentes_nos_relatorios_sinteticos():
+    resultado = comparador.comparar(comparador.amostras_sinteticas())
+    for nome, por_backend in resultado.items():
+        for backend, info in por_backend.items():
+            assert info['diferencas'] == [], (nome, backend, info['diferencas'])
+            assert info['linhas']
+
+
+def test_abrir_documento_bytes_e_caminho():
+    pdf_bytes, _ = gerador.gerar_relatorio(n_servicos=12, linhas_por_pagina=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, "2025_10.pdf")
+        with open(caminho, "wb") as f:
+            f.write(pdf_bytes)
+
+        for backend in pdf_texto_utils.backends_disponiveis():
+            with pdf_texto_utils.abrir_documento(pdf_bytes, backend) as doc:
+                textos_bytes = list(doc.textos())
+                assert doc.backend == backend
+            with pdf_texto_utils.abrir_documento(caminho, backend) as doc:
+                assert list(doc.textos()) == textos_bytes
+                assert list(doc.textos(1, 2)) == textos_bytes[1:2]
+            assert len(textos_bytes) > 1
+            assert "\r" not in "".join(textos_bytes)
+
+
+def test_backend_desconhecido():
+    try:
+        pdf_texto_utils.resolver_backend("pdfminer-xyz")
+        assert False, "Backend desconhecido deveria falhar"
+    except ValueError:
+        pass
+
+
+def test_diferencas_detectadas():
+    ref = [{'cod': '1', 'Total': 10.0}, {'cod': '2', 'Total': 5.0}]
+    outro = [{'cod': '1', 'Total': 10.0}, {'cod': '2', 'Total': 6.0}, {'cod': '3', 'Total': 1.0}]
+    difs = comparador.diferencas(ref, outro)
+    assert difs[0] == "nº de linhas: 2 x 3"
+    assert "Total: 5.0 x 6.0" in difs[1]
+
+
+if __name__ == "__main__":
+    test_backends_equivalentes_nos_relatorios_sinteticos()
+    test_abrir_documento_bytes_e_caminho()
+    test_backend_desconhecido()
+    test_diferencas_detectadas()
+    print("[OK] Backends de texto equivalentes.")
@@ -0,0 +1,317 @@
+"""
+Teste do tokenizador de linhas de processar_pdf_content (extrai_transp_tjrj).
+
+Compara a saída do classificador pré-compilado com a implementação anterior
+(cópia congelada abaixo) e mede linhas/segundo antes e depois.
+
+Uso:
+    python test_tokenizer_tjrj.py     (testes + micro-benchmark)
+    pytest test_tokenizer_tjrj.py
+"""
+import re
+import json
+import time
+import random
+
+import extrai_transp_tjrj as tjrj
+
+# ============================================================
+# REFERÊNCIA: implementação anterior (não alterar)
+# ============================================================
+
+def _extrair_valores_legado(linha):
+    valores_str = re.findall(r'[\d\.]+\,\d{2}', linha)
+    valores_float = []
+    for v in valores_str:
+        v_limpo = v.replace('.', '').replace(',', '.')
+        try:
+            valores_float.append(float(v_limpo))
+        except ValueError:
+            pass
+    return valores_float
+
+
+def extrair_servicos_legado(textos_paginas, nome_arquivo):
+    """Implementação anterior ao tokenizador (cópia congelada, usada como referência)."""
+    dados_servicos = []
+    # Tenta extrair mês/ano do nome do arquivo fornecido
+    match_data_arquivo = re.search(r'(\d{4})_(\d{2})', nome_arquivo)
+    if match_data_arquivo:
+        ano_arquivo = int(match_data_arquivo.group(1))
+        mes_arquivo = int(match_data_arquivo.group(2))
+    else:
+        ano_arquivo, mes_arquivo = 0, 0
+
+    mes_atual = mes_arquivo
+    ano_atual = ano_arquivo
+    
+    # Regex para mapear colunas (RCPJ, RCPN, etc.)
+    mapa_regex = {
+        r'Civil das Pessoas Jur.dicas': "RCPJ",
+        r'Civil das Pessoas Naturais': "RCPN",
+        r'Interdi..es e Tutelas': "IT",
+        r'Of.cios e Atos do Registro de Im.veis': "RI",
+        r'T.tulos e Documentos': "RTD",
+        r'Of.cios e Atos de Notas': "Notas",
+        r'Tabelionatos de Protesto de T.tulos': "Protesto"
+    }
+
+    for texto in textos_paginas:
+        if not texto: continue
+        
+        # Limpeza de texto para facilitar a extração (Lógica do extrator.py)
+        texto_reparado = re.sub(r'[^\S\n]+', ' ', texto) 
+        texto_reparado = re.sub(r'(\S)(Servi.o:)', r'\1\n\2', texto_reparado)
+        texto_reparado = re.sub(r'(\S)(Total Geral)', r'\1\n\2', texto_reparado)
+        texto_reparado = re.sub(r'(\S)(Gestor do Servi.o:)', r'\1\n\2', texto_reparado)
+        
+        for key_regex in mapa_regex.keys():
+            texto_reparado = re.sub(rf'(\S)({key_regex})', r'\1\n\2', texto_reparado, flags=re.IGNORECASE)
+
+        linhas = texto_reparado.split('\n')
+        dados_servico_atual = {}
+        lendo_servico = False
+        
+        for linha in linhas:
+            linha_limpa = linha.strip()
+
+            # Tentativa de extrair data do cabeçalho da página
+            if "Per" in linha and "/" in linha and len(linha) < 50:
+                match_data = re.search(r'(\d{1,2})\s*/\s*(\d{4})', linha)
+                if match_data:
+                    mes_atual = int(match_data.group(1))
+                    ano_atual = int(match_data.group(2))
+
+            # Início de um novo serviço
+            if re.match(r'^Servi.o:', linha_limpa):
+                if lendo_servico: pass 
+                partes = linha_limpa.split(":", 1)
+                texto_completo = partes[1].strip() if len(partes) > 1 else ""
+                match_cod = re.search(r'^(\d+)\s*-\s*(.*)', texto_completo)
+                
+                if match_cod:
+                    cod_servico = match_cod.group(1).strip()
+                    nome_full = match_cod.group(2).strip()
+                else:
+                    cod_servico = texto_completo.split(' ')[0] if texto_completo else "N/A"
+                    nome_full = texto_completo
+                    
+                cidade, designacao = tjrj.extrator_separar_cidade_designacao(nome_full)
+
+                # Inicializa os dados do serviço
+                dados_servico_atual = {col: None for col in tjrj.COLUNAS_BRUTAS}
+                dados_servico_atual['cod'] = cod_servico 
+                dados_servico_atual['cidade'] = cidade
+                dados_servico_atual['designacao'] = designacao
+                dados_servico_atual['mes'] = mes_atual
+                dados_servico_atual['ano'] = ano_atual
+                dados_servico_atual['arquivo_origem'] = nome_arquivo
+                dados_servico_atual['gestor'] = "NAO IDENTIFICADO"
+                dados_servico_atual['cargo'] = "NAO IDENTIFICADO"
+                lendo_servico = True
+            
+            # Extração do Gestor
+            if lendo_servico and re.search(r'Gestor do Servi.o:', linha_limpa):
+                try:
+                    partes = linha_limpa.split(":", 1)
+                    conteudo = partes[1].strip() if len(partes) > 1 else ""
+                    if re.search(r'Condi..o do Gestor', conteudo):
+                        split_cond = re.split(r'Condi..o do Gestor:?', conteudo)
+                        dados_servico_atual['gestor'] = split_cond[0].strip()
+                        if len(split_cond) > 1:
+                            cargo_temp = split_cond[1].strip()
+                            if "Delegat" in cargo_temp: cargo_temp = "Titular"
+                            dados_servico_atual['cargo'] = cargo_temp
+                    else:
+                        dados_servico_atual['gestor'] = conteudo
+                except: pass
+
+            # Extração da Condição (Cargo)
+            if lendo_servico and re.search(r'^Condi..o do Gestor:', linha_limpa):
+                try:
+                    partes = linha_limpa.split(":", 1)
+                    cargo_temp = partes[1].strip()
+                    if "Delegat" in cargo_temp: cargo_temp = "Titular"
+                    dados_servico_atual['cargo'] = cargo_temp
+                except: pass
+
+            # Extração dos valores por atribuição
+            if lendo_servico:
+                for key_regex, nome_coluna in mapa_regex.items():
+                    if re.search(key_regex, linha_limpa, re.IGNORECASE):
+                        valores = _extrair_valores_legado(linha_limpa)
+                        if valores:
+                            # O valor total do emolumento fica no final da linha
+                            dados_servico_atual[nome_coluna] = valores[-1]
+                        break
+            
+            # Fim de um serviço (Total Geral)
+            if lendo_servico and "Total Geral" in linha_limpa:
+                valores = _extrair_valores_legado(linha_limpa)
+                if len(valores) >= 1:
+                    # O último valor é o Total Final
+                    dados_servico_atual['Total'] = valores[-1]
+                    
+                    # Tentativa de capturar Emolumentos Totais, Funarpem e Gratuitos
+                    if len(valores) >= 4:
+                        dados_servico_atual['Emolumentos'] = valores[-4] # Emolumentos
+                        dados_servico_atual['Funarpem'] = valores[-3]
+                        dados_servico_atual['Gratuitos'] = valores[-2]
+                        
+                    dados_servicos.append(dados_servico_atual.copy())
+                    lendo_servico = False
+                    dados_servico_atual = {}
+    return dados_servicos
+
+
+# ============================================================
+# FIXTURE: texto de páginas no formato do relatório do TJRJ
+# ============================================================
+
+CIDADES_FIXTURE = ["CAPITAL", "NITEROI", "SAO GONCALO", "CAMPOS DOS GOYTACAZES", "RIO DAS OSTRAS",
+                   "PETROPOLIS", "NOVA IGUACU", "VARRE-SAI", "BARRA MANSA", "MACUCO"]
+DESIGNACOES_FIXTURE = ["1 OFÍCIO DE JUSTIÇA", "2 OF DE NOTAS", "RCPN 3 DISTR", "OFÍCIO ÚNICO",
+                       "5 RCPN DA 2 CIRCUNSCRIÇÃO", "CARTÓRIO DO 4º OFÍCIO", "REGISTRO DE IMÓVEIS"]
+LINHAS_ATRIBUICAO = [
+    "Registro Civil das Pessoas Jurídicas",
+    "Registro Civil das Pessoas Naturais",
+    "Registro de Interdições e Tutelas",
+    "Ofícios e Atos do Registro de Imóveis",
+    "Registro de Títulos e Documentos",
+    "Ofícios e Atos de Notas",
+    "Tabelionatos de Protesto de Títulos",
+]
+
+
+def _brl(valor):
+    inteiro, dec = f"{valor:.2f}".split('.')
+    return f"{int(inteiro):,}".replace(',', '.') + ',' + dec
+
+
+def gerar_textos_relatorio(n_servicos=400, servicos_por_pagina=6, mes=10, ano=2025, colar_marcadores=False, seed=7):
+    """Gera o texto das páginas de um relatório sintético (sem serviços cruzando páginas)."""
+    rnd = random.Random(seed)
+    paginas, linhas = [], []
+    for i in range(n_servicos):
+        if i % servicos_por_pagina == 0:
+            if linhas:
+                paginas.append("\n".join(linhas))
+            linhas = ["TRIBUNAL DE JUSTIÇA DO ESTADO DO RIO DE JANEIRO",
+                      "Relatório de Receita Cartorária Extrajudicial",
+                      f"Período: {mes:02d}/{ano}"]
+        cidade = rnd.choice(CIDADES_FIXTURE)
+        designacao = rnd.choice(DESIGNACOES_FIXTURE)
+        cabecalho = f"Serviço: {1000 + i} - {cidade} {designacao}"
+        gestor = f"Gestor do Serviço: GESTOR {i} DA SILVA"
+        if rnd.random() < 0.5:
+            linhas += [cabecalho, f"{gestor} Condição do Gestor: {rnd.choice(['Delegatário', 'Interino', 'Responsável pelo Expediente'])}"]
+        else:
+            linhas += [cabecalho, gestor, f"Condição do Gestor: {rnd.choice(['Delegatária', 'Interino'])}"]
+        linhas.append("Atribuição Quantidade Emolumentos")
+
+        soma = 0.0
+        for atrib in rnd.sample(LINHAS_ATRIBUICAO, rnd.randint(1, 4)):
+            valor = round(rnd.uniform(10, 250000), 2)
+            soma += valor
+            linha = f"{atrib} {rnd.randint(1, 5000)} {_brl(valor)}"
+            if colar_marcadores and rnd.random() < 0.3:
+                linhas[-1] += linha  # pdfplumber às vezes junta linhas vizinhas
+            else:
+                linhas.append(linha)
+        funarpem = round(soma * 0.2, 2)
+        total = f"Total Geral {rnd.randint(1, 9000)} {_brl(soma)} {_brl(funarpem)} 0,00 {_brl(soma + funarpem)}"
+        if colar_marcadores and rnd.random() < 0.3:
+            linhas[-1] += total
+        else:
+            linhas.append(total)
+    paginas.append("\n".join(linhas))
+    return paginas
+
+
+def _extrair_novo(textos, nome_arquivo):
+    dados = []
+    tjrj.extrair_servicos_textos(textos, nome_arquivo, dados)
+    return dados
+
+
+# ============================================================
+# TESTES
+# ============================================================
+
+def test_classificar_linha():
+    assert tjrj.classificar_linha("Serviço: 123 - NITEROI 1 OFICIO") == (True, False, False, None, False)
+    assert tjrj.classificar_linha("Gestor do Serviço: FULANO Condição do Gestor: Interino") == (False, True, False, None, False)
+    assert tjrj.classificar_linha("Condição do Gestor: Delegatário") == (False, False, True, None, False)
+    assert tjrj.classificar_linha("Registro de Títulos e Documentos 3 1.234,56")[3] == "RTD"
+    assert tjrj.classificar_linha("ofícios e atos de notas 3 1,00")[3] == "Notas"
+    assert tjrj.classificar_linha("Total Geral 3 1,00 0,20 0,00 1,20")[4] is True
+    # Prioridade segue a ordem de MAPA_ATRIBUICOES, não a posição na linha
+    assert tjrj.classificar_linha("Ofícios e Atos de Notas Civil das Pessoas Naturais 1,00")[3] == "RCPN"
+    # "Serviço:" só abre serviço no início da linha e diferencia maiúsculas
+    assert tjrj.classificar_linha("Texto Serviço: 1")[0] is False
+    assert tjrj.classificar_linha("SERVIÇO: 1")[0] is False
+    # Ocorrências sobrepostas: RTD dentro da linha de Protesto tem prioridade (como antes)
+    assert tjrj.classificar_linha("Tabelionatos de Protesto de Títulos e Documentos 1,00")[3] == "RTD"
+    # lower() que muda o comprimento da linha usa o classificador sem minúsculas
+    assert tjrj.classificar_linha("İ Total Geral 1,00") == (False, False, False, None, True)
+
+
+def test_saida_identica_ao_legado():
+    textos = gerar_textos_relatorio()
+    esperado = json.dumps(extrair_servicos_legado(textos, "2025_10.pdf"), ensure_ascii=False)
+    obtido = json.dumps(_extrair_novo(textos, "2025_10.pdf"), ensure_ascii=False)
+    assert esperado == obtido
+    assert len(json.loads(obtido)) == 400
+
+
+def test_saida_identica_com_marcadores_colados():
+    textos = gerar_textos_relatorio(colar_marcadores=True, seed=11)
+    esperado = json.dumps(extrair_servicos_legado(textos, "2025_09.pdf"), ensure_ascii=False)
+    obtido = json.dumps(_extrair_novo(textos, "2025_09.pdf"), ensure_ascii=False)
+    assert esperado == obtido
+
+
+def test_saida_identica_casos_limite():
+    textos = ["Período: 3/2025\n"
+              "Serviço: 77 - CAPITAL 1 OF Gestor do Serviço: A Condição do Gestor: Delegatário\n"
+              "TOTAL GERAL 1,00\n"
+              "Tabelionatos de Protesto de Títulos e Documentos 9 2,00\n"
+              "Registro Civil das Pessoas NaturaisOfícios e Atos de Notas 1 3,00\n"
+              "İtem Total Geral 1,00 2,00 3,00 4,00Serviço: 78 - MACUCO OFICIO UNICO\n"
+              "Condição do Gestor: Interino\n"
+              "Total Geral 5,00"]
+    esperado = json.dumps(extrair_servicos_legado(textos, "2025_03.pdf"), ensure_ascii=False)
+    obtido = json.dumps(_extrair_novo(textos, "2025_03.pdf"), ensure_ascii=False)
+    assert esperado == obtido
+    assert len(json.loads(obtido)) == 2
+
+
+# ============================================================
+# MICRO-BENCHMARK
+# ============================================================
+
+def benchmark(repeticoes=5):
+    textos = gerar_textos_relatorio(n_servicos=3000)
+    total_linhas = sum(len(t.split("\n")) for t in textos)
+
+    resultados = {}
+    for nome, func in (("anterior", extrair_servicos_legado), ("tokenizador", _extrair_novo)):
+        melhor = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            func(textos, "2025_10.pdf")
+            melhor = min(melhor, time.perf_counter() - inicio)
+        resultados[nome] = total_linhas / melhor
+        print(f"  {nome:<12} {resultados[nome]:>12,.0f} linhas/s")
+    print(f"  Ganho: {resultados['tokenizador'] / resultados['anterior']:.2f}x ({total_linhas} linhas)")
+    return resultados
+
+
+if __name__ == "__main__":
+    test_classificar_linha()
+    test_saida_identica_ao_legado()
+    test_saida_identica_com_marcadores_colados()
+    test_saida_identica_casos_limite()
+    print("[OK] Saída idêntica à implementação anterior.")
+    print("\n=== Micro-benchmark (somente classificação de linhas, sem pdfplumber) ===")
+    benchmark()
@@ -4,9 +4,7 @@ Wrapper para integração com o botão de atualização geral
 """
 import os
 import sys
-import json
-import gspread
-from google.oauth2.service_account import Credentials
+import gsheets_client_utils
 from cnj_api import CNJClient
 import pandas as pd
 from datetime import datetime
@@ -19,25 +17,6 @@ def main():
     print("Iniciando atualização do Cadastro CNJ...")
     
     try:
-        # Autenticação
-        if "GCP_SERVICE_ACCOUNT" in os.environ:
-            creds_dict = json.loads(os.environ["GCP_SERVICE_ACCOUNT"])
-            scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-            credentials = Credentials.from_service_account_info(creds_dict, scopes=scope)
-            gc = gspread.authorize(credentials)
-        elif os.path.exists(".streamlit/secrets.toml"):
-            import toml
-            secrets = toml.load(".streamlit/secrets.toml")
-            if "gcp_service_account" in secrets:
-                creds_dict = dict(secrets["gcp_service_account"])
-                scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-                credentials = Credentials.from_service_account_info(creds_dict, scopes=scope)
-                gc = gspread.authorize(credentials)
-            else:
-                gc = gspread.service_account()
-        else:
-            gc = gspread.service_account()
-        
         # Buscar dados
         client = CNJClient()
         estados = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 
@@ -59,7 +38,7 @@ def main():
         df.insert(0, 'data_atualizacao', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         df = df.astype(str)
         
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         try:
             ws = sh.worksheet(WORKSHEET_NAME)
             ws.clear()
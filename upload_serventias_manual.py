@@ -4,8 +4,7 @@ Use este script quando baixar manualmente o CSV do Qlik Sense
 """
 
 import pandas as pd
-import gspread
-import toml
+import gsheets_client_utils
 from cns_utils import normalize_cns_column
 
 print("=== Upload Manual - Lista de Serventias ===\n")
@@ -38,7 +37,7 @@ print("✅ CNS normalizado para 6 dígitos")
 
 # Conecta ao Google Sheets
 print("\nConectando ao Google Sheets...")
-gc = gspread.service_account_from_dict(toml.load('.streamlit/secrets.toml')['gcp_service_account'])
+gc = gsheets_client_utils.obter_cliente()
 sh = gc.open_by_key('1Cx_ceynq_Y_pFKRUtFyHkLEJIvBvlWFjGo5LuOAvW-Y')
 
 # Atualiza aba
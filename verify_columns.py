@@ -1,6 +1,5 @@
-import gspread
+import gsheets_client_utils
 import os
-import toml
 import pandas as pd
 import json
 
@@ -8,18 +7,7 @@ SHEET_ID = "1Cx_ceynq_Y_pFKRUtFyHkLEJIvBvlWFjGo5LuOAvW-Y"
 
 def check_columns():
     try:
-        # Autenticação
-        if os.path.exists(".streamlit/secrets.toml"):
-            secrets = toml.load(".streamlit/secrets.toml")
-            if "gcp_service_account" in secrets:
-                creds_dict = dict(secrets["gcp_service_account"])
-                gc = gspread.service_account_from_dict(creds_dict)
-            else:
-                gc = gspread.service_account()
-        else:
-            gc = gspread.service_account()
-            
-        sh = gc.open_by_key(SHEET_ID)
+        sh = gsheets_client_utils.abrir_planilha(SHEET_ID)
         
         # Check Arrecadacao
         try: